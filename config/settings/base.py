@@ -63,6 +63,39 @@ DATABASES = {
     "wordpress_dev": env.db("WORDPRESS_DATABASE_URL", ""),
 }
 
+# Circuit breaker around the WordPress database connection. After
+# WORDPRESS_DB_CIRCUIT_FAILURES connection failures, new connections fail fast
+# (as OperationalError) for WORDPRESS_DB_CIRCUIT_COOLDOWN seconds, after which
+# a single probe connection is let through. State is shared via the cache.
+WORDPRESS_DB_CIRCUIT_BREAKER = env.bool(
+    "WORDPRESS_DB_CIRCUIT_BREAKER", default=True
+)
+WORDPRESS_DB_CIRCUIT_FAILURES = env.int(
+    "WORDPRESS_DB_CIRCUIT_FAILURES", default=3
+)
+WORDPRESS_DB_CIRCUIT_COOLDOWN = env.int(
+    "WORDPRESS_DB_CIRCUIT_COOLDOWN", default=30
+)
+
+if WORDPRESS_DB_CIRCUIT_BREAKER and DATABASES["wordpress_dev"].get("ENGINE"):
+    DATABASES["wordpress_dev"]["WRAPPED_ENGINE"] = DATABASES["wordpress_dev"][
+        "ENGINE"
+    ]
+    DATABASES["wordpress_dev"]["ENGINE"] = (
+        "knowledge_commons_profiles.common.db_backends.circuit_breaker"
+    )
+    DATABASES["wordpress_dev"]["CIRCUIT_BREAKER"] = {
+        "FAILURES": WORDPRESS_DB_CIRCUIT_FAILURES,
+        "COOLDOWN": WORDPRESS_DB_CIRCUIT_COOLDOWN,
+    }
+
+# Serve REST API group memberships from the Postgres mirror kept current by
+# the sync_group_memberships management command (the group_mirror service)
+# instead of querying WordPress.
+GROUP_MEMBERSHIP_MIRROR_ENABLED = env.bool(
+    "GROUP_MEMBERSHIP_MIRROR_ENABLED", default=False
+)
+
 DATABASE_ROUTERS = [
     "knowledge_commons_profiles.newprofile.wordpress_router.ReadWriteRouter"
 ]
@@ -173,6 +206,9 @@ MIDDLEWARE = [
     # login from another domain onto broker-client hosts. Inert elsewhere.
     "knowledge_commons_profiles.cilogon.middleware.BrokerClientSilentLoginMiddleware",
     "knowledge_commons_profiles.common.middleware.RequestMiddleware",
+    # Per-request cache of Profile/WpUser/User rows and API objects, shared
+    # by views and serializers that look up the same username.
+    "knowledge_commons_profiles.common.middleware.IdentityMapMiddleware",
 ]
 
 # STATIC
@@ -438,6 +474,24 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 50,
 }
 
+# Render and parse REST API JSON with orjson (common.fast_json) instead of
+# the json module. The output decodes to the same values, though floats are
+# formatted differently and NaN is written as null (see
+# rest_api/renderers.py). Without orjson installed the classes fall back to
+# DRF's own.
+FAST_JSON_API = env.bool("FAST_JSON_API", default=False)
+
+if FAST_JSON_API:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
+        "knowledge_commons_profiles.rest_api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"] = [
+        "knowledge_commons_profiles.rest_api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ]
+
 # OAuth forwarding domain whitelist for CILogon proxy redirects.
 # SECURITY: Only include production domains in defaults. Development domains
 # (localhost, lndo.site, etc.) should be explicitly configured via environment
@@ -591,6 +645,29 @@ UP_API_BASE_URL = env("UP_API_BASE_URL", default="https://www.up.org/api/")
 UP_CLIENT_ID = env("UP_CLIENT_ID", default="")
 UP_CLIENT_SECRET = env("UP_CLIENT_SECRET", default="")
 UP_REFRESH_TOKEN = env("UP_REFRESH_TOKEN", default="")
+# The Salesforce access token is shared through the cache and refreshed
+# UP_TOKEN_REFRESH_MARGIN seconds before it expires. Salesforce does not
+# always say how long a token lasts; UP_TOKEN_LIFETIME should then match the
+# org's session timeout.
+UP_TOKEN_LIFETIME = env.int("UP_TOKEN_LIFETIME", default=2 * 60 * 60)
+UP_TOKEN_REFRESH_MARGIN = env.int("UP_TOKEN_REFRESH_MARGIN", default=10 * 60)
+
+# Rate limits for the partner APIs, as "calls/seconds", shared by every
+# process through Redis. A key is a partner ("MLA") or a partner and the
+# first part of an endpoint's path ("MLA:members"); a partner without one
+# gets the default in its module. A call waits up to
+# SYNC_API_RATE_LIMIT_WAIT seconds for the limiter (0 to fail at once).
+SYNC_API_RATE_LIMITS = env.dict("SYNC_API_RATE_LIMITS", default={})
+SYNC_API_RATE_LIMIT_WAIT = env.float("SYNC_API_RATE_LIMIT_WAIT", default=5.0)
+
+# How long a partner's answer that it has no record of an email is kept,
+# apart from the search caches above, which then only hold hits; 0 turns
+# this off. An email's misses are forgotten when a user adds it. Keep it no
+# longer than the search caches, or someone who has just joined a partner
+# waits longer to be recognised than a lapsed member does to be dropped.
+SYNC_API_NEGATIVE_CACHE_TIMEOUT = env.int(
+    "SYNC_API_NEGATIVE_CACHE_TIMEOUT", default=24 * 60 * 60
+)
 
 EXTERNAL_SYNC_CLASSES: list[tuple[str, list[str]]] = [
     ("MLA", ["Modern Language Association", "MLA"]),
@@ -599,6 +676,23 @@ EXTERNAL_SYNC_CLASSES: list[tuple[str, list[str]]] = [
     ("UP", ["Association of American University Presses"]),
 ]
 
+# ExternalSync.sync looks a user up in the partner APIs concurrently and
+# skips any that has not answered within this many seconds. An inline sync
+# runs inside a request, so keep this well below gunicorn's --timeout (15
+# seconds in compose/production/django/start).
+EXTERNAL_SYNC_DEADLINE = env.float("EXTERNAL_SYNC_DEADLINE", default=6.0)
+# The threads the partner lookups run on, kept apart from the outbound pool
+# below so that a hung partner cannot starve logout propagation. A sync
+# takes one per partner, and a lookup that misses the deadline holds its
+# thread until the partner's own timeout; the default covers gunicorn's 8
+# threads syncing at once with room for that many hung lookups.
+EXTERNAL_SYNC_WORKERS = env.int("EXTERNAL_SYNC_WORKERS", default=64)
+
+# Minutes before a sync that skipped a failed or slow partner is retried.
+# Until then the profile counts as synced, so a partner that keeps failing
+# is not asked again on every request.
+EXTERNAL_SYNC_RETRY_MINUTES = env.int("EXTERNAL_SYNC_RETRY_MINUTES", 15)
+
 # Each entry is (code, display_name, tagline). The code is the
 # load-bearing identifier written to Profile.role_overrides and synced
 # to WordPress/COmanage; it must never change. display_name and tagline
@@ -645,10 +739,22 @@ NETWORK_DISPLAY_NAMES = env.json(
 
 LOGOUT_ENDPOINTS = env.list("LOGOUT_ENDPOINTS", default=[])
 
+# The threads shared by logout propagation, the health check and the
+# subscriber pings (common/http_pool.py), and the seconds to wait for all
+# the calls in one fan-out
+OUTBOUND_HTTP_WORKERS = env.int("OUTBOUND_HTTP_WORKERS", default=16)
+OUTBOUND_FANOUT_DEADLINE = env.float("OUTBOUND_FANOUT_DEADLINE", default=10.0)
+# The connections each async client keeps to one host (common/http_pool.py)
+OUTBOUND_ASYNC_CONNECTIONS = env.int("OUTBOUND_ASYNC_CONNECTIONS", default=100)
+
 WORKS_UPDATE_ENDPOINTS = env.list(
     "WORKS_UPDATE_ENDPOINTS", default=["https://works.hcommons.org/"]
 )
 
+# The most user updates the outbox dispatcher sends to a works endpoint in
+# one POST
+IDMS_UPDATE_BATCH_SIZE = env.int("IDMS_UPDATE_BATCH_SIZE", default=100)
+
 WEBHOOK_TOKEN = env("WEBHOOK_TOKEN")
 WEBHOOK_URLS = env.list("WEBHOOK_URLS", default=[])
 WORDPRESS_EMAIL_UPDATE_URL = env("WORDPRESS_EMAIL_UPDATE_URL", default="")
@@ -666,6 +772,38 @@ SYNC_HOURS = env.int(
     "SYNC_HOURS", 24
 )  # hours before syncs are considered stale
 
+# When set, REST API reads serve the stored memberships of a stale profile
+# and queue a refresh for the run_sync_worker command instead of calling
+# the partner APIs inline
+EXTERNAL_SYNC_IN_BACKGROUND = env.bool("EXTERNAL_SYNC_IN_BACKGROUND", True)
+
+# The /api/v1/changes/ feed keeps change log entries for this many days;
+# readers with an older cursor must resync in full. Entries older than
+# CHANGE_FEED_COMPACT_AFTER_HOURS that a newer entry for the same object
+# supersedes are dropped by the compact_change_feed command.
+CHANGE_FEED_RETENTION_DAYS = env.int("CHANGE_FEED_RETENTION_DAYS", 30)
+CHANGE_FEED_COMPACT_AFTER_HOURS = env.int(
+    "CHANGE_FEED_COMPACT_AFTER_HOURS", 24
+)
+
+# Seconds to keep a group's cached metadata (name, slug, status,
+# description, avatar and group blog URL). Renames and status changes seen
+# by sync_group_memberships invalidate it sooner; warm_group_cache refills
+# it for every group.
+GROUP_METADATA_CACHE_TIMEOUT = env.int("GROUP_METADATA_CACHE_TIMEOUT", 3600)
+
+# Seconds a cached group's name, slug and status are trusted before a hit
+# re-reads them from WordPress, so that a status change is seen within this
+# time however long the rest of the entry is kept.
+GROUP_STATUS_CHECK_TIMEOUT = env.int("GROUP_STATUS_CHECK_TIMEOUT", 60)
+
+# Seconds to keep a rendered anonymous profile or group detail response in
+# the shared cache, keyed by its version stamp; 0 turns the cache off.
+# Authenticated responses are never cached there.
+ANONYMOUS_RESPONSE_CACHE_TIMEOUT = env.int(
+    "ANONYMOUS_RESPONSE_CACHE_TIMEOUT", 600
+)
+
 CC_SEARCH_URL = env("CC_SEARCH_URL", default="https://search.hcommons.org/v1/")
 
 # for now, the ADMIN KEY is used in place of the API KEY
@@ -973,61 +973,74 @@ def send_association_message(sub: str, kc_id: str):
     """
 
     for base_endpoint in settings.WORKS_UPDATE_ENDPOINTS:
+        if send_association_message_to(base_endpoint, sub, kc_id):
+            return
 
-        config = APIClientConfig(
-            base_url=base_endpoint,
-            timeout=30,
-            max_retries=3,
-            backoff_factor=0.5,
-        )
-        client = APIClient(config)
+    return
 
-        association_updates = [
-            AssociationUpdate(
-                id=sub,
-                kc_id=kc_id,
-                event=EventType.ASSOCIATED,
-            ),
-        ]
 
-        try:
-            # Send updates
-            response = client.send_association(
-                endpoint="/api/webhooks/user_data_update",
-                idp="cilogon",
-                associations=association_updates,
-                headers={
-                    "Authorization": "Bearer " + settings.WEBHOOK_TOKEN,
-                },
-            )
+def send_association_message_to(base_endpoint: str, sub: str, kc_id: str):
+    """
+    Send an association message to one works endpoint
+    :param base_endpoint: the endpoint's base URL
+    :param sub: the subject
+    :param kc_id: the kc id
+    :return: True if the endpoint accepted the message
+    """
+    config = APIClientConfig(
+        base_url=base_endpoint,
+        timeout=30,
+        max_retries=3,
+        backoff_factor=0.5,
+    )
+    client = APIClient(config)
 
-            if response.data:
-                message = "Success! Response: %s"
-                logger.info(message, json.dumps(response.data, indent=2))
-            else:
-                message = "Success! Raw response: %s"
-                logger.info(message, response.raw_response)
+    association_updates = [
+        AssociationUpdate(
+            id=sub,
+            kc_id=kc_id,
+            event=EventType.ASSOCIATED,
+        ),
+    ]
 
-        except ValueError:
-            message = "Validation error: %s"
-            logger.exception(message)
-        except requests.exceptions.ConnectionError:
-            message = "Failed to connect to the API server"
-            logger.exception(message)
-        except requests.exceptions.Timeout:
-            message = "Request timed out"
-            logger.exception(message)
-        except requests.exceptions.HTTPError:
-            message = "HTTP error occurred"
-            logger.exception(message)
-        except requests.exceptions.RequestException:
-            message = "Request failed"
-            logger.exception(message)
-        except Exception:
-            message = "Unexpected error"
-            logger.exception(message)
+    try:
+        # Send updates
+        response = client.send_association(
+            endpoint="/api/webhooks/user_data_update",
+            idp="cilogon",
+            associations=association_updates,
+            headers={
+                "Authorization": "Bearer " + settings.WEBHOOK_TOKEN,
+            },
+        )
 
+        if response.data:
+            message = "Success! Response: %s"
+            logger.info(message, json.dumps(response.data, indent=2))
         else:
-            return
+            message = "Success! Raw response: %s"
+            logger.info(message, response.raw_response)
 
-    return
+    except ValueError:
+        message = "Validation error: %s"
+        logger.exception(message)
+    except requests.exceptions.ConnectionError:
+        message = "Failed to connect to the API server"
+        logger.exception(message)
+    except requests.exceptions.Timeout:
+        message = "Request timed out"
+        logger.exception(message)
+    except requests.exceptions.HTTPError:
+        message = "HTTP error occurred"
+        logger.exception(message)
+    except requests.exceptions.RequestException:
+        message = "Request failed"
+        logger.exception(message)
+    except Exception:
+        message = "Unexpected error"
+        logger.exception(message)
+
+    else:
+        return True
+
+    return False
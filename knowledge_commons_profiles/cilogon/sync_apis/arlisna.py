@@ -6,7 +6,6 @@ from __future__ import annotations
 
 import json
 import logging
-import re
 from datetime import UTC
 from datetime import datetime
 
@@ -15,10 +14,10 @@ from decimal import Decimal
 from http import HTTPMethod
 
 import dateutil
+import httpx
 import requests
 import sentry_sdk
 from django.conf import settings
-from django.core.cache import cache
 from django.core.validators import validate_email
 from pydantic import BaseModel
 from pydantic import ConfigDict
@@ -27,13 +26,12 @@ from pydantic import TypeAdapter
 from pydantic import ValidationError
 from pydantic import model_validator
 from requests.adapters import HTTPAdapter
-from rest_framework.status import HTTP_200_OK
 from urllib3.util.retry import Retry
 
-from knowledge_commons_profiles.__version__ import VERSION
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import APIError
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import SyncClass
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import rate_limit
+from knowledge_commons_profiles.common import http_pool
 from knowledge_commons_profiles.common.profiles_email import normalize_email
 
 MEMBERS_URL = "members"
@@ -251,21 +249,23 @@ class ARLISNA(SyncClass):
         )
         self.session.mount("https://", adapter)
 
+    def _headers(self):
+        return {
+            "Content-Type": "application/json",
+            "Authorization": "Basic " + settings.ARLISNA_API_TOKEN,
+        }
+
     @rate_limit(max_calls=MAX_CALLS, period=MAX_CALL_PERIOD)
     def _make_rest_request(self, url, http_method=HTTPMethod.GET, params=None):
         """
         Make a request to the ARLISNA API
         """
         timeout = 30
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": "Basic " + settings.ARLISNA_API_TOKEN,
-        }
 
         response = self.session.request(
             method=http_method,
             url=url,
-            headers=headers,
+            headers=self._headers(),
             params=params,
             timeout=timeout,
             verify=True,
@@ -274,6 +274,26 @@ class ARLISNA(SyncClass):
 
         return response
 
+    @rate_limit(max_calls=MAX_CALLS, period=MAX_CALL_PERIOD)
+    async def _amake_rest_request(
+        self, url, http_method=HTTPMethod.GET, params=None
+    ):
+        """
+        Make a request to the ARLISNA API with the shared async client
+        """
+        timeout = 30
+
+        response = await http_pool.async_client_for(url).request(
+            http_method,
+            url,
+            headers=self._headers(),
+            params=params,
+            timeout=timeout,
+        )
+        response.raise_for_status()
+
+        return response
+
     def _query_arlisna_api(
         self,
         attributes: dict[str, str],
@@ -285,12 +305,10 @@ class ARLISNA(SyncClass):
         :param attributes:
         :return:
         """
+        cached_response = self._cached_response(cache_key)
 
-        if cache_key:
-            cached_response = cache.get(cache_key, version=VERSION)
-
-            if cached_response is not None:
-                return cached_response
+        if cached_response is not None:
+            return cached_response
 
         suffix = suffix if suffix else MEMBERS_URL
         url = self.base_url + suffix
@@ -299,44 +317,46 @@ class ARLISNA(SyncClass):
             response = self._make_rest_request(
                 url, HTTPMethod.GET, params=attributes
             )
+        except requests.exceptions.RequestException as e:
+            raise self._request_failed(e) from e
 
-            cache_timeout = settings.ARLISNA_CACHE_TIMEOUT
+        return self._read_response(
+            response, cache_key, settings.ARLISNA_CACHE_TIMEOUT
+        )
 
-            if "Cache-Control" in response.headers:
-                # Parse max-age from Cache-Control header
-                match = re.search(
-                    r"max-age=(\d+)", response.headers["Cache-Control"]
-                )
-                if match:
-                    cache_timeout = min(int(match.group(1)), cache_timeout)
-
-            if cache_key:
-                cache.set(
-                    cache_key,
-                    response.content,
-                    timeout=cache_timeout,
-                    version=VERSION,
-                )
+    async def _aquery_arlisna_api(
+        self,
+        attributes: dict[str, str],
+        suffix: str | None = None,
+        cache_key: str | None = None,
+    ):
+        """
+        Query the ARLISNA API from async code
+        """
+        cached_response = self._cached_response(cache_key)
 
-        except requests.exceptions.RequestException as e:
-            message = f"Request to ARLISNA API failed: {e}"
-            logger.exception(message)
-            raise APIError(message) from e
+        if cached_response is not None:
+            return cached_response
 
-        if response.status_code == HTTP_200_OK:
-            logger.debug("ARLISNA response: %s", response.content)
-            return response.content
+        suffix = suffix if suffix else MEMBERS_URL
+        url = self.base_url + suffix
 
-        message = f"Received {response.status_code} response"
-        logger.error(message)
-        raise APIError(message)
+        try:
+            response = await self._amake_rest_request(
+                url, HTTPMethod.GET, params=attributes
+            )
+        except httpx.HTTPError as e:
+            raise self._request_failed(e) from e
 
-    def is_member(self, user_id: str) -> bool:
+        return self._read_response(
+            response, cache_key, settings.ARLISNA_CACHE_TIMEOUT
+        )
+
+    @staticmethod
+    def _is_current(response) -> bool:
         """
-        Check if a user is a member
+        Whether a member record's membership has not yet expired
         """
-        response: MembersSearchResponse | dict = self.get_user_info(user_id)
-
         if hasattr(response, "TotalCount") and response.TotalCount > 0:
             # parse response.data[0].membership.expiring_date into a date
             # and check if it is in the future
@@ -354,36 +374,87 @@ class ARLISNA(SyncClass):
 
         return False
 
+    def is_member(self, user_id: str) -> bool:
+        """
+        Check if a user is a member
+        """
+        response: MembersSearchResponse | dict = self.get_user_info(user_id)
+
+        return self._is_current(response)
+
+    async def ais_member(self, user_id: str) -> bool:
+        """
+        Check if a user is a member, from async code
+        """
+        return self._is_current(await self.aget_user_info(user_id))
+
+    def _search_hit(self, email, result):
+        """
+        The parsed search result for an email if it found the user, noting
+        a miss if it did not
+        """
+        adapted: MembersSearchResponse = self._process_adapter(
+            MembersSearchResponse, result
+        )
+
+        if hasattr(adapted, "TotalCount"):
+            if adapted.TotalCount > 0:
+                return adapted
+
+            self._record_misses([email], [f"ARLISNA_api_search_{email}"])
+
+        return None
+
     def search_multiple(self, emails) -> MembersSearchResponse | dict:
         """
         Search for a user
         :param emails: the emails to search for; first hit will be returned
         """
-        for raw_email in emails:
-            email = normalize_email(raw_email)
-            if not email:
-                continue
-            cache_key = f"ARLISNA_api_search_{email}"
+        emails = [email for email in map(normalize_email, emails) if email]
+        misses = self._known_misses(emails)
 
-            search_params = {
-                "email": email,
-            }
+        for email in emails:
+            if email in misses:
+                continue
 
             try:
                 logger.info("Searching for %s in ARLISNA", email)
                 result = self._query_arlisna_api(
-                    search_params, cache_key=cache_key
+                    {"email": email}, cache_key=f"ARLISNA_api_search_{email}"
                 )
+            except APIError:
+                continue
 
-                adapted: MembersSearchResponse = self._process_adapter(
-                    MembersSearchResponse, result
-                )
+            hit = self._search_hit(email, result)
+            if hit:
+                return {"ARLISNA": hit}
+
+        return {"ARLISNA": None}
 
-                if hasattr(adapted, "TotalCount") and adapted.TotalCount > 0:
-                    return {"ARLISNA": adapted}
+    async def asearch_multiple(self, emails) -> MembersSearchResponse | dict:
+        """
+        Search for a user from async code
+        :param emails: the emails to search for; first hit will be returned
+        """
+        emails = [email for email in map(normalize_email, emails) if email]
+        misses = self._known_misses(emails)
+
+        for email in emails:
+            if email in misses:
+                continue
 
+            try:
+                logger.info("Searching for %s in ARLISNA", email)
+                result = await self._aquery_arlisna_api(
+                    {"email": email}, cache_key=f"ARLISNA_api_search_{email}"
+                )
             except APIError:
                 continue
+
+            hit = self._search_hit(email, result)
+            if hit:
+                return {"ARLISNA": hit}
+
         return {"ARLISNA": None}
 
     def get_sync_id(self, response: MembersSearchResponse):
@@ -396,10 +467,10 @@ class ARLISNA(SyncClass):
             return response.Results[0].Email
         return None
 
-    def search(self, email) -> MembersSearchResponse | dict:
+    @staticmethod
+    def _valid_email(email):
         """
-        Search for a user
-        :param email: the email to search for
+        Normalize an email, raising ValueError if it is not valid
         """
         email = normalize_email(email)
         try:
@@ -408,15 +479,37 @@ class ARLISNA(SyncClass):
             message = f"Invalid email address: {email}"
             raise ValueError(message) from ve
 
-        cache_key = f"ARLISNA_api_search_{email}"
+        return email
 
-        search_params = {
-            "email": email,
-        }
+    def search(self, email) -> MembersSearchResponse | dict:
+        """
+        Search for a user
+        :param email: the email to search for
+        """
+        email = self._valid_email(email)
 
         try:
             result = self._query_arlisna_api(
-                search_params, cache_key=cache_key
+                {"email": email}, cache_key=f"ARLISNA_api_search_{email}"
+            )
+        except APIError:
+            return {}
+
+        if not result:
+            return {}
+
+        return self._process_adapter(MembersSearchResponse, result)
+
+    async def asearch(self, email) -> MembersSearchResponse | dict:
+        """
+        Search for a user from async code
+        :param email: the email to search for
+        """
+        email = self._valid_email(email)
+
+        try:
+            result = await self._aquery_arlisna_api(
+                {"email": email}, cache_key=f"ARLISNA_api_search_{email}"
             )
         except APIError:
             return {}
@@ -458,15 +551,33 @@ class ARLISNA(SyncClass):
             logger.exception("Invalid ARLISNA ID (must be string or int)")
             return {}
 
-        cache_key = f"ARLISNA_api_user_info_{arlisna_id}"
+        try:
+            result = self._query_arlisna_api(
+                {"email": arlisna_id},
+                suffix="members",
+                cache_key=f"ARLISNA_api_user_info_{arlisna_id}",
+            )
+        except APIError:
+            return {}
+
+        if not result:
+            return {}
 
-        search_params = {"email": arlisna_id}
+        return self._process_adapter(MembersSearchResponse, result)
+
+    async def aget_user_info(
+        self, arlisna_id: str | int
+    ) -> MembersSearchResponse | dict:
+        """
+        Search for a user from async code
+        """
+        arlisna_id = str(arlisna_id)
 
         try:
-            result = self._query_arlisna_api(
-                search_params,
+            result = await self._aquery_arlisna_api(
+                {"email": arlisna_id},
                 suffix="members",
-                cache_key=cache_key,
+                cache_key=f"ARLISNA_api_user_info_{arlisna_id}",
             )
         except APIError:
             return {}
@@ -481,3 +592,9 @@ class ARLISNA(SyncClass):
         Get a user's groups
         """
         return []
+
+    async def agroups(self, user_id: str | int) -> list[str]:
+        """
+        Get a user's groups from async code
+        """
+        return []
@@ -6,7 +6,6 @@ import hashlib
 import hmac
 import json
 import logging
-import re
 import time
 from datetime import UTC
 from datetime import datetime
@@ -15,11 +14,11 @@ from typing import Literal
 from urllib import parse
 from urllib.parse import urlencode
 
+import httpx
 import requests
 import sentry_sdk
 from dateutil import parser
 from django.conf import settings
-from django.core.cache import cache
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.validators import validate_email
 from pydantic import BaseModel
@@ -27,13 +26,12 @@ from pydantic import SecretStr
 from pydantic import TypeAdapter
 from pydantic import ValidationError
 from requests.adapters import HTTPAdapter
-from rest_framework.status import HTTP_200_OK
 from urllib3.util.retry import Retry
 
-from knowledge_commons_profiles.__version__ import VERSION
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import APIError
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import SyncClass
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import rate_limit
+from knowledge_commons_profiles.common import http_pool
 from knowledge_commons_profiles.common.profiles_email import normalize_email
 
 logger = logging.getLogger(__name__)
@@ -372,6 +370,37 @@ class MLA(SyncClass):
 
         return response
 
+    @rate_limit(max_calls=MAX_CALLS, period=MAX_CALL_PERIOD)
+    async def _amake_rest_request(
+        self, url, http_method=HTTPMethod.GET, params=None
+    ):
+        """
+        Make a request to the MLA API with the shared async client
+        """
+        timeout = 30
+        headers = {"Content-Type": "application/json"}
+
+        response = await http_pool.async_client_for(url).request(
+            http_method, url, headers=headers, params=params, timeout=timeout
+        )
+        response.raise_for_status()
+
+        return response
+
+    def _signed_request(self, attributes: dict[str, str], suffix=None):
+        """
+        The URL and signed parameters for a query of the MLA API
+        """
+        suffix = suffix if suffix else MEMBERS_URL
+
+        # copy so as not to mutate the original dictionary
+        signed_attributes = attributes.copy()
+        signed_attributes["signature"] = self._get_signature(
+            HTTPMethod.GET, attributes, suffix=suffix
+        )
+
+        return self.base_url + suffix, signed_attributes
+
     def _query_mla_api(
         self,
         attributes: dict[str, str],
@@ -383,65 +412,56 @@ class MLA(SyncClass):
         :param attributes:
         :return:
         """
-        if cache_key:
-            cached_response = cache.get(cache_key, version=VERSION)
+        cached_response = self._cached_response(cache_key)
 
-            if cached_response is not None:
-                return cached_response
-
-        suffix = suffix if suffix else MEMBERS_URL
-        url = self.base_url + suffix
+        if cached_response is not None:
+            return cached_response
 
-        # copy so as not to mutate the original dictionary
-        signed_attributes = attributes.copy()
-        signed_attributes["signature"] = self._get_signature(
-            HTTPMethod.GET, attributes, suffix=suffix
-        )
+        url, signed_attributes = self._signed_request(attributes, suffix)
 
         try:
             response = self._make_rest_request(
                 url, HTTPMethod.GET, signed_attributes
             )
+        except requests.exceptions.RequestException as e:
+            raise self._request_failed(e) from e
 
-            cache_timeout = settings.MLA_CACHE_TIMEOUT
+        return self._read_response(
+            response, cache_key, settings.MLA_CACHE_TIMEOUT
+        )
 
-            if "Cache-Control" in response.headers:
-                # Parse max-age from Cache-Control header
-                match = re.search(
-                    r"max-age=(\d+)", response.headers["Cache-Control"]
-                )
-                if match:
-                    cache_timeout = min(int(match.group(1)), cache_timeout)
-
-            if cache_key:
-                cache.set(
-                    cache_key,
-                    response.content,
-                    timeout=cache_timeout,
-                    version=VERSION,
-                )
+    async def _aquery_mla_api(
+        self,
+        attributes: dict[str, str],
+        suffix: str | None = None,
+        cache_key: str | None = None,
+    ):
+        """
+        Query the MLA API from async code
+        """
+        cached_response = self._cached_response(cache_key)
 
-        except requests.exceptions.RequestException as e:
-            message = f"Request to MLA API failed: {e}"
-            logger.exception(message)
-            raise APIError(message) from e
+        if cached_response is not None:
+            return cached_response
 
-        if response.status_code == HTTP_200_OK:
-            logger.debug("MLA response: %s", response.content)
-            return response.content
+        url, signed_attributes = self._signed_request(attributes, suffix)
 
-        message = f"Received {response.status_code} response"
-        logger.error(message)
-        raise APIError(message)
+        try:
+            response = await self._amake_rest_request(
+                url, HTTPMethod.GET, signed_attributes
+            )
+        except httpx.HTTPError as e:
+            raise self._request_failed(e) from e
 
-    def is_member(self, user_id: str | int) -> bool:
-        """
-        Check if a user is a member
-        """
-        response: MemberResponse | CommonErrorResponse | dict = (
-            self.get_user_info(user_id)
+        return self._read_response(
+            response, cache_key, settings.MLA_CACHE_TIMEOUT
         )
 
+    @staticmethod
+    def _is_current(response) -> bool:
+        """
+        Whether a member record's membership has not yet expired
+        """
         if (
             getattr(response, "meta", None) is not None
             and response.meta.status == "success"
@@ -459,6 +479,50 @@ class MLA(SyncClass):
 
         return False
 
+    def is_member(self, user_id: str | int) -> bool:
+        """
+        Check if a user is a member
+        """
+        response: MemberResponse | CommonErrorResponse | dict = (
+            self.get_user_info(user_id)
+        )
+
+        return self._is_current(response)
+
+    async def ais_member(self, user_id: str | int) -> bool:
+        """
+        Check if a user is a member, from async code
+        """
+        return self._is_current(await self.aget_user_info(user_id))
+
+    @staticmethod
+    def _search_params(email):
+        return {
+            "email": email,
+            "membership_status": "ALL",
+            "timestamp": time.time(),
+            "key": settings.MLA_API_KEY,
+        }
+
+    def _search_hit(self, email, result):
+        """
+        The parsed search result for an email if it found the user, noting
+        a miss if it did not
+        """
+        adapted = self._process_adapter(SearchApiResponse, result)
+
+        if (
+            hasattr(adapted, "meta")
+            and adapted.meta.status == "success"
+            and hasattr(adapted.data[0], "total_num_results")
+        ):
+            if adapted.data[0].total_num_results > 0:
+                return adapted
+
+            self._record_misses([email], [f"MLA_api_search_{email}"])
+
+        return None
+
     def search_multiple(
         self, emails
     ) -> SearchApiResponse | CommonErrorResponse | dict:
@@ -466,37 +530,55 @@ class MLA(SyncClass):
         Search for a user
         :param emails: the emails to search for; first hit will be returned
         """
-        for raw_email in emails:
-            email = normalize_email(raw_email)
-            if not email:
-                continue
-            cache_key = f"MLA_api_search_{email}"
+        emails = [email for email in map(normalize_email, emails) if email]
+        misses = self._known_misses(emails)
 
-            search_params = {
-                "email": email,
-                "membership_status": "ALL",
-                "timestamp": time.time(),
-                "key": settings.MLA_API_KEY,
-            }
+        for email in emails:
+            if email in misses:
+                continue
 
             try:
                 logger.info("Searching for %s in MLA", email)
                 result = self._query_mla_api(
-                    search_params, cache_key=cache_key
+                    self._search_params(email),
+                    cache_key=f"MLA_api_search_{email}",
                 )
+            except APIError:
+                continue
+
+            hit = self._search_hit(email, result)
+            if hit:
+                return {"MLA": hit}
 
-                adapted = self._process_adapter(SearchApiResponse, result)
+        return {"MLA": None}
+
+    async def asearch_multiple(
+        self, emails
+    ) -> SearchApiResponse | CommonErrorResponse | dict:
+        """
+        Search for a user from async code
+        :param emails: the emails to search for; first hit will be returned
+        """
+        emails = [email for email in map(normalize_email, emails) if email]
+        misses = self._known_misses(emails)
 
-                if (
-                    hasattr(adapted, "meta")
-                    and adapted.meta.status == "success"
-                    and hasattr(adapted.data[0], "total_num_results")
-                    and adapted.data[0].total_num_results > 0
-                ):
-                    return {"MLA": adapted}
+        for email in emails:
+            if email in misses:
+                continue
 
+            try:
+                logger.info("Searching for %s in MLA", email)
+                result = await self._aquery_mla_api(
+                    self._search_params(email),
+                    cache_key=f"MLA_api_search_{email}",
+                )
             except APIError:
                 continue
+
+            hit = self._search_hit(email, result)
+            if hit:
+                return {"MLA": hit}
+
         return {"MLA": None}
 
     def get_sync_id(self, response):
@@ -509,10 +591,10 @@ class MLA(SyncClass):
             return response.data[0].search_results[0].id
         return None
 
-    def search(self, email) -> SearchApiResponse | CommonErrorResponse | dict:
+    @staticmethod
+    def _valid_email(email):
         """
-        Search for a user
-        :param email: the email to search for
+        Normalize an email, raising ValueError if it is not valid
         """
         email = normalize_email(email)
         try:
@@ -521,17 +603,42 @@ class MLA(SyncClass):
             message = f"Invalid email address: {email}"
             raise ValueError(message) from ve
 
-        cache_key = f"MLA_api_search_{email}"
+        return email
 
-        search_params = {
-            "email": email,
-            "membership_status": "ALL",
-            "timestamp": time.time(),
-            "key": settings.MLA_API_KEY,
-        }
+    def search(self, email) -> SearchApiResponse | CommonErrorResponse | dict:
+        """
+        Search for a user
+        :param email: the email to search for
+        """
+        email = self._valid_email(email)
 
         try:
-            result = self._query_mla_api(search_params, cache_key=cache_key)
+            result = self._query_mla_api(
+                self._search_params(email),
+                cache_key=f"MLA_api_search_{email}",
+            )
+        except APIError:
+            return {}
+
+        if not result:
+            return {}
+
+        return self._process_adapter(SearchApiResponse, result)
+
+    async def asearch(
+        self, email
+    ) -> SearchApiResponse | CommonErrorResponse | dict:
+        """
+        Search for a user from async code
+        :param email: the email to search for
+        """
+        email = self._valid_email(email)
+
+        try:
+            result = await self._aquery_mla_api(
+                self._search_params(email),
+                cache_key=f"MLA_api_search_{email}",
+            )
         except APIError:
             return {}
 
@@ -560,6 +667,13 @@ class MLA(SyncClass):
 
         return response
 
+    @staticmethod
+    def _user_info_params():
+        return {
+            "timestamp": time.time(),
+            "key": settings.MLA_API_KEY,
+        }
+
     def get_user_info(
         self, mla_id: str | int
     ) -> MemberResponse | CommonErrorResponse | dict:
@@ -572,18 +686,33 @@ class MLA(SyncClass):
             logger.exception("Invalid MLA ID (must be string or int)")
             return {}
 
-        cache_key = f"MLA_api_user_info_{mla_id}"
+        try:
+            result = self._query_mla_api(
+                self._user_info_params(),
+                suffix=f"{MEMBERS_URL}/{mla_id}",
+                cache_key=f"MLA_api_user_info_{mla_id}",
+            )
+        except APIError:
+            return {}
 
-        search_params = {
-            "timestamp": time.time(),
-            "key": settings.MLA_API_KEY,
-        }
+        if not result:
+            return {}
+
+        return self._process_adapter(MemberResponse, result)
+
+    async def aget_user_info(
+        self, mla_id: str | int
+    ) -> MemberResponse | CommonErrorResponse | dict:
+        """
+        Search for a user from async code
+        """
+        mla_id = str(mla_id)
 
         try:
-            result = self._query_mla_api(
-                search_params,
+            result = await self._aquery_mla_api(
+                self._user_info_params(),
                 suffix=f"{MEMBERS_URL}/{mla_id}",
-                cache_key=cache_key,
+                cache_key=f"MLA_api_user_info_{mla_id}",
             )
         except APIError:
             return {}
@@ -615,3 +744,9 @@ class MLA(SyncClass):
         Get a user's groups
         """
         return []
+
+    async def agroups(self, user_id: str | int) -> list[str]:
+        """
+        Get a user's groups from async code
+        """
+        return []
@@ -100,3 +100,32 @@ class MSU(SyncClass):
         Get a user's groups
         """
         return []
+
+    # MSU membership is read from the email address alone, so there is
+    # nothing to wait for
+
+    async def asearch(self, email) -> dict:
+        """
+        Search for a user from async code
+        :param email: the email to search for
+        """
+        return self.search(email)
+
+    async def asearch_multiple(self, emails) -> dict:
+        """
+        Search for a user from async code
+        :param emails: the emails to search for; first hit will be returned
+        """
+        return self.search_multiple(emails)
+
+    async def ais_member(self, user_id: str | int | list) -> bool:
+        """
+        Check if a user is a member, from async code
+        """
+        return self.is_member(user_id)
+
+    async def agroups(self, user_id: str | int | list) -> list[str]:
+        """
+        Get a user's groups from async code
+        """
+        return []
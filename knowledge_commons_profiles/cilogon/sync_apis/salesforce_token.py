@@ -0,0 +1,225 @@
+"""
+The Salesforce access token for the UP API, shared by every process
+
+The token is kept in the shared cache, encrypted with the token encryption
+key, together with the time it expires. A process that needs a token reads
+it from there rather than asking Salesforce for one of its own.
+
+The token is refreshed UP_TOKEN_REFRESH_MARGIN seconds before it expires.
+Within that margin get_access_token() still returns the current token and
+starts the refresh on the outbound pool, so the request path does not wait
+for Salesforce; the sync worker also calls refresh_if_due() between
+rounds. Refreshes are made under a lock in the cache, so the fleet makes
+one per expiry window. Only when there is no valid token at all, on a cold
+start or after a 401, does a caller wait for a refresh, or for another
+process's refresh to land.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from knowledge_commons_profiles.cilogon.encryption import token_encryptor
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import APIError
+from knowledge_commons_profiles.common import http_pool
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URL = "https://aupresses.my.salesforce.com/services/oauth2/token"
+
+TOKEN_KEY = "up_salesforce_token"
+LOCK_KEY = "up_salesforce_token:refresh"
+
+# longer than a token request can take, so the lock outlives the refresh
+LOCK_TIMEOUT = 45
+
+# how often a caller without a token checks for another process's refresh
+POLL_INTERVAL = 0.1
+
+_background_lock = threading.Lock()
+_background_refresh = None
+
+
+def _read():
+    """
+    The cached token and the time it expires, or None
+    """
+    entry = cache.get(TOKEN_KEY)
+
+    if not entry:
+        return None
+
+    return token_encryptor.decrypt(entry["token"]), entry["expires"]
+
+
+def _write(token, expires):
+    cache.set(
+        TOKEN_KEY,
+        {"token": token_encryptor.encrypt(token), "expires": expires},
+        timeout=max(1, int(expires - time.time())),
+    )
+
+
+def _due(expires):
+    return time.time() >= expires - settings.UP_TOKEN_REFRESH_MARGIN
+
+
+def request_token():
+    """
+    Ask Salesforce for a new access token with the refresh token
+
+    :return: the token and the time it expires
+    """
+    data = {
+        "grant_type": "refresh_token",
+        "client_id": settings.UP_CLIENT_ID,
+        "client_secret": settings.UP_CLIENT_SECRET,
+        "refresh_token": settings.UP_REFRESH_TOKEN,
+    }
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    timeout = 30
+
+    try:
+        resp = http_pool.session_for(TOKEN_URL).post(
+            TOKEN_URL, data=data, headers=headers, timeout=timeout
+        )
+        resp.raise_for_status()
+        result = resp.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        message = f"Unable to refresh the Salesforce token: {e}"
+        logger.exception(message)
+        raise APIError(message) from e
+
+    if "access_token" not in result:
+        message = "Salesforce returned no access token"
+        logger.error(message)
+        raise APIError(message)
+
+    # Salesforce only says how long a token lasts when the connected app
+    # is set up to; otherwise it lasts the org's session timeout
+    lifetime = int(result.get("expires_in") or settings.UP_TOKEN_LIFETIME)
+
+    return result["access_token"], time.time() + lifetime
+
+
+def refresh(stale_token=None):
+    """
+    Fetch and cache a new token, unless another process is doing so
+
+    :param stale_token: a token known not to work; the cached token is
+        only kept if it is a different one
+    :return: the token now cached, or None if another process holds the
+        lock
+    """
+    if not cache.add(LOCK_KEY, value=True, timeout=LOCK_TIMEOUT):
+        return None
+
+    try:
+        # another process may have refreshed while this one waited
+        cached = _read()
+        if cached and cached[0] != stale_token and not _due(cached[1]):
+            return cached[0]
+
+        token, expires = request_token()
+        _write(token, expires)
+        logger.info("Refreshed the Salesforce access token")
+        return token
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def refresh_if_due():
+    """
+    Refresh the token if it is missing or close to expiry
+    """
+    if not settings.UP_REFRESH_TOKEN:
+        return
+
+    cached = _read()
+
+    if cached and not _due(cached[1]):
+        return
+
+    try:
+        refresh()
+    except APIError:
+        # the cached token, if any, is still good until it expires
+        logger.warning("Early refresh of the Salesforce token failed")
+
+
+def _refresh_in_background():
+    """
+    Start refresh_if_due() on the outbound pool, once per process at a time
+    """
+    global _background_refresh  # noqa: PLW0603
+
+    with _background_lock:
+        if _background_refresh and not _background_refresh.done():
+            return
+
+        _background_refresh = http_pool.get_executor().submit(refresh_if_due)
+
+
+def get_access_token(stale_token=None):
+    """
+    A Salesforce access token for the UP API
+
+    :param stale_token: a token that was just refused, to be replaced
+    :raises APIError: if no token can be had
+    """
+    if not settings.UP_REFRESH_TOKEN:
+        # no OAuth client configured, so use the fixed token
+        return settings.UP_API_TOKEN
+
+    cached = _read()
+
+    if cached and cached[0] != stale_token:
+        if _due(cached[1]):
+            _refresh_in_background()
+        return cached[0]
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+
+    while time.monotonic() < deadline:
+        token = refresh(stale_token)
+
+        if token:
+            return token
+
+        # another process is refreshing; wait for its token
+        time.sleep(POLL_INTERVAL)
+        cached = _read()
+
+        if cached and cached[0] != stale_token:
+            return cached[0]
+
+    message = "Timed out waiting for a Salesforce access token"
+    logger.error(message)
+    raise APIError(message)
+
+
+async def aget_access_token(stale_token=None):
+    """
+    get_access_token() for async code
+
+    Only a refresh that the caller has to wait for leaves the event loop.
+    """
+    if not settings.UP_REFRESH_TOKEN:
+        return settings.UP_API_TOKEN
+
+    cached = _read()
+
+    if cached and cached[0] != stale_token:
+        if _due(cached[1]):
+            _refresh_in_background()
+        return cached[0]
+
+    return await sync_to_async(get_access_token, thread_sensitive=False)(
+        stale_token
+    )
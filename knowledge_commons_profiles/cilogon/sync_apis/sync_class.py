@@ -1,44 +1,184 @@
+import inspect
+import logging
+import re
+import threading
 from abc import ABC
 from abc import abstractmethod
+from collections import Counter
 from functools import wraps
+from urllib.parse import urlsplit
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.cache import cache
+from rest_framework.status import HTTP_200_OK
+
+from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.common.profiles_email import normalize_email
+from knowledge_commons_profiles.common.rate_limit import RateLimitExceededError
+from knowledge_commons_profiles.common.rate_limit import TokenBucket
+from knowledge_commons_profiles.common.rate_limit import parse_rate
+
+logger = logging.getLogger(__name__)
+
+_errors_lock = threading.Lock()
+_errors = Counter()
 
 
 class APIError(Exception):
     """Base exception for MLA API errors"""
 
 
+def count_api_error(partner):
+    """
+    Count a failed call to a partner API
+    """
+    with _errors_lock:
+        _errors[partner] += 1
+
+
+def api_error_stats():
+    """
+    The failed partner API calls, by partner, in this process
+    """
+    with _errors_lock:
+        return dict(_errors)
+
+
+def reset_api_error_stats():
+    """
+    Clear the counts
+    """
+    with _errors_lock:
+        _errors.clear()
+
+
+def _endpoint(sync_class, url):
+    """
+    The first part of a request URL's path below the partner's base URL
+    """
+    base_url = getattr(sync_class, "base_url", "")
+
+    if base_url and url.startswith(base_url):
+        path = url[len(base_url) :]
+    else:
+        path = urlsplit(url).path
+
+    return path.split("?")[0].strip("/").split("/")[0]
+
+
+def _buckets(sync_class, url, max_calls, period):
+    """
+    The token buckets a request must take a token from: its endpoint's, if
+    settings.SYNC_API_RATE_LIMITS has one, and then its partner's
+
+    The endpoint comes first so that a call it turns away does not use up
+    one of the partner's tokens.
+    """
+    partner = sync_class.__class__.__name__
+    limits = settings.SYNC_API_RATE_LIMITS
+    buckets = []
+
+    endpoint = f"{partner}:{_endpoint(sync_class, url)}"
+    if endpoint in limits:
+        buckets.append(TokenBucket(endpoint, *parse_rate(limits[endpoint])))
+
+    buckets.append(
+        TokenBucket(
+            partner,
+            *(
+                parse_rate(limits[partner])
+                if partner in limits
+                else (max_calls, period)
+            ),
+        )
+    )
+
+    return buckets
+
+
 def rate_limit(max_calls: int, period: int):
-    """Rate limit decorator"""
+    """
+    Rate limit decorator for a SyncClass's request method
+
+    Each partner (the SyncClass's name) has a token bucket allowing
+    max_calls per period seconds, unless settings.SYNC_API_RATE_LIMITS
+    sets another rate, and may have another per endpoint. A call waits up
+    to settings.SYNC_API_RATE_LIMIT_WAIT seconds for a token before it
+    fails with APIError. The method may be a coroutine, in which case it
+    waits without blocking the event loop.
+    """
 
     def decorator(func):
-        @wraps(func)
-        def wrapper(self, *args, **kwargs):
-            cache_key = f"api_rate_limit_{func.__name__}"
+        if inspect.iscoroutinefunction(func):
 
-            # Get current count
-            current = cache.get(cache_key, 0)
+            @wraps(func)
+            async def async_wrapper(self, url, *args, **kwargs):
+                try:
+                    for bucket in _buckets(self, url, max_calls, period):
+                        await bucket.aacquire(
+                            timeout=settings.SYNC_API_RATE_LIMIT_WAIT
+                        )
+                except RateLimitExceededError as e:
+                    count_api_error(self.__class__.__name__)
+                    message = "Rate limit exceeded"
+                    raise APIError(message) from e
 
-            if current >= max_calls:
-                message = "Rate limit exceeded"
-                raise APIError(message)
+                return await func(self, url, *args, **kwargs)
 
-            # Increment and set expiry
-            cache.set(cache_key, current + 1, timeout=period)
+            return async_wrapper
 
-            return func(self, *args, **kwargs)
+        @wraps(func)
+        def wrapper(self, url, *args, **kwargs):
+            try:
+                for bucket in _buckets(self, url, max_calls, period):
+                    bucket.acquire(timeout=settings.SYNC_API_RATE_LIMIT_WAIT)
+            except RateLimitExceededError as e:
+                count_api_error(self.__class__.__name__)
+                message = "Rate limit exceeded"
+                raise APIError(message) from e
+
+            return func(self, url, *args, **kwargs)
 
         return wrapper
 
     return decorator
 
 
+def _miss_key(partner, email):
+    return f"sync_api_miss:{partner}:{email}"
+
+
+def forget_misses(emails):
+    """
+    Forget that any partner had no record of these emails, so that the next
+    sync looks them up again
+    :param emails: the emails a user has just added
+    """
+    emails = {normalize_email(email) for email in emails} - {None, ""}
+
+    if not emails:
+        return
+
+    cache.delete_many(
+        [
+            _miss_key(partner, email)
+            for partner, _ in settings.EXTERNAL_SYNC_CLASSES
+            for email in emails
+        ],
+        version=VERSION,
+    )
+
+
 class SyncClass(ABC):
     """
     Abstract class for Sync APIs
     """
 
+    # whether search_bulk() looks many emails up in one call, so that
+    # ExternalSync.prefetch() is worth calling for this partner
+    supports_bulk_search = False
+
     @abstractmethod
     def search(self, email):
         """
@@ -53,6 +193,101 @@ class SyncClass(ABC):
         :param emails: the multiple emails to search for
         """
 
+    def search_bulk(self, emails_by_key):
+        """
+        Search for many users
+        :param emails_by_key: each user's emails, under any key
+        :return: the search_multiple() result for each key
+        """
+        return {
+            key: self.search_multiple(emails)[self.__class__.__name__]
+            for key, emails in emails_by_key.items()
+        }
+
+    def _cached_response(self, cache_key):
+        """
+        A response body cached by _read_response(), or None
+        """
+        if not cache_key:
+            return None
+
+        return cache.get(cache_key, version=VERSION)
+
+    def _read_response(self, response, cache_key, cache_timeout):
+        """
+        Cache a response's body, for no longer than its Cache-Control
+        max-age allows, and return it
+
+        The response may come from requests or from httpx.
+        :raises APIError: if the status is not 200
+        """
+        name = self.__class__.__name__
+
+        if "Cache-Control" in response.headers:
+            # Parse max-age from Cache-Control header
+            match = re.search(
+                r"max-age=(\d+)", response.headers["Cache-Control"]
+            )
+            if match:
+                cache_timeout = min(int(match.group(1)), cache_timeout)
+
+        if cache_key:
+            cache.set(
+                cache_key,
+                response.content,
+                timeout=cache_timeout,
+                version=VERSION,
+            )
+
+        if response.status_code == HTTP_200_OK:
+            logger.debug("%s response: %s", name, response.content)
+            return response.content
+
+        count_api_error(name)
+        message = f"Received {response.status_code} response"
+        logger.error(message)
+        raise APIError(message)
+
+    def _request_failed(self, error):
+        """
+        Log a request that could not be made and give the APIError to raise
+        """
+        count_api_error(self.__class__.__name__)
+        message = f"Request to {self.__class__.__name__} API failed: {error}"
+        logger.exception(message)
+        return APIError(message)
+
+    def _known_misses(self, emails):
+        """
+        The emails this partner recently said it has no record of
+
+        Misses are kept apart from the search caches, for
+        settings.SYNC_API_NEGATIVE_CACHE_TIMEOUT seconds, so that the many
+        users who are not members are not searched for on every sync.
+        :param emails: normalized emails
+        """
+        partner = self.__class__.__name__
+        keys = {_miss_key(partner, email): email for email in emails}
+        found = cache.get_many(list(keys), version=VERSION)
+        return {keys[key] for key in found}
+
+    def _record_misses(self, emails, search_cache_keys=()):
+        """
+        Note that this partner has no record of these emails
+        :param emails: normalized emails
+        :param search_cache_keys: search cache entries holding the misses,
+            which are dropped so that only the miss timeout applies
+        """
+        partner = self.__class__.__name__
+        cache.set_many(
+            {_miss_key(partner, email): True for email in emails},
+            timeout=settings.SYNC_API_NEGATIVE_CACHE_TIMEOUT,
+            version=VERSION,
+        )
+
+        if search_cache_keys:
+            cache.delete_many(list(search_cache_keys), version=VERSION)
+
     @abstractmethod
     def get_user_info(self, user_id):
         """
@@ -80,3 +315,37 @@ class SyncClass(ABC):
         Get a sync ID from the api response
         :param response: the response from the API
         """
+
+    # The async interface. A partner whose calls go over the network
+    # overrides these to use its pooled httpx client; these defaults run the
+    # synchronous methods on a worker thread.
+
+    async def asearch(self, email):
+        """
+        search() for async code
+        """
+        return await sync_to_async(self.search, thread_sensitive=False)(email)
+
+    async def asearch_multiple(self, emails):
+        """
+        search_multiple() for async code
+        """
+        return await sync_to_async(
+            self.search_multiple, thread_sensitive=False
+        )(emails)
+
+    async def ais_member(self, user_id) -> bool:
+        """
+        is_member() for async code
+        """
+        return await sync_to_async(self.is_member, thread_sensitive=False)(
+            user_id
+        )
+
+    async def agroups(self, user_id) -> list[str]:
+        """
+        groups() for async code
+        """
+        return await sync_to_async(self.groups, thread_sensitive=False)(
+            user_id
+        )
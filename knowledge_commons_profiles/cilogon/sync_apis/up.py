@@ -4,9 +4,11 @@ The UP API for synchronising user data
 
 from __future__ import annotations
 
+import itertools
 import json
 import logging
 import re
+from contextvars import ContextVar
 from datetime import date
 from datetime import datetime
 
@@ -16,6 +18,7 @@ from typing import Generic
 from typing import Literal
 from typing import TypeVar
 
+import httpx
 import requests
 import sentry_sdk
 from django.conf import settings
@@ -26,18 +29,23 @@ from pydantic import TypeAdapter
 from pydantic import ValidationError
 from pydantic import field_validator
 from requests.adapters import HTTPAdapter
-from rest_framework.status import HTTP_200_OK
+from rest_framework.status import HTTP_401_UNAUTHORIZED
 from urllib3.util.retry import Retry
 
 from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.cilogon.sync_apis import salesforce_token
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import APIError
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import SyncClass
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import rate_limit
+from knowledge_commons_profiles.common import fast_json
+from knowledge_commons_profiles.common import http_pool
 from knowledge_commons_profiles.common.profiles_email import normalize_email
 
 MEMBERS_URL = "query"
 MAX_CALLS = 100
 MAX_CALL_PERIOD = 60
+# emails looked up in one SOQL query; keeps the GET URL well within limits
+SOQL_BATCH_SIZE = 100
 # Simple but solid regex for validating most real-world email addresses
 EMAIL_REGEX = re.compile(
     r"^(?P<local>[a-zA-Z0-9_.+-]+)@(?P<domain>[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)$"
@@ -46,6 +54,11 @@ DATE_OFFSET = 5
 
 logger = logging.getLogger(__name__)
 
+# The Contacts found by the last search in this thread or task, which
+# is_member() reads. One UP instance serves concurrent syncs, so these
+# cannot be kept on the instance.
+_contacts: ContextVar[list | None] = ContextVar("up_contacts", default=None)
+
 # --- Helpers ---------------------------------------------------------------
 
 
@@ -329,36 +342,103 @@ class UP(SyncClass):
             pool_block=False,
         )
         self.session.mount("https://", adapter)
-        self.contact_response: list[Contact] | None = None
+
+    @property
+    def contact_response(self) -> list[Contact] | None:
+        """
+        The Contacts found by the last search in this thread or task
+        """
+        return _contacts.get()
+
+    @contact_response.setter
+    def contact_response(self, records: list[Contact] | None):
+        _contacts.set(records)
 
     @rate_limit(max_calls=MAX_CALLS, period=MAX_CALL_PERIOD)
     def _make_rest_request(self, url, http_method=HTTPMethod.GET, params=None):
         """
         Make a request to the UP API
+
+        The access token comes from the shared cache; if Salesforce refuses
+        it, it is replaced and the request is made once more.
         """
-        # refresh the access key
-        result = self._refresh_salesforce_token()
+        token = salesforce_token.get_access_token()
+        response = self._send(url, http_method, params, token)
 
-        if "access_token" in result:
-            settings.UP_API_TOKEN = result["access_token"]
+        if (
+            response.status_code == HTTP_401_UNAUTHORIZED
+            and settings.UP_REFRESH_TOKEN
+        ):
+            logger.info("UP refused the access token, refreshing")
+            token = salesforce_token.get_access_token(stale_token=token)
+            response = self._send(url, http_method, params, token)
 
-        timeout = 30
-        headers = {
+        response.raise_for_status()
+
+        return response
+
+    @rate_limit(max_calls=MAX_CALLS, period=MAX_CALL_PERIOD)
+    async def _amake_rest_request(
+        self, url, http_method=HTTPMethod.GET, params=None
+    ):
+        """
+        Make a request to the UP API with the shared async client
+        """
+        token = await salesforce_token.aget_access_token()
+        response = await self._asend(url, http_method, params, token)
+
+        if (
+            response.status_code == HTTP_401_UNAUTHORIZED
+            and settings.UP_REFRESH_TOKEN
+        ):
+            logger.info("UP refused the access token, refreshing")
+            token = await salesforce_token.aget_access_token(stale_token=token)
+            response = await self._asend(url, http_method, params, token)
+
+        response.raise_for_status()
+
+        return response
+
+    @staticmethod
+    def _headers(token):
+        return {
             "Content-Type": "application/json",
-            "Authorization": "Bearer " + settings.UP_API_TOKEN,
+            "Authorization": "Bearer " + token,
         }
 
-        response = self.session.request(
+    def _send(self, url, http_method, params, token):
+        timeout = 30
+
+        return self.session.request(
             method=http_method,
             url=url,
-            headers=headers,
+            headers=self._headers(token),
             params=params,
             timeout=timeout,
             verify=True,
         )
-        response.raise_for_status()
 
-        return response
+    async def _asend(self, url, http_method, params, token):
+        timeout = 30
+
+        return await http_pool.async_client_for(url).request(
+            http_method,
+            url,
+            headers=self._headers(token),
+            params=params,
+            timeout=timeout,
+        )
+
+    def _url(self, suffix=None, url=None):
+        suffix = suffix[1:] if suffix else MEMBERS_URL
+        return url if url else self.base_url + suffix
+
+    @staticmethod
+    def _raise_for_error_code(response):
+        resp = response.json()
+
+        if "errorCode" in resp:
+            raise APIError(resp["errorCode"])
 
     def _query_up_api(
         self,
@@ -372,56 +452,53 @@ class UP(SyncClass):
         :param attributes:
         :return:
         """
+        cached_response = self._cached_response(cache_key)
 
-        if cache_key:
-            cached_response = cache.get(cache_key, version=VERSION)
+        if cached_response is not None:
+            return cached_response
 
-            if cached_response is not None:
-                return cached_response
-
-        suffix = suffix[1:] if suffix else MEMBERS_URL
-        url = url if url else self.base_url + suffix
+        url = self._url(suffix, url)
 
         try:
             response = self._make_rest_request(
                 url, HTTPMethod.GET, params=attributes
             )
+            self._raise_for_error_code(response)
+        except requests.exceptions.RequestException as e:
+            raise self._request_failed(e) from e
 
-            resp = response.json()
-
-            if "errorCode" in resp:
-                raise APIError(resp["errorCode"])
+        return self._read_response(
+            response, cache_key, settings.UP_CACHE_TIMEOUT
+        )
 
-            cache_timeout = settings.UP_CACHE_TIMEOUT
+    async def _aquery_up_api(
+        self,
+        attributes: dict[str, str],
+        suffix: str | None = None,
+        cache_key: str | None = None,
+        url: str | None = None,
+    ):
+        """
+        Query the UP API from async code
+        """
+        cached_response = self._cached_response(cache_key)
 
-            if "Cache-Control" in response.headers:
-                # Parse max-age from Cache-Control header
-                match = re.search(
-                    r"max-age=(\d+)", response.headers["Cache-Control"]
-                )
-                if match:
-                    cache_timeout = min(int(match.group(1)), cache_timeout)
-
-            if cache_key:
-                cache.set(
-                    cache_key,
-                    response.content,
-                    timeout=cache_timeout,
-                    version=VERSION,
-                )
+        if cached_response is not None:
+            return cached_response
 
-        except requests.exceptions.RequestException as e:
-            message = f"Request to UP API failed: {e}"
-            logger.exception(message)
-            raise APIError(message) from e
+        url = self._url(suffix, url)
 
-        if response.status_code == HTTP_200_OK:
-            logger.debug("UP response: %s", response.content)
-            return response.content
+        try:
+            response = await self._amake_rest_request(
+                url, HTTPMethod.GET, params=attributes
+            )
+            self._raise_for_error_code(response)
+        except (httpx.HTTPError, ValueError) as e:
+            raise self._request_failed(e) from e
 
-        message = f"Received {response.status_code} response"
-        logger.error(message)
-        raise APIError(message)
+        return self._read_response(
+            response, cache_key, settings.UP_CACHE_TIMEOUT
+        )
 
     def is_member(self, sync_id: str) -> bool:
         """
@@ -434,51 +511,230 @@ class UP(SyncClass):
 
         return False
 
+    async def ais_member(self, sync_id: str) -> bool:
+        """
+        Check if a user is a member, from async code
+
+        Like is_member(), this reads the Contacts found by the last search,
+        so it must be awaited straight after asearch_multiple().
+        """
+        return self.is_member(sync_id)
+
     def _is_valid_email(self, email: str) -> bool:
         """Return True if the given string is a valid email address."""
         return EMAIL_REGEX.match(email) is not None
 
-    def search_multiple(self, emails) -> SalesforceQueryResponse | dict:
+    def _valid_emails(self, emails) -> list[str]:
         """
-        Search for a user
-        :param emails: the emails to search for; first hit will be returned
+        The normalized, valid emails from a list, in order, without repeats
         """
+        valid = []
         for raw_email in emails:
             email = normalize_email(raw_email)
-            if not email:
-                continue
-            cache_key = f"UP_api_search_{email}"
+            if email and self._is_valid_email(email) and email not in valid:
+                valid.append(email)
+        return valid
 
-            # Validate email
-            if not self._is_valid_email(email):
-                continue
+    def _cached_searches(self, emails: list[str]):
+        """
+        The cached hits among emails, and the emails that are neither cached
+        hits nor known misses
+        """
+        misses = self._known_misses(emails)
+        cached = cache.get_many(
+            [f"UP_api_search_{email}" for email in emails], version=VERSION
+        )
+        results = {
+            email: cached[f"UP_api_search_{email}"]
+            for email in emails
+            if f"UP_api_search_{email}" in cached
+        }
+        uncached = [
+            email
+            for email in emails
+            if email not in results and email not in misses
+        ]
 
-            # ruff: noqa: S608
-            search_params = {
-                "q": f"SELECT Id, Name, Email, AccountId, Current_Staff__c, "
-                f"UP_Commons_Eligible__c "
-                f"FROM Contact "
-                f"WHERE Email = '{email}'",
-            }
+        return results, uncached
 
-            try:
-                logger.info("Searching for %s in UP Contacts", email)
-                result = self._query_up_api(search_params, cache_key=cache_key)
+    @staticmethod
+    def _soql_params(batch):
+        # _valid_emails() has checked that the emails hold no quotes
+        # ruff: noqa: S608
+        in_list = ", ".join(f"'{email}'" for email in batch)
+        return {
+            "q": f"SELECT Id, Name, Email, AccountId, Current_Staff__c, "
+            f"UP_Commons_Eligible__c "
+            f"FROM Contact "
+            f"WHERE Email IN ({in_list})",
+        }
 
-                adapted: SalesforceQueryResponse[Contact] = (
-                    self._process_adapter(
-                        SalesforceQueryResponse[Contact], result
-                    )
+    def _store_batch(self, batch, content):
+        """
+        Split the answer to one Email IN (...) query by email, caching the
+        hits and noting the misses
+        :return: a query response, as JSON, for each email that has a
+            Contact
+        """
+        try:
+            response = fast_json.loads(content)
+        except fast_json.JSONDecodeError:
+            logger.warning("UP search for %s emails failed", len(batch))
+            return {}
+
+        # a truncated answer cannot show that an email has no Contact
+        complete = response.get("done", True)
+        if not complete:
+            logger.warning("UP search for %s emails was truncated", len(batch))
+
+        records_by_email = {}
+        for record in response.get("records", []):
+            records_by_email.setdefault(
+                normalize_email(record.get("Email") or ""), []
+            ).append(record)
+
+        found = {
+            email: fast_json.dumpb(
+                {
+                    "totalSize": len(records),
+                    "done": True,
+                    "records": records,
+                }
+            )
+            for email in batch
+            if (records := records_by_email.get(email))
+        }
+
+        if complete:
+            self._record_misses(
+                [email for email in batch if email not in found]
+            )
+
+        cache.set_many(
+            {
+                f"UP_api_search_{email}": result
+                for email, result in found.items()
+            },
+            timeout=settings.UP_CACHE_TIMEOUT,
+            version=VERSION,
+        )
+
+        return found
+
+    def _search_emails(self, emails: list[str]) -> dict[str, bytes]:
+        """
+        Look up the Contacts for many emails
+
+        Each email's hit is cached on its own, and each miss is noted with
+        _record_misses(), so only the emails in neither are queried,
+        SOQL_BATCH_SIZE of them per query with Email IN (...).
+
+        :param emails: normalized, valid emails
+        :return: a query response, as JSON, for each email that has a
+            Contact
+        """
+        results, uncached = self._cached_searches(emails)
+
+        for batch in itertools.batched(uncached, SOQL_BATCH_SIZE):
+            try:
+                logger.info(
+                    "Searching for %s emails in UP Contacts", len(batch)
                 )
+                content = self._query_up_api(self._soql_params(batch))
+            except APIError:
+                logger.warning("UP search for %s emails failed", len(batch))
+                continue
 
-                self.contact_response = adapted.records
+            results.update(self._store_batch(batch, content))
 
-                if adapted.totalSize > 0:
-                    return {"UP": adapted}
+        return results
 
+    async def _asearch_emails(self, emails: list[str]) -> dict[str, bytes]:
+        """
+        _search_emails() for async code
+        """
+        results, uncached = self._cached_searches(emails)
+
+        for batch in itertools.batched(uncached, SOQL_BATCH_SIZE):
+            try:
+                logger.info(
+                    "Searching for %s emails in UP Contacts", len(batch)
+                )
+                content = await self._aquery_up_api(self._soql_params(batch))
             except APIError:
+                logger.warning("UP search for %s emails failed", len(batch))
+                continue
+
+            results.update(self._store_batch(batch, content))
+
+        return results
+
+    def _first_hit(self, emails, results):
+        """
+        The response for the first of the emails that has a Contact
+        """
+        for email in emails:
+            if email not in results:
+                continue
+
+            adapted: SalesforceQueryResponse[Contact] = self._process_adapter(
+                SalesforceQueryResponse[Contact], results[email]
+            )
+
+            if not adapted:
                 continue
-        return {"UP": None}
+
+            self.contact_response = adapted.records
+
+            if adapted.totalSize > 0:
+                return adapted
+
+        return None
+
+    def search_multiple(self, emails) -> SalesforceQueryResponse | dict:
+        """
+        Search for a user, with one query for all the emails
+        :param emails: the emails to search for; first hit will be returned
+        """
+        emails = self._valid_emails(emails)
+        return {"UP": self._first_hit(emails, self._search_emails(emails))}
+
+    async def asearch_multiple(self, emails) -> SalesforceQueryResponse | dict:
+        """
+        Search for a user from async code
+        :param emails: the emails to search for; first hit will be returned
+        """
+        emails = self._valid_emails(emails)
+        return {
+            "UP": self._first_hit(emails, await self._asearch_emails(emails))
+        }
+
+    supports_bulk_search = True
+
+    def search_bulk(self, emails_by_key):
+        """
+        Search for many users, with one query per SOQL_BATCH_SIZE emails
+        :param emails_by_key: each user's emails, under any key
+        :return: the search_multiple() result for each key
+        """
+        emails_by_key = {
+            key: self._valid_emails(emails)
+            for key, emails in emails_by_key.items()
+        }
+        results = self._search_emails(
+            list(
+                dict.fromkeys(
+                    email
+                    for emails in emails_by_key.values()
+                    for email in emails
+                )
+            )
+        )
+
+        return {
+            key: self._first_hit(emails, results)
+            for key, emails in emails_by_key.items()
+        }
 
     def get_sync_id(self, response: SalesforceQueryResponse[Contact]):
         """
@@ -494,8 +750,21 @@ class UP(SyncClass):
         """
         Search for a user
         :param email: the email to search for
+        :return: the query response, or {} if there is no Contact
+        """
+        emails = self._valid_emails([email])
+        return self._first_hit(emails, self._search_emails(emails)) or {}
+
+    async def asearch(self, email) -> SalesforceQueryResponse | dict:
+        """
+        Search for a user from async code
+        :param email: the email to search for
+        :return: the query response, or {} if there is no Contact
         """
-        raise NotImplementedError
+        emails = self._valid_emails([email])
+        return (
+            self._first_hit(emails, await self._asearch_emails(emails)) or {}
+        )
 
     @staticmethod
     def _process_adapter(type_adapter, result):
@@ -529,18 +798,8 @@ class UP(SyncClass):
         """
         return []
 
-    def _refresh_salesforce_token(self):
-        url = "https://aupresses.my.salesforce.com/services/oauth2/token"
-        data = {
-            "grant_type": "refresh_token",
-            "client_id": settings.UP_CLIENT_ID,
-            "client_secret": settings.UP_CLIENT_SECRET,
-            "refresh_token": settings.UP_REFRESH_TOKEN,
-        }
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-
-        timeout = 30
-
-        resp = requests.post(url, data=data, headers=headers, timeout=timeout)
-        resp.raise_for_status()
-        return resp.json()
+    async def agroups(self, user_id: str | int) -> list[str]:
+        """
+        Get a user's groups from async code
+        """
+        return []
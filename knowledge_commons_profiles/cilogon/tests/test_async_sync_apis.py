@@ -0,0 +1,138 @@
+"""
+Tests for the async interface of the partner sync classes
+"""
+
+from unittest.mock import patch
+
+import httpx
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test import override_settings
+
+from knowledge_commons_profiles.cilogon.sync_apis.arlisna import ARLISNA
+from knowledge_commons_profiles.cilogon.sync_apis.mla import MLA
+from knowledge_commons_profiles.cilogon.sync_apis.up import UP
+from knowledge_commons_profiles.common import fast_json
+
+ASYNC_CLIENT = "knowledge_commons_profiles.common.http_pool.async_client_for"
+
+MLA_NO_RESULTS = {
+    "meta": {"status": "success", "code": "200", "message": None},
+    "data": [{"total_num_results": 0, "search_results": []}],
+}
+
+
+def _client(requests, *responses):
+    """
+    An async client that records each request and answers with the next
+    of responses
+    """
+    answers = iter(responses)
+
+    def handler(request):
+        requests.append(request)
+        return next(answers)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@override_settings(
+    MLA_API_BASE_URL="https://mla.example/",
+    ARLISNA_API_BASE_URL="https://arlisna.example/",
+    UP_API_BASE_URL="https://up.example/",
+    UP_REFRESH_TOKEN="",
+    UP_API_TOKEN="fixed",
+    SYNC_API_RATE_LIMITS={},
+    SYNC_API_NEGATIVE_CACHE_TIMEOUT=600,
+)
+class AsyncSyncAPITests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_mla_search_is_signed_and_remembers_a_miss(self):
+        requests = []
+        client = _client(requests, httpx.Response(200, json=MLA_NO_RESULTS))
+
+        with patch(ASYNC_CLIENT, return_value=client):
+            self.assertEqual(
+                await MLA().asearch_multiple(["A@example.com"]), {"MLA": None}
+            )
+            await MLA().asearch_multiple(["a@example.com"])
+
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(requests[0].url.host, "mla.example")
+        self.assertEqual(requests[0].url.params["email"], "a@example.com")
+        self.assertIn("signature", requests[0].url.params)
+
+    async def test_arlisna_error_is_not_a_miss(self):
+        requests = []
+        client = _client(
+            requests,
+            httpx.Response(500),
+            httpx.Response(200, json={"TotalCount": 0, "Results": []}),
+        )
+
+        with patch(ASYNC_CLIENT, return_value=client):
+            self.assertEqual(
+                await ARLISNA().asearch_multiple(["a@example.com"]),
+                {"ARLISNA": None},
+            )
+            await ARLISNA().asearch_multiple(["a@example.com"])
+            await ARLISNA().asearch_multiple(["a@example.com"])
+
+        self.assertEqual(len(requests), 2)
+
+    async def test_up_searches_all_emails_in_one_query(self):
+        contact = {
+            "attributes": {"type": "Contact", "url": "/Contact/acc-b"},
+            "Id": "c-b",
+            "Name": "b@example.com",
+            "Email": "b@example.com",
+            "AccountId": "acc-b",
+            "Current_Staff__c": False,
+            "UP_Commons_Eligible__c": True,
+        }
+        requests = []
+        client = _client(
+            requests,
+            httpx.Response(
+                200,
+                content=fast_json.dumpb(
+                    {"totalSize": 1, "done": True, "records": [contact]}
+                ),
+            ),
+        )
+        up = UP()
+
+        with patch(ASYNC_CLIENT, return_value=client):
+            result = await up.asearch_multiple(
+                ["a@example.com", "b@example.com"]
+            )
+
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(requests[0].headers["Authorization"], "Bearer fixed")
+        self.assertIn(
+            "WHERE Email IN ('a@example.com', 'b@example.com')",
+            requests[0].url.params["q"],
+        )
+        self.assertEqual(up.get_sync_id(result["UP"]), "acc-b")
+        self.assertTrue(await up.ais_member("acc-b"))
+
+    async def test_up_asearch_returns_nothing_for_a_miss(self):
+        requests = []
+        client = _client(
+            requests,
+            httpx.Response(
+                200,
+                content=fast_json.dumpb(
+                    {"totalSize": 0, "done": True, "records": []}
+                ),
+            ),
+        )
+
+        with patch(ASYNC_CLIENT, return_value=client):
+            self.assertEqual(await UP().asearch("a@example.com"), {})
+            self.assertEqual(await UP().asearch("a@example.com"), {})
+
+        # the miss is remembered
+        self.assertEqual(len(requests), 1)
@@ -196,7 +196,7 @@ class SecondaryEmailHelperCaseTests(CILogonTestBase):
         with patch(
             "knowledge_commons_profiles.cilogon.views.hcommons_update_user_email_in_mailchimp"
         ), patch(
-            "knowledge_commons_profiles.cilogon.views.sync_email_to_wordpress"
+            "knowledge_commons_profiles.cilogon.views.queue_email_sync"
         ):
             _make_email_primary(self.profile, request)
 
@@ -406,7 +406,7 @@ class TestMakeEmailPrimaryWordpressSync(TestCase):
         return request
 
     @patch(
-        "knowledge_commons_profiles.cilogon.views.sync_email_to_wordpress"
+        "knowledge_commons_profiles.cilogon.views.queue_email_sync"
     )
     def test_make_primary_calls_wordpress_sync(self, mock_sync):
         """Changing primary email should call sync with correct args"""
@@ -416,7 +416,7 @@ class TestMakeEmailPrimaryWordpressSync(TestCase):
         _make_email_primary(self.profile, request)
 
     @patch(
-        "knowledge_commons_profiles.cilogon.views.sync_email_to_wordpress"
+        "knowledge_commons_profiles.cilogon.views.queue_email_sync"
     )
     def test_make_primary_invalid_email_does_not_sync(self, mock_sync):
         """Invalid email (not in secondaries) should not trigger sync"""
@@ -425,7 +425,7 @@ class TestMakeEmailPrimaryWordpressSync(TestCase):
         _make_email_primary(self.profile, request)
 
     @patch(
-        "knowledge_commons_profiles.cilogon.views.sync_email_to_wordpress"
+        "knowledge_commons_profiles.cilogon.views.queue_email_sync"
     )
     def test_make_primary_saves_before_sync(self, mock_sync):
         """Profile should be saved even if sync raises an exception"""
@@ -0,0 +1,116 @@
+"""
+Tests for remembering that a partner has no record of an email
+"""
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.test import override_settings
+
+from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.cilogon.sync_apis.arlisna import ARLISNA
+from knowledge_commons_profiles.cilogon.sync_apis.mla import MLA
+from knowledge_commons_profiles.cilogon.sync_apis.up import UP
+from knowledge_commons_profiles.common import fast_json
+from knowledge_commons_profiles.newprofile.models import Profile
+
+MLA_QUERY = (
+    "knowledge_commons_profiles.cilogon.sync_apis.mla.MLA._query_mla_api"
+)
+ARLISNA_QUERY = (
+    "knowledge_commons_profiles.cilogon.sync_apis.arlisna.ARLISNA"
+    "._query_arlisna_api"
+)
+UP_QUERY = "knowledge_commons_profiles.cilogon.sync_apis.up.UP._query_up_api"
+
+MLA_NO_RESULTS = fast_json.dumpb(
+    {
+        "meta": {"status": "success", "code": "200", "message": None},
+        "data": [{"total_num_results": 0, "search_results": []}],
+    }
+)
+MLA_ERROR = fast_json.dumpb(
+    {"meta": {"status": "error", "code": "500", "message": "oops"}}
+)
+UP_NO_RESULTS = fast_json.dumpb({"totalSize": 0, "done": True, "records": []})
+
+
+@override_settings(SYNC_API_NEGATIVE_CACHE_TIMEOUT=600)
+class NegativeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_mla_miss_is_not_searched_again(self):
+        cache.set(
+            "MLA_api_search_a@example.com", MLA_NO_RESULTS, version=VERSION
+        )
+
+        with patch(MLA_QUERY, return_value=MLA_NO_RESULTS) as mock_query:
+            self.assertEqual(
+                MLA().search_multiple(["A@example.com"]), {"MLA": None}
+            )
+            MLA().search_multiple(["a@example.com"])
+
+        mock_query.assert_called_once()
+        # the miss's own timeout applies, not the search cache's
+        self.assertIsNone(
+            cache.get("MLA_api_search_a@example.com", version=VERSION)
+        )
+
+    def test_mla_error_is_not_a_miss(self):
+        with patch(MLA_QUERY, return_value=MLA_ERROR) as mock_query:
+            MLA().search_multiple(["a@example.com"])
+            MLA().search_multiple(["a@example.com"])
+
+        self.assertEqual(mock_query.call_count, 2)
+
+    def test_arlisna_miss_is_not_searched_again(self):
+        with patch(
+            ARLISNA_QUERY,
+            return_value=fast_json.dumpb({"TotalCount": 0, "Results": []}),
+        ) as mock_query:
+            ARLISNA().search_multiple(["a@example.com"])
+            ARLISNA().search_multiple(["a@example.com"])
+
+        mock_query.assert_called_once()
+
+    def test_misses_are_kept_per_partner(self):
+        with patch(MLA_QUERY, return_value=MLA_NO_RESULTS):
+            MLA().search_multiple(["a@example.com"])
+
+        with patch(UP_QUERY, return_value=UP_NO_RESULTS) as mock_query:
+            UP().search_multiple(["a@example.com"])
+            UP().search_multiple(["a@example.com"])
+
+        mock_query.assert_called_once()
+        self.assertIsNone(
+            cache.get("UP_api_search_a@example.com", version=VERSION)
+        )
+
+    @override_settings(SYNC_API_NEGATIVE_CACHE_TIMEOUT=0)
+    def test_a_zero_timeout_turns_misses_off(self):
+        with patch(UP_QUERY, return_value=UP_NO_RESULTS) as mock_query:
+            UP().search_multiple(["a@example.com"])
+            UP().search_multiple(["a@example.com"])
+
+        self.assertEqual(mock_query.call_count, 2)
+
+    def test_adding_an_email_forgets_its_misses(self):
+        profile = Profile.objects.create(
+            username="alice", name="A", email="a@example.com"
+        )
+
+        with patch(MLA_QUERY, return_value=MLA_NO_RESULTS):
+            MLA().search_multiple(["a@example.com", "new@example.com"])
+
+        profile.emails = ["New@example.com"]
+        profile.save()
+
+        with patch(MLA_QUERY, return_value=MLA_NO_RESULTS) as mock_query:
+            MLA().search_multiple(["a@example.com", "new@example.com"])
+
+        self.assertEqual(
+            [call.args[0]["email"] for call in mock_query.call_args_list],
+            ["new@example.com"],
+        )
@@ -0,0 +1,148 @@
+"""
+Tests for the shared Salesforce access token used by the UP API
+"""
+
+import time
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test import override_settings
+
+from knowledge_commons_profiles.cilogon.sync_apis import salesforce_token
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import APIError
+from knowledge_commons_profiles.cilogon.sync_apis.up import UP
+
+REQUEST_TOKEN = (
+    "knowledge_commons_profiles.cilogon.sync_apis.salesforce_token"
+    ".request_token"
+)
+IN_BACKGROUND = (
+    "knowledge_commons_profiles.cilogon.sync_apis.salesforce_token"
+    "._refresh_in_background"
+)
+SLEEP = (
+    "knowledge_commons_profiles.cilogon.sync_apis.salesforce_token.time.sleep"
+)
+
+
+@override_settings(
+    UP_REFRESH_TOKEN="refresh",
+    UP_API_TOKEN="fixed",
+    UP_TOKEN_LIFETIME=3600,
+    UP_TOKEN_REFRESH_MARGIN=600,
+)
+class SalesforceTokenTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_token_is_fetched_once_and_stored_encrypted(self):
+        with patch(
+            REQUEST_TOKEN, return_value=("secret", time.time() + 3600)
+        ) as mock_request:
+            self.assertEqual(salesforce_token.get_access_token(), "secret")
+            self.assertEqual(salesforce_token.get_access_token(), "secret")
+
+        mock_request.assert_called_once()
+        self.assertNotIn(
+            "secret", cache.get(salesforce_token.TOKEN_KEY)["token"]
+        )
+
+    def test_token_near_expiry_is_refreshed_in_the_background(self):
+        salesforce_token._write("old", time.time() + 60)
+
+        with (
+            patch(REQUEST_TOKEN) as mock_request,
+            patch(IN_BACKGROUND) as mock_background,
+        ):
+            self.assertEqual(salesforce_token.get_access_token(), "old")
+
+        mock_request.assert_not_called()
+        mock_background.assert_called_once()
+
+    def test_refresh_if_due(self):
+        salesforce_token._write("fresh", time.time() + 3600)
+
+        with patch(REQUEST_TOKEN) as mock_request:
+            salesforce_token.refresh_if_due()
+        mock_request.assert_not_called()
+
+        salesforce_token._write("old", time.time() + 60)
+
+        with patch(
+            REQUEST_TOKEN, return_value=("new", time.time() + 3600)
+        ) as mock_request:
+            salesforce_token.refresh_if_due()
+
+        mock_request.assert_called_once()
+        self.assertEqual(salesforce_token.get_access_token(), "new")
+
+    def test_failed_early_refresh_keeps_the_token(self):
+        salesforce_token._write("old", time.time() + 60)
+
+        with patch(REQUEST_TOKEN, side_effect=APIError("down")):
+            salesforce_token.refresh_if_due()
+
+        with patch(IN_BACKGROUND):
+            self.assertEqual(salesforce_token.get_access_token(), "old")
+
+    def test_waits_for_another_process_to_refresh(self):
+        cache.add(salesforce_token.LOCK_KEY, value=True)
+
+        def other_process_finishes(seconds):
+            salesforce_token._write("theirs", time.time() + 3600)
+
+        with (
+            patch(REQUEST_TOKEN) as mock_request,
+            patch(SLEEP, side_effect=other_process_finishes),
+        ):
+            self.assertEqual(salesforce_token.get_access_token(), "theirs")
+
+        mock_request.assert_not_called()
+
+    def test_refused_token_is_replaced(self):
+        salesforce_token._write("refused", time.time() + 3600)
+
+        with patch(REQUEST_TOKEN, return_value=("new", time.time() + 3600)):
+            token = salesforce_token.get_access_token(stale_token="refused")
+
+        self.assertEqual(token, "new")
+
+    @override_settings(UP_REFRESH_TOKEN="")
+    def test_fixed_token_without_an_oauth_client(self):
+        with patch(REQUEST_TOKEN) as mock_request:
+            self.assertEqual(salesforce_token.get_access_token(), "fixed")
+
+        mock_request.assert_not_called()
+
+
+@override_settings(
+    UP_REFRESH_TOKEN="refresh",
+    UP_API_BASE_URL="https://up.example/",
+    SYNC_API_RATE_LIMITS={},
+)
+class UPRequestTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        salesforce_token._write("refused", time.time() + 3600)
+
+    def test_request_is_retried_with_a_new_token_after_a_401(self):
+        up = UP()
+        up.session = Mock()
+        up.session.request.side_effect = [
+            Mock(status_code=401),
+            Mock(status_code=200),
+        ]
+
+        with patch(REQUEST_TOKEN, return_value=("new", time.time() + 3600)):
+            response = up._make_rest_request("https://up.example/query")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                call.kwargs["headers"]["Authorization"]
+                for call in up.session.request.call_args_list
+            ],
+            ["Bearer refused", "Bearer new"],
+        )
@@ -0,0 +1,173 @@
+"""
+Tests for looking up many emails in UP with one SOQL query
+"""
+
+import threading
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test import override_settings
+
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import APIError
+from knowledge_commons_profiles.cilogon.sync_apis.up import UP
+from knowledge_commons_profiles.common import fast_json
+
+QUERY = "knowledge_commons_profiles.cilogon.sync_apis.up.UP._query_up_api"
+
+
+def _contact(email, account_id, eligible=True):
+    return {
+        "attributes": {"type": "Contact", "url": f"/Contact/{account_id}"},
+        "Id": f"c-{account_id}",
+        "Name": email,
+        "Email": email,
+        "AccountId": account_id,
+        "Current_Staff__c": False,
+        "UP_Commons_Eligible__c": eligible,
+    }
+
+
+def _response(*records):
+    return fast_json.dumpb(
+        {"totalSize": len(records), "done": True, "records": list(records)}
+    )
+
+
+@override_settings(UP_API_BASE_URL="https://up.example/", UP_CACHE_TIMEOUT=60)
+class BulkSearchTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_search_multiple_makes_one_query(self):
+        up = UP()
+
+        with patch(
+            QUERY, return_value=_response(_contact("b@example.com", "acc-b"))
+        ) as mock_query:
+            result = up.search_multiple(
+                ["A@Example.com", "b@example.com", "a@example.com"]
+            )
+
+        mock_query.assert_called_once()
+        self.assertIn(
+            "WHERE Email IN ('a@example.com', 'b@example.com')",
+            mock_query.call_args.args[0]["q"],
+        )
+        self.assertEqual(up.get_sync_id(result["UP"]), "acc-b")
+
+    def test_results_are_cached_per_email(self):
+        with patch(
+            QUERY, return_value=_response(_contact("a@example.com", "acc-a"))
+        ):
+            UP().search_multiple(["a@example.com", "b@example.com"])
+
+        with patch(
+            QUERY, return_value=_response(_contact("c@example.com", "acc-c"))
+        ) as mock_query:
+            result = UP().search_multiple(["b@example.com", "c@example.com"])
+
+        # only the email that had not been looked up is queried
+        self.assertIn("IN ('c@example.com')", mock_query.call_args.args[0]["q"])
+        self.assertEqual(result["UP"].records[0].AccountId, "acc-c")
+
+    def test_search_looks_up_one_email(self):
+        up = UP()
+
+        with patch(
+            QUERY, return_value=_response(_contact("a@example.com", "acc-a"))
+        ) as mock_query:
+            result = up.search("A@Example.com")
+            missing = up.search("b@example.com")
+
+        self.assertEqual(up.get_sync_id(result), "acc-a")
+        self.assertIn(
+            "IN ('a@example.com')", mock_query.call_args_list[0].args[0]["q"]
+        )
+        self.assertEqual(missing, {})
+
+    def test_search_bulk_answers_each_key(self):
+        up = UP()
+
+        with patch(
+            QUERY,
+            return_value=_response(
+                _contact("a@example.com", "acc-a"),
+                _contact("C@example.com", "acc-c"),
+            ),
+        ) as mock_query:
+            results = up.search_bulk(
+                {
+                    "alice": ["a@example.com"],
+                    "bob": ["b@example.com", "not an email"],
+                    "carol": ["b@example.com", "c@example.com"],
+                }
+            )
+
+        mock_query.assert_called_once()
+        self.assertEqual(up.get_sync_id(results["alice"]), "acc-a")
+        self.assertIsNone(results["bob"])
+        self.assertEqual(up.get_sync_id(results["carol"]), "acc-c")
+
+    @patch("knowledge_commons_profiles.cilogon.sync_apis.up.SOQL_BATCH_SIZE", 2)
+    def test_emails_are_queried_in_batches(self):
+        with patch(QUERY, return_value=_response()) as mock_query:
+            UP().search_bulk(
+                {
+                    "alice": ["a@example.com", "b@example.com"],
+                    "bob": ["c@example.com"],
+                }
+            )
+
+        self.assertEqual(mock_query.call_count, 2)
+
+    def test_failed_query_is_not_cached(self):
+        with patch(QUERY, side_effect=APIError("down")):
+            self.assertEqual(
+                UP().search_multiple(["a@example.com"]), {"UP": None}
+            )
+
+        with patch(QUERY, return_value=_response()) as mock_query:
+            UP().search_multiple(["a@example.com"])
+
+        mock_query.assert_called_once()
+
+
+@override_settings(UP_API_BASE_URL="https://up.example/", UP_CACHE_TIMEOUT=60)
+class ConcurrentSearchTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_threads_sharing_an_instance_see_their_own_contacts(self):
+        contacts = {
+            "a@example.com": _contact("a@example.com", "acc-a", eligible=True),
+            "b@example.com": _contact("b@example.com", "acc-b", eligible=False),
+        }
+
+        def query(params):
+            email = next(email for email in contacts if email in params["q"])
+            return _response(contacts[email])
+
+        up = UP()
+        searched = threading.Barrier(2, timeout=2)
+        results = {}
+
+        def sync(email):
+            sync_id = up.get_sync_id(up.search_multiple([email])["UP"])
+            # both searches are done before either reads its Contacts
+            searched.wait()
+            results[email] = up.is_member(sync_id)
+
+        with patch(QUERY, side_effect=query):
+            threads = [
+                threading.Thread(target=sync, args=(email,))
+                for email in contacts
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(
+            results, {"a@example.com": True, "b@example.com": False}
+        )
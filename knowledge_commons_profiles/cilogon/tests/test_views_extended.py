@@ -1100,7 +1100,7 @@ class EmailVerificationTests(CILogonTestBase):
 
         with (
             patch(
-                "knowledge_commons_profiles.cilogon.views.send_association_message"
+                "knowledge_commons_profiles.cilogon.views.queue_association"
             ),
             patch(
                 "knowledge_commons_profiles.cilogon.views.hcommons_add_new_user_to_mailchimp"
@@ -1141,7 +1141,7 @@ class EmailVerificationTests(CILogonTestBase):
 
         with (
             patch(
-                "knowledge_commons_profiles.cilogon.views.send_association_message"
+                "knowledge_commons_profiles.cilogon.views.queue_association"
             ) as mock_assoc,
             patch(
                 "knowledge_commons_profiles.cilogon.views.hcommons_add_new_user_to_mailchimp"
@@ -1183,7 +1183,7 @@ class EmailVerificationTests(CILogonTestBase):
 
         with (
             patch(
-                "knowledge_commons_profiles.cilogon.views.send_association_message"
+                "knowledge_commons_profiles.cilogon.views.queue_association"
             ) as mock_assoc,
             patch(
                 "knowledge_commons_profiles.cilogon.views.hcommons_add_new_user_to_mailchimp"
@@ -1262,7 +1262,7 @@ class EmailVerificationTests(CILogonTestBase):
 
         with (
             patch(
-                "knowledge_commons_profiles.cilogon.views.send_association_message"
+                "knowledge_commons_profiles.cilogon.views.queue_association"
             ),
             patch(
                 "knowledge_commons_profiles.cilogon.views.hcommons_add_new_user_to_mailchimp"
@@ -1358,7 +1358,7 @@ class EmailVerificationTests(CILogonTestBase):
         with (
             patch.object(EmailVerification, "garbage_collect") as mock_gc2,
             patch(
-                "knowledge_commons_profiles.cilogon.views.send_association_message"
+                "knowledge_commons_profiles.cilogon.views.queue_association"
             ),
             patch(
                 "knowledge_commons_profiles.cilogon.views.hcommons_add_new_user_to_mailchimp"
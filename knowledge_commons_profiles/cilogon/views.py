@@ -68,10 +68,8 @@ from knowledge_commons_profiles.cilogon.oauth import (
 )
 from knowledge_commons_profiles.cilogon.oauth import oauth
 from knowledge_commons_profiles.cilogon.oauth import revoke_single_token
-from knowledge_commons_profiles.cilogon.oauth import send_association_message
 from knowledge_commons_profiles.cilogon.oauth import should_prompt_login
 from knowledge_commons_profiles.cilogon.oauth import store_session_variables
-from knowledge_commons_profiles.cilogon.oauth import sync_email_to_wordpress
 from knowledge_commons_profiles.cilogon.oauth import validate_return_to
 from knowledge_commons_profiles.cilogon.reserved_usernames import (
     get_reserved_patterns,
@@ -97,6 +95,8 @@ from knowledge_commons_profiles.newprofile.mailchimp import (
 )
 from knowledge_commons_profiles.newprofile.models import Profile
 from knowledge_commons_profiles.newprofile.models import Role
+from knowledge_commons_profiles.newprofile.outbox import queue_association
+from knowledge_commons_profiles.newprofile.outbox import queue_email_sync
 from knowledge_commons_profiles.newprofile.views.members import (
     resolve_network_display_name,
 )
@@ -1031,7 +1031,7 @@ def _make_email_primary(profile: Profile | None, request):
     # so the WP cron script doesn't treat the new email as a new subscriber
     hcommons_update_user_email_in_mailchimp(old_email, email)
 
-    sync_email_to_wordpress(username=profile.username, email=profile.email)
+    queue_email_sync(username=profile.username, email=profile.email)
 
 
 @transaction.atomic
@@ -1598,18 +1598,19 @@ def activate(request, secret_key: str):
         profile=profile
     ).exists()
 
-    # create a sub association
-    SubAssociation.objects.create(
-        sub=sub,
-        profile=profile,
-        idp_name=idp_name,
-    )
+    with transaction.atomic():
+        # create a sub association
+        SubAssociation.objects.create(
+            sub=sub,
+            profile=profile,
+            idp_name=idp_name,
+        )
 
-    # delete the verification as it's no longer needed
-    verify.delete()
+        # delete the verification as it's no longer needed
+        verify.delete()
 
-    # send a message to the webhooks
-    send_association_message(sub=sub, kc_id=profile.username)
+        # send a message to the webhooks
+        queue_association(sub=sub, kc_id=profile.username)
 
     # For new registrations, run the post-registration tasks
     if is_new_registration:
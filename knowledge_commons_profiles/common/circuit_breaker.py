@@ -0,0 +1,239 @@
+"""
+A shared circuit breaker
+
+The breaker state lives in the cache (Redis in production) so that every
+worker sees the same state, with a local mirror so that an open circuit fails
+fast without a cache round trip and so that the breaker keeps working if the
+cache itself is unavailable.
+
+States:
+    closed:    calls go through; failures are counted
+    open:      calls fail fast until the cool-down period has passed
+    half-open: the cool-down has passed; a single probe call is let through.
+               If it succeeds the breaker closes, if it fails it re-opens
+"""
+
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker with shared (cache) state and a local mirror
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        cooldown: int = 30,
+        failure_window: int = 60,
+    ):
+        """
+        :param name: the name of the protected resource, used in cache keys
+        :param failure_threshold: consecutive failures before opening
+        :param cooldown: seconds to fail fast for once open
+        :param failure_window: seconds after which a failure count that has
+            not reached the threshold is forgotten
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failure_window = failure_window
+
+        self._failures_key = f"circuit_breaker:{name}:failures"
+        self._open_until_key = f"circuit_breaker:{name}:open_until"
+        self._probe_key = f"circuit_breaker:{name}:probe"
+
+        # the local mirror of the shared state
+        self._lock = threading.Lock()
+        self._local_failures = 0
+        self._local_open_until = 0.0
+        self._local_probe = False
+
+    def _shared_open_until(self) -> float:
+        """
+        Read the shared open_until timestamp, falling back to the local mirror
+        """
+        try:
+            open_until = cache.get(self._open_until_key)
+        except Exception:  # noqa: BLE001
+            logger.warning(
+                "Circuit breaker %s: cache unavailable, using local state",
+                self.name,
+            )
+            return self._local_open_until
+
+        with self._lock:
+            self._local_open_until = float(open_until or 0.0)
+            return self._local_open_until
+
+    def _claim_probe(self) -> bool:
+        """
+        Claim the single half-open probe slot
+        """
+        try:
+            return cache.add(self._probe_key, value=True, timeout=self.cooldown)
+        except Exception:  # noqa: BLE001
+            with self._lock:
+                if self._local_probe:
+                    return False
+                self._local_probe = True
+                return True
+
+    def allow_request(self) -> bool:
+        """
+        Whether a call should be attempted
+        """
+        now = time.time()
+
+        # fail fast on the local mirror without touching the cache
+        if now < self._local_open_until:
+            return False
+
+        open_until = self._shared_open_until()
+
+        if not open_until:
+            return True
+
+        if now < open_until:
+            return False
+
+        return self._claim_probe()
+
+    def record_success(self):
+        """
+        Record a successful call, closing the breaker if it was tripped
+        """
+        with self._lock:
+            was_tripped = self._local_failures > 0 or self._local_open_until > 0
+            self._local_failures = 0
+            self._local_open_until = 0.0
+            self._local_probe = False
+
+        # the mirror was refreshed by allow_request, so there is nothing to
+        # clear unless this worker saw the breaker tripped
+        if not was_tripped:
+            return
+
+        try:
+            cache.delete_many(
+                [self._failures_key, self._open_until_key, self._probe_key]
+            )
+        except Exception:  # noqa: BLE001
+            return
+
+        logger.info("Circuit breaker %s: closed", self.name)
+
+    def record_failure(self):
+        """
+        Record a failed call, opening the breaker once the threshold is hit or
+        when a half-open probe fails
+        """
+        probing = bool(self._local_open_until)
+
+        try:
+            cache.add(self._failures_key, 0, timeout=self.failure_window)
+            failures = cache.incr(self._failures_key)
+        except Exception:  # noqa: BLE001
+            with self._lock:
+                self._local_failures += 1
+                failures = self._local_failures
+        else:
+            with self._lock:
+                self._local_failures = failures
+
+        if probing or failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        """
+        Open the breaker for the cool-down period
+        """
+        open_until = time.time() + self.cooldown
+
+        with self._lock:
+            self._local_open_until = open_until
+            self._local_probe = False
+
+        try:
+            # keep the timestamp past the cool-down so that the half-open
+            # state is visible until a probe succeeds or fails
+            cache.set(
+                self._open_until_key, open_until, timeout=self.cooldown * 10
+            )
+            cache.delete(self._probe_key)
+        except Exception:  # noqa: BLE001
+            logger.warning(
+                "Circuit breaker %s: cache unavailable, opened locally only",
+                self.name,
+            )
+
+        logger.warning(
+            "Circuit breaker %s: open for %s seconds", self.name, self.cooldown
+        )
+
+    def status(self) -> dict:
+        """
+        The current state, for the health endpoint
+        """
+        now = time.time()
+        open_until = self._shared_open_until()
+
+        if not open_until:
+            state = CLOSED
+        elif now < open_until:
+            state = OPEN
+        else:
+            state = HALF_OPEN
+
+        try:
+            failures = cache.get(self._failures_key, 0)
+        except Exception:  # noqa: BLE001
+            failures = self._local_failures
+
+        result = {"state": state, "failures": failures}
+
+        if state == OPEN:
+            result["retry_in"] = round(open_until - now, 1)
+
+        return result
+
+    def reset(self):
+        """
+        Forget all state, local and shared
+        """
+        with self._lock:
+            self._local_failures = 0
+            self._local_open_until = 0.0
+            self._local_probe = False
+
+        try:
+            cache.delete_many(
+                [self._failures_key, self._open_until_key, self._probe_key]
+            )
+        except Exception:  # noqa: BLE001
+            logger.warning("Circuit breaker %s: unable to reset", self.name)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """
+    Get the process-wide breaker for a name, creating it on first use
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **kwargs)
+        return _breakers[name]
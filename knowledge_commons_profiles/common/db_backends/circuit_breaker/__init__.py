@@ -0,0 +1,3 @@
+"""
+A database backend that wraps another backend in a circuit breaker
+"""
@@ -0,0 +1,79 @@
+"""
+A database backend that wraps another backend in a circuit breaker
+
+Configure a database with this ENGINE and put the real engine in
+WRAPPED_ENGINE:
+
+    DATABASES["wordpress_dev"] = {
+        "ENGINE": "knowledge_commons_profiles.common.db_backends"
+        ".circuit_breaker",
+        "WRAPPED_ENGINE": "django.db.backends.mysql",
+        "CIRCUIT_BREAKER": {"FAILURES": 3, "COOLDOWN": 30},
+        ...
+    }
+
+While the breaker is open, opening a connection raises the wrapped driver's
+OperationalError immediately (surfacing as django.db.utils.OperationalError)
+instead of waiting for the connect timeout, so every existing
+"except OperationalError" fallback kicks in at once.
+"""
+
+import functools
+
+from django.db.utils import load_backend
+
+from knowledge_commons_profiles.common.circuit_breaker import (
+    get_circuit_breaker,
+)
+
+
+def circuit_breaker_for(settings_dict, alias):
+    """
+    Get the shared circuit breaker for a database alias
+    """
+    options = settings_dict.get("CIRCUIT_BREAKER", {})
+
+    return get_circuit_breaker(
+        f"db:{alias}",
+        failure_threshold=options.get("FAILURES", 3),
+        cooldown=options.get("COOLDOWN", 30),
+        failure_window=options.get("FAILURE_WINDOW", 60),
+    )
+
+
+@functools.cache
+def _wrapper_class(wrapped_engine):
+    """
+    Build a subclass of the wrapped backend's DatabaseWrapper that consults
+    the circuit breaker whenever it opens a connection
+    """
+    wrapped = load_backend(wrapped_engine).DatabaseWrapper
+
+    class CircuitBreakerDatabaseWrapper(wrapped):
+        def connect(self):
+            breaker = circuit_breaker_for(self.settings_dict, self.alias)
+
+            if not breaker.allow_request():
+                # use an assignment to avoid EM101
+                msg = f"Circuit breaker open for database '{self.alias}'"
+                raise self.Database.OperationalError(msg)
+
+            try:
+                super().connect()
+            except (
+                self.Database.OperationalError,
+                self.Database.InterfaceError,
+            ):
+                breaker.record_failure()
+                raise
+
+            breaker.record_success()
+
+    return CircuitBreakerDatabaseWrapper
+
+
+def DatabaseWrapper(settings_dict, alias):  # noqa: N802
+    """
+    Instantiate the wrapped backend with the circuit breaker mixed in
+    """
+    return _wrapper_class(settings_dict["WRAPPED_ENGINE"])(settings_dict, alias)
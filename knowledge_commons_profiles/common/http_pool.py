@@ -0,0 +1,232 @@
+"""
+A shared thread pool and HTTP sessions for calls to other services
+
+Logout propagation and the health check used to start a new
+ThreadPoolExecutor for every call and open a new connection to every
+endpoint with requests.post(), and the subscriber pings opened one per
+request with requests.get().
+
+Instead, they share one bounded pool of settings.OUTBOUND_HTTP_WORKERS
+threads, created on first use and kept for the life of the process, and
+one requests session per host, so that connections are kept alive and
+reused. fan_out() runs a call per item on the pool and waits at most
+settings.OUTBOUND_FANOUT_DEADLINE seconds for all of them.
+
+Partner lookups for external syncs run on a pool of their own,
+PARTNER_SYNC_POOL, of settings.EXTERNAL_SYNC_WORKERS threads. A partner that
+hangs keeps its thread past the sync deadline, and on the shared pool a few
+such syncs would leave logout propagation with no thread to run on.
+
+Work submitted here must not use the database: the pool threads are never
+handed back to Django, so their connections would not be closed.
+
+Async code uses async_client_for() instead: one httpx.AsyncClient per host
+and event loop, holding up to settings.OUTBOUND_ASYNC_CONNECTIONS
+connections, so many concurrent calls share a loop rather than a thread
+each.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_POOL = "outbound-http"
+PARTNER_SYNC_POOL = "partner-sync"
+
+# the setting that sizes each pool
+POOL_SIZES = {
+    OUTBOUND_POOL: "OUTBOUND_HTTP_WORKERS",
+    PARTNER_SYNC_POOL: "EXTERNAL_SYNC_WORKERS",
+}
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_sizes: dict[str, int] = {}
+_executor_lock = threading.Lock()
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# an AsyncClient's connections belong to the loop that opened them
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+
+def get_executor(pool=OUTBOUND_POOL) -> ThreadPoolExecutor:
+    """
+    A shared thread pool, created on first use
+    """
+    with _executor_lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            size = max(
+                getattr(settings, POOL_SIZES[pool]), _sizes.get(pool, 0)
+            )
+            executor = ThreadPoolExecutor(
+                max_workers=size, thread_name_prefix=pool
+            )
+            _executors[pool] = executor
+            _sizes[pool] = size
+
+    return executor
+
+
+def reserve(pool, workers):
+    """
+    Make sure a pool has at least workers threads, for a command that runs
+    more calls at once than a web worker does
+
+    A smaller pool that already exists is replaced; the calls running on
+    it finish there.
+    """
+    with _executor_lock:
+        if _sizes.get(pool, 0) >= workers:
+            return
+
+        _sizes[pool] = workers
+        executor = _executors.pop(pool, None)
+
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def session_for(url: str) -> requests.Session:
+    """
+    The shared session for the host of a URL
+
+    The session's connection pool holds as many connections as the thread
+    pool has threads, so concurrent calls to one host do not queue for a
+    connection.
+    """
+    key = _host_key(url)
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.OUTBOUND_HTTP_WORKERS,
+            )
+            session.mount(key, adapter)
+            _sessions[key] = session
+
+    return session
+
+
+def async_client_for(url: str) -> httpx.AsyncClient:
+    """
+    The shared async client for the host of a URL, on the running event loop
+
+    Connection errors are retried, as the partners' sessions retry them.
+    """
+    key = _host_key(url)
+    loop = asyncio.get_running_loop()
+
+    with _async_clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=settings.OUTBOUND_ASYNC_CONNECTIONS,
+                max_keepalive_connections=settings.OUTBOUND_ASYNC_CONNECTIONS,
+            )
+            client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(limits=limits, retries=3)
+            )
+            clients[key] = client
+
+    return client
+
+
+async def aclose():
+    """
+    Close the shared async clients of the running event loop
+    """
+    with _async_clients_lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+
+    for client in clients.values():
+        await client.aclose()
+
+
+def close():
+    """
+    Shut down the shared pools and close the shared sessions
+    """
+    with _executor_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
+        _sizes.clear()
+
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def fan_out(func, items, on_timeout, deadline=None, pool=OUTBOUND_POOL):
+    """
+    Call func(item) for each item on a shared pool
+
+    :param on_timeout: called with an item whose call had not finished by
+        the deadline, to give its result; a call that had not started is
+        cancelled, one that had goes on in the background and its result
+        is discarded
+    :param deadline: the seconds to wait for all the calls, by default
+        settings.OUTBOUND_FANOUT_DEADLINE
+    :param pool: the pool to run the calls on
+    :return: the results, in the order of items
+    :raises: any exception raised by func
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    if deadline is None:
+        deadline = settings.OUTBOUND_FANOUT_DEADLINE
+
+    executor = get_executor(pool)
+    started = time.monotonic()
+    futures = [executor.submit(func, item) for item in items]
+
+    _, not_done = wait(futures, timeout=deadline)
+
+    for future in not_done:
+        future.cancel()
+
+    if not_done:
+        logger.warning(
+            "%s of %s outbound calls missed the %ss deadline",
+            len(not_done),
+            len(futures),
+            deadline,
+        )
+
+    logger.debug(
+        "Fanned out %s calls in %.3fs",
+        len(futures),
+        time.monotonic() - started,
+    )
+
+    return [
+        on_timeout(item) if future in not_done else future.result()
+        for item, future in zip(items, futures, strict=True)
+    ]
@@ -9,6 +9,7 @@ from django.urls import Resolver404
 from django.urls import resolve
 
 from knowledge_commons_profiles.cilogon.models import MaintenanceMode
+from knowledge_commons_profiles.newprofile.identity_map import IdentityMap
 from knowledge_commons_profiles.newprofile.views.members import (
     resolve_network_name,
 )
@@ -139,6 +140,28 @@ class RequestMiddleware(MiddlewareMixin):
         return response
 
 
+class IdentityMapMiddleware:
+    """
+    Attach a fresh IdentityMap to each request as ``request.identity_map``.
+
+    Views, serializers and notification renderers that build API objects for
+    the same username share the Profile, WpUser and User rows loaded through
+    it, so each is fetched at most once per request. The map is cleared when
+    the response is returned so nothing outlives the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.identity_map = IdentityMap()
+        try:
+            return self.get_response(request)
+        finally:
+            request.identity_map.clear()
+            del request.identity_map
+
+
 class HostAwareCookieDomainMiddleware:
     """
     Rewrite the session and CSRF cookie ``Domain`` per request host.
@@ -0,0 +1,233 @@
+"""
+A shared token-bucket rate limiter
+
+A bucket holds up to `calls` tokens and refills at `calls` per `period`
+seconds; each call takes a token. So a client may make a burst of up to
+`calls` calls, and no more than `calls` in any `period` on average.
+
+With Redis the bucket is a hash updated by one Lua script call, so every
+process and thread shares one accurate count, and the refill is timed by
+the Redis server's clock rather than by each worker's. If Redis cannot be
+reached the call is let through. Other backends (LocMem in tests and
+development) keep the bucket in an ordinary cache entry, updated under a
+lock, which is exact within a process.
+
+acquire() either fails at once or waits up to a timeout for a token;
+aacquire() does the same without blocking the event loop while it waits.
+The calls allowed, delayed and rejected, and the time spent waiting, are
+counted per bucket in this process; rate_limit_stats() reports them.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from collections import defaultdict
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# returns 0 if a token was taken, or the milliseconds until one will be free
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local per_ms = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * per_ms)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / per_ms)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / per_ms) + 1000)
+return wait
+"""
+
+_local_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+class RateLimitExceededError(Exception):
+    """
+    No token became free within the time allowed
+    """
+
+
+def parse_rate(rate: str) -> tuple[int, float]:
+    """
+    Parse a rate written as "calls/seconds", such as "100/60"
+    """
+    calls, _, period = rate.partition("/")
+    return int(calls), float(period or 1)
+
+
+def _redis_client():
+    """
+    The raw Redis client behind the default cache, or None for other backends
+    """
+    client = getattr(cache, "client", None)
+
+    if client is None or not hasattr(client, "get_client"):
+        return None
+
+    return client.get_client(write=True)
+
+
+def _record(name, outcome, waited=0.0):
+    with _stats_lock:
+        _stats[f"{name}:{outcome}"] += 1
+        if waited:
+            _stats[f"{name}:wait_seconds"] += waited
+
+
+class TokenBucket:
+    """
+    A token bucket shared by every process that uses the same name
+    """
+
+    def __init__(self, name: str, calls: int, period: float):
+        self.name = name
+        self.capacity = calls
+        self.per_second = calls / period
+        self.key = f"rate_limit:{name}"
+
+    def _take_local(self):
+        with _local_lock:
+            now = time.monotonic()
+            tokens, ts = cache.get(self.key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + (now - ts) * self.per_second)
+
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.per_second
+
+            cache.set(
+                self.key,
+                (tokens, now),
+                timeout=int(self.capacity / self.per_second) + 1,
+            )
+
+        return wait
+
+    def take(self):
+        """
+        Take a token if one is free
+
+        :return: 0 if a token was taken, or the seconds until one will be
+        """
+        client = _redis_client()
+
+        if client is None:
+            return self._take_local()
+
+        try:
+            script = client.register_script(TOKEN_BUCKET_SCRIPT)
+            wait = script(
+                keys=[cache.make_key(self.key)],
+                args=[self.capacity, self.per_second / 1000],
+            )
+        except Exception:  # noqa: BLE001
+            # an outage of the limiter should not stop the calls it guards
+            logger.warning(
+                "Unable to check rate limit %s", self.name, exc_info=True
+            )
+            return 0
+
+        return int(wait) / 1000
+
+    def acquire(self, timeout: float = 0):
+        """
+        Take a token, waiting up to timeout seconds for one to be free
+
+        :raises RateLimitExceededError: if no token is free in time
+        """
+        waited = 0.0
+
+        while True:
+            wait = self.take()
+
+            if not wait:
+                _record(self.name, "delayed" if waited else "allowed", waited)
+                return
+
+            if waited + wait > timeout:
+                _record(self.name, "rejected", waited)
+                message = f"Rate limit for {self.name} exceeded"
+                raise RateLimitExceededError(message)
+
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, timeout: float = 0):  # noqa: ASYNC109
+        """
+        acquire() for async code
+
+        :raises RateLimitExceededError: if no token is free in time
+        """
+        waited = 0.0
+
+        while True:
+            wait = self.take()
+
+            if not wait:
+                _record(self.name, "delayed" if waited else "allowed", waited)
+                return
+
+            if waited + wait > timeout:
+                _record(self.name, "rejected", waited)
+                message = f"Rate limit for {self.name} exceeded"
+                raise RateLimitExceededError(message)
+
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+def rate_limit_stats():
+    """
+    The calls allowed, delayed and rejected per bucket, and the seconds
+    spent waiting, in this process
+
+    :return: a dict of {name: {"allowed": n, "delayed": n, "rejected": n,
+        "wait_seconds": s}}
+    """
+    with _stats_lock:
+        counts = dict(_stats)
+
+    stats = defaultdict(
+        lambda: {"allowed": 0, "delayed": 0, "rejected": 0, "wait_seconds": 0}
+    )
+
+    for field, count in counts.items():
+        name, _, outcome = field.rpartition(":")
+        stats[name][outcome] = (
+            round(count, 3) if outcome == "wait_seconds" else count
+        )
+
+    return dict(stats)
+
+
+def reset_stats():
+    """
+    Clear the counts
+    """
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,248 @@
+"""
+Tagged cache entries
+
+Per-user (and per-group) data is cached under many unrelated keys. Entries
+written with store() are recorded against one or more tags, such as
+user_tag("kfitz"), so that a single invalidate(user_tag("kfitz")) drops all
+of them after an edit, without each view having to know which keys exist.
+
+With Redis each tag is a set of cache keys and invalidate() runs as one Lua
+script call. Other backends (LocMem in tests and development) keep the tag
+membership in an ordinary cache entry.
+
+fetch() and store() take a key family, such as "works_fragment", and hits and
+misses are counted per family. Counts are kept per process and added to a
+shared Redis hash every STATS_FLUSH_EVERY lookups; cache_stats() reports
+them.
+"""
+
+import logging
+import threading
+from collections import Counter
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from knowledge_commons_profiles.__version__ import VERSION
+
+logger = logging.getLogger(__name__)
+
+# tag sets outlive the entries in them; entries that have already expired
+# are simply skipped on invalidation
+TAG_TIMEOUT = 7 * 24 * 60 * 60
+
+STATS_KEY = "tagged_cache:stats"
+STATS_FLUSH_EVERY = 100
+
+INVALIDATE_SCRIPT = """
+local removed = 0
+for _, tag in ipairs(KEYS) do
+    local members = redis.call('SMEMBERS', tag)
+    for start = 1, #members, 500 do
+        removed = removed + redis.call(
+            'UNLINK', unpack(members, start, math.min(start + 499, #members))
+        )
+    end
+    redis.call('UNLINK', tag)
+end
+return removed
+"""
+
+_stats_lock = threading.Lock()
+_local_stats = Counter()
+_unflushed_stats = Counter()
+
+
+def user_tag(username):
+    """
+    The tag for everything cached about a user
+    """
+    return f"user:{str(username).lower()}"
+
+
+def group_tag(group_id):
+    """
+    The tag for everything cached about a group
+    """
+    return f"group:{group_id}"
+
+
+def _tag_key(tag):
+    return f"tagged_cache:tag:{tag}"
+
+
+def _redis_client():
+    """
+    The raw Redis client behind the default cache, or None for other backends
+    """
+    client = getattr(cache, "client", None)
+
+    if client is None or not hasattr(client, "get_client"):
+        return None
+
+    return client.get_client(write=True)
+
+
+def _flush_stats(client):
+    """
+    Add the unflushed per-process counts to the shared hash
+    """
+    with _stats_lock:
+        pending = dict(_unflushed_stats)
+        _unflushed_stats.clear()
+
+    if not pending:
+        return
+
+    try:
+        pipeline = client.pipeline(transaction=False)
+        for field, count in pending.items():
+            pipeline.hincrby(cache.make_key(STATS_KEY), field, count)
+        pipeline.execute()
+    except Exception:  # noqa: BLE001
+        logger.warning("Unable to flush cache statistics", exc_info=True)
+
+
+def _record(family, outcome):
+    field = f"{family}:{outcome}"
+
+    with _stats_lock:
+        _local_stats[field] += 1
+        _unflushed_stats[field] += 1
+        flush = sum(_unflushed_stats.values()) >= STATS_FLUSH_EVERY
+
+    if flush:
+        client = _redis_client()
+        if client is not None:
+            _flush_stats(client)
+
+
+def fetch(family, key):
+    """
+    Read a cache entry, counting a hit or a miss for its family
+
+    :return: the cached value, or None on a miss
+    """
+    value = cache.get(key, version=VERSION)
+    _record(family, "hits" if value is not None else "misses")
+    return value
+
+
+def store(family, key, value, timeout, tags=()):
+    """
+    Write a cache entry and record it against each of the given tags
+    """
+    cache.set(key, value, timeout=timeout, version=VERSION)
+
+    if not tags:
+        return
+
+    try:
+        client = _redis_client()
+
+        if client is not None:
+            full_key = cache.make_key(key, version=VERSION)
+            pipeline = client.pipeline(transaction=False)
+            for tag in tags:
+                tag_key = cache.make_key(_tag_key(tag))
+                pipeline.sadd(tag_key, full_key)
+                pipeline.expire(tag_key, TAG_TIMEOUT)
+            pipeline.execute()
+            return
+
+        for tag in tags:
+            entries = cache.get(_tag_key(tag))
+            if not isinstance(entries, set):
+                entries = set()
+            entries.add(key)
+            cache.set(_tag_key(tag), entries, timeout=TAG_TIMEOUT)
+    except Exception:  # noqa: BLE001
+        logger.warning(
+            "Unable to tag cache entry %s (%s)", key, family, exc_info=True
+        )
+
+
+def invalidate(*tags):
+    """
+    Delete every cache entry recorded against any of the given tags
+
+    A cache error is logged rather than raised, so an edit is not failed by
+    a cache that is unavailable
+
+    :return: the number of entries deleted
+    """
+    if not tags:
+        return 0
+
+    try:
+        client = _redis_client()
+
+        if client is not None:
+            script = client.register_script(INVALIDATE_SCRIPT)
+            removed = script(
+                keys=[cache.make_key(_tag_key(tag)) for tag in tags]
+            )
+            logger.debug("Invalidated %s cache entries for %s", removed, tags)
+            return removed
+
+        keys = set()
+
+        for tag in tags:
+            keys.update(cache.get(_tag_key(tag)) or ())
+
+        cache.delete_many(list(keys), version=VERSION)
+        cache.delete_many([_tag_key(tag) for tag in tags])
+    except Exception:  # noqa: BLE001
+        logger.warning(
+            "Unable to invalidate cache entries for %s", tags, exc_info=True
+        )
+        return 0
+
+    removed = len(keys)
+    logger.debug("Invalidated %s cache entries for %s", removed, tags)
+
+    return removed
+
+
+def cache_stats():
+    """
+    Hit and miss counts per key family
+
+    :return: a dict of {family: {"hits": n, "misses": n}}, shared across
+        processes with Redis and for this process only otherwise
+    """
+    client = _redis_client()
+
+    if client is not None:
+        _flush_stats(client)
+        counts = {
+            field.decode(): int(count)
+            for field, count in client.hgetall(
+                cache.make_key(STATS_KEY)
+            ).items()
+        }
+    else:
+        with _stats_lock:
+            counts = dict(_local_stats)
+
+    stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    for field, count in counts.items():
+        family, _, outcome = field.rpartition(":")
+        stats[family][outcome] = count
+
+    return dict(stats)
+
+
+def reset_stats():
+    """
+    Clear the hit and miss counts
+    """
+    with _stats_lock:
+        _local_stats.clear()
+        _unflushed_stats.clear()
+
+    client = _redis_client()
+
+    if client is not None:
+        client.delete(cache.make_key(STATS_KEY))
@@ -0,0 +1,153 @@
+"""
+Tests for the shared circuit breaker and the database backend that uses it.
+
+Behaviour under test: the breaker opens after N failures, fails fast during
+the cool-down, lets exactly one probe through when half-open, closes on a
+successful probe and re-opens on a failed one; the database wrapper turns an
+open breaker into an immediate OperationalError without trying to connect.
+"""
+
+import copy
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+
+from knowledge_commons_profiles.common.circuit_breaker import CLOSED
+from knowledge_commons_profiles.common.circuit_breaker import HALF_OPEN
+from knowledge_commons_profiles.common.circuit_breaker import OPEN
+from knowledge_commons_profiles.common.circuit_breaker import CircuitBreaker
+from knowledge_commons_profiles.common.db_backends.circuit_breaker.base import (
+    DatabaseWrapper,
+)
+from knowledge_commons_profiles.common.db_backends.circuit_breaker.base import (
+    circuit_breaker_for,
+)
+
+TIME = "knowledge_commons_profiles.common.circuit_breaker.time.time"
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker("test", failure_threshold=3, cooldown=30)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _trip(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_closed_allows_requests(self):
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.status()["state"], CLOSED)
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow_request())
+
+        status = self.breaker.status()
+        self.assertEqual(status["state"], OPEN)
+        self.assertEqual(status["failures"], 3)
+        self.assertIn("retry_in", status)
+
+    def test_open_state_is_shared_between_workers(self):
+        self._trip()
+
+        other_worker = CircuitBreaker("test", failure_threshold=3)
+        self.assertFalse(other_worker.allow_request())
+
+    def test_half_open_lets_a_single_probe_through(self):
+        with patch(TIME, return_value=1000.0):
+            self._trip()
+
+        with patch(TIME, return_value=1031.0):
+            self.assertEqual(self.breaker.status()["state"], HALF_OPEN)
+            self.assertTrue(self.breaker.allow_request())
+            self.assertFalse(self.breaker.allow_request())
+            self.assertFalse(
+                CircuitBreaker("test", cooldown=30).allow_request()
+            )
+
+    def test_successful_probe_closes(self):
+        with patch(TIME, return_value=1000.0):
+            self._trip()
+
+        with patch(TIME, return_value=1031.0):
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_success()
+
+            self.assertEqual(self.breaker.status()["state"], CLOSED)
+            self.assertTrue(self.breaker.allow_request())
+            self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe_reopens(self):
+        with patch(TIME, return_value=1000.0):
+            self._trip()
+
+        with patch(TIME, return_value=1031.0):
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_failure()
+            self.assertFalse(self.breaker.allow_request())
+            self.assertEqual(self.breaker.status()["state"], OPEN)
+
+    def test_cache_failure_falls_back_to_local_state(self):
+        with patch(
+            "knowledge_commons_profiles.common.circuit_breaker.cache"
+        ) as mock_cache:
+            mock_cache.get.side_effect = ConnectionError("cache down")
+            mock_cache.add.side_effect = ConnectionError("cache down")
+            mock_cache.set.side_effect = ConnectionError("cache down")
+            mock_cache.delete.side_effect = ConnectionError("cache down")
+
+            self.assertTrue(self.breaker.allow_request())
+            self._trip()
+            self.assertFalse(self.breaker.allow_request())
+
+
+class CircuitBreakerDatabaseWrapperTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        settings_dict = copy.deepcopy(
+            connections["wordpress_dev"].settings_dict
+        )
+        if "WRAPPED_ENGINE" not in settings_dict:
+            self.skipTest("WordPress database circuit breaker disabled")
+
+        # nothing listens on port 1, so connecting fails straight away
+        settings_dict["HOST"] = "127.0.0.1"
+        settings_dict["PORT"] = "1"
+        settings_dict["CIRCUIT_BREAKER"] = {"FAILURES": 2, "COOLDOWN": 30}
+        self.settings_dict = settings_dict
+        self.breaker = circuit_breaker_for(settings_dict, "breaker_test")
+        self.breaker.reset()
+
+    def tearDown(self):
+        self.breaker.reset()
+        cache.clear()
+
+    def test_open_breaker_fails_fast(self):
+        for _ in range(2):
+            wrapper = DatabaseWrapper(self.settings_dict, "breaker_test")
+            with self.assertRaises(OperationalError) as context:
+                wrapper.ensure_connection()
+            self.assertNotIn("Circuit breaker open", str(context.exception))
+
+        self.assertEqual(self.breaker.status()["state"], OPEN)
+
+        wrapper = DatabaseWrapper(self.settings_dict, "breaker_test")
+        with (
+            patch.object(type(wrapper).__mro__[1], "connect") as mock_connect,
+            self.assertRaises(OperationalError) as context,
+        ):
+            wrapper.ensure_connection()
+
+        self.assertIn("Circuit breaker open", str(context.exception))
+        mock_connect.assert_not_called()
@@ -0,0 +1,124 @@
+"""
+Tests for the shared outbound thread pool and HTTP sessions
+"""
+
+import threading
+
+from django.test import SimpleTestCase
+from django.test import override_settings
+
+from knowledge_commons_profiles.common import http_pool
+
+
+@override_settings(
+    OUTBOUND_HTTP_WORKERS=4,
+    OUTBOUND_FANOUT_DEADLINE=5,
+    EXTERNAL_SYNC_WORKERS=4,
+)
+class HttpPoolTests(SimpleTestCase):
+    def tearDown(self):
+        http_pool.close()
+
+    def test_executor_is_shared(self):
+        self.assertIs(http_pool.get_executor(), http_pool.get_executor())
+
+    def test_one_session_per_host(self):
+        first = http_pool.session_for("https://one.example/a?token=x")
+
+        self.assertIs(first, http_pool.session_for("https://one.example/b"))
+        self.assertIsNot(first, http_pool.session_for("https://two.example/"))
+
+    def test_fan_out_keeps_the_order_of_items(self):
+        results = http_pool.fan_out(
+            lambda item: item * 2, [3, 1, 2], on_timeout=lambda item: None
+        )
+
+        self.assertEqual(results, [6, 2, 4])
+
+    def test_fan_out_runs_calls_concurrently(self):
+        barrier = threading.Barrier(3, timeout=2)
+
+        # each call waits for the other two, so this only finishes if all
+        # three are running at once
+        results = http_pool.fan_out(
+            lambda item: barrier.wait() >= 0,
+            range(3),
+            on_timeout=lambda item: False,
+        )
+
+        self.assertEqual(results, [True, True, True])
+
+    def test_calls_that_miss_the_deadline_use_on_timeout(self):
+        release = threading.Event()
+
+        def call(item):
+            if item == "slow":
+                release.wait(2)
+            return f"{item} done"
+
+        try:
+            results = http_pool.fan_out(
+                call,
+                ["fast", "slow"],
+                on_timeout=lambda item: f"{item} timed out",
+                deadline=0.1,
+            )
+        finally:
+            release.set()
+
+        self.assertEqual(results, ["fast done", "slow timed out"])
+
+    def test_hung_partner_lookups_leave_outbound_calls_a_thread(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        partner_pool = http_pool.get_executor(http_pool.PARTNER_SYNC_POOL)
+        for _ in range(4):
+            partner_pool.submit(release.wait, 2)
+
+        results = http_pool.fan_out(
+            lambda item: "logged out",
+            ["one", "two"],
+            on_timeout=lambda item: "deadline",
+            deadline=0.5,
+        )
+
+        self.assertEqual(results, ["logged out", "logged out"])
+
+    def test_reserve_grows_a_pool(self):
+        pool = http_pool.PARTNER_SYNC_POOL
+        small = http_pool.get_executor(pool)
+
+        http_pool.reserve(pool, 2)
+        self.assertIs(http_pool.get_executor(pool), small)
+
+        http_pool.reserve(pool, 10)
+        barrier = threading.Barrier(10, timeout=2)
+        results = http_pool.fan_out(
+            lambda item: barrier.wait() >= 0,
+            range(10),
+            on_timeout=lambda item: False,
+            pool=pool,
+        )
+
+        self.assertEqual(results, [True] * 10)
+
+    def test_fan_out_of_nothing(self):
+        self.assertEqual(http_pool.fan_out(str, [], on_timeout=str), [])
+
+    async def test_one_async_client_per_host(self):
+        first = http_pool.async_client_for("https://one.example/a")
+
+        self.assertIs(
+            first, http_pool.async_client_for("https://one.example/")
+        )
+        self.assertIsNot(
+            first, http_pool.async_client_for("https://two.example/")
+        )
+
+        await http_pool.aclose()
+
+        self.assertTrue(first.is_closed)
+        self.assertIsNot(
+            first, http_pool.async_client_for("https://one.example/a")
+        )
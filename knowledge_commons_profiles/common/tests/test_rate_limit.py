@@ -0,0 +1,174 @@
+"""
+Tests for the token-bucket rate limiter and the SyncClass rate_limit
+decorator built on it.
+
+The tests run against the LocMem cache, so the bucket is kept in a cache
+entry; the Redis path is checked for the script call it makes and for
+letting calls through when Redis cannot be reached.
+"""
+
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.test import override_settings
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import APIError
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import rate_limit
+from knowledge_commons_profiles.common import rate_limit as limiter
+from knowledge_commons_profiles.common.rate_limit import RateLimitExceededError
+from knowledge_commons_profiles.common.rate_limit import TokenBucket
+from knowledge_commons_profiles.common.rate_limit import parse_rate
+from knowledge_commons_profiles.common.rate_limit import rate_limit_stats
+
+REDIS_CLIENT = "knowledge_commons_profiles.common.rate_limit._redis_client"
+SLEEP = "knowledge_commons_profiles.common.rate_limit.time.sleep"
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        limiter.reset_stats()
+
+    def test_allows_a_burst_then_fails_fast(self):
+        bucket = TokenBucket("burst", calls=3, period=60)
+
+        for _ in range(3):
+            bucket.acquire()
+
+        with self.assertRaises(RateLimitExceededError):
+            bucket.acquire()
+
+        self.assertEqual(
+            rate_limit_stats()["burst"],
+            {"allowed": 3, "delayed": 0, "rejected": 1, "wait_seconds": 0},
+        )
+
+    def test_waits_for_a_token_within_the_timeout(self):
+        bucket = TokenBucket("wait", calls=1, period=0.05)
+        bucket.acquire()
+
+        bucket.acquire(timeout=1)
+
+        stats = rate_limit_stats()["wait"]
+        self.assertEqual(stats["delayed"], 1)
+        self.assertGreater(stats["wait_seconds"], 0)
+
+    def test_gives_up_when_the_wait_is_longer_than_the_timeout(self):
+        bucket = TokenBucket("slow", calls=1, period=60)
+        bucket.acquire()
+
+        with (
+            patch(SLEEP) as mock_sleep,
+            self.assertRaises(RateLimitExceededError),
+        ):
+            bucket.acquire(timeout=5)
+
+        mock_sleep.assert_not_called()
+
+    def test_buckets_with_the_same_name_share_tokens(self):
+        TokenBucket("shared", calls=1, period=60).acquire()
+
+        with self.assertRaises(RateLimitExceededError):
+            TokenBucket("shared", calls=1, period=60).acquire()
+
+        TokenBucket("other", calls=1, period=60).acquire()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("100/60"), (100, 60.0))
+        self.assertEqual(parse_rate("5"), (5, 1.0))
+
+
+class RedisTokenBucketTests(SimpleTestCase):
+    def test_uses_the_script_result(self):
+        client = Mock()
+        client.register_script.return_value.return_value = 250
+
+        with patch(REDIS_CLIENT, return_value=client):
+            wait = TokenBucket("partner", calls=100, period=50).take()
+
+        self.assertEqual(wait, 0.25)
+        client.register_script.return_value.assert_called_once_with(
+            keys=[cache.make_key("rate_limit:partner")], args=[100, 0.002]
+        )
+
+    def test_lets_calls_through_when_redis_is_down(self):
+        client = Mock()
+        client.register_script.return_value.side_effect = RedisConnectionError(
+            "down"
+        )
+
+        with patch(REDIS_CLIENT, return_value=client):
+            self.assertEqual(TokenBucket("partner", 1, 60).take(), 0)
+
+
+class MLA:
+    base_url = "https://api.example/2/"
+
+    def __init__(self):
+        self.calls = []
+
+    @rate_limit(max_calls=2, period=60)
+    def _make_rest_request(self, url, params=None):
+        self.calls.append(url)
+        return url
+
+
+class UP(MLA):
+    pass
+
+
+class ARLISNA(MLA):
+    @rate_limit(max_calls=1, period=60)
+    async def _amake_rest_request(self, url, params=None):
+        self.calls.append(url)
+        return url
+
+
+@override_settings(SYNC_API_RATE_LIMITS={}, SYNC_API_RATE_LIMIT_WAIT=0)
+class RateLimitDecoratorTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_is_per_partner(self):
+        mla = MLA()
+        for _ in range(2):
+            mla._make_rest_request(mla.base_url + "members")
+
+        with self.assertRaisesMessage(APIError, "Rate limit exceeded"):
+            mla._make_rest_request(mla.base_url + "members")
+
+        # another partner's calls do not count against MLA's limit
+        up = UP()
+        up._make_rest_request(up.base_url + "query")
+        self.assertEqual(len(mla.calls) + len(up.calls), 3)
+
+    @override_settings(SYNC_API_RATE_LIMITS={"MLA": "10/60"})
+    def test_partner_rate_from_settings(self):
+        mla = MLA()
+        for _ in range(10):
+            mla._make_rest_request(mla.base_url + "members")
+
+        self.assertEqual(len(mla.calls), 10)
+
+    @override_settings(SYNC_API_RATE_LIMITS={"MLA:members": "1/60"})
+    def test_endpoint_rate_from_settings(self):
+        mla = MLA()
+        mla._make_rest_request(mla.base_url + "members/12?x=1")
+
+        with self.assertRaises(APIError):
+            mla._make_rest_request(mla.base_url + "members")
+
+        mla._make_rest_request(mla.base_url + "groups")
+        self.assertEqual(len(mla.calls), 2)
+
+    async def test_async_requests_share_the_limit(self):
+        arlisna = ARLISNA()
+        await arlisna._amake_rest_request(arlisna.base_url + "members")
+
+        with self.assertRaisesMessage(APIError, "Rate limit exceeded"):
+            await arlisna._amake_rest_request(arlisna.base_url + "members")
+
+        self.assertEqual(len(arlisna.calls), 1)
@@ -0,0 +1,143 @@
+"""
+Tests for tagged cache entries.
+
+Behaviour under test: entries stored under a tag are all dropped by
+invalidate(tag) and no others are, hits and misses are counted per key
+family, Redis invalidation is a single script call, and the profile edit
+views invalidate the user's cached fragments.
+"""
+
+import json
+from io import StringIO
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.test import SimpleTestCase
+from django.test import TestCase
+
+from knowledge_commons_profiles.common import tagged_cache
+from knowledge_commons_profiles.common.tagged_cache import group_tag
+from knowledge_commons_profiles.common.tagged_cache import user_tag
+from knowledge_commons_profiles.newprofile.views.profile.works import (
+    save_works_order,
+)
+
+
+class TaggedCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        tagged_cache.reset_stats()
+
+    def tearDown(self):
+        cache.clear()
+        tagged_cache.reset_stats()
+
+    def test_invalidate_drops_only_tagged_entries(self):
+        tagged_cache.store("a", "a-kfitz", 1, 600, tags=[user_tag("kfitz")])
+        tagged_cache.store("b", "b-kfitz", 2, 600, tags=[user_tag("KFitz")])
+        tagged_cache.store("a", "a-other", 3, 600, tags=[user_tag("other")])
+        tagged_cache.store("g", "g-5", 4, 600, tags=[group_tag(5)])
+
+        removed = tagged_cache.invalidate(user_tag("kfitz"))
+
+        self.assertEqual(removed, 2)
+        self.assertIsNone(tagged_cache.fetch("a", "a-kfitz"))
+        self.assertIsNone(tagged_cache.fetch("b", "b-kfitz"))
+        self.assertEqual(tagged_cache.fetch("a", "a-other"), 3)
+        self.assertEqual(tagged_cache.fetch("g", "g-5"), 4)
+
+    def test_invalidating_an_unknown_tag_is_harmless(self):
+        self.assertEqual(tagged_cache.invalidate(user_tag("nobody")), 0)
+
+    def test_hits_and_misses_per_family(self):
+        tagged_cache.fetch("works_json", "missing")
+        tagged_cache.store("works_json", "present", [1], 600)
+        tagged_cache.fetch("works_json", "present")
+        tagged_cache.fetch("works_json", "present")
+        tagged_cache.fetch("mastodon", "missing")
+
+        self.assertEqual(
+            tagged_cache.cache_stats(),
+            {
+                "works_json": {"hits": 2, "misses": 1},
+                "mastodon": {"hits": 0, "misses": 1},
+            },
+        )
+
+    def test_command_reports_hit_rate(self):
+        tagged_cache.store("memberships", "m", ["MLA"], 600)
+        tagged_cache.fetch("memberships", "m")
+        tagged_cache.fetch("memberships", "other")
+        out = StringIO()
+
+        call_command("cache_stats", "--reset", stdout=out)
+
+        self.assertIn(
+            "memberships: 1 hits, 1 misses (50% hit rate)", out.getvalue()
+        )
+        self.assertEqual(tagged_cache.cache_stats(), {})
+
+    def test_redis_invalidation_is_one_script_call(self):
+        client = MagicMock()
+        client.register_script.return_value.return_value = 3
+
+        with patch.object(tagged_cache, "_redis_client", return_value=client):
+            removed = tagged_cache.invalidate(user_tag("a"), group_tag(1))
+
+        self.assertEqual(removed, 3)
+        script = client.register_script.return_value
+        script.assert_called_once()
+        self.assertEqual(len(script.call_args.kwargs["keys"]), 2)
+        client.delete.assert_not_called()
+
+    def test_invalidation_error_is_logged_not_raised(self):
+        client = MagicMock()
+        client.register_script.return_value.side_effect = ConnectionError()
+
+        with (
+            patch.object(tagged_cache, "_redis_client", return_value=client),
+            self.assertLogs(tagged_cache.logger, "WARNING"),
+        ):
+            removed = tagged_cache.invalidate(user_tag("a"))
+
+        self.assertEqual(removed, 0)
+
+
+class EditInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="editor", password="testpass"
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    @patch("knowledge_commons_profiles.newprofile.views.profile.works.API")
+    def test_save_works_order_drops_cached_fragments(self, mock_api):
+        tagged_cache.store(
+            "works_fragment",
+            "htmx_works_deposits:editor:default",
+            "<p>stale</p>",
+            600,
+            tags=[user_tag("editor")],
+        )
+        request = RequestFactory().post(
+            "/works/order/",
+            data=json.dumps({"item_order": [], "show_work_values": {}}),
+            content_type="application/json",
+        )
+        request.user = self.user
+
+        response = save_works_order(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(
+            tagged_cache.fetch(
+                "works_fragment", "htmx_works_deposits:editor:default"
+            )
+        )
@@ -5,6 +5,7 @@ A class of API calls for user details
 import json
 import logging
 import re
+from collections import defaultdict
 from enum import Enum
 from functools import cached_property
 from operator import itemgetter
@@ -14,7 +15,6 @@ import django
 import phpserialize
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.db import connections
 from django.db.models import Case
 from django.db.models import CharField
@@ -23,15 +23,29 @@ from django.db.models import Value
 from django.db.models import When
 from django.http import Http404
 
-from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.common import tagged_cache
+from knowledge_commons_profiles.common.tagged_cache import user_tag
 from knowledge_commons_profiles.newprofile import mastodon
+from knowledge_commons_profiles.newprofile.decoded_memberships import (
+    get_decoded_memberships,
+)
+from knowledge_commons_profiles.newprofile.follow_counts import (
+    get_follow_counts,
+)
+from knowledge_commons_profiles.newprofile.group_cache import get_group_metadata
+from knowledge_commons_profiles.newprofile.group_mirror import (
+    get_mirrored_groups,
+)
+from knowledge_commons_profiles.newprofile.group_mirror import (
+    get_mirrored_groups_for_usernames,
+)
+from knowledge_commons_profiles.newprofile.group_mirror import member_role
+from knowledge_commons_profiles.newprofile.identity_map import get_identity_map
 from knowledge_commons_profiles.newprofile.models import Profile
 from knowledge_commons_profiles.newprofile.models import WpBlog
 from knowledge_commons_profiles.newprofile.models import WpBpActivity
-from knowledge_commons_profiles.newprofile.models import WpBpFollow
 from knowledge_commons_profiles.newprofile.models import WpBpGroup
 from knowledge_commons_profiles.newprofile.models import WpBpGroupMember
-from knowledge_commons_profiles.newprofile.models import WpBpGroupsGroupmeta
 from knowledge_commons_profiles.newprofile.models import WpBpNotification
 from knowledge_commons_profiles.newprofile.models import WpBpUserBlogMeta
 from knowledge_commons_profiles.newprofile.models import WpPostSubTable
@@ -67,6 +81,96 @@ class ErrorModel(Enum):
     RETURN = 2
 
 
+def get_api(
+    request,
+    user: str | Profile,
+    use_wordpress=True,
+    create=False,
+    works_citation_style="MHRA",
+):
+    """
+    Get an API object for a user, reusing the one already built for this
+    request (if any) when IdentityMapMiddleware is installed
+    """
+    identity_map = get_identity_map(request)
+
+    def build():
+        return API(
+            request,
+            user,
+            use_wordpress=use_wordpress,
+            create=create,
+            works_citation_style=works_citation_style,
+        )
+
+    if identity_map is None:
+        return build()
+
+    username = user.username if isinstance(user, Profile) else str(user)
+
+    return identity_map.fetch(
+        "api",
+        (username, use_wordpress, create, works_citation_style),
+        build,
+    )
+
+
+def get_groups_for_usernames(usernames, status_keys):
+    """
+    The confirmed groups of many users, in the shape of API.get_groups,
+    from one membership query, one inviter lookup and one society lookup
+
+    :param usernames: the usernames to look up
+    :param status_keys: the group statuses to include
+    :return: a dict of lower-cased username to a list of groups
+    """
+    if settings.GROUP_MEMBERSHIP_MIRROR_ENABLED:
+        return get_mirrored_groups_for_usernames(usernames, status_keys)
+
+    group_members = list(
+        WpBpGroupMember.objects.filter(
+            user__user_login__in=usernames,
+            is_confirmed=True,
+            group__status__in=status_keys,
+        )
+        .select_related("group")
+        .annotate(username=F("user__user_login"))
+        .order_by("group__name", "group_id")
+    )
+
+    inviter_ids = {gm.inviter_id for gm in group_members if gm.inviter_id}
+    inviter_usernames = (
+        dict(
+            WpUser.objects.filter(id__in=inviter_ids).values_list(
+                "id", "user_login"
+            )
+        )
+        if inviter_ids
+        else {}
+    )
+
+    societies = society_ids_for_groups({gm.group_id for gm in group_members})
+
+    groups = defaultdict(list)
+
+    for gm in group_members:
+        groups[gm.username.lower()].append(
+            {
+                "id": gm.group_id,
+                "group_name": wp_unslash(gm.group.name),
+                "role": member_role(gm.is_admin, gm.is_mod),
+                "slug": gm.group.slug,
+                "status": gm.group.status,
+                "avatar": gm.group.get_avatar(),
+                "inviter_id": gm.inviter_id,
+                "inviter_username": inviter_usernames.get(gm.inviter_id),
+                "url": group_url(societies.get(gm.group_id), gm.group.slug),
+            }
+        )
+
+    return dict(groups)
+
+
 class API:
     """
     A class containing API calls for user details
@@ -105,10 +209,17 @@ class API:
         self._works_types = None
         self._wp_user_triggered = False
 
+        # rows loaded by any API object for this username are shared across
+        # the whole request when IdentityMapMiddleware is installed
+        self.identity_map = get_identity_map(request)
+
         if isinstance(user, Profile):
             self._profile = user
             self.user = user.username
 
+            if self.identity_map is not None:
+                self.identity_map.remember("profile", self.user, user)
+
     @property
     def works_citation_style(self):
         """
@@ -218,15 +329,47 @@ class API:
             return self._wp_user
 
         if self._wp_user is None:
-            try:
-                self._wp_user = WpUser.objects.get(user_login=self.user)
-            except WpUser.DoesNotExist:
-                self._wp_user_triggered = True
-                self._wp_user = None
+            if self.identity_map is not None:
+                self._wp_user = self.identity_map.fetch(
+                    "wp_user", str(self.user), self._load_wp_user
+                )
+            else:
+                self._wp_user = self._load_wp_user()
 
         self._wp_user_triggered = True
         return self._wp_user
 
+    def _load_wp_user(self):
+        """
+        Load the WordPress user row, returning None if there isn't one
+        """
+        try:
+            return WpUser.objects.get(user_login=self.user)
+        except WpUser.DoesNotExist:
+            self._wp_user_triggered = True
+            return None
+
+    @cached_property
+    def django_user(self):
+        """
+        Get the Django auth User for this username, or None
+        """
+        if self.identity_map is not None:
+            return self.identity_map.fetch(
+                "user", str(self.user), self._load_django_user
+            )
+
+        return self._load_django_user()
+
+    def _load_django_user(self):
+        """
+        Load the Django auth User row, returning None if there isn't one
+        """
+        try:
+            return User.objects.get(username=self.user)
+        except User.DoesNotExist:
+            return None
+
     @cached_property
     def mastodon_posts(self):
         """
@@ -255,6 +398,7 @@ class API:
                     self._mastodon_posts = mastodon.MastodonFeed(
                         self.mastodon_username,
                         self.mastodon_server,
+                        tags=[user_tag(self.user)],
                     )
         return self._mastodon_profile
 
@@ -351,36 +495,49 @@ class API:
         Get the profile
         """
         if self._profile is None:
-            try:
-                msg = f"Fetching info for {self.user}"
-                logger.info(msg)
-                self._profile = Profile.objects.prefetch_related(
-                    "academic_interests",
-                    "coverimage_set",
-                ).get(username=self.user)
-            except Profile.MultipleObjectsReturned:
-                self._profile = self._deduplicate_profiles()
-            except Profile.DoesNotExist:
-                if self.create:
-                    self._profile, _ = Profile.objects.get_or_create(
-                        username=self.user,
-                    )
-                else:
-                    # if the user exists but the Profile doesn't, then create
-                    # it
-                    try:
-                        user_object = User.objects.get(username=self.user)
-                        self._profile, _ = Profile.objects.get_or_create(
-                            username=self.user,
-                            defaults={"email": user_object.email},
-                        )
-                    except User.DoesNotExist as exc:
-                        # raise 404
-                        # use an assignment to avoid EM101
-                        error_message = f"Profile not found: {self.user}"
-                        raise Http404(error_message) from exc
+            if self.identity_map is not None:
+                self._profile = self.identity_map.fetch(
+                    "profile", str(self.user), self._load_profile
+                )
+            else:
+                self._profile = self._load_profile()
         return self._profile
 
+    def _load_profile(self):
+        """
+        Load the profile row, creating it where appropriate
+        """
+        try:
+            msg = f"Fetching info for {self.user}"
+            logger.info(msg)
+            return Profile.objects.prefetch_related(
+                "academic_interests",
+                "coverimage_set",
+            ).get(username=self.user)
+        except Profile.MultipleObjectsReturned:
+            return self._deduplicate_profiles()
+        except Profile.DoesNotExist:
+            if self.create:
+                profile, _ = Profile.objects.get_or_create(
+                    username=self.user,
+                )
+                return profile
+
+            # if the user exists but the Profile doesn't, then create it
+            user_object = self.django_user
+
+            if user_object is None:
+                # raise 404
+                # use an assignment to avoid EM101
+                error_message = f"Profile not found: {self.user}"
+                raise Http404(error_message) from None
+
+            profile, _ = Profile.objects.get_or_create(
+                username=self.user,
+                defaults={"email": user_object.email},
+            )
+            return profile
+
     def _deduplicate_profiles(self):
         """Remove duplicate profiles, keeping the most complete one."""
         profiles = list(
@@ -482,7 +639,7 @@ class API:
             return []
 
         cache_key = f"blog_post_list-{self.user}"
-        cached_response = cache.get(cache_key, version=VERSION)
+        cached_response = tagged_cache.fetch("blog_posts", cache_key)
 
         if cached_response is not None:
             return cached_response
@@ -504,11 +661,12 @@ class API:
         counter = 0
 
         if len(valid_blog_ids) == 0:
-            cache.set(
+            tagged_cache.store(
+                "blog_posts",
                 cache_key,
                 [],
                 timeout=600,
-                version=VERSION,
+                tags=[user_tag(self.user)],
             )
             return []
 
@@ -562,11 +720,12 @@ class API:
             list(WpPostSubTable.objects.raw(final_query, param_list))
         )
 
-        cache.set(
+        tagged_cache.store(
+            "blog_posts",
             cache_key,
             results,
             timeout=600,
-            version=VERSION,
+            tags=[user_tag(self.user)],
         )
 
         return results
@@ -632,61 +791,37 @@ class API:
                 "Privileged API call from %s", self.request.META["REMOTE_ADDR"]
             )
 
-        # Try to fetch the group (or bail out with exception)
-        if slug:
-            grp = WpBpGroup.objects.get(slug=slug, status__in=status_keys)
-        else:
-            grp = WpBpGroup.objects.get(id=group_id, status__in=status_keys)
-
-        # TODO: build the canonical URL
-        url = f"/groups/{grp.slug}/"
+        # Fetch the group's cached metadata (or bail out with exception)
+        grp = get_group_metadata(group_id=None if slug else group_id, slug=slug)
 
-        # Grab any avatar meta (your meta_key may be different)
-        avatar_path = self.get_group_avatar_url(group_id=group_id)
-        avatar = avatar_path if avatar_path else ""
+        if grp is None or grp["status"] not in status_keys:
+            msg = "WpBpGroup matching query does not exist."
+            raise WpBpGroup.DoesNotExist(msg)
 
-        # Grab the groupblog ID → turn it into a blog URL
-        blog_id = (
-            WpBpGroupsGroupmeta.objects.filter(group=grp, meta_key="blog_id")
-            .values_list("meta_value", flat=True)
-            .first()
-        )
-        if blog_id:
-            try:
-                blog = WpBlog.objects.get(blog_id=blog_id)
-                group_blog = f"https://{blog.domain}{blog.path}"
-            except WpBlog.DoesNotExist:
-                group_blog = ""
-        else:
-            group_blog = ""
+        # TODO: build the canonical URL
+        url = f"/groups/{grp['slug']}/"
 
         # Static arrays for upload/ moderate permissions
         upload_roles = ["member", "moderator", "administrator"]
         moderate_roles = ["moderator", "administrator"]
 
         return {
-            "id": grp.id,
-            "name": grp.name,
-            "slug": grp.slug,
+            "id": grp["id"],
+            "name": grp["name"],
+            "slug": grp["slug"],
             "url": url,
-            "visibility": grp.status,
-            "description": grp.description or "",
-            "avatar": avatar,
-            "groupblog": group_blog,
+            "visibility": grp["status"],
+            "description": grp["description"],
+            "avatar": grp["avatar"],
+            "groupblog": grp["groupblog"],
             "upload_roles": upload_roles,
             "moderate_roles": moderate_roles,
         }
 
-    def get_groups(
-        self, status_choices=None, on_error: ErrorModel = ErrorModel.RAISE
-    ):
+    def _group_status_keys(self, status_choices):
         """
-        Return a list of groups that the user is a member of
-        :return:
+        The group statuses to return for a get_groups call
         """
-        if not self.wp_user:
-            return []
-
         # default to [("public","Public")]
         if status_choices is None:
             status_choices = WpBpGroup.STATUS_CHOICES[:1]
@@ -699,6 +834,26 @@ class API:
                 "Privileged API call from %s", self.request.META["REMOTE_ADDR"]
             )
 
+        return status_keys
+
+    def get_groups(
+        self, status_choices=None, on_error: ErrorModel = ErrorModel.RAISE
+    ):
+        """
+        Return a list of groups that the user is a member of
+        :return:
+        """
+        if settings.GROUP_MEMBERSHIP_MIRROR_ENABLED:
+            # served from the Postgres mirror without touching WordPress
+            return get_mirrored_groups(
+                self.user, self._group_status_keys(status_choices)
+            )
+
+        if not self.wp_user:
+            return []
+
+        status_keys = self._group_status_keys(status_choices)
+
         try:
             group_members = list(
                 WpBpGroupMember.objects.filter(
@@ -842,61 +997,34 @@ class API:
         :return:
         """
         cache_key = f"user_memberships-{self.user}"
-        cached_response = cache.get(cache_key, version=VERSION)
+        cached_response = tagged_cache.fetch("memberships", cache_key)
 
         if cached_response is not None:
             return cached_response
 
-        meta_object = WpUserMeta.objects.filter(
-            meta_key="shib_ismemberof",
-            user=self.wp_user,
-        ).first()
-
         try:
-            # this is double serialized
-            decoded_list = phpserialize.unserialize(
-                phpserialize.unserialize(meta_object.meta_value.encode()),
-            )
-
-            memberships = []
-
-            # we're looking for things like this:
-            # CO:COU:HASTAC:members:active
-            for item in decoded_list:
-                item_decoded = decoded_list[item].decode("utf-8")
-
-                if item_decoded.startswith(
-                    "CO:COU:"
-                ) and item_decoded.endswith(
-                    ":members:active",
-                ):
-                    society = item_decoded.split(":")[2]
-
-                    if society != "HC":
-                        memberships.append(society)
-
-            cache.set(
-                cache_key,
-                memberships,
-                timeout=600,
-                version=VERSION,
-            )
-
-            return sorted(memberships)
-
+            memberships = get_decoded_memberships(self.wp_user)
         except Exception:  # noqa: BLE001
             return []
 
+        # the list is stored sorted, so cache hits and misses agree
+        tagged_cache.store(
+            "memberships",
+            cache_key,
+            memberships,
+            timeout=600,
+            tags=[user_tag(self.user)],
+        )
+
+        return memberships
+
     def follower_count(self):
         """
-        Return the number of followers
-        :return: an integer
+        Return the number of members this user follows
+        :return: a (success, count) tuple
         """
         try:
-            return (
-                True,
-                WpBpFollow.objects.filter(follower=self.wp_user).count(),
-            )
+            return True, get_follow_counts(self.wp_user)[1]
         except django.db.utils.OperationalError:
             logger.warning(
                 "Unable to connect to MySQL, fast-failing profile data."
@@ -912,7 +1040,7 @@ class API:
             return []
 
         cache_key = f"user_blog_post_list-{self.user}"
-        cached_response = cache.get(cache_key, version=VERSION)
+        cached_response = tagged_cache.fetch("user_blogs", cache_key)
 
         if cached_response is not None:
             return cached_response
@@ -949,11 +1077,12 @@ class API:
 
             results.append((blog_meta.meta_value, blog_meta.blog.domain))
 
-        cache.set(
+        tagged_cache.store(
+            "user_blogs",
             cache_key,
             results,
             timeout=600,
-            version=VERSION,
+            tags=[user_tag(self.user)],
         )
 
         return sorted(results, key=itemgetter(0))
@@ -966,7 +1095,7 @@ class API:
             return None
 
         cache_key = f"user_activities_list-{self.user}"
-        cached_response = cache.get(cache_key, version=VERSION)
+        cached_response = tagged_cache.fetch("activities", cache_key)
 
         if cached_response is not None:
             return cached_response
@@ -990,11 +1119,12 @@ class API:
                 distinct_entries.append(activity.type)
                 distinct_objects.append(activity)
 
-        cache.set(
+        tagged_cache.store(
+            "activities",
             cache_key,
             distinct_objects[:5],
             timeout=600,
-            version=VERSION,
+            tags=[user_tag(self.user)],
         )
 
         return distinct_objects[:5]
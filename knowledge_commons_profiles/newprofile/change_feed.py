@@ -0,0 +1,185 @@
+"""
+An incremental feed of changes to profiles and memberships
+
+Signal handlers in signals.py call record_change() when a profile, its
+memberships, a COmanage role or a CILogon association changes, which
+appends a ChangeLogEntry once the change's transaction has committed.
+Downstream systems read the log with changes_since() through
+/api/v1/changes/ instead of paging through every profile, passing back the
+cursor that each page returns.
+
+A cursor is "<last id>.<timestamp>". The timestamp records how far the
+reader has seen, so that a cursor older than CHANGE_FEED_RETENTION_DAYS,
+whose unread entries may already have been deleted, is rejected and the
+reader knows to resync in full.
+
+Ids and creation times are taken at INSERT, not at commit, so an entry
+written inside a long transaction could commit after a reader had passed
+newer ids, and would never be read. Entries are therefore only written
+after the change commits, each in a transaction of its own, and entries
+younger than SETTLE_SECONDS are held back so that one of those short
+transactions that took an id before, but committed after, a newer one is
+not skipped either. A process that dies between a change's commit and
+its entry's loses the entry.
+
+compact() deletes entries older than the retention period and, among
+entries older than CHANGE_FEED_COMPACT_AFTER_HOURS, those superseded by a
+newer entry for the same object: a reader who had not yet seen the older
+entry will still see the newer one.
+"""
+
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.utils import timezone
+
+from knowledge_commons_profiles.newprofile.models import ChangeLogEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+SETTLE_SECONDS = 5
+
+
+class InvalidCursorError(ValueError):
+    """
+    The cursor could not be parsed
+    """
+
+
+class ExpiredCursorError(Exception):
+    """
+    The cursor is older than the retention period
+    """
+
+
+def record_change(kind, username, action, object_id=""):
+    """
+    Append an entry to the change log once the current transaction commits
+
+    :param kind: a ChangeKind
+    :param username: the user the change concerns
+    :param action: a ChangeAction
+    :param object_id: the id of the changed object, if not the profile
+    """
+    if not username:
+        return
+
+    def append():
+        ChangeLogEntry.objects.create(
+            kind=kind,
+            username=username,
+            action=action,
+            object_id=str(object_id),
+        )
+
+    transaction.on_commit(append, robust=True)
+
+
+def encode_cursor(last_id, seen):
+    return f"{last_id}.{int(seen.timestamp())}"
+
+
+def decode_cursor(cursor):
+    """
+    :return: a (last id, seen datetime) tuple
+    """
+    try:
+        last_id, seen = cursor.split(".")
+        return int(last_id), datetime.datetime.fromtimestamp(
+            int(seen), tz=datetime.UTC
+        )
+    except (AttributeError, ValueError, OverflowError, OSError) as exc:
+        message = f"Invalid change feed cursor: {cursor}"
+        raise InvalidCursorError(message) from exc
+
+
+def changes_since(cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    The next page of changes after a cursor
+
+    :param cursor: a cursor from a previous page, or None to start from the
+        oldest retained entry
+    :param limit: the maximum number of entries to return
+    :return: an (entries, next cursor, has more) tuple
+    """
+    now = timezone.now()
+    settled = now - datetime.timedelta(seconds=SETTLE_SECONDS)
+    retention = datetime.timedelta(days=settings.CHANGE_FEED_RETENTION_DAYS)
+
+    if cursor is None:
+        last_id = 0
+    else:
+        last_id, seen = decode_cursor(cursor)
+
+        if seen < now - retention:
+            message = f"Change feed cursor {cursor} has expired"
+            raise ExpiredCursorError(message)
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    entries = list(
+        ChangeLogEntry.objects.filter(
+            id__gt=last_id, created__lte=settled
+        ).order_by("id")[: limit + 1]
+    )
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    if has_more:
+        next_cursor = encode_cursor(entries[-1].id, entries[-1].created)
+    elif entries:
+        next_cursor = encode_cursor(entries[-1].id, settled)
+    else:
+        next_cursor = encode_cursor(last_id, settled)
+
+    return entries, next_cursor, has_more
+
+
+def compact(retention_days=None, compact_after_hours=None):
+    """
+    Delete expired and superseded change log entries
+
+    :return: a dict of counts
+    """
+    if retention_days is None:
+        retention_days = settings.CHANGE_FEED_RETENTION_DAYS
+
+    if compact_after_hours is None:
+        compact_after_hours = settings.CHANGE_FEED_COMPACT_AFTER_HOURS
+
+    now = timezone.now()
+
+    expired, _ = ChangeLogEntry.objects.filter(
+        created__lt=now - datetime.timedelta(days=retention_days)
+    ).delete()
+
+    newer = ChangeLogEntry.objects.filter(
+        kind=OuterRef("kind"),
+        username=OuterRef("username"),
+        object_id=OuterRef("object_id"),
+        id__gt=OuterRef("id"),
+    )
+
+    superseded, _ = (
+        ChangeLogEntry.objects.filter(
+            created__lt=now - datetime.timedelta(hours=compact_after_hours)
+        )
+        .filter(Exists(newer))
+        .delete()
+    )
+
+    logger.info(
+        "Change feed compacted: %s expired, %s superseded",
+        expired,
+        superseded,
+    )
+
+    return {"expired": expired, "superseded": superseded}
@@ -0,0 +1,259 @@
+"""
+Decoded shib_ismemberof memberships
+
+WordPress stores each user's society memberships in the shib_ismemberof user
+meta as a double PHP-serialized list of strings like
+"CO:COU:HASTAC:members:active". Decoding that is pure-Python CPU work, so
+rather than doing it on every request the results are stored in
+DecodedMembership, keyed by WpUser.id:
+
+* decode_all_memberships() walks every shib_ismemberof row in chunks and
+  decodes them in parallel worker processes, skipping rows whose value has
+  not changed since the last run;
+* get_decoded_memberships() is the read path used by API.get_memberships.
+  It checks the stored row's hash against the current meta value and
+  decodes on demand for users the bulk job has not reached yet or whose
+  value has changed since.
+"""
+
+import hashlib
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import phpserialize
+
+from knowledge_commons_profiles.newprofile.models import DecodedMembership
+from knowledge_commons_profiles.newprofile.models import WpUserMeta
+
+logger = logging.getLogger(__name__)
+
+MEMBERSHIP_META_KEY = "shib_ismemberof"
+
+DECODE_CHUNK_SIZE = 1000
+
+# memberships in the base Commons are implied and never listed
+BASE_SOCIETY = "HC"
+
+
+def decode_ismemberof(meta_value) -> list[str]:
+    """
+    Decode a shib_ismemberof meta value into a sorted list of societies
+
+    Raises whatever phpserialize raises if the value is malformed.
+    """
+    # this is double serialized
+    decoded_list = phpserialize.unserialize(
+        phpserialize.unserialize(meta_value.encode()),
+    )
+
+    memberships = []
+
+    # we're looking for things like this:
+    # CO:COU:HASTAC:members:active
+    for item in decoded_list:
+        item_decoded = decoded_list[item].decode("utf-8")
+
+        if item_decoded.startswith("CO:COU:") and item_decoded.endswith(
+            ":members:active",
+        ):
+            society = item_decoded.split(":")[2]
+
+            if society != BASE_SOCIETY:
+                memberships.append(society)
+
+    return sorted(memberships)
+
+
+def source_hash(meta_value) -> str:
+    """
+    A fingerprint of a meta value, to detect changes between runs
+    """
+    return hashlib.sha1(
+        (meta_value or "").encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+def _decode_chunk(rows):
+    """
+    Decode a chunk of (wp_user_id, meta_value) pairs. Runs in a worker
+    process, so it must not touch the database.
+
+    :return: a list of (wp_user_id, memberships, source_hash, error) tuples
+    """
+    results = []
+
+    for wp_user_id, meta_value in rows:
+        try:
+            memberships = decode_ismemberof(meta_value)
+        except Exception as exc:  # noqa: BLE001
+            results.append((wp_user_id, [], source_hash(meta_value), str(exc)))
+        else:
+            results.append(
+                (wp_user_id, memberships, source_hash(meta_value), None)
+            )
+
+    return results
+
+
+def _store(results):
+    """
+    Upsert decoded results
+    """
+    DecodedMembership.objects.bulk_create(
+        [
+            DecodedMembership(
+                wp_user_id=wp_user_id,
+                memberships=memberships,
+                source_hash=hashed,
+            )
+            for wp_user_id, memberships, hashed, _ in results
+        ],
+        update_conflicts=True,
+        unique_fields=["wp_user_id"],
+        update_fields=["memberships", "source_hash", "decoded"],
+    )
+
+
+def _changed_chunks(chunk_size, counts, seen_ids):
+    """
+    Yield chunks of (wp_user_id, meta_value) pairs whose value has changed
+    since it was last decoded, in user id order
+    """
+    last_id = 0
+
+    while True:
+        rows = list(
+            WpUserMeta.objects.filter(
+                meta_key=MEMBERSHIP_META_KEY, user_id__gt=last_id
+            )
+            .order_by("user_id")
+            .values_list("user_id", "meta_value")[:chunk_size]
+        )
+
+        if not rows:
+            return
+
+        last_id = rows[-1][0]
+        counts["seen"] += len(rows)
+        seen_ids.update(user_id for user_id, _ in rows)
+
+        known = dict(
+            DecodedMembership.objects.filter(
+                wp_user_id__in=[user_id for user_id, _ in rows]
+            ).values_list("wp_user_id", "source_hash")
+        )
+
+        changed = [
+            (user_id, meta_value)
+            for user_id, meta_value in rows
+            if known.get(user_id) != source_hash(meta_value)
+        ]
+        counts["unchanged"] += len(rows) - len(changed)
+
+        if changed:
+            yield changed
+
+
+def _clear_removed(seen_ids, chunk_size):
+    """
+    Empty the stored memberships of users whose meta row has gone
+    """
+    removed = [
+        wp_user_id
+        for wp_user_id in DecodedMembership.objects.exclude(
+            memberships=[]
+        ).values_list("wp_user_id", flat=True)
+        if wp_user_id not in seen_ids
+    ]
+
+    for start in range(0, len(removed), chunk_size):
+        DecodedMembership.objects.filter(
+            wp_user_id__in=removed[start : start + chunk_size]
+        ).update(memberships=[], source_hash=source_hash(None))
+
+    return len(removed)
+
+
+def decode_all_memberships(chunk_size=DECODE_CHUNK_SIZE, workers=1):
+    """
+    Decode every user's shib_ismemberof meta into DecodedMembership
+
+    :param chunk_size: meta rows to read (and hand to a worker) at a time
+    :param workers: worker processes to decode in; 1 decodes in-process
+    :return: a dict of counts
+    """
+    counts = {"seen": 0, "unchanged": 0, "decoded": 0, "errors": 0}
+    seen_ids = set()
+
+    def store(results):
+        _store(results)
+        counts["decoded"] += len(results)
+        counts["errors"] += sum(1 for result in results if result[3])
+
+    chunks = _changed_chunks(chunk_size, counts, seen_ids)
+
+    if workers <= 1:
+        for chunk in chunks:
+            store(_decode_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # keep a bounded number of chunks in flight so that reading
+            # does not race ahead of decoding and fill memory
+            pending = deque()
+
+            for chunk in chunks:
+                pending.append(executor.submit(_decode_chunk, chunk))
+
+                if len(pending) >= workers * 2:
+                    store(pending.popleft().result())
+
+            while pending:
+                store(pending.popleft().result())
+
+    counts["cleared"] = _clear_removed(seen_ids, chunk_size)
+
+    logger.info("Decoded memberships: %s", counts)
+
+    return counts
+
+
+def get_decoded_memberships(wp_user) -> list[str]:
+    """
+    A user's decoded memberships
+
+    The stored row is only used while its source_hash still matches the
+    user's current shib_ismemberof meta, so a membership change in WordPress
+    is seen on the next read rather than after the next bulk run. Otherwise
+    the value is decoded and stored here.
+    """
+    if not wp_user:
+        return []
+
+    meta_object = WpUserMeta.objects.filter(
+        meta_key=MEMBERSHIP_META_KEY,
+        user=wp_user,
+    ).first()
+
+    meta_value = meta_object.meta_value if meta_object else None
+    hashed = source_hash(meta_value)
+
+    stored = (
+        DecodedMembership.objects.filter(
+            wp_user_id=wp_user.id, source_hash=hashed
+        )
+        .values_list("memberships", flat=True)
+        .first()
+    )
+
+    if stored is not None:
+        return stored
+
+    memberships = decode_ismemberof(meta_value) if meta_value else []
+
+    DecodedMembership.objects.update_or_create(
+        wp_user_id=wp_user.id,
+        defaults={"memberships": memberships, "source_hash": hashed},
+    )
+
+    return memberships
@@ -0,0 +1,259 @@
+"""
+Denormalized BuddyPress follow counts
+
+API.follower_count used to COUNT wp_bp_follow rows in MySQL on every
+profile render. The functions here keep per-user totals in FollowCount
+instead:
+
+* sync_follow_counts() is the scheduled job. It finds follows added since
+  the last run by id and recounts only the users involved. Unfollows delete
+  rows, which cannot be found by id, so when the table has shrunk relative
+  to the checkpoint the job falls back to a full recount;
+* recount_follow_counts() recounts everyone with two grouped queries;
+* get_follow_counts() is the cache-aside read path for a single user. It
+  counts in MySQL until the job has run once.
+
+The job runs continuously as `sync_follow_counts --every 300`.
+"""
+
+import logging
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.newprofile.models import FollowCount
+from knowledge_commons_profiles.newprofile.models import WpBpFollow
+from knowledge_commons_profiles.newprofile.models import WpUser
+
+logger = logging.getLogger(__name__)
+
+RECOUNT_CHUNK_SIZE = 2000
+
+CHECKPOINT_CACHE_KEY = "follow_counts-checkpoint"
+
+
+def _cache_key(wp_user_id):
+    return f"follow_counts-{wp_user_id}"
+
+
+def _grouped_counts(field, user_ids=None):
+    """
+    Count follow rows per value of field ("leader_id" or "follower_id"),
+    optionally only for the given users
+    """
+    queryset = WpBpFollow.objects.all()
+
+    if user_ids is not None:
+        queryset = queryset.filter(**{f"{field}__in": user_ids})
+
+    return dict(
+        queryset.values_list(field).annotate(total=Count("id")).order_by()
+    )
+
+
+def _store_counts(counts, chunk_size):
+    """
+    Upsert {wp_user_id: (followers, following)} where it differs from what
+    is stored, and drop the cached copies of the changed users
+
+    :return: the number of users whose counts changed
+    """
+    changed = 0
+    user_ids = sorted(counts)
+
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start : start + chunk_size]
+
+        stored = {
+            row[0]: row[1:]
+            for row in FollowCount.objects.filter(
+                wp_user_id__in=chunk
+            ).values_list("wp_user_id", "followers", "following")
+        }
+        chunk = [
+            user_id
+            for user_id in chunk
+            if stored.get(user_id) != counts[user_id]
+        ]
+
+        if not chunk:
+            continue
+
+        usernames = dict(
+            WpUser.objects.filter(id__in=chunk).values_list("id", "user_login")
+        )
+
+        FollowCount.objects.bulk_create(
+            [
+                FollowCount(
+                    wp_user_id=user_id,
+                    username=usernames.get(user_id, ""),
+                    followers=counts[user_id][0],
+                    following=counts[user_id][1],
+                )
+                for user_id in chunk
+            ],
+            update_conflicts=True,
+            unique_fields=["wp_user_id"],
+            update_fields=["username", "followers", "following", "updated"],
+        )
+        cache.delete_many(
+            [_cache_key(user_id) for user_id in chunk], version=VERSION
+        )
+        changed += len(chunk)
+
+    return changed
+
+
+def _save_checkpoint(last_id, total):
+    cache.set(
+        CHECKPOINT_CACHE_KEY,
+        {"last_id": last_id, "total": total},
+        timeout=None,
+        version=VERSION,
+    )
+
+
+def recount_follow_counts(chunk_size=RECOUNT_CHUNK_SIZE):
+    """
+    Recount every user's followers and following from wp_bp_follow
+
+    :return: a dict of counts
+    """
+    last_id = (
+        WpBpFollow.objects.order_by("-id").values_list("id", flat=True).first()
+        or 0
+    )
+    total = WpBpFollow.objects.count()
+
+    followers = _grouped_counts("leader_id")
+    following = _grouped_counts("follower_id")
+
+    # users who are stored with counts but have since lost every follow
+    user_ids = set(followers) | set(following)
+    user_ids.update(
+        FollowCount.objects.exclude(followers=0, following=0).values_list(
+            "wp_user_id", flat=True
+        )
+    )
+
+    updated = _store_counts(
+        {
+            user_id: (followers.get(user_id, 0), following.get(user_id, 0))
+            for user_id in user_ids
+        },
+        chunk_size,
+    )
+
+    _save_checkpoint(last_id, total)
+
+    return {"full": True, "new_follows": 0, "updated": updated}
+
+
+def sync_follow_counts(chunk_size=RECOUNT_CHUNK_SIZE):
+    """
+    Bring FollowCount up to date, recounting only the users affected by new
+    follows where possible
+
+    :return: a dict of counts
+    """
+    checkpoint = cache.get(CHECKPOINT_CACHE_KEY, version=VERSION)
+
+    if not checkpoint:
+        counts = recount_follow_counts(chunk_size)
+        logger.info("Follow counts: no checkpoint, recounted: %s", counts)
+        return counts
+
+    new_follows = list(
+        WpBpFollow.objects.filter(id__gt=checkpoint["last_id"]).values_list(
+            "id", "leader_id", "follower_id"
+        )
+    )
+    total = WpBpFollow.objects.count()
+
+    if total != checkpoint["total"] + len(new_follows):
+        counts = recount_follow_counts(chunk_size)
+        logger.info("Follow counts: unfollows found, recounted: %s", counts)
+        return counts
+
+    if not new_follows:
+        return {"full": False, "new_follows": 0, "updated": 0}
+
+    user_ids = {leader for _, leader, _ in new_follows} | {
+        follower for _, _, follower in new_follows
+    }
+    followers = _grouped_counts("leader_id", user_ids)
+    following = _grouped_counts("follower_id", user_ids)
+
+    updated = _store_counts(
+        {
+            user_id: (followers.get(user_id, 0), following.get(user_id, 0))
+            for user_id in user_ids
+        },
+        chunk_size,
+    )
+
+    _save_checkpoint(max(follow_id for follow_id, _, _ in new_follows), total)
+
+    counts = {
+        "full": False,
+        "new_follows": len(new_follows),
+        "updated": updated,
+    }
+    logger.info("Follow counts: %s", counts)
+
+    return counts
+
+
+def _live_counts(wp_user):
+    return (
+        WpBpFollow.objects.filter(leader=wp_user).count(),
+        WpBpFollow.objects.filter(follower=wp_user).count(),
+    )
+
+
+def get_follow_counts(wp_user):
+    """
+    A user's (followers, following) counts
+
+    Reads the cache, then FollowCount, and only counts in MySQL (storing the
+    result) for users the job has not reached yet. Until the job has run
+    there is no checkpoint and stored rows cannot be trusted to be current,
+    so every user is counted in MySQL. Raises OperationalError if a count is
+    needed and MySQL is down.
+    """
+    if not wp_user:
+        return 0, 0
+
+    cache_key = _cache_key(wp_user.id)
+    cached = cache.get_many([cache_key, CHECKPOINT_CACHE_KEY], version=VERSION)
+
+    if cached.get(cache_key) is not None:
+        return cached[cache_key]
+
+    if not cached.get(CHECKPOINT_CACHE_KEY):
+        counts = _live_counts(wp_user)
+        cache.set(cache_key, counts, timeout=600, version=VERSION)
+        return counts
+
+    stored = (
+        FollowCount.objects.filter(wp_user_id=wp_user.id)
+        .values_list("followers", "following")
+        .first()
+    )
+
+    if stored is None:
+        stored = _live_counts(wp_user)
+        FollowCount.objects.update_or_create(
+            wp_user_id=wp_user.id,
+            defaults={
+                "username": wp_user.user_login,
+                "followers": stored[0],
+                "following": stored[1],
+            },
+        )
+
+    cache.set(cache_key, tuple(stored), timeout=600, version=VERSION)
+
+    return tuple(stored)
@@ -0,0 +1,236 @@
+"""
+A cache of group metadata, keyed by group id
+
+Serializing a group for the REST API or API.get_group reads the group from
+WordPress, its groupblog meta and blog, its BuddyPress group type, and scans
+the avatar directory on disk. get_group_metadata() returns all of that as a
+plain dict from the cache, so that a hit needs no MySQL queries at all.
+
+Entries are tagged with group_tag(), so invalidate_group() (called when the
+membership mirror notices a rename or status change) drops them at once;
+otherwise they expire after GROUP_METADATA_CACHE_TIMEOUT seconds. Lookups by
+slug go through a small slug-to-id entry with the same tag.
+
+A status change decides who may see a group, so it cannot wait for the
+entry to expire. Every GROUP_STATUS_CHECK_TIMEOUT seconds a hit re-reads the
+group's name, slug and status (one primary key lookup) and rebuilds the
+entry if any of them has changed. If WordPress cannot be reached the cached
+entry is served unchecked, and the check is tried again on the next hit.
+
+The warm_group_cache command fills the cache for every group in bulk, with
+a handful of queries per chunk of groups rather than several per group.
+"""
+
+import itertools
+import logging
+
+from django.conf import settings
+from django.db import OperationalError
+
+from knowledge_commons_profiles.common import tagged_cache
+from knowledge_commons_profiles.common.tagged_cache import group_tag
+from knowledge_commons_profiles.newprofile.models import WpBlog
+from knowledge_commons_profiles.newprofile.models import WpBpGroup
+from knowledge_commons_profiles.newprofile.models import WpBpGroupsGroupmeta
+from knowledge_commons_profiles.newprofile.network_urls import (
+    society_ids_for_groups,
+)
+
+logger = logging.getLogger(__name__)
+
+WARM_CHUNK_SIZE = 500
+
+GROUP_FIELDS = ["id", "name", "slug", "status", "description", "date_created"]
+
+# the fields re-read when an entry's status check is due
+CHECKED_FIELDS = ["name", "slug", "status"]
+
+
+def _cache_key(group_id):
+    return f"group_meta-{group_id}"
+
+
+def _slug_key(slug):
+    return f"group_meta_slug-{slug}"
+
+
+def _checked_key(group_id):
+    return f"group_meta_checked-{group_id}"
+
+
+def build_group_metadata(groups):
+    """
+    Assemble the cached metadata for several groups at once
+
+    :param groups: WpBpGroup instances
+    :return: a dict of {group id: metadata dict}
+    """
+    groups = list(groups)
+    group_ids = [group.id for group in groups]
+
+    blog_ids = dict(
+        WpBpGroupsGroupmeta.objects.filter(
+            group_id__in=group_ids, meta_key="groupblog_blog_id"
+        ).values_list("group_id", "meta_value")
+    )
+
+    valid_blog_ids = {
+        int(blog_id) for blog_id in blog_ids.values() if str(blog_id).isdigit()
+    }
+
+    blog_urls = (
+        {
+            blog_id: f"https://{domain}{path}"
+            for blog_id, domain, path in WpBlog.objects.filter(
+                blog_id__in=valid_blog_ids
+            ).values_list("blog_id", "domain", "path")
+        }
+        if valid_blog_ids
+        else {}
+    )
+
+    societies = society_ids_for_groups(group_ids)
+
+    metadata = {}
+
+    for group in groups:
+        blog_id = str(blog_ids.get(group.id, ""))
+
+        metadata[group.id] = {
+            **{field: getattr(group, field) for field in GROUP_FIELDS},
+            "description": group.description or "",
+            "avatar": group.get_avatar(),
+            "groupblog": (
+                blog_urls.get(int(blog_id), "") if blog_id.isdigit() else ""
+            ),
+            "society_id": societies.get(group.id, ""),
+        }
+
+    return metadata
+
+
+def cache_group_metadata(metadata):
+    """
+    Store metadata built by build_group_metadata()
+    """
+    timeout = settings.GROUP_METADATA_CACHE_TIMEOUT
+
+    for group_id, data in metadata.items():
+        tags = [group_tag(group_id)]
+        tagged_cache.store(
+            "group_meta", _cache_key(group_id), data, timeout, tags=tags
+        )
+        tagged_cache.store(
+            "group_meta_slug",
+            _slug_key(data["slug"]),
+            group_id,
+            timeout,
+            tags=tags,
+        )
+        _mark_checked(group_id)
+
+
+def _mark_checked(group_id):
+    tagged_cache.store(
+        "group_meta_checked",
+        _checked_key(group_id),
+        value=True,
+        timeout=settings.GROUP_STATUS_CHECK_TIMEOUT,
+        tags=[group_tag(group_id)],
+    )
+
+
+def _is_current(cached):
+    """
+    Whether a cached entry still has the group's name, slug and status,
+    re-reading them from WordPress if the last check is too old. An entry
+    that cannot be checked because WordPress is down is treated as current.
+    """
+    group_id = cached["id"]
+
+    if tagged_cache.fetch("group_meta_checked", _checked_key(group_id)):
+        return True
+
+    try:
+        current = (
+            WpBpGroup.objects.filter(id=group_id)
+            .values_list(*CHECKED_FIELDS)
+            .first()
+        )
+    except OperationalError:
+        logger.warning(
+            "Unable to check group %s in WordPress, serving cached entry",
+            group_id,
+        )
+        return True
+
+    if current != tuple(cached[field] for field in CHECKED_FIELDS):
+        invalidate_group(group_id)
+        return False
+
+    _mark_checked(group_id)
+    return True
+
+
+def get_group_metadata(group_id=None, slug=None):
+    """
+    A group's metadata, from the cache if possible
+
+    :param group_id: the group's id
+    :param slug: the group's slug, used when no id is given
+    :return: a dict with the fields in GROUP_FIELDS plus avatar, groupblog
+        and society_id, or None if there is no such group
+    """
+    if group_id is None and slug:
+        group_id = tagged_cache.fetch("group_meta_slug", _slug_key(slug))
+
+    if group_id is not None:
+        cached = tagged_cache.fetch("group_meta", _cache_key(group_id))
+
+        # a renamed group leaves its old slug entry pointing at it
+        if (
+            cached is not None
+            and (not slug or cached["slug"] == slug)
+            and _is_current(cached)
+        ):
+            return cached
+
+    lookup = {"id": group_id} if group_id is not None else {"slug": slug}
+
+    try:
+        group = WpBpGroup.objects.get(**lookup)
+    except (WpBpGroup.DoesNotExist, ValueError):
+        return None
+
+    metadata = build_group_metadata([group])
+    cache_group_metadata(metadata)
+
+    return metadata[group.id]
+
+
+def invalidate_group(*group_ids):
+    """
+    Drop the cached metadata for the given groups
+    """
+    return tagged_cache.invalidate(
+        *(group_tag(group_id) for group_id in group_ids)
+    )
+
+
+def warm_group_cache(chunk_size=WARM_CHUNK_SIZE):
+    """
+    Cache the metadata for every group
+
+    :param chunk_size: the number of groups to read and cache at a time
+    :return: the number of groups cached
+    """
+    groups = WpBpGroup.objects.order_by("id").iterator(chunk_size=chunk_size)
+    cached = 0
+
+    for chunk in itertools.batched(groups, chunk_size):
+        cache_group_metadata(build_group_metadata(chunk))
+        cached += len(chunk)
+
+    logger.info("Cached metadata for %s groups", cached)
+
+    return cached
@@ -0,0 +1,330 @@
+"""
+A Postgres mirror of BuddyPress group memberships
+
+API.get_groups joins WpBpGroupMember to WpBpGroup in MySQL, resolves inviter
+usernames and looks up each group's society on every call. The functions here
+copy that data into GroupMembershipMirror so that, with
+GROUP_MEMBERSHIP_MIRROR_ENABLED set, the REST API can answer from Postgres
+alone.
+
+The sync is incremental: new memberships are found by id, changed ones by
+date_modified, removed ones by comparing row counts over id ranges, and group
+renames, status changes and society changes by comparing each mirrored group
+with WordPress.
+"""
+
+import datetime
+import logging
+from collections import defaultdict
+
+from django.db.models import Max
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from knowledge_commons_profiles.newprofile.group_cache import invalidate_group
+from knowledge_commons_profiles.newprofile.models import GroupMembershipMirror
+from knowledge_commons_profiles.newprofile.models import WpBpGroup
+from knowledge_commons_profiles.newprofile.models import WpBpGroupMember
+from knowledge_commons_profiles.newprofile.models import WpUser
+from knowledge_commons_profiles.newprofile.network_urls import group_url
+from knowledge_commons_profiles.newprofile.network_urls import (
+    society_ids_for_groups,
+)
+from knowledge_commons_profiles.rest_api.utils import wp_unslash
+
+logger = logging.getLogger(__name__)
+
+SYNC_CHUNK_SIZE = 2000
+
+# re-read memberships modified this long before the newest mirrored change,
+# to cover clock skew and rows committed out of order
+MODIFIED_OVERLAP = datetime.timedelta(minutes=10)
+
+MIRROR_FIELDS = [
+    "wp_user_id",
+    "username",
+    "group_id",
+    "group_name",
+    "group_slug",
+    "group_status",
+    "role",
+    "is_confirmed",
+    "society_id",
+    "inviter_id",
+    "inviter_username",
+    "date_modified",
+]
+
+
+def member_role(is_admin, is_mod):
+    """
+    The role name used by API.get_groups
+    """
+    if is_admin:
+        return "administrator"
+    if is_mod:
+        return "moderator"
+    return "member"
+
+
+def _changed_memberships(full):
+    """
+    The WpBpGroupMember rows that need to be (re)copied
+    """
+    queryset = WpBpGroupMember.objects.all()
+
+    if full:
+        return queryset
+
+    high_water = GroupMembershipMirror.objects.aggregate(
+        max_id=Max("id"), max_modified=Max("date_modified")
+    )
+
+    if high_water["max_id"] is None:
+        return queryset
+
+    return queryset.filter(
+        Q(id__gt=high_water["max_id"])
+        | Q(date_modified__gte=high_water["max_modified"] - MODIFIED_OVERLAP)
+    )
+
+
+def _mirror_rows(members):
+    """
+    Build mirror rows for a chunk of WpBpGroupMember values() dicts
+    """
+    inviter_ids = {
+        member["inviter_id"] for member in members if member["inviter_id"]
+    }
+    inviter_usernames = (
+        dict(
+            WpUser.objects.filter(id__in=inviter_ids).values_list(
+                "id", "user_login"
+            )
+        )
+        if inviter_ids
+        else {}
+    )
+
+    societies = society_ids_for_groups(
+        {member["group_id"] for member in members}
+    )
+
+    return [
+        GroupMembershipMirror(
+            id=member["id"],
+            wp_user_id=member["user_id"],
+            username=member["user__user_login"],
+            group_id=member["group_id"],
+            group_name=wp_unslash(member["group__name"]),
+            group_slug=member["group__slug"],
+            group_status=member["group__status"],
+            role=member_role(member["is_admin"], member["is_mod"]),
+            is_confirmed=member["is_confirmed"],
+            society_id=societies.get(member["group_id"], ""),
+            inviter_id=member["inviter_id"],
+            inviter_username=inviter_usernames.get(member["inviter_id"]),
+            date_modified=member["date_modified"],
+        )
+        for member in members
+    ]
+
+
+def _copy_memberships(queryset, chunk_size):
+    """
+    Upsert the given memberships into the mirror in id-ordered chunks
+    """
+    copied = 0
+    last_id = 0
+
+    while True:
+        members = list(
+            queryset.filter(id__gt=last_id)
+            .order_by("id")
+            .values(
+                "id",
+                "user_id",
+                "user__user_login",
+                "group_id",
+                "group__name",
+                "group__slug",
+                "group__status",
+                "is_admin",
+                "is_mod",
+                "is_confirmed",
+                "inviter_id",
+                "date_modified",
+            )[:chunk_size]
+        )
+
+        if not members:
+            return copied
+
+        GroupMembershipMirror.objects.bulk_create(
+            _mirror_rows(members),
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=MIRROR_FIELDS,
+        )
+
+        copied += len(members)
+        last_id = members[-1]["id"]
+
+
+def _delete_removed_memberships(chunk_size):
+    """
+    Remove mirrored memberships that no longer exist in WordPress
+
+    The mirror and WordPress live in different databases, so the two tables
+    cannot be joined. Instead the mirror is walked in id ranges of chunk_size
+    rows and each range's row count is compared with WordPress's. Only the
+    ranges that differ read their live ids, and the mirror rows missing from
+    them are deleted with one query per range.
+    """
+    deleted = 0
+    last_id = 0
+
+    while True:
+        mirrored = GroupMembershipMirror.objects.filter(id__gt=last_id)
+        upper = (
+            mirrored.order_by("id")
+            .values_list("id", flat=True)[chunk_size - 1 : chunk_size]
+            .first()
+        )
+        if upper is None:
+            upper = mirrored.aggregate(Max("id"))["id__max"]
+        if upper is None:
+            return deleted
+
+        in_range = mirrored.filter(id__lte=upper)
+        live = WpBpGroupMember.objects.filter(id__gt=last_id, id__lte=upper)
+
+        if in_range.count() != live.count():
+            deleted += in_range.exclude(
+                id__in=list(live.values_list("id", flat=True))
+            ).delete()[0]
+
+        last_id = upper
+
+
+def _refresh_groups():
+    """
+    Copy group renames, status changes and society changes onto existing
+    mirror rows, and drop the changed groups' cached metadata. Group changes
+    do not touch the membership rows in WordPress, so they are not picked up
+    by date_modified.
+    """
+    mirrored = {
+        row[0]: row[1:]
+        for row in GroupMembershipMirror.objects.values_list(
+            "group_id", "group_name", "group_slug", "group_status", "society_id"
+        ).distinct()
+    }
+
+    if not mirrored:
+        return 0
+
+    societies = society_ids_for_groups(mirrored)
+    updated = 0
+
+    for group_id, name, slug, status in WpBpGroup.objects.filter(
+        id__in=mirrored
+    ).values_list("id", "name", "slug", "status"):
+        current = (
+            wp_unslash(name),
+            slug,
+            status,
+            societies.get(group_id, ""),
+        )
+
+        if mirrored[group_id] != current:
+            GroupMembershipMirror.objects.filter(group_id=group_id).update(
+                group_name=current[0],
+                group_slug=current[1],
+                group_status=current[2],
+                society_id=current[3],
+                # update() skips auto_now; synced versions the memberships
+                synced=timezone.now(),
+            )
+            invalidate_group(group_id)
+            updated += 1
+
+    return updated
+
+
+def sync_group_memberships(full=False, chunk_size=SYNC_CHUNK_SIZE):
+    """
+    Bring the group membership mirror up to date with WordPress
+
+    :param full: recopy every membership rather than only new/changed ones
+    :param chunk_size: number of memberships to copy per query
+    :return: a dict of counts
+    """
+    copied = _copy_memberships(_changed_memberships(full), chunk_size)
+    deleted = _delete_removed_memberships(chunk_size)
+    groups_updated = _refresh_groups()
+
+    logger.info(
+        "Group membership mirror: copied %s, deleted %s, groups updated %s",
+        copied,
+        deleted,
+        groups_updated,
+    )
+
+    return {
+        "copied": copied,
+        "deleted": deleted,
+        "groups_updated": groups_updated,
+    }
+
+
+def _mirrored_group(membership):
+    """
+    A mirror row in the shape of an API.get_groups entry
+    """
+    return {
+        "id": membership.group_id,
+        "group_name": membership.group_name,
+        "role": membership.role,
+        "slug": membership.group_slug,
+        "status": membership.group_status,
+        "avatar": WpBpGroup(id=membership.group_id).get_avatar(),
+        "inviter_id": membership.inviter_id,
+        "inviter_username": membership.inviter_username,
+        "url": group_url(membership.society_id, membership.group_slug),
+    }
+
+
+def get_mirrored_groups(username, status_keys):
+    """
+    A user's confirmed groups from the mirror, in the same shape as
+    API.get_groups
+    """
+    memberships = GroupMembershipMirror.objects.filter(
+        username=username,
+        is_confirmed=True,
+        group_status__in=status_keys,
+    ).order_by(Lower("group_name"), "group_id")
+
+    return [_mirrored_group(membership) for membership in memberships]
+
+
+def get_mirrored_groups_for_usernames(usernames, status_keys):
+    """
+    Many users' confirmed groups from the mirror in one query
+
+    :return: a dict of lower-cased username to a list of groups
+    """
+    memberships = GroupMembershipMirror.objects.filter(
+        username__in=usernames,
+        is_confirmed=True,
+        group_status__in=status_keys,
+    ).order_by(Lower("group_name"), "group_id")
+
+    groups = defaultdict(list)
+
+    for membership in memberships:
+        groups[membership.username.lower()].append(_mirrored_group(membership))
+
+    return dict(groups)
@@ -0,0 +1,82 @@
+"""
+A request-scoped identity map for profile lookups
+
+A single page render or REST response can build several API objects for the
+same username (the header bar, the notification strings, the avatar and group
+serializer fields...), each of which used to fetch its own Profile, WpUser and
+User rows. The IdentityMap is attached to the request by IdentityMapMiddleware
+and memoizes those rows (and the API objects themselves) so that each is
+loaded at most once per request.
+"""
+
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class IdentityMap:
+    """
+    A per-request registry of loaded objects, keyed by kind and key
+    """
+
+    def __init__(self):
+        self._registry = {}
+
+    def fetch(self, kind: str, key, loader):
+        """
+        Return the object stored under (kind, key), calling loader() to
+        populate it on first access. Falsy results (e.g. None for "looked up
+        but not found") are memoized too; exceptions raised by the loader are
+        not, so a failed lookup is retried on the next call.
+        """
+        bucket = self._registry.setdefault(kind, {})
+
+        if key in bucket:
+            return bucket[key]
+
+        value = loader()
+        bucket[key] = value
+        return value
+
+    def remember(self, kind: str, key, value):
+        """
+        Store an object that was loaded elsewhere (e.g. by a DRF view's
+        get_object) so that later lookups reuse it
+        """
+        self._registry.setdefault(kind, {})[key] = value
+
+    def forget(self, kind: str, key):
+        """
+        Drop a stored object so that the next fetch reloads it
+        """
+        self._registry.get(kind, {}).pop(key, None)
+
+    def __contains__(self, item):
+        kind, key = item
+        return key in self._registry.get(kind, {})
+
+    def clear(self):
+        """
+        Drop everything held by the map
+        """
+        self._registry.clear()
+
+
+def get_identity_map(request=None) -> IdentityMap | None:
+    """
+    Find the identity map for the current request
+
+    Falls back to the request stored on settings.THREAD by RequestMiddleware
+    when no request is passed (e.g. model methods that build an API object).
+    Returns None outside a request cycle, in which case callers load
+    everything themselves as before.
+    """
+    identity_map = getattr(request, "identity_map", None)
+
+    if identity_map is None and request is None:
+        thread_request = getattr(settings.THREAD, "request", None)
+        identity_map = getattr(thread_request, "identity_map", None)
+
+    return identity_map if isinstance(identity_map, IdentityMap) else None
@@ -12,22 +12,48 @@ By default this command refreshes the local COmanage-derived societies
 (settings.KNOWN_SOCIETY_MAPPINGS) from Role rows only — no external API
 calls. With ``--full`` it runs the complete ExternalSync.sync per
 profile, including the external partner APIs (MLA, MSU, ARLISNA, UP).
+Profiles are taken --batch-size at a time, and each batch is looked up
+together first in the partners that support bulk searches (UP), so those
+cost one call per batch of emails rather than one per email.
+
+With ``--workers N`` the profiles are split by username into N shards
+of about the same size, processed at the same time on N threads. The
+partner calls of every shard take their tokens from the same rate-limit
+buckets, so the partners see no more traffic than their limits allow;
+the workers only overlap the time spent waiting on the network. Each
+shard keeps its own resume state.
+
+No request is waiting on a backfill, so each profile's partner lookups get
+--deadline seconds rather than EXTERNAL_SYNC_DEADLINE, and the partner
+sync pool is grown to give every worker's lookups a thread. A profile that
+a partner still failed to answer for is counted as incomplete and left out
+of the resume state, so a resumed run tries it again.
 
 Subscribers (settings.WEBHOOK_URLS) are notified once per profile whose
 memberships actually changed, so downstream services re-fetch; suppress
 with --no-notify.
 """
 
+import itertools
 import json
 import logging
 import signal
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import smart_open
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connection
 from django.db.models import Q
 
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import (
+    api_error_stats,
+)
+from knowledge_commons_profiles.common import http_pool
+from knowledge_commons_profiles.common.rate_limit import rate_limit_stats
 from knowledge_commons_profiles.newprofile.models import Profile
 from knowledge_commons_profiles.rest_api.sync import ExternalSync
 
@@ -36,6 +62,18 @@ logger = logging.getLogger(__name__)
 # is_member_of values that count as "never synced" for --missing-only
 MISSING_VALUES = ("", "{}")
 
+COUNTS = (
+    "processed",
+    "changed",
+    "notified",
+    "skipped",
+    "errors",
+    "incomplete",
+)
+
+# the seconds a profile's partner lookups get with --full
+DEFAULT_DEADLINE = 60.0
+
 
 class _LocalStateStore:
     """
@@ -166,6 +204,37 @@ class Command(BaseCommand):
                 "external API calls in --full mode)."
             ),
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help=(
+                "With --full: look this many profiles up together in "
+                "partners that support bulk searches before syncing "
+                "them one by one."
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Split the profiles by username into this many shards "
+                "and process them concurrently, each on its own thread "
+                "with its own resume state. Partner calls stay within "
+                "the shared rate limits."
+            ),
+        )
+        parser.add_argument(
+            "--deadline",
+            type=float,
+            default=DEFAULT_DEADLINE,
+            help=(
+                "With --full: seconds each profile's partner lookups may "
+                "take before the partners that have not answered are "
+                "skipped for that profile."
+            ),
+        )
         parser.add_argument(
             "--no-notify",
             action="store_true",
@@ -223,13 +292,48 @@ class Command(BaseCommand):
 
         return qs
 
-    def _make_store(self, options):
+    @staticmethod
+    def _shards(queryset, workers, done):
+        """
+        Split a queryset into about equal username ranges.
+
+        The ranges are cut so that each holds about the same number of
+        profiles still to do, so a resumed run stays balanced.
+        """
+        usernames = [
+            username
+            for username in queryset.values_list(
+                "username", flat=True
+            ).iterator()
+            if username not in done
+        ]
+
+        workers = min(workers, len(usernames))
+        bounds = [
+            usernames[len(usernames) * shard // workers]
+            for shard in range(1, workers)
+        ]
+
+        return [
+            queryset.filter(
+                Q(username__gte=low) if low else Q(),
+                Q(username__lt=high) if high else Q(),
+            )
+            for low, high in itertools.pairwise([None, *bounds, None])
+        ]
+
+    def _make_store(self, options, shard=None):
         """
         Build the resume-state store for --state-file, if requested.
+
+        With --workers each shard has a store of its own, beside the
+        --state-file location, so that no two threads write one object.
         """
         target = options["state_file"]
         if not target:
             return None
+        if shard is not None:
+            target = f"{target}.shard{shard}"
         if "://" in target:
             return _RemoteStateStore(
                 target,
@@ -244,84 +348,256 @@ class Command(BaseCommand):
         # persists resume state before the process dies
         raise SystemExit(143)
 
-    def _backfill_profile(self, profile, options) -> bool:
+    @staticmethod
+    def _prefetch(batch, done, options):
         """
-        Backfill one profile; return True if its memberships changed.
+        Look a batch of profiles up together before they are synced.
+        """
+        if not options["full"] or options["dry_run"]:
+            return
+
+        ExternalSync.prefetch(
+            profile
+            for profile in batch
+            if profile.username not in done
+            and (options["force"] or ExternalSync.is_stale(profile))
+        )
+
+    def _backfill_profile(self, profile, options):
+        """
+        Backfill one profile.
+
+        :return: (changed, complete); complete is False if a partner
+            failed or missed the deadline for this profile
         """
         before = self._parse(profile.is_member_of)
+        complete = True
 
         if options["full"]:
-            ExternalSync.sync(
+            _, complete = ExternalSync.sync_with_status(
                 profile=profile,
                 cache=not options["force"],
                 webhooks=False,
+                deadline=options["deadline"],
             )
         else:
             ExternalSync.refresh_local_memberships(profile)
 
-        return self._parse(profile.is_member_of) != before
+        return self._parse(profile.is_member_of) != before, complete
 
-    def handle(self, *args, **options):
-        counts = dict.fromkeys(
-            ("processed", "changed", "notified", "skipped", "errors"), 0
-        )
-        state_store = self._make_store(options)
-        done = state_store.load() if state_store else set()
+    def _handle_profile(self, profile, options, done, state_store, counts):
+        """
+        Backfill one profile of the run, updating the counts.
+        """
+        if profile.username in done:
+            counts["skipped"] += 1
+            return
 
-        previous_sigterm = signal.signal(
-            signal.SIGTERM, self._exit_on_sigterm
-        )
+        if options["dry_run"]:
+            self.stdout.write(f"[DRY-RUN] would backfill {profile.username}")
+            counts["processed"] += 1
+            return
 
         try:
-            for profile in self._build_queryset(options).iterator():
-                if profile.username in done:
-                    counts["skipped"] += 1
-                    continue
-
-                if options["dry_run"]:
-                    self.stdout.write(
-                        f"[DRY-RUN] would backfill {profile.username}"
-                    )
-                    counts["processed"] += 1
-                    continue
-
-                try:
-                    has_changed = self._backfill_profile(profile, options)
-                except Exception:
-                    counts["errors"] += 1
-                    logger.exception(
-                        "Failed to backfill memberships for %s",
-                        profile.username,
-                    )
-                    self.stderr.write(
-                        self.style.ERROR(f"Failed: {profile.username}")
-                    )
-                    continue
-
-                counts["processed"] += 1
-
-                if has_changed:
-                    counts["changed"] += 1
-                    if not options["no_notify"]:
-                        ExternalSync.notify_subscribers(profile)
-                        counts["notified"] += 1
-
-                # record only after the profile is fully handled so an
-                # interrupted run retries anything in flight
-                if state_store:
-                    state_store.record(profile.username)
+            has_changed, complete = self._backfill_profile(profile, options)
+        except Exception:
+            counts["errors"] += 1
+            logger.exception(
+                "Failed to backfill memberships for %s",
+                profile.username,
+            )
+            self.stderr.write(self.style.ERROR(f"Failed: {profile.username}"))
+            return
+
+        counts["processed"] += 1
+
+        if has_changed:
+            counts["changed"] += 1
+            if not options["no_notify"]:
+                ExternalSync.notify_subscribers(profile)
+                counts["notified"] += 1
+
+        if not complete:
+            counts["incomplete"] += 1
+
+        # record only after the profile is fully handled so an
+        # interrupted run retries anything in flight, and a partner that
+        # was skipped is asked again
+        if state_store and complete:
+            state_store.record(profile.username)
+
+        if options["sleep"]:
+            time.sleep(options["sleep"])
+
+    def _backfill(  # noqa: PLR0913
+        self, queryset, options, done, state_store, counts, stop=None
+    ):
+        """
+        Backfill the profiles of a queryset, batch by batch.
+        """
+        for batch in itertools.batched(
+            queryset.iterator(), max(1, options["batch_size"])
+        ):
+            self._prefetch(batch, done, options)
+
+            for profile in batch:
+                if stop and stop.is_set():
+                    return
+
+                self._handle_profile(
+                    profile, options, done, state_store, counts
+                )
 
-                if options["sleep"]:
-                    time.sleep(options["sleep"])
+    def _backfill_shard(self, queryset, options, done, state_store, stop):
+        """
+        Backfill one shard on a worker thread; return its counts.
+        """
+        counts = dict.fromkeys(COUNTS, 0)
+
+        try:
+            self._backfill(queryset, options, done, state_store, counts, stop)
         finally:
-            signal.signal(signal.SIGTERM, previous_sigterm)
-            if state_store:
-                state_store.close()
+            # the thread's own connection; Django only closes the
+            # request threads'
+            connection.close()
+
+        return counts
 
+    def _backfill_shards(self, options, done, state_stores, counts):
+        """
+        Backfill the shards concurrently, adding up their counts.
+        """
+        shards = self._shards(
+            self._build_queryset(options), len(state_stores), done
+        )
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=len(shards), thread_name_prefix="backfill"
+        )
+
+        try:
+            futures = [
+                executor.submit(
+                    self._backfill_shard,
+                    shard,
+                    options,
+                    done,
+                    state_store,
+                    stop,
+                )
+                for shard, state_store in zip(
+                    shards, state_stores, strict=False
+                )
+            ]
+
+            for future in futures:
+                for name, count in future.result().items():
+                    counts[name] += count
+        finally:
+            # on SIGTERM, let each worker finish its profile so that
+            # its state is complete before the stores are closed
+            stop.set()
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def _api_calls():
+        """
+        The partner API calls made so far in this process.
+        """
+        # endpoint buckets ("MLA:members") repeat their partner's calls
+        return sum(
+            stats["allowed"] + stats["delayed"]
+            for name, stats in rate_limit_stats().items()
+            if ":" not in name
+        )
+
+    def _report(self, counts, elapsed, api_calls, errors_before):
         self.stdout.write(
             self.style.SUCCESS(
                 "Processed {processed} profile(s): {changed} changed, "
                 "{notified} notified, {skipped} skipped, "
-                "{errors} error(s)".format(**counts)
+                "{errors} error(s), {incomplete} incomplete".format(**counts)
             )
         )
+
+        processed = counts["processed"]
+        self.stdout.write(
+            f"Throughput: {processed / max(elapsed, 1e-6):.2f} "
+            f"profile(s)/s over {elapsed:.1f}s, "
+            f"{api_calls / max(processed, 1):.2f} API call(s) per profile"
+        )
+
+        errors = {
+            partner: count - errors_before.get(partner, 0)
+            for partner, count in sorted(api_error_stats().items())
+            if count > errors_before.get(partner, 0)
+        }
+        self.stdout.write(
+            "API errors by partner: "
+            + (
+                ", ".join(
+                    f"{partner} {count}" for partner, count in errors.items()
+                )
+                or "none"
+            )
+        )
+
+    def handle(self, *args, **options):
+        counts = dict.fromkeys(COUNTS, 0)
+        workers = max(1, options["workers"])
+
+        if workers > 1:
+            state_stores = [
+                self._make_store(options, shard) for shard in range(workers)
+            ]
+        else:
+            state_stores = [self._make_store(options)]
+
+        done = set()
+        for state_store in state_stores:
+            if state_store:
+                done |= state_store.load()
+
+        if workers > 1 and options["state_file"]:
+            # honour the progress of an earlier run without --workers
+            done |= self._make_store(options).load()
+
+        if options["full"]:
+            # one thread per lookup of every worker, and as many again for
+            # lookups still running after their deadline
+            http_pool.reserve(
+                http_pool.PARTNER_SYNC_POOL,
+                2 * workers * len(settings.EXTERNAL_SYNC_CLASSES),
+            )
+
+        started = time.monotonic()
+        api_calls_before = self._api_calls()
+        errors_before = api_error_stats()
+
+        previous_sigterm = signal.signal(
+            signal.SIGTERM, self._exit_on_sigterm
+        )
+
+        try:
+            if workers > 1:
+                self._backfill_shards(options, done, state_stores, counts)
+            else:
+                self._backfill(
+                    self._build_queryset(options),
+                    options,
+                    done,
+                    state_stores[0],
+                    counts,
+                )
+        finally:
+            signal.signal(signal.SIGTERM, previous_sigterm)
+            for state_store in state_stores:
+                if state_store:
+                    state_store.close()
+
+        self._report(
+            counts,
+            time.monotonic() - started,
+            self._api_calls() - api_calls_before,
+            errors_before,
+        )
@@ -0,0 +1,43 @@
+"""
+Report cache hits and misses per key family.
+
+Usage:
+    ./manage.py cache_stats
+
+    # Report, then start counting afresh
+    ./manage.py cache_stats --reset
+"""
+
+from django.core.management.base import BaseCommand
+
+from knowledge_commons_profiles.common.tagged_cache import cache_stats
+from knowledge_commons_profiles.common.tagged_cache import reset_stats
+
+
+class Command(BaseCommand):
+    help = "Report cache hits and misses per key family."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Clear the counts after reporting them.",
+        )
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+
+        if not stats:
+            self.stdout.write("No cache lookups recorded.")
+
+        for family, counts in sorted(stats.items()):
+            total = counts["hits"] + counts["misses"]
+            ratio = counts["hits"] / total if total else 0
+            self.stdout.write(
+                f"{family}: {counts['hits']} hits, {counts['misses']} misses "
+                f"({ratio:.0%} hit rate)"
+            )
+
+        if options["reset"]:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counts reset."))
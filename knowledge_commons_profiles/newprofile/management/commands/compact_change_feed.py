@@ -0,0 +1,86 @@
+"""
+Delete expired and superseded change feed entries.
+
+Usage:
+    # Use CHANGE_FEED_RETENTION_DAYS and CHANGE_FEED_COMPACT_AFTER_HOURS
+    ./manage.py compact_change_feed
+
+    # Keep a week of entries and compact everything older than an hour
+    ./manage.py compact_change_feed --retention-days 7 --compact-after-hours 1
+
+    # Keep running, starting a compaction an hour after the last began
+    ./manage.py compact_change_feed --every 3600
+"""
+
+import signal
+import time
+
+import django.db
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from knowledge_commons_profiles.newprofile.change_feed import compact
+
+
+class Command(BaseCommand):
+    help = "Delete expired and superseded change feed entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=None,
+            help="Delete entries older than this many days.",
+        )
+        parser.add_argument(
+            "--compact-after-hours",
+            type=int,
+            default=None,
+            help="Drop superseded entries older than this many hours.",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Seconds between the starts of repeated runs (0 runs once).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["every"]:
+            self._run_once(options)
+            return
+
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not stopping:
+            started = time.monotonic()
+            self._run_once(options)
+            django.db.close_old_connections()
+
+            while not stopping and (
+                time.monotonic() - started < options["every"]
+            ):
+                time.sleep(1)
+
+    def _run_once(self, options):
+        try:
+            counts = compact(
+                retention_days=options["retention_days"],
+                compact_after_hours=options["compact_after_hours"],
+            )
+        except django.db.utils.OperationalError as exc:
+            msg = f"Unable to compact the change feed: {exc}"
+            raise CommandError(msg) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {counts['expired']} expired and "
+                f"{counts['superseded']} superseded entries."
+            )
+        )
@@ -0,0 +1,95 @@
+"""
+Decode every user's shib_ismemberof meta into DecodedMembership.
+
+Usage:
+    # Decode new and changed values in-process
+    ./manage.py decode_memberships
+
+    # Decode in four worker processes, 2000 users per chunk
+    ./manage.py decode_memberships --workers 4 --chunk-size 2000
+
+    # Keep running, starting a new pass an hour after the last one began
+    ./manage.py decode_memberships --every 3600
+"""
+
+import signal
+import time
+
+import django.db
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from knowledge_commons_profiles.newprofile.decoded_memberships import (
+    DECODE_CHUNK_SIZE,
+)
+from knowledge_commons_profiles.newprofile.decoded_memberships import (
+    decode_all_memberships,
+)
+
+
+class Command(BaseCommand):
+    help = "Decode shib_ismemberof memberships into Postgres."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes to decode in (1 decodes in-process).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DECODE_CHUNK_SIZE,
+            help="Users to read and decode per chunk.",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Seconds between the starts of repeated runs (0 runs once).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["every"]:
+            self._run_once(options)
+            return
+
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not stopping:
+            started = time.monotonic()
+            self._run_once(options)
+            django.db.close_old_connections()
+
+            while not stopping and (
+                time.monotonic() - started < options["every"]
+            ):
+                time.sleep(1)
+
+    def _run_once(self, options):
+        started = time.monotonic()
+
+        try:
+            counts = decode_all_memberships(
+                chunk_size=options["chunk_size"], workers=options["workers"]
+            )
+        except django.db.utils.OperationalError as exc:
+            msg = f"Unable to decode memberships: {exc}"
+            raise CommandError(msg) from exc
+
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Seen {counts['seen']}, unchanged {counts['unchanged']}, "
+                f"decoded {counts['decoded']} ({counts['errors']} errors), "
+                f"cleared {counts['cleared']} in {elapsed:.1f}s."
+            )
+        )
@@ -0,0 +1,93 @@
+"""
+Update the stored BuddyPress follower and following counts.
+
+Usage:
+    # Recount only the users affected by new follows (run on a schedule)
+    ./manage.py sync_follow_counts
+
+    # Recount every user
+    ./manage.py sync_follow_counts --full
+
+    # Keep running, starting an update five minutes after the last began
+    ./manage.py sync_follow_counts --every 300
+"""
+
+import signal
+import time
+
+import django.db
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from knowledge_commons_profiles.newprofile.follow_counts import (
+    RECOUNT_CHUNK_SIZE,
+)
+from knowledge_commons_profiles.newprofile.follow_counts import (
+    recount_follow_counts,
+)
+from knowledge_commons_profiles.newprofile.follow_counts import (
+    sync_follow_counts,
+)
+
+
+class Command(BaseCommand):
+    help = "Update the stored BuddyPress follower and following counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recount every user, not only those with new follows.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=RECOUNT_CHUNK_SIZE,
+            help="Users to write per query.",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Seconds between the starts of repeated runs (0 runs once).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["every"]:
+            self._run_once(options)
+            return
+
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not stopping:
+            started = time.monotonic()
+            self._run_once(options)
+            django.db.close_old_connections()
+
+            while not stopping and (
+                time.monotonic() - started < options["every"]
+            ):
+                time.sleep(1)
+
+    def _run_once(self, options):
+        job = recount_follow_counts if options["full"] else sync_follow_counts
+
+        try:
+            counts = job(chunk_size=options["chunk_size"])
+        except django.db.utils.OperationalError as exc:
+            msg = f"Unable to update follow counts: {exc}"
+            raise CommandError(msg) from exc
+
+        mode = "Full recount" if counts["full"] else "Incremental update"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{mode}: {counts['new_follows']} new follows, "
+                f"{counts['updated']} users updated."
+            )
+        )
@@ -0,0 +1,87 @@
+"""
+Sync the Postgres mirror of BuddyPress group memberships.
+
+Usage:
+    # Copy new and changed memberships, drop removed ones (run on a schedule)
+    ./manage.py sync_group_memberships
+
+    # Recopy every membership
+    ./manage.py sync_group_memberships --full
+
+    # Keep running, starting a sync five minutes after the last began
+    ./manage.py sync_group_memberships --every 300
+"""
+
+import signal
+import time
+
+import django.db
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from knowledge_commons_profiles.newprofile.group_mirror import SYNC_CHUNK_SIZE
+from knowledge_commons_profiles.newprofile.group_mirror import (
+    sync_group_memberships,
+)
+
+
+class Command(BaseCommand):
+    help = "Sync the Postgres mirror of BuddyPress group memberships."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recopy every membership, not only new or changed ones.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=SYNC_CHUNK_SIZE,
+            help="Memberships to copy per query.",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Seconds between the starts of repeated runs (0 runs once).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["every"]:
+            self._run_once(options)
+            return
+
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not stopping:
+            started = time.monotonic()
+            self._run_once(options)
+            django.db.close_old_connections()
+
+            while not stopping and (
+                time.monotonic() - started < options["every"]
+            ):
+                time.sleep(1)
+
+    def _run_once(self, options):
+        try:
+            counts = sync_group_memberships(
+                full=options["full"], chunk_size=options["chunk_size"]
+            )
+        except django.db.utils.OperationalError as exc:
+            msg = f"Unable to sync group memberships: {exc}"
+            raise CommandError(msg) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Copied {counts['copied']}, deleted {counts['deleted']}, "
+                f"groups updated {counts['groups_updated']}."
+            )
+        )
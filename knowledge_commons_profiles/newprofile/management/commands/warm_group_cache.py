@@ -0,0 +1,40 @@
+"""
+Fill the group metadata cache for every group.
+
+Usage:
+    # Cache every group's name, slug, status, avatar and group blog URL
+    ./manage.py warm_group_cache
+
+    # Read fewer groups per query
+    ./manage.py warm_group_cache --chunk-size 200
+"""
+
+import django.db
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from knowledge_commons_profiles.newprofile.group_cache import WARM_CHUNK_SIZE
+from knowledge_commons_profiles.newprofile.group_cache import warm_group_cache
+
+
+class Command(BaseCommand):
+    help = "Fill the group metadata cache for every group."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=WARM_CHUNK_SIZE,
+            help="Groups to read and cache per query.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            cached = warm_group_cache(chunk_size=options["chunk_size"])
+        except django.db.utils.OperationalError as exc:
+            msg = f"Unable to warm the group cache: {exc}"
+            raise CommandError(msg) from exc
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Cached metadata for {cached} groups.")
+        )
@@ -9,10 +9,9 @@ from datetime import datetime
 
 import bleach
 import requests
-from django.core.cache import cache
 from lxml import etree
 
-from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.common import tagged_cache
 
 logger = logging.getLogger(__name__)
 
@@ -88,15 +87,17 @@ class MastodonFeed:
     Fetches Mastodon feed latest and handles caching
     """
 
-    def __init__(self, username, server):
+    def __init__(self, username, server, tags=()):
         """
         Initialize the MastodonFeed object.
 
         :param username: The username on Mastodon
         :param server: The server where the Mastodon profile is hosted
+        :param tags: cache tags to record the cached feed against
         """
         self.username = username
         self.server = server
+        self.tags = tags
         self.api_url = f"https://{self.server}/@{self.username}.rss"
         self.timeout = 10  # Request timeout in seconds
         self.max_posts = 4  # Maximum posts to return
@@ -141,25 +142,27 @@ class MastodonFeed:
             latest_posts = self._fetch_and_parse_posts()
             # Still cache the fresh results for future requests
             if latest_posts:
-                cache.set(
+                tagged_cache.store(
+                    "mastodon",
                     cache_key,
                     latest_posts,
-                    self.cache_time,
-                    version=VERSION,
+                    timeout=self.cache_time,
+                    tags=self.tags,
                 )
             return latest_posts
 
         # Normal cached behavior
-        latest_posts = cache.get(cache_key, version=VERSION)
+        latest_posts = tagged_cache.fetch("mastodon", cache_key)
 
         if latest_posts is None:
             latest_posts = self._fetch_and_parse_posts()
             if latest_posts:
-                cache.set(
+                tagged_cache.store(
+                    "mastodon",
                     cache_key,
                     latest_posts,
-                    self.cache_time,
-                    version=VERSION,
+                    timeout=self.cache_time,
+                    tags=self.tags,
                 )
 
         return latest_posts
@@ -0,0 +1,62 @@
+# Generated by Django 6.0.7 on 2026-10-19 01:48
+
+import knowledge_commons_profiles.newprofile.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newprofile", "0059_merge_central_user_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GroupMembershipMirror",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(primary_key=True, serialize=False),
+                ),
+                ("wp_user_id", models.BigIntegerField(db_index=True)),
+                (
+                    "username",
+                    knowledge_commons_profiles.newprofile.fields.CICharField(
+                        max_length=255
+                    ),
+                ),
+                ("group_id", models.BigIntegerField(db_index=True)),
+                ("group_name", models.CharField(max_length=255)),
+                ("group_slug", models.CharField(max_length=200)),
+                (
+                    "group_status",
+                    models.CharField(
+                        choices=[
+                            ("public", "Public"),
+                            ("private", "Private"),
+                            ("hidden", "Hidden"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("role", models.CharField(max_length=20)),
+                ("is_confirmed", models.BooleanField(default=False)),
+                ("society_id", models.CharField(blank=True, max_length=200)),
+                ("inviter_id", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "inviter_username",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("date_modified", models.DateTimeField(db_index=True)),
+                ("synced", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["username", "is_confirmed", "group_status"],
+                        name="newprofile__usernam_f40b5a_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.7 on 2026-10-19 01:50
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newprofile", "0060_groupmembershipmirror"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DecodedMembership",
+            fields=[
+                (
+                    "wp_user_id",
+                    models.BigIntegerField(primary_key=True, serialize=False),
+                ),
+                (
+                    "memberships",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(max_length=100),
+                        blank=True,
+                        default=list,
+                    ),
+                ),
+                ("source_hash", models.CharField(blank=True, max_length=40)),
+                ("decoded", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
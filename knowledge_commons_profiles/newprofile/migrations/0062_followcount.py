@@ -0,0 +1,33 @@
+# Generated by Django 6.0.7 on 2026-10-19 03:10
+
+from django.db import migrations, models
+
+import knowledge_commons_profiles.newprofile.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newprofile", "0061_decodedmembership"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FollowCount",
+            fields=[
+                (
+                    "wp_user_id",
+                    models.BigIntegerField(primary_key=True, serialize=False),
+                ),
+                (
+                    "username",
+                    knowledge_commons_profiles.newprofile.fields.CICharField(
+                        db_index=True, max_length=255
+                    ),
+                ),
+                ("followers", models.PositiveIntegerField(default=0)),
+                ("following", models.PositiveIntegerField(default=0)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.7 on 2026-10-19 02:00
+
+import django.utils.timezone
+import knowledge_commons_profiles.newprofile.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newprofile", "0062_followcount"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExternalSyncJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "username",
+                    knowledge_commons_profiles.newprofile.fields.CICharField(
+                        max_length=255
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("enqueued", models.DateTimeField(auto_now_add=True)),
+                (
+                    "run_after",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("started", models.DateTimeField(blank=True, null=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"],
+                        name="newprofile__status_fdbfb9_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status", "pending")),
+                        fields=("username",),
+                        name="unique_pending_external_sync_job",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.7 on 2026-10-19 02:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("newprofile", "0063_externalsyncjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="modified",
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="revision",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 6.0.7 on 2026-10-19 02:10
+
+import knowledge_commons_profiles.newprofile.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newprofile", "0064_profile_revision"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, db_index=True),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("profile", "Profile"),
+                            ("role", "Role"),
+                            ("sub_association", "Sub association"),
+                            ("memberships", "Memberships"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("updated", "Updated"),
+                            ("deleted", "Deleted"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "username",
+                    knowledge_commons_profiles.newprofile.fields.CICharField(
+                        max_length=255
+                    ),
+                ),
+                ("object_id", models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "username", "object_id", "id"],
+                        name="newprofile__kind_715db2_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 6.0.7 on 2026-10-19 02:29
+
+import django.utils.timezone
+import knowledge_commons_profiles.newprofile.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("newprofile", "0065_changelogentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("idms_user_update", "IDMS user update"),
+                            ("subscriber_webhook", "Subscriber webhook"),
+                            ("association", "IDMS association"),
+                            ("wordpress_avatar", "WordPress avatar"),
+                            ("wordpress_email", "WordPress email"),
+                            ("cc_search", "CC search index"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                (
+                    "username",
+                    knowledge_commons_profiles.newprofile.fields.CICharField(
+                        max_length=255
+                    ),
+                ),
+                ("destination", models.CharField(max_length=255)),
+                ("payload", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "run_after",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("started", models.DateTimeField(blank=True, null=True)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "run_after"],
+                        name="newprofile__status_732ba2_idx",
+                    ),
+                    models.Index(
+                        fields=["destination", "username", "id"],
+                        name="newprofile__destina_6c4137_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
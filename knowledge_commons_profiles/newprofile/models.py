@@ -522,6 +522,11 @@ class Profile(models.Model):
     )
     last_sync = models.DateTimeField(blank=True, null=True)
 
+    # bumped on every save; with modified and last_sync, these version the
+    # REST API representation for ETag and Last-Modified headers
+    revision = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True, null=True)
+
     # this should not be accessed directly, but instead via the property below
     cc_search_id = models.CharField(max_length=255, blank=True, null=True)
 
@@ -541,6 +546,18 @@ class Profile(models.Model):
         """
         return str(self.name)
 
+    def save(self, *args, **kwargs):
+        """
+        Save the profile, bumping its revision
+        """
+        self.revision = (self.revision or 0) + 1
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "revision", "modified"}
+
+        super().save(*args, **kwargs)
+
     def admin_display(self):
         """
         Return a human-readable representation of the Profile model instance
@@ -1648,3 +1665,222 @@ class Role(models.Model):
                     "active now by dates."
                 }
             )
+
+
+# Postgres-side mirrors of WordPress data
+
+
+class GroupMembershipMirror(models.Model):
+    """
+    A denormalized Postgres copy of a BuddyPress group membership
+
+    Rows are keyed by the WpBpGroupMember id and kept current by the
+    sync_group_memberships command so that the REST API can serve a user's
+    groups without touching the WordPress database.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    wp_user_id = models.BigIntegerField(db_index=True)
+    username = CICharField(max_length=255)
+    group_id = models.BigIntegerField(db_index=True)
+    group_name = models.CharField(max_length=255)
+    group_slug = models.CharField(max_length=200)
+    group_status = models.CharField(
+        max_length=10, choices=WpBpGroup.STATUS_CHOICES
+    )
+    role = models.CharField(max_length=20)
+    is_confirmed = models.BooleanField(default=False)
+    society_id = models.CharField(max_length=200, blank=True)
+    inviter_id = models.BigIntegerField(null=True, blank=True)
+    inviter_username = models.CharField(max_length=255, null=True, blank=True)
+    date_modified = models.DateTimeField(db_index=True)
+    synced = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["username", "is_confirmed", "group_status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.username} in {self.group_slug} ({self.role})"
+
+
+class DecodedMembership(models.Model):
+    """
+    The society memberships decoded from a user's shib_ismemberof meta
+
+    The WordPress value is double PHP-serialized; decoding it on every
+    request is wasteful, so the decode_memberships command (and
+    API.get_memberships, on demand) store the result here, keyed by WpUser.id.
+    source_hash lets the bulk job skip users whose meta has not changed.
+    """
+
+    wp_user_id = models.BigIntegerField(primary_key=True)
+    memberships = ArrayField(
+        models.CharField(max_length=100), default=list, blank=True
+    )
+    source_hash = models.CharField(max_length=40, blank=True)
+    decoded = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.wp_user_id}: {', '.join(self.memberships)}"
+
+
+class FollowCount(models.Model):
+    """
+    A user's BuddyPress follower and following counts
+
+    Counting wp_bp_follow rows in MySQL on every profile render is wasteful,
+    so the sync_follow_counts command keeps these totals current, keyed by
+    WpUser.id, and API.follower_count reads them from here.
+    """
+
+    wp_user_id = models.BigIntegerField(primary_key=True)
+    username = CICharField(max_length=255, db_index=True)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return (
+            f"{self.username}: {self.followers} followers, "
+            f"{self.following} following"
+        )
+
+
+# Background jobs
+
+
+class ExternalSyncJobStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    RUNNING = "running", "Running"
+    FAILED = "failed", "Failed"
+
+
+class ExternalSyncJob(models.Model):
+    """
+    A queued refresh of a profile's external society memberships
+
+    Requests that find a profile's memberships stale enqueue one of these
+    instead of calling the partner APIs inline; the run_sync_worker command
+    claims and runs them. At most one job per profile can be pending.
+    """
+
+    username = CICharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        choices=ExternalSyncJobStatus.choices,
+        default=ExternalSyncJobStatus.PENDING,
+    )
+    enqueued = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["username"],
+                condition=models.Q(status="pending"),
+                name="unique_pending_external_sync_job",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+        ]
+
+    def __str__(self):
+        return f"{self.username} ({self.status})"
+
+
+class OutboxKind(models.TextChoices):
+    IDMS_USER_UPDATE = "idms_user_update", "IDMS user update"
+    SUBSCRIBER_WEBHOOK = "subscriber_webhook", "Subscriber webhook"
+    ASSOCIATION = "association", "IDMS association"
+    WORDPRESS_AVATAR = "wordpress_avatar", "WordPress avatar"
+    WORDPRESS_EMAIL = "wordpress_email", "WordPress email"
+    CC_SEARCH = "cc_search", "CC search index"
+
+
+class OutboxStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    RUNNING = "running", "Running"
+    FAILED = "failed", "Failed"
+
+
+class OutboxMessage(models.Model):
+    """
+    An outbound call to another service, waiting to be delivered
+
+    Views write these in the request transaction instead of calling the
+    service inline, so a message exists if and only if the change that
+    caused it was committed. The run_outbox_dispatcher command delivers
+    them. Messages to the same destination about the same user are
+    delivered in the order they were written.
+    """
+
+    kind = models.CharField(max_length=32, choices=OutboxKind.choices)
+    username = CICharField(max_length=255)
+    destination = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=OutboxStatus.choices,
+        default=OutboxStatus.PENDING,
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"]),
+            models.Index(fields=["destination", "username", "id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.username} to {self.destination}"
+
+
+# Change feed
+
+
+class ChangeKind(models.TextChoices):
+    PROFILE = "profile", "Profile"
+    ROLE = "role", "Role"
+    SUB_ASSOCIATION = "sub_association", "Sub association"
+    MEMBERSHIPS = "memberships", "Memberships"
+
+
+class ChangeAction(models.TextChoices):
+    CREATED = "created", "Created"
+    UPDATED = "updated", "Updated"
+    DELETED = "deleted", "Deleted"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    An append-only record that something about a user changed
+
+    Rows are written by signal handlers once the change has committed and
+    read in id order by the /api/v1/changes/ feed. The
+    compact_change_feed command drops superseded and expired rows.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    kind = models.CharField(max_length=20, choices=ChangeKind.choices)
+    action = models.CharField(max_length=10, choices=ChangeAction.choices)
+    username = CICharField(max_length=255)
+    object_id = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind", "username", "object_id", "id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.action}: {self.username}"
@@ -59,9 +59,9 @@ class BuddyPressNotification:
             update_reply -- possibly (but rarely) used
         """
 
-        from knowledge_commons_profiles.newprofile.api import API
+        from knowledge_commons_profiles.newprofile.api import get_api
 
-        api_me = API(
+        api_me = get_api(
             self.request,
             username,
             use_wordpress=True,
@@ -0,0 +1,177 @@
+"""
+A transactional outbox for calls to other services
+
+Saving a profile used to call the IDMS works endpoints, the subscriber
+webhooks, WordPress and the CC search index inline, so a slow or failing
+service held up the request, and a request that rolled back had already
+told the world about a change that never happened.
+
+Instead, the queue_* functions here write an OutboxMessage per destination.
+ATOMIC_REQUESTS is off, so the rows are only committed with the change (or
+not at all) when the caller writes both in one transaction.atomic() block,
+as the profile edit, avatar upload, activation and sync paths do. The
+run_outbox_dispatcher command (rest_api/outbox_dispatcher.py) delivers
+them.
+
+A message names the user it is about and the URL it goes to. Messages to one
+destination about one user are delivered in the order they were written;
+different users and destinations are delivered concurrently.
+"""
+
+import logging
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models import Min
+from django.utils import timezone
+
+from knowledge_commons_profiles.newprofile.models import OutboxKind
+from knowledge_commons_profiles.newprofile.models import OutboxMessage
+from knowledge_commons_profiles.newprofile.models import OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(kind, username, destination, payload=None):
+    """
+    Write one message to the outbox
+
+    :param kind: an OutboxKind
+    :param username: the user the message is about
+    :param destination: the URL the message will be delivered to
+    :param payload: further JSON-serializable data for the delivery
+    :return: the OutboxMessage
+    """
+    message = OutboxMessage.objects.create(
+        kind=kind,
+        username=username,
+        destination=destination,
+        payload=payload or {},
+    )
+
+    logger.debug("Queued %s for %s", kind, username)
+    return message
+
+
+def _enqueue_configured(kind, username, setting, payload=None):
+    """
+    Write a message to the single URL in a setting, if it is configured
+    """
+    destination = getattr(settings, setting, "")
+
+    if not destination:
+        logger.warning("%s is not configured", setting)
+        return None
+
+    return enqueue(kind, username, destination, payload)
+
+
+def queue_user_update(user_name: str):
+    """
+    Queue a user update to every IDMS works endpoint
+    """
+    return [
+        enqueue(OutboxKind.IDMS_USER_UPDATE, user_name, base_endpoint)
+        for base_endpoint in settings.WORKS_UPDATE_ENDPOINTS
+    ]
+
+
+def queue_subscriber_webhooks(username: str):
+    """
+    Queue a ping to every subscriber in settings.WEBHOOK_URLS
+    """
+    return [
+        enqueue(OutboxKind.SUBSCRIBER_WEBHOOK, username, url)
+        for url in settings.WEBHOOK_URLS
+    ]
+
+
+def queue_association(sub: str, kc_id: str):
+    """
+    Queue an association of a CILogon subject with a user to every IDMS
+    works endpoint
+    """
+    return [
+        enqueue(OutboxKind.ASSOCIATION, kc_id, base_endpoint, {"sub": sub})
+        for base_endpoint in settings.WORKS_UPDATE_ENDPOINTS
+    ]
+
+
+def queue_avatar_sync(username: str, image_url: str):
+    """
+    Queue an update of the user's avatar in WordPress
+    """
+    return _enqueue_configured(
+        OutboxKind.WORDPRESS_AVATAR,
+        username,
+        "WORDPRESS_AVATAR_UPDATE_URL",
+        {"image_url": image_url},
+    )
+
+
+def queue_email_sync(username: str, email: str):
+    """
+    Queue an update of the user's primary email in WordPress
+    """
+    return _enqueue_configured(
+        OutboxKind.WORDPRESS_EMAIL,
+        username,
+        "WORDPRESS_EMAIL_UPDATE_URL",
+        {"email": email},
+    )
+
+
+def queue_cc_search_index(profile):
+    """
+    Queue a re-index of the profile in CC search
+
+    The document is built when the message is delivered, so it reflects the
+    profile as it is then.
+    """
+    return _enqueue_configured(
+        OutboxKind.CC_SEARCH, profile.username, "CC_SEARCH_URL"
+    )
+
+
+def _host(destination):
+    # destinations can carry credentials in their query strings, so the
+    # metrics only ever name the host
+    return urlsplit(destination).netloc or destination
+
+
+def queue_depth():
+    """
+    Counts of outbox messages, for monitoring
+
+    :return: a dict with the number of pending, running and failed
+        messages, the age in seconds of the oldest pending one, and the
+        pending messages by kind and by destination host
+    """
+    depth = {status.value: 0 for status in OutboxStatus}
+    by_kind = {}
+    by_destination = {}
+
+    rows = OutboxMessage.objects.values(
+        "kind", "destination", "status"
+    ).annotate(count=Count("id"))
+
+    for row in rows:
+        depth[row["status"]] += row["count"]
+
+        if row["status"] == OutboxStatus.PENDING:
+            by_kind[row["kind"]] = by_kind.get(row["kind"], 0) + row["count"]
+            host = _host(row["destination"])
+            by_destination[host] = by_destination.get(host, 0) + row["count"]
+
+    oldest = OutboxMessage.objects.filter(
+        status=OutboxStatus.PENDING
+    ).aggregate(oldest=Min("created"))["oldest"]
+
+    depth["oldest_pending_seconds"] = (
+        round((timezone.now() - oldest).total_seconds()) if oldest else 0
+    )
+    depth["pending_by_kind"] = by_kind
+    depth["pending_by_destination"] = by_destination
+
+    return depth
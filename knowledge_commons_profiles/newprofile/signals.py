@@ -2,16 +2,32 @@
 Signal handlers for Profile model to handle file deletion from storage.
 
 This module contains Django signals that automatically delete old CV files
-from storage when a user uploads a new one or clears the field.
+from storage when a user uploads a new one or clears the field, and that
+record changes to profiles, roles and CILogon associations in the change
+feed, that drop a changed profile's cached REST responses, that save a
+profile when its user's superadmin flags change, and that forget the
+partner misses for a newly added email.
 """
 
 import logging
 
+from django.contrib.auth.models import User
 from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
 from django.db.models.signals import pre_save
 from django.dispatch import receiver
 
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import (
+    forget_misses,
+)
+from knowledge_commons_profiles.common import fast_json
+from knowledge_commons_profiles.newprofile.change_feed import record_change
+from knowledge_commons_profiles.newprofile.models import ChangeAction
+from knowledge_commons_profiles.newprofile.models import ChangeKind
+from knowledge_commons_profiles.newprofile.models import Person
 from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.newprofile.models import Role
+from knowledge_commons_profiles.rest_api import response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -93,3 +109,264 @@ def delete_cv_file_on_profile_delete(sender, instance, **kwargs):
         except Exception as e:
             msg = f"Error deleting CV file for user {instance.username}: {e}"
             logger.exception(msg)
+
+
+# saves that only touch these fields are bookkeeping, not profile changes;
+# membership recomputes are recorded separately below
+BOOKKEEPING_FIELDS = {
+    "last_sync",
+    "revision",
+    "modified",
+    "external_sync_ids",
+    "in_membership_groups",
+    "is_member_of",
+    "cc_search_id",
+}
+
+
+def _saves_memberships(update_fields):
+    return update_fields is None or "is_member_of" in update_fields
+
+
+def _parse_memberships(value):
+    try:
+        return fast_json.loads(value or "{}")
+    except (TypeError, fast_json.JSONDecodeError):
+        return value
+
+
+@receiver(post_save, sender=Profile)
+def record_profile_change(sender, instance, created, update_fields, **kwargs):
+    """
+    Record a created or edited profile, and any change to its memberships,
+    in the change feed
+    """
+    if (
+        not created
+        and _saves_memberships(update_fields)
+        and _parse_memberships(getattr(instance, "_stored_is_member_of", None))
+        != _parse_memberships(instance.is_member_of)
+    ):
+        record_change(
+            ChangeKind.MEMBERSHIPS, instance.username, ChangeAction.UPDATED
+        )
+
+    if update_fields and set(update_fields) <= BOOKKEEPING_FIELDS:
+        return
+
+    record_change(
+        ChangeKind.PROFILE,
+        instance.username,
+        ChangeAction.CREATED if created else ChangeAction.UPDATED,
+    )
+
+
+@receiver(post_delete, sender=Profile)
+def record_profile_deletion(sender, instance, **kwargs):
+    """
+    Record a deleted profile in the change feed
+    """
+    record_change(ChangeKind.PROFILE, instance.username, ChangeAction.DELETED)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def drop_cached_responses(sender, instance, **kwargs):
+    """
+    Drop the shared cache's anonymous REST responses for a saved or deleted
+    profile. Every save moves the profile's version stamp, so the old
+    responses can no longer be served.
+    """
+    if kwargs.get("created"):
+        return
+
+    try:
+        response_cache.invalidate_profile(instance.username)
+    except Exception:
+        logger.warning(
+            "Unable to drop cached responses for %s",
+            instance.username,
+            exc_info=True,
+        )
+
+
+_SUPERADMIN_FIELDS = {"is_superuser", "is_staff"}
+
+
+def _saves_superadmin(update_fields):
+    return update_fields is None or bool(_SUPERADMIN_FIELDS & update_fields)
+
+
+@receiver(pre_save, sender=User)
+def remember_superadmin(sender, instance, update_fields, **kwargs):
+    """
+    Note a user's stored superadmin flags before a save, so that post_save
+    can tell whether they changed
+    """
+    if not instance.pk or not _saves_superadmin(update_fields):
+        return
+
+    instance._stored_superadmin = (
+        User.objects.filter(pk=instance.pk)
+        .values_list("is_superuser", "is_staff")
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_profile_on_superadmin_change(sender, instance, created, **kwargs):
+    """
+    Save the user's profile when their superadmin flags change. The flags
+    are part of the profile's API representation but live on the User, so
+    without this the profile's version stamp, cached responses and change
+    feed would not see the change.
+    """
+    stored = getattr(instance, "_stored_superadmin", None)
+    instance._stored_superadmin = None
+
+    if created or stored is None:
+        return
+
+    if stored == (instance.is_superuser, instance.is_staff):
+        return
+
+    try:
+        profile = Profile.objects.filter(username=instance.username).first()
+        if profile is not None:
+            profile.save(update_fields=["modified"])
+    except Exception:
+        logger.warning(
+            "Unable to bump the profile of %s",
+            instance.username,
+            exc_info=True,
+        )
+
+
+def _profile_emails(email, emails):
+    return {email, *(emails or [])} - {None, ""}
+
+
+def _saves_emails(update_fields):
+    return update_fields is None or bool({"email", "emails"} & update_fields)
+
+
+@receiver(pre_save, sender=Profile)
+def remember_stored_fields(sender, instance, update_fields, **kwargs):
+    """
+    Note the stored memberships and emails before a save, with one query,
+    so that post_save can tell whether a sync or recompute changed the
+    memberships and which emails were added
+    """
+    if not instance.pk:
+        return
+
+    fields = []
+    if _saves_memberships(update_fields):
+        fields.append("is_member_of")
+    if _saves_emails(update_fields):
+        fields.extend(["email", "emails"])
+
+    if not fields:
+        return
+
+    stored = (
+        Profile.objects.filter(pk=instance.pk).values(*fields).first() or {}
+    )
+
+    if "is_member_of" in fields:
+        instance._stored_is_member_of = stored.get("is_member_of")
+    if "email" in fields:
+        instance._stored_emails = _profile_emails(
+            stored.get("email"), stored.get("emails")
+        )
+
+
+@receiver(post_save, sender=Profile)
+def forget_partner_misses(sender, instance, created, update_fields, **kwargs):
+    """
+    Let the next sync search the partners for a user's new emails, even if
+    they recently had no record of them
+    """
+    if not created and not _saves_emails(update_fields):
+        return
+
+    added = _profile_emails(instance.email, instance.emails) - getattr(
+        instance, "_stored_emails", set()
+    )
+
+    try:
+        forget_misses(added)
+    except Exception:
+        logger.warning(
+            "Unable to forget partner misses for %s",
+            instance.username,
+            exc_info=True,
+        )
+
+
+def _role_username(role):
+    return (
+        Person.objects.filter(pk=role.person_id)
+        .values_list("user__username", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Role)
+def record_role_change(sender, instance, created, **kwargs):
+    """
+    Record a created or edited COmanage role in the change feed
+    """
+    record_change(
+        ChangeKind.ROLE,
+        _role_username(instance),
+        ChangeAction.CREATED if created else ChangeAction.UPDATED,
+        object_id=instance.pk,
+    )
+
+
+@receiver(post_delete, sender=Role)
+def record_role_deletion(sender, instance, **kwargs):
+    """
+    Record a deleted COmanage role in the change feed
+    """
+    record_change(
+        ChangeKind.ROLE,
+        _role_username(instance),
+        ChangeAction.DELETED,
+        object_id=instance.pk,
+    )
+
+
+def _sub_association_username(association):
+    return (
+        Profile.objects.filter(pk=association.profile_id)
+        .values_list("username", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender="cilogon.SubAssociation")
+def record_sub_association_change(sender, instance, created, **kwargs):
+    """
+    Record a created or edited CILogon association in the change feed
+    """
+    record_change(
+        ChangeKind.SUB_ASSOCIATION,
+        _sub_association_username(instance),
+        ChangeAction.CREATED if created else ChangeAction.UPDATED,
+        object_id=instance.sub,
+    )
+
+
+@receiver(post_delete, sender="cilogon.SubAssociation")
+def record_sub_association_deletion(sender, instance, **kwargs):
+    """
+    Record a deleted CILogon association in the change feed
+    """
+    record_change(
+        ChangeKind.SUB_ASSOCIATION,
+        _sub_association_username(instance),
+        ChangeAction.DELETED,
+        object_id=instance.sub,
+    )
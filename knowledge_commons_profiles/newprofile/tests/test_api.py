@@ -8,6 +8,7 @@ from unittest.mock import patch
 from urllib.parse import urlencode
 
 import django.test
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.test.client import RequestFactory
 
@@ -2116,11 +2117,15 @@ class FollowerCountTests(django.test.TestCase):
         # Create a mock wp_user
         self.model_instance.wp_user = mock.MagicMock()
         self.model_instance.wp_user.id = 42
+        self.model_instance.wp_user.user_login = "testuser"
+
+        # counts are cached per user, so start each test cold
+        cache.clear()
 
         # Mock WpBpFollow.objects.filter
         self.filter_patcher = mock.patch(
-            "knowledge_commons_profiles.newprofile.api.WpBpFollow.objects."
-            "filter"
+            "knowledge_commons_profiles.newprofile.follow_counts.WpBpFollow"
+            ".objects.filter"
         )
         self.mock_filter = self.filter_patcher.start()
 
@@ -54,7 +54,7 @@ class UploadAvatarAuthTests(TestCase):
 
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
-        ".index_profile_in_cc_search"
+        ".queue_cc_search_index"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
@@ -79,7 +79,7 @@ class UploadAvatarAuthTests(TestCase):
 
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
-        ".index_profile_in_cc_search"
+        ".queue_cc_search_index"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
@@ -95,7 +95,7 @@ class UploadAvatarAuthTests(TestCase):
 
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
-        ".index_profile_in_cc_search"
+        ".queue_cc_search_index"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
@@ -4,7 +4,7 @@ Tests for the backfill_memberships management command.
 The command materializes Profile.is_member_of for profiles that have
 never been synced, so network membership listings include them. Local
 mode recomputes the KNOWN_SOCIETY_MAPPINGS societies from real Role
-rows; --full delegates to ExternalSync.sync (mocked here — it calls
+rows; --full delegates to ExternalSync.sync_with_status (mocked here — it calls
 external partner APIs). Webhook notifications are mocked: they are
 outbound HTTP.
 """
@@ -21,8 +21,17 @@ from unittest.mock import patch
 from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.test import TestCase
+from django.test import TransactionTestCase
 from django.test import override_settings
 
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import (
+    count_api_error,
+)
+from knowledge_commons_profiles.common import rate_limit
+from knowledge_commons_profiles.common.rate_limit import TokenBucket
+from knowledge_commons_profiles.newprofile.management.commands import (
+    backfill_memberships,
+)
 from knowledge_commons_profiles.newprofile.models import CO
 from knowledge_commons_profiles.newprofile.models import Person
 from knowledge_commons_profiles.newprofile.models import Profile
@@ -34,6 +43,9 @@ User = get_user_model()
 
 SOCIETY_MAPPINGS = {"stemedplus": "STEMED+", "hastac": "HASTAC"}
 
+PREFETCH = "knowledge_commons_profiles.rest_api.sync.ExternalSync.prefetch"
+SYNC = "knowledge_commons_profiles.rest_api.sync.ExternalSync.sync_with_status"
+
 
 class FakeRemoteStore:
     """
@@ -89,8 +101,7 @@ class _FakeRemoteReader:
         pass
 
 
-@override_settings(KNOWN_SOCIETY_MAPPINGS=SOCIETY_MAPPINGS)
-class BackfillMembershipsTests(TestCase):
+class BackfillHelpers:
     def setUp(self):
         self.co = CO.objects.create(id=18, name="STEMEDPLUS", slug="stemedplus")
 
@@ -120,6 +131,16 @@ class BackfillMembershipsTests(TestCase):
         profile.refresh_from_db()
         return json.loads(profile.is_member_of or "{}")
 
+    def _state_file(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(
+            lambda: __import__("shutil").rmtree(tmpdir, ignore_errors=True)
+        )
+        return Path(tmpdir) / "state.txt"
+
+
+@override_settings(KNOWN_SOCIETY_MAPPINGS=SOCIETY_MAPPINGS)
+class BackfillMembershipsTests(BackfillHelpers, TestCase):
     def test_materializes_memberships_for_never_synced_profile(self):
         profile = self._profile_with_role("bonnie")
         self.assertIsNone(profile.is_member_of)
@@ -221,13 +242,6 @@ class BackfillMembershipsTests(TestCase):
 
         self.assertTrue(self._memberships(survivor)["STEMED+"])
 
-    def _state_file(self):
-        tmpdir = tempfile.mkdtemp()
-        self.addCleanup(
-            lambda: __import__("shutil").rmtree(tmpdir, ignore_errors=True)
-        )
-        return Path(tmpdir) / "state.txt"
-
     def test_state_file_records_processed_profiles(self):
         self._profile_with_role("bonnie")
         self._profile_with_role("clyde")
@@ -442,9 +456,10 @@ class BackfillMembershipsTests(TestCase):
         self._profile_with_role("bonnie")
         self._profile_with_role("clyde")
 
-        with patch(
-            "knowledge_commons_profiles.rest_api.sync.ExternalSync.sync"
-        ) as sync:
+        with (
+            patch(SYNC, return_value=({}, True)) as sync,
+            patch(PREFETCH),
+        ):
             call_command("backfill_memberships", "--full", stdout=StringIO())
 
         synced = {
@@ -458,12 +473,35 @@ class BackfillMembershipsTests(TestCase):
             all(call.kwargs["cache"] for call in sync.call_args_list)
         )
 
+    def test_incomplete_profiles_are_retried_on_resume(self):
+        self._profile_with_role("bonnie")
+        self._profile_with_role("clyde")
+        state = self._state_file()
+
+        def sync(profile, **kwargs):
+            return {}, profile.username != "clyde"
+
+        with patch(SYNC, side_effect=sync) as mock_sync, patch(PREFETCH):
+            out, _ = self._call(
+                "--full", "--deadline", "30", "--state-file", str(state)
+            )
+
+        self.assertIn("1 incomplete", out)
+        self.assertEqual(state.read_text().split(), ["bonnie"])
+        self.assertTrue(
+            all(
+                call.kwargs["deadline"] == 30  # noqa: PLR2004
+                for call in mock_sync.call_args_list
+            )
+        )
+
     def test_full_mode_force_disables_sync_cache(self):
         self._profile_with_role("bonnie")
 
-        with patch(
-            "knowledge_commons_profiles.rest_api.sync.ExternalSync.sync"
-        ) as sync:
+        with (
+            patch(SYNC, return_value=({}, True)) as sync,
+            patch(PREFETCH),
+        ):
             call_command(
                 "backfill_memberships",
                 "--full",
@@ -474,3 +512,114 @@ class BackfillMembershipsTests(TestCase):
         self.assertFalse(
             any(call.kwargs["cache"] for call in sync.call_args_list)
         )
+
+    def test_full_mode_prefetches_each_batch(self):
+        for username in ("bonnie", "clyde", "dana"):
+            self._profile_with_role(username)
+
+        with (
+            patch(SYNC, return_value=({}, True)),
+            patch(PREFETCH) as prefetch,
+        ):
+            call_command(
+                "backfill_memberships",
+                "--full",
+                "--batch-size",
+                "2",
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(
+            [
+                [profile.username for profile in call.args[0]]
+                for call in prefetch.call_args_list
+            ],
+            [["bonnie", "clyde"], ["dana"]],
+        )
+
+    def test_local_mode_does_not_prefetch(self):
+        self._profile_with_role("bonnie")
+
+        with patch(PREFETCH) as prefetch:
+            call_command("backfill_memberships", stdout=StringIO())
+
+        prefetch.assert_not_called()
+
+
+@override_settings(KNOWN_SOCIETY_MAPPINGS=SOCIETY_MAPPINGS)
+class ShardedBackfillTests(BackfillHelpers, TransactionTestCase):
+    """
+    --workers runs its shards on threads, which need committed rows.
+    """
+
+    USERNAMES = ("bonnie", "clyde", "dana", "eve", "fay")
+
+    def test_shards_split_the_remaining_profiles_by_username(self):
+        for username in self.USERNAMES:
+            Profile.objects.create(username=username)
+
+        shards = backfill_memberships.Command._shards(
+            Profile.objects.order_by("username"), 2, done={"bonnie"}
+        )
+
+        self.assertEqual(
+            [
+                list(shard.values_list("username", flat=True))
+                for shard in shards
+            ],
+            [["bonnie", "clyde", "dana"], ["eve", "fay"]],
+        )
+
+    def test_workers_process_every_profile_once(self):
+        profiles = [
+            self._profile_with_role(username) for username in self.USERNAMES
+        ]
+
+        out, notify = self._call("--workers", "3")
+
+        self.assertIn("Processed 5 profile(s): 5 changed", out)
+        self.assertEqual(notify.call_count, 5)
+        for profile in profiles:
+            self.assertTrue(self._memberships(profile)["STEMED+"])
+
+    def test_each_shard_keeps_its_own_state_and_resumes(self):
+        for username in self.USERNAMES:
+            self._profile_with_role(username)
+        state = self._state_file()
+        state.write_text("bonnie\n")
+
+        self._call("--workers", "2", "--state-file", str(state))
+
+        shard_states = [
+            set(Path(f"{state}.shard{shard}").read_text().split())
+            for shard in range(2)
+        ]
+        self.assertEqual(shard_states, [{"clyde", "dana"}, {"eve", "fay"}])
+
+        out, _ = self._call("--workers", "2", "--state-file", str(state))
+
+        self.assertIn("Processed 0 profile(s)", out)
+        self.assertIn("5 skipped", out)
+
+    @override_settings(SYNC_API_RATE_LIMITS={})
+    def test_summary_reports_throughput_and_errors_by_partner(self):
+        for username in ("bonnie", "clyde"):
+            self._profile_with_role(username)
+        rate_limit.reset_stats()
+
+        def sync(profile, **kwargs):
+            TokenBucket("MLA", calls=100, period=60).acquire()
+            TokenBucket("UP", calls=100, period=60).acquire()
+            if profile.username == "clyde":
+                count_api_error("UP")
+            return {}, True
+
+        with (
+            patch(SYNC, side_effect=sync),
+            patch(PREFETCH),
+        ):
+            out, _ = self._call("--full", "--workers", "2")
+
+        self.assertRegex(out, r"Throughput: [\d.]+ profile\(s\)/s")
+        self.assertIn("2.00 API call(s) per profile", out)
+        self.assertIn("API errors by partner: UP 1", out)
@@ -0,0 +1,274 @@
+"""
+Tests for the change log and the /api/v1/changes/ feed
+
+Entries are written once the change commits, so the tests run outside a
+wrapping transaction.
+"""
+
+import datetime
+import json
+import signal
+import threading
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from knowledge_commons_profiles.cilogon.models import SubAssociation
+from knowledge_commons_profiles.newprofile import change_feed
+from knowledge_commons_profiles.newprofile import signals
+from knowledge_commons_profiles.newprofile.models import CO
+from knowledge_commons_profiles.newprofile.models import ChangeLogEntry
+from knowledge_commons_profiles.newprofile.models import Person
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.newprofile.models import Role
+from knowledge_commons_profiles.rest_api.authentication import (
+    StaticBearerAuthentication,
+)
+from knowledge_commons_profiles.rest_api.views import ChangeFeedView
+
+
+def _events():
+    return list(
+        ChangeLogEntry.objects.order_by("id").values_list(
+            "kind", "action", "username"
+        )
+    )
+
+
+class RecordChangeTests(TransactionTestCase):
+    def setUp(self):
+        self.profile = Profile.objects.create(username="feed", name="F")
+
+    def test_profile_lifecycle_is_recorded(self):
+        self.profile.name = "Renamed"
+        self.profile.save()
+        self.profile.delete()
+
+        self.assertEqual(
+            _events(),
+            [
+                ("profile", "created", "feed"),
+                ("profile", "updated", "feed"),
+                ("profile", "deleted", "feed"),
+            ],
+        )
+
+    def test_bookkeeping_saves_are_not_recorded(self):
+        ChangeLogEntry.objects.all().delete()
+
+        self.profile.last_sync = timezone.now()
+        self.profile.save(update_fields=["last_sync"])
+
+        self.assertEqual(_events(), [])
+
+    def test_membership_recompute_is_recorded_once_changed(self):
+        ChangeLogEntry.objects.all().delete()
+
+        self.profile.is_member_of = json.dumps({"MLA": True})
+        self.profile.save(update_fields=["is_member_of"])
+        self.profile.save(update_fields=["is_member_of"])
+
+        self.assertEqual(_events(), [("memberships", "updated", "feed")])
+
+    def test_full_save_reads_stored_fields_once(self):
+        self.profile.email = "new@example.org"
+        self.profile.is_member_of = json.dumps({"MLA": True})
+
+        with (
+            CaptureQueriesContext(connection) as queries,
+            patch.object(signals, "forget_misses") as mock_forget,
+        ):
+            self.profile.save()
+
+        # the CV handler's full-row read is separate
+        reads = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT")
+            and '"is_member_of"' in query["sql"]
+            and '"cv_file"' not in query["sql"]
+        ]
+        self.assertEqual(len(reads), 1)
+        self.assertIn('"emails"', reads[0])
+        mock_forget.assert_called_once_with({"new@example.org"})
+        self.assertIn(("memberships", "updated", "feed"), _events())
+
+    def test_roles_and_sub_associations_are_recorded(self):
+        ChangeLogEntry.objects.all().delete()
+        person = Person.objects.create(display_name="F", user=self.profile)
+        co = CO.objects.create(name="CO", slug="co")
+
+        role = Role.objects.create(person=person, co=co, affiliation="member")
+        role.delete()
+        SubAssociation.objects.create(sub="sub-1", profile=self.profile)
+
+        self.assertEqual(
+            _events(),
+            [
+                ("role", "created", "feed"),
+                ("role", "deleted", "feed"),
+                ("sub_association", "created", "feed"),
+            ],
+        )
+
+
+@override_settings(CHANGE_FEED_RETENTION_DAYS=30)
+@patch.object(change_feed, "SETTLE_SECONDS", 0)
+class ChangesSinceTests(TransactionTestCase):
+    def setUp(self):
+        for number in range(5):
+            Profile.objects.create(username=f"user{number}", name="U")
+
+    def test_pages_resume_from_the_cursor(self):
+        first, cursor, has_more = change_feed.changes_since(limit=3)
+
+        self.assertTrue(has_more)
+        self.assertEqual(first[0].username, "user0")
+
+        rest, cursor, has_more = change_feed.changes_since(cursor, limit=3)
+
+        self.assertFalse(has_more)
+        self.assertEqual([entry.username for entry in rest], ["user3", "user4"])
+
+        nothing, same, _ = change_feed.changes_since(cursor)
+        self.assertEqual(nothing, [])
+        self.assertEqual(same.split(".")[0], cursor.split(".")[0])
+
+    def test_old_cursor_has_expired(self):
+        old = timezone.now() - datetime.timedelta(days=31)
+
+        with self.assertRaises(change_feed.ExpiredCursorError):
+            change_feed.changes_since(change_feed.encode_cursor(1, old))
+
+    def test_malformed_cursor_is_rejected(self):
+        with self.assertRaises(change_feed.InvalidCursorError):
+            change_feed.changes_since("not-a-cursor")
+
+    def test_entry_of_a_long_transaction_is_not_skipped(self):
+        _, cursor, _ = change_feed.changes_since()
+        read = {}
+
+        def other_request():
+            Profile.objects.create(username="fast", name="F")
+            read["entries"], read["cursor"], _ = change_feed.changes_since(
+                cursor
+            )
+            connection.close()
+
+        with transaction.atomic():
+            Profile.objects.create(username="slow", name="S")
+
+            # commits, and is read, while "slow" is still uncommitted
+            thread = threading.Thread(target=other_request)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(
+            [entry.username for entry in read["entries"]], ["fast"]
+        )
+
+        entries, _, _ = change_feed.changes_since(read["cursor"])
+
+        self.assertEqual([entry.username for entry in entries], ["slow"])
+
+    def test_unsettled_entries_are_held_back(self):
+        with patch.object(change_feed, "SETTLE_SECONDS", 60):
+            entries, _, _ = change_feed.changes_since()
+
+        self.assertEqual(entries, [])
+
+
+class CompactTests(TransactionTestCase):
+    def test_superseded_and_expired_entries_are_dropped(self):
+        profile = Profile.objects.create(username="busy", name="B")
+        for _ in range(3):
+            profile.save()
+        Profile.objects.create(username="quiet", name="Q")
+
+        ChangeLogEntry.objects.update(
+            created=timezone.now() - datetime.timedelta(days=2)
+        )
+        ChangeLogEntry.objects.filter(username="quiet").update(
+            created=timezone.now() - datetime.timedelta(days=60)
+        )
+        out = StringIO()
+
+        call_command(
+            "compact_change_feed",
+            "--retention-days",
+            "30",
+            "--compact-after-hours",
+            "24",
+            stdout=out,
+        )
+
+        self.assertIn("Deleted 1 expired and 3 superseded", out.getvalue())
+        self.assertEqual(_events(), [("profile", "updated", "busy")])
+
+    def test_command_repeats_until_stopped(self):
+        runs = []
+
+        def compact(retention_days, compact_after_hours):
+            runs.append(retention_days)
+            if len(runs) == 2:  # noqa: PLR2004
+                signal.raise_signal(signal.SIGTERM)
+            return {"expired": 0, "superseded": 0}
+
+        handler = signal.getsignal(signal.SIGTERM)
+        self.addCleanup(signal.signal, signal.SIGTERM, handler)
+
+        with (
+            patch(
+                "knowledge_commons_profiles.newprofile.management.commands"
+                ".compact_change_feed.compact",
+                side_effect=compact,
+            ),
+            patch("django.db.close_old_connections"),
+        ):
+            call_command(
+                "compact_change_feed", "--every", "0.01", stdout=StringIO()
+            )
+
+        self.assertEqual(runs, [None, None])
+
+
+@override_settings(STATIC_API_BEARER="feed-token")
+@patch.object(StaticBearerAuthentication, "static_token", "feed-token")
+@patch.object(change_feed, "SETTLE_SECONDS", 0)
+class ChangeFeedViewTests(TransactionTestCase):
+    def _get(self, **params):
+        request = APIRequestFactory().get(
+            "/api/v1/changes/",
+            params,
+            HTTP_AUTHORIZATION="Bearer feed-token",
+        )
+        return ChangeFeedView.as_view()(request)
+
+    def test_returns_compact_events_and_cursor(self):
+        Profile.objects.create(username="viewed", name="V")
+
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (event["type"], event["action"], event["username"])
+                for event in response.data["results"]
+            ],
+            [("profile", "created", "viewed")],
+        )
+
+        response = self._get(since=response.data["next"])
+        self.assertEqual(response.data["results"], [])
+
+    def test_bad_and_expired_cursors(self):
+        self.assertEqual(self._get(since="nonsense").status_code, 400)
+        self.assertEqual(self._get(since="1.0").status_code, 410)
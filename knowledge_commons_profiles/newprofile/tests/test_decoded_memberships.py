@@ -0,0 +1,191 @@
+"""
+Tests for the precomputed shib_ismemberof memberships
+"""
+
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import phpserialize
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.test import TestCase
+
+from knowledge_commons_profiles.newprofile import decoded_memberships
+from knowledge_commons_profiles.newprofile.api import API
+from knowledge_commons_profiles.newprofile.models import DecodedMembership
+
+
+def _meta_value(*entries):
+    """
+    Serialize entries the way WordPress stores shib_ismemberof
+    """
+    inner = phpserialize.dumps(
+        {index: entry.encode() for index, entry in enumerate(entries)}
+    )
+    return phpserialize.dumps(inner).decode()
+
+
+MLA_HASTAC = _meta_value(
+    "CO:COU:MLA:members:active",
+    "CO:COU:HC:members:active",
+    "CO:COU:HASTAC:members:active",
+    "CO:COU:ARLISNA:members:expired",
+)
+
+
+class FakeMetaQuerySet:
+    """
+    Enough of a WpUserMeta queryset for the keyset-paginated bulk job
+    """
+
+    def __init__(self, rows, last_id=0):
+        self.rows = rows
+        self.last_id = last_id
+
+    def filter(self, meta_key, user_id__gt):
+        return FakeMetaQuerySet(self.rows, user_id__gt)
+
+    def order_by(self, *args):
+        return self
+
+    def values_list(self, *args):
+        return [row for row in self.rows if row[0] > self.last_id]
+
+
+class DecodeTests(TestCase):
+    def test_decode_returns_sorted_active_societies(self):
+        self.assertEqual(
+            decoded_memberships.decode_ismemberof(MLA_HASTAC),
+            ["HASTAC", "MLA"],
+        )
+
+    def test_decode_rejects_malformed_values(self):
+        with self.assertRaises(ValueError):
+            decoded_memberships.decode_ismemberof("not serialized")
+
+
+class DecodeAllMembershipsTests(TestCase):
+    def _run(self, rows, workers=1):
+        with patch.object(decoded_memberships, "WpUserMeta") as mock_meta:
+            mock_meta.objects = FakeMetaQuerySet(rows)
+            return decoded_memberships.decode_all_memberships(
+                chunk_size=2, workers=workers
+            )
+
+    def test_decodes_in_chunks_and_skips_unchanged(self):
+        rows = [
+            (1, MLA_HASTAC),
+            (2, _meta_value("CO:COU:UP:members:active")),
+            (3, "garbage"),
+        ]
+
+        counts = self._run(rows)
+
+        self.assertEqual(counts["decoded"], 3)
+        self.assertEqual(counts["errors"], 1)
+        self.assertEqual(
+            DecodedMembership.objects.get(wp_user_id=1).memberships,
+            ["HASTAC", "MLA"],
+        )
+        self.assertEqual(
+            DecodedMembership.objects.get(wp_user_id=3).memberships, []
+        )
+
+        counts = self._run(rows)
+
+        self.assertEqual(counts["decoded"], 0)
+        self.assertEqual(counts["unchanged"], 3)
+
+    def test_changed_and_removed_values(self):
+        self._run([(1, MLA_HASTAC), (2, MLA_HASTAC)])
+
+        counts = self._run([(1, _meta_value("CO:COU:UP:members:active"))])
+
+        self.assertEqual(counts["decoded"], 1)
+        self.assertEqual(counts["cleared"], 1)
+        self.assertEqual(
+            DecodedMembership.objects.get(wp_user_id=1).memberships, ["UP"]
+        )
+        self.assertEqual(
+            DecodedMembership.objects.get(wp_user_id=2).memberships, []
+        )
+
+    def test_parallel_workers(self):
+        rows = [(user_id, MLA_HASTAC) for user_id in range(1, 8)]
+
+        counts = self._run(rows, workers=2)
+
+        self.assertEqual(counts["decoded"], 7)
+        self.assertEqual(DecodedMembership.objects.count(), 7)
+
+    def test_command_reports_counts(self):
+        out = StringIO()
+
+        with patch.object(decoded_memberships, "WpUserMeta") as mock_meta:
+            mock_meta.objects = FakeMetaQuerySet([(1, MLA_HASTAC)])
+            call_command("decode_memberships", stdout=out)
+
+        self.assertIn("decoded 1 (0 errors)", out.getvalue())
+
+
+class GetMembershipsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = API(RequestFactory().get("/"), "decodeduser")
+        self.api.wp_user = SimpleNamespace(id=99)
+
+    def tearDown(self):
+        cache.clear()
+
+    def _meta(self, mock_meta, meta_value):
+        mock_meta.objects.filter.return_value.first.return_value = (
+            SimpleNamespace(meta_value=meta_value)
+        )
+
+    def test_precomputed_memberships_are_not_decoded_again(self):
+        DecodedMembership.objects.create(
+            wp_user_id=99,
+            memberships=["HASTAC", "MLA"],
+            source_hash=decoded_memberships.source_hash(MLA_HASTAC),
+        )
+
+        with (
+            patch.object(decoded_memberships, "WpUserMeta") as mock_meta,
+            patch.object(
+                decoded_memberships, "decode_ismemberof"
+            ) as mock_decode,
+        ):
+            self._meta(mock_meta, MLA_HASTAC)
+            self.assertEqual(self.api.get_memberships(), ["HASTAC", "MLA"])
+
+        mock_decode.assert_not_called()
+
+    def test_stored_memberships_follow_a_changed_meta_value(self):
+        DecodedMembership.objects.create(
+            wp_user_id=99,
+            memberships=["HASTAC", "MLA"],
+            source_hash=decoded_memberships.source_hash(MLA_HASTAC),
+        )
+
+        with patch.object(decoded_memberships, "WpUserMeta") as mock_meta:
+            self._meta(mock_meta, _meta_value("CO:COU:UP:members:active"))
+            self.assertEqual(self.api.get_memberships(), ["UP"])
+
+        self.assertEqual(
+            DecodedMembership.objects.get(wp_user_id=99).memberships, ["UP"]
+        )
+
+    def test_cache_hit_and_miss_agree(self):
+        with patch.object(decoded_memberships, "WpUserMeta") as mock_meta:
+            self._meta(mock_meta, MLA_HASTAC)
+            miss = self.api.get_memberships()
+
+        hit = self.api.get_memberships()
+
+        self.assertEqual(miss, ["HASTAC", "MLA"])
+        self.assertEqual(hit, miss)
+        self.assertEqual(
+            DecodedMembership.objects.get(wp_user_id=99).memberships, miss
+        )
@@ -0,0 +1,224 @@
+"""
+Tests for the denormalized follower and following counts
+"""
+
+import signal
+from collections import Counter
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from knowledge_commons_profiles.newprofile import follow_counts
+from knowledge_commons_profiles.newprofile.models import FollowCount
+
+FIELDS = ("id", "leader_id", "follower_id")
+
+
+class FakeValues(list):
+    """
+    values_list() results that can also be grouped and counted
+    """
+
+    def __init__(self, rows, flat=False):
+        super().__init__([row[0] for row in rows] if flat else rows)
+
+    def annotate(self, **kwargs):
+        return FakeValues(list(Counter(row[0] for row in self).items()))
+
+    def order_by(self, *args):
+        return self
+
+    def first(self):
+        return self[0] if self else None
+
+
+class FakeFollowQuerySet:
+    """
+    Enough of a WpBpFollow queryset over (id, leader_id, follower_id) rows
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self
+
+    def filter(self, **kwargs):
+        rows = self.rows
+        for lookup, value in kwargs.items():
+            field, _, op = lookup.partition("__")
+            index = FIELDS.index(field)
+            if op == "gt":
+                rows = [row for row in rows if row[index] > value]
+            else:
+                rows = [row for row in rows if row[index] in value]
+        return FakeFollowQuerySet(rows)
+
+    def order_by(self, field):
+        return FakeFollowQuerySet(sorted(self.rows, reverse=True))
+
+    def values_list(self, *fields, flat=False):
+        indexes = [FIELDS.index(field) for field in fields]
+        return FakeValues(
+            [tuple(row[index] for index in indexes) for row in self.rows],
+            flat=flat,
+        )
+
+    def count(self):
+        return len(self.rows)
+
+
+class SyncFollowCountsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.follows = [(1, 10, 20), (2, 10, 30), (3, 20, 30)]
+
+    def tearDown(self):
+        cache.clear()
+
+    def _run(self, job=follow_counts.sync_follow_counts):
+        with (
+            patch.object(follow_counts, "WpBpFollow") as mock_follow,
+            patch.object(follow_counts, "WpUser") as mock_user,
+        ):
+            mock_follow.objects = FakeFollowQuerySet(self.follows)
+            mock_user.objects.filter.return_value.values_list.return_value = [
+                (10, "leader"),
+                (20, "both"),
+                (30, "fan"),
+            ]
+            return job()
+
+    def _stored(self):
+        return {
+            row[0]: row[1:]
+            for row in FollowCount.objects.values_list(
+                "wp_user_id", "followers", "following"
+            )
+        }
+
+    def test_first_run_recounts_everyone(self):
+        counts = self._run()
+
+        self.assertTrue(counts["full"])
+        self.assertEqual(self._stored(), {10: (2, 0), 20: (1, 1), 30: (0, 2)})
+        self.assertEqual(FollowCount.objects.get(wp_user_id=30).username, "fan")
+
+    def test_new_follows_recount_only_affected_users(self):
+        self._run()
+        self.follows.append((4, 30, 10))
+
+        counts = self._run()
+
+        self.assertFalse(counts["full"])
+        self.assertEqual(counts["new_follows"], 1)
+        self.assertEqual(counts["updated"], 2)
+        self.assertEqual(self._stored()[30], (1, 2))
+        self.assertEqual(self._stored()[10], (2, 1))
+
+    def test_unfollows_trigger_full_recount(self):
+        self._run()
+        self.follows = [(2, 10, 30), (3, 20, 30)]
+
+        counts = self._run()
+
+        self.assertTrue(counts["full"])
+        self.assertEqual(self._stored(), {10: (1, 0), 20: (1, 0), 30: (0, 2)})
+
+    def test_users_who_lose_every_follow_are_zeroed(self):
+        self._run()
+        self.follows = []
+
+        self._run(follow_counts.recount_follow_counts)
+
+        self.assertEqual(self._stored(), {10: (0, 0), 20: (0, 0), 30: (0, 0)})
+
+    def test_command_reports_counts(self):
+        out = StringIO()
+        with patch(
+            "knowledge_commons_profiles.newprofile.management.commands"
+            ".sync_follow_counts.recount_follow_counts",
+            return_value={"full": True, "new_follows": 0, "updated": 4},
+        ) as mock_recount:
+            call_command("sync_follow_counts", "--full", stdout=out)
+
+        mock_recount.assert_called_once_with(chunk_size=2000)
+        self.assertIn("4 users updated", out.getvalue())
+
+    def test_command_repeats_until_stopped(self):
+        runs = []
+
+        def sync(chunk_size):
+            runs.append(chunk_size)
+            if len(runs) == 2:  # noqa: PLR2004
+                signal.raise_signal(signal.SIGTERM)
+            return {"full": False, "new_follows": 0, "updated": 0}
+
+        handler = signal.getsignal(signal.SIGTERM)
+        self.addCleanup(signal.signal, signal.SIGTERM, handler)
+
+        with (
+            patch(
+                "knowledge_commons_profiles.newprofile.management.commands"
+                ".sync_follow_counts.sync_follow_counts",
+                side_effect=sync,
+            ),
+            patch("django.db.close_old_connections"),
+        ):
+            call_command(
+                "sync_follow_counts", "--every", "0.01", stdout=StringIO()
+            )
+
+        self.assertEqual(len(runs), 2)
+
+
+class ReadFollowCountsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.wp_user = SimpleNamespace(id=10, user_login="leader")
+        follow_counts._save_checkpoint(last_id=3, total=3)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_stored_counts_skip_wordpress(self):
+        FollowCount.objects.create(
+            wp_user_id=10, username="leader", followers=3, following=1
+        )
+
+        with patch.object(follow_counts, "WpBpFollow") as mock_follow:
+            self.assertEqual(
+                follow_counts.get_follow_counts(self.wp_user), (3, 1)
+            )
+            self.assertEqual(
+                follow_counts.get_follow_counts(self.wp_user), (3, 1)
+            )
+
+        mock_follow.objects.filter.assert_not_called()
+
+    def test_missing_counts_are_counted_and_stored(self):
+        with patch.object(follow_counts, "WpBpFollow") as mock_follow:
+            mock_follow.objects.filter.return_value.count.return_value = 2
+            self.assertEqual(
+                follow_counts.get_follow_counts(self.wp_user), (2, 2)
+            )
+
+        self.assertEqual(FollowCount.objects.get(wp_user_id=10).followers, 2)
+
+    def test_counts_are_live_until_the_job_has_run(self):
+        cache.clear()
+        FollowCount.objects.create(
+            wp_user_id=10, username="leader", followers=3, following=1
+        )
+
+        with patch.object(follow_counts, "WpBpFollow") as mock_follow:
+            mock_follow.objects.filter.return_value.count.return_value = 7
+            self.assertEqual(
+                follow_counts.get_follow_counts(self.wp_user), (7, 7)
+            )
+
+        self.assertEqual(FollowCount.objects.get(wp_user_id=10).followers, 3)
@@ -248,11 +248,11 @@ class EditProfileViewAcademicInterestsTests(TestCase):
 
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "index_profile_in_cc_search"
+        "queue_cc_search_index"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "send_webhook_user_update"
+        "queue_user_update"
     )
     def test_post_with_invalid_other_field_still_renders_without_500(
         self, mock_webhook, mock_index
@@ -277,11 +277,11 @@ class EditProfileViewAcademicInterestsTests(TestCase):
 
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "index_profile_in_cc_search"
+        "queue_cc_search_index"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "send_webhook_user_update"
+        "queue_user_update"
     )
     def test_post_with_new_free_text_interest_persists_through_view(
         self, mock_webhook, mock_index
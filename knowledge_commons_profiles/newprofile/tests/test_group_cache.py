@@ -0,0 +1,186 @@
+"""
+Tests for the group metadata cache
+"""
+
+import datetime
+import json
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from knowledge_commons_profiles.newprofile import group_cache
+from knowledge_commons_profiles.newprofile.models import WpBpGroup
+from knowledge_commons_profiles.rest_api.views import GroupDetailView
+
+
+def _group(group_id, slug, status="public"):
+    return SimpleNamespace(
+        id=group_id,
+        name=f"Group {group_id}",
+        slug=slug,
+        status=status,
+        description="",
+        date_created=datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC),
+        get_avatar=lambda: f"https://example.org/group-avatars/{group_id}",
+    )
+
+
+@override_settings(GROUP_METADATA_CACHE_TIMEOUT=600)
+class GroupCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.groups = {1: _group(1, "one"), 2: _group(2, "two", "private")}
+
+        patchers = [
+            patch.object(
+                group_cache,
+                "society_ids_for_groups",
+                return_value={1: "mla"},
+            ),
+            patch.object(group_cache, "WpBpGroupsGroupmeta"),
+            patch.object(group_cache, "WpBlog"),
+            patch.object(group_cache, "WpBpGroup"),
+        ]
+        mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+        _, mock_meta, mock_blog, self.mock_group = mocks
+
+        # group 1 has a blog, group 2 points at a blog that no longer exists
+        mock_meta.objects.filter.return_value.values_list.return_value = [
+            (1, "10"),
+            (2, "99"),
+        ]
+        mock_blog.objects.filter.return_value.values_list.return_value = [
+            (10, "blog.example.org", "/one/"),
+        ]
+
+        self.mock_group.DoesNotExist = WpBpGroup.DoesNotExist
+        self.mock_group.objects.get.side_effect = self._get_group
+        iterator = self.mock_group.objects.order_by.return_value.iterator
+        iterator.side_effect = lambda chunk_size: iter(self.groups.values())
+
+    def _get_group(self, **lookup):
+        for group in self.groups.values():
+            if lookup in ({"id": group.id}, {"slug": group.slug}):
+                return group
+        raise WpBpGroup.DoesNotExist
+
+    def test_metadata_is_built_in_bulk(self):
+        metadata = group_cache.build_group_metadata(self.groups.values())
+
+        self.assertEqual(
+            metadata[1]["groupblog"], "https://blog.example.org/one/"
+        )
+        self.assertEqual(metadata[1]["society_id"], "mla")
+        self.assertEqual(metadata[2]["groupblog"], "")
+        self.assertEqual(metadata[2]["society_id"], "")
+        self.assertEqual(
+            metadata[2]["avatar"], "https://example.org/group-avatars/2"
+        )
+
+    def test_hits_do_not_query_wordpress(self):
+        first = group_cache.get_group_metadata(group_id=1)
+        second = group_cache.get_group_metadata(group_id=1)
+        by_slug = group_cache.get_group_metadata(slug="one")
+
+        self.assertEqual(first, second)
+        self.assertEqual(by_slug, first)
+        self.mock_group.objects.get.assert_called_once_with(id=1)
+
+    def test_missing_group(self):
+        self.assertIsNone(group_cache.get_group_metadata(group_id=404))
+
+    def test_invalidation_refetches(self):
+        group_cache.get_group_metadata(group_id=1)
+        self.groups[1].name = "Renamed"
+
+        group_cache.invalidate_group(1)
+
+        self.assertEqual(
+            group_cache.get_group_metadata(group_id=1)["name"], "Renamed"
+        )
+
+    def test_stale_slug_entry_is_not_trusted(self):
+        group_cache.get_group_metadata(group_id=1)
+        self.groups[1].slug = "uno"
+        group_cache.invalidate_group(1)
+        group_cache.get_group_metadata(group_id=1)
+
+        self.assertIsNone(group_cache.get_group_metadata(slug="one"))
+
+    @override_settings(GROUP_STATUS_CHECK_TIMEOUT=0)
+    def test_status_change_is_seen_once_the_check_is_due(self):
+        rows = self.mock_group.objects.filter.return_value.values_list
+        rows.side_effect = lambda *fields: SimpleNamespace(
+            first=lambda: tuple(
+                getattr(self.groups[1], field) for field in fields
+            )
+        )
+        group_cache.get_group_metadata(group_id=1)
+
+        self.assertEqual(
+            group_cache.get_group_metadata(group_id=1)["status"], "public"
+        )
+        self.mock_group.objects.get.assert_called_once_with(id=1)
+
+        self.groups[1].status = "hidden"
+
+        self.assertEqual(
+            group_cache.get_group_metadata(group_id=1)["status"], "hidden"
+        )
+
+    @override_settings(GROUP_STATUS_CHECK_TIMEOUT=0)
+    def test_cached_entry_is_served_when_the_check_fails(self):
+        group_cache.get_group_metadata(group_id=1)
+        rows = self.mock_group.objects.filter.return_value.values_list
+        rows.side_effect = OperationalError("WordPress is down")
+
+        with self.assertLogs(group_cache.logger, "WARNING"):
+            metadata = group_cache.get_group_metadata(group_id=1)
+
+        self.assertEqual(metadata["slug"], "one")
+        self.mock_group.objects.get.assert_called_once_with(id=1)
+
+    def test_warm_command_fills_the_cache(self):
+        out = StringIO()
+
+        call_command("warm_group_cache", stdout=out)
+
+        self.assertIn("Cached metadata for 2 groups", out.getvalue())
+        self.mock_group.objects.get.side_effect = AssertionError
+
+        self.assertEqual(
+            group_cache.get_group_metadata(slug="two")["status"], "private"
+        )
+
+    @override_settings(
+        GROUP_MEMBERSHIP_MIRROR_ENABLED=False,
+        NAV_DEFAULT_DOMAIN="hcommons-dev.org",
+    )
+    def test_detail_view_is_served_from_the_cache(self):
+        group_cache.warm_group_cache()
+        self.mock_group.objects.get.side_effect = AssertionError
+
+        response = GroupDetailView.as_view()(
+            APIRequestFactory().get("/api/v1/groups/one/"), slug="one"
+        )
+        hidden = GroupDetailView.as_view()(
+            APIRequestFactory().get("/api/v1/groups/2/"), pk=2
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)["results"]["url"],
+            "https://mla.hcommons-dev.org/groups/one/",
+        )
+        self.assertEqual(hidden.status_code, 404)
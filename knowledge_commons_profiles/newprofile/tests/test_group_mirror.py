@@ -0,0 +1,284 @@
+"""
+Tests for the Postgres mirror of BuddyPress group memberships
+"""
+
+import datetime
+import signal
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.test import TestCase
+from django.test import override_settings
+
+from knowledge_commons_profiles.newprofile import group_mirror
+from knowledge_commons_profiles.newprofile.api import API
+from knowledge_commons_profiles.newprofile.models import GroupMembershipMirror
+from knowledge_commons_profiles.newprofile.models import WpBpGroup
+
+MODIFIED = datetime.datetime(2026, 1, 1, tzinfo=datetime.UTC)
+
+
+def _mirror(member_id, group_id, name, **kwargs):
+    defaults = {
+        "id": member_id,
+        "wp_user_id": 1,
+        "username": "mirroruser",
+        "group_id": group_id,
+        "group_name": name,
+        "group_slug": name.lower().replace(" ", "-"),
+        "group_status": "public",
+        "role": "member",
+        "is_confirmed": True,
+        "society_id": "",
+        "inviter_id": 0,
+        "inviter_username": None,
+        "date_modified": MODIFIED,
+    }
+    defaults.update(kwargs)
+    return GroupMembershipMirror.objects.create(**defaults)
+
+
+def _member(member_id, group_id, **kwargs):
+    member = {
+        "id": member_id,
+        "user_id": 1,
+        "user__user_login": "mirroruser",
+        "group_id": group_id,
+        "group__name": f"Group\\'s {group_id}",
+        "group__slug": f"group-{group_id}",
+        "group__status": "public",
+        "is_admin": False,
+        "is_mod": False,
+        "is_confirmed": True,
+        "inviter_id": 0,
+        "date_modified": MODIFIED,
+    }
+    member.update(kwargs)
+    return member
+
+
+class FakeMemberQuerySet:
+    """
+    Enough of a WpBpGroupMember queryset for the keyset-paginated copy
+    """
+
+    def __init__(self, members, last_id=0):
+        self.members = members
+        self.last_id = last_id
+
+    def filter(self, id__gt):
+        return FakeMemberQuerySet(self.members, id__gt)
+
+    def order_by(self, *args):
+        return self
+
+    def values(self, *args):
+        return [m for m in self.members if m["id"] > self.last_id]
+
+
+class FakeLiveIds:
+    """
+    Enough of a WpBpGroupMember queryset for the id range comparison
+    """
+
+    def __init__(self, live_ids):
+        self.live_ids = live_ids
+        self.read = []
+
+    def filter(self, id__gt, id__lte):
+        ids = [i for i in self.live_ids if id__gt < i <= id__lte]
+        return SimpleNamespace(
+            count=lambda: len(ids),
+            values_list=lambda *args, **kwargs: self.read.append(ids) or ids,
+        )
+
+
+@patch(
+    "knowledge_commons_profiles.newprofile.models.WpBpGroup.get_avatar",
+    return_value="",
+)
+class MirroredGroupsReadTests(TestCase):
+    def test_returns_confirmed_groups_in_name_order(self, mock_avatar):
+        _mirror(
+            1,
+            10,
+            "beta",
+            role="administrator",
+            inviter_id=5,
+            inviter_username="inviter",
+        )
+        _mirror(2, 11, "Alpha", society_id="mla")
+        _mirror(3, 12, "Gamma", is_confirmed=False)
+        _mirror(4, 13, "Delta", group_status="private")
+
+        groups = group_mirror.get_mirrored_groups("mirroruser", ["public"])
+
+        self.assertEqual([g["id"] for g in groups], [11, 10])
+        self.assertEqual(groups[1]["role"], "administrator")
+        self.assertEqual(groups[1]["inviter_username"], "inviter")
+        self.assertIn("mla.", groups[0]["url"])
+        self.assertTrue(groups[0]["url"].endswith("/groups/alpha/"))
+
+    def test_private_groups_need_all_statuses(self, mock_avatar):
+        _mirror(4, 13, "Delta", group_status="private")
+
+        keys = [key for key, _ in WpBpGroup.STATUS_CHOICES]
+
+        self.assertEqual(
+            group_mirror.get_mirrored_groups("mirroruser", ["public"]), []
+        )
+        self.assertEqual(
+            len(group_mirror.get_mirrored_groups("mirroruser", keys)), 1
+        )
+
+    @override_settings(GROUP_MEMBERSHIP_MIRROR_ENABLED=True)
+    def test_api_reads_mirror_without_wordpress(self, mock_avatar):
+        _mirror(1, 10, "Beta")
+        request = RequestFactory().get("/")
+
+        with patch(
+            "knowledge_commons_profiles.newprofile.api.WpUser.objects.get"
+        ) as mock_wp_user:
+            groups = API(request, "mirroruser").get_groups()
+
+        mock_wp_user.assert_not_called()
+        self.assertEqual([g["slug"] for g in groups], ["beta"])
+
+
+@patch.object(group_mirror, "society_ids_for_groups", return_value={10: "mla"})
+class SyncGroupMembershipsTests(TestCase):
+    def _sync(self, members, live_ids, groups=(), chunk_size=2000):
+        with (
+            patch.object(
+                group_mirror,
+                "_changed_memberships",
+                return_value=FakeMemberQuerySet(members),
+            ),
+            patch.object(group_mirror, "WpBpGroupMember") as mock_member,
+            patch.object(group_mirror, "WpUser") as mock_user,
+            patch.object(group_mirror, "WpBpGroup") as mock_group,
+        ):
+            self.live = FakeLiveIds(live_ids)
+            mock_member.objects.filter.side_effect = self.live.filter
+            mock_user.objects.filter.return_value.values_list.return_value = [
+                (5, "inviter")
+            ]
+            mock_group.objects.filter.return_value.values_list.return_value = (
+                list(groups)
+            )
+
+            return group_mirror.sync_group_memberships(chunk_size=chunk_size)
+
+    def test_initial_sync_copies_memberships(self, mock_societies):
+        counts = self._sync(
+            [_member(1, 10, is_admin=True, inviter_id=5), _member(2, 11)],
+            live_ids=[1, 2],
+        )
+
+        self.assertEqual(counts["copied"], 2)
+        first = GroupMembershipMirror.objects.get(id=1)
+        self.assertEqual(first.role, "administrator")
+        self.assertEqual(first.inviter_username, "inviter")
+        self.assertEqual(first.society_id, "mla")
+        self.assertEqual(first.group_name, "Group's 10")
+        self.assertEqual(GroupMembershipMirror.objects.get(id=2).society_id, "")
+
+    def test_incremental_sync_updates_and_deletes(self, mock_societies):
+        _mirror(1, 10, "Group's 10", society_id="mla")
+        _mirror(2, 11, "Group's 11")
+
+        counts = self._sync(
+            [_member(1, 10, is_mod=True)],
+            live_ids=[1],
+            groups=[(10, "Group\\'s 10", "group-10", "public")],
+        )
+
+        self.assertEqual(
+            counts, {"copied": 1, "deleted": 1, "groups_updated": 0}
+        )
+        self.assertEqual(
+            GroupMembershipMirror.objects.get(id=1).role, "moderator"
+        )
+        self.assertFalse(GroupMembershipMirror.objects.filter(id=2).exists())
+
+    def test_only_changed_id_ranges_read_live_ids(self, mock_societies):
+        for member_id in (1, 2, 3, 4, 5):
+            _mirror(member_id, 10, "Group's 10", society_id="mla")
+
+        counts = self._sync([], live_ids=[1, 2, 4, 5], chunk_size=2)
+
+        self.assertEqual(counts["deleted"], 1)
+        self.assertEqual(self.live.read, [[4]])
+        self.assertEqual(
+            list(
+                GroupMembershipMirror.objects.order_by("id").values_list(
+                    "id", flat=True
+                )
+            ),
+            [1, 2, 4, 5],
+        )
+
+    def test_group_changes_are_copied(self, mock_societies):
+        _mirror(1, 10, "Old name", group_slug="group-10", society_id="mla")
+
+        counts = self._sync(
+            [],
+            live_ids=[1],
+            groups=[(10, "New name", "group-10", "hidden")],
+        )
+
+        self.assertEqual(counts["groups_updated"], 1)
+        membership = GroupMembershipMirror.objects.get(id=1)
+        self.assertEqual(membership.group_name, "New name")
+        self.assertEqual(membership.group_status, "hidden")
+
+    def test_incremental_sync_filters_on_high_water_mark(self, mock_societies):
+        _mirror(7, 10, "Group")
+
+        with patch.object(group_mirror, "WpBpGroupMember") as mock_member:
+            group_mirror._changed_memberships(full=False)
+
+        query = str(mock_member.objects.all.return_value.filter.call_args)
+        self.assertIn("('id__gt', 7)", query)
+        self.assertIn("date_modified__gte", query)
+
+    def test_command_reports_counts(self, mock_societies):
+        out = StringIO()
+        with patch(
+            "knowledge_commons_profiles.newprofile.management.commands"
+            ".sync_group_memberships.sync_group_memberships",
+            return_value={"copied": 3, "deleted": 1, "groups_updated": 0},
+        ) as mock_sync:
+            call_command("sync_group_memberships", "--full", stdout=out)
+
+        mock_sync.assert_called_once_with(full=True, chunk_size=2000)
+        self.assertIn("Copied 3", out.getvalue())
+
+    def test_command_repeats_until_stopped(self, mock_societies):
+        runs = []
+
+        def sync(full, chunk_size):
+            runs.append(full)
+            if len(runs) == 2:  # noqa: PLR2004
+                signal.raise_signal(signal.SIGTERM)
+            return {"copied": 0, "deleted": 0, "groups_updated": 0}
+
+        handler = signal.getsignal(signal.SIGTERM)
+        self.addCleanup(signal.signal, signal.SIGTERM, handler)
+
+        with (
+            patch(
+                "knowledge_commons_profiles.newprofile.management.commands"
+                ".sync_group_memberships.sync_group_memberships",
+                side_effect=sync,
+            ),
+            patch("django.db.close_old_connections"),
+        ):
+            call_command(
+                "sync_group_memberships", "--every", "0.01", stdout=StringIO()
+            )
+
+        self.assertEqual(runs, [False, False])
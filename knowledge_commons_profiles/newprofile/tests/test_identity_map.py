@@ -0,0 +1,152 @@
+"""
+Tests for the request-scoped identity map
+
+Behaviour under test: API objects built for the same username during one
+request share their Profile and User rows (and get_api hands out the same
+API object), while API objects built outside a request load everything
+themselves as before.
+"""
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from django.test import TestCase
+
+from knowledge_commons_profiles.common.middleware import IdentityMapMiddleware
+from knowledge_commons_profiles.newprofile.api import API
+from knowledge_commons_profiles.newprofile.api import get_api
+from knowledge_commons_profiles.newprofile.identity_map import IdentityMap
+from knowledge_commons_profiles.newprofile.identity_map import get_identity_map
+from knowledge_commons_profiles.newprofile.tests.model_factories import (
+    ProfileFactory,
+)
+from knowledge_commons_profiles.rest_api.serializers.serializers_shared import (
+    get_is_superadmin,
+)
+
+
+class IdentityMapTests(TestCase):
+    def test_fetch_memoizes_value(self):
+        identity_map = IdentityMap()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return "value"
+
+        self.assertEqual(identity_map.fetch("kind", "key", loader), "value")
+        self.assertEqual(identity_map.fetch("kind", "key", loader), "value")
+        self.assertEqual(len(calls), 1)
+
+    def test_fetch_memoizes_none(self):
+        identity_map = IdentityMap()
+        calls = []
+
+        def loader():
+            calls.append(1)
+
+        self.assertIsNone(identity_map.fetch("kind", "key", loader))
+        self.assertIsNone(identity_map.fetch("kind", "key", loader))
+        self.assertEqual(len(calls), 1)
+
+    def test_fetch_does_not_memoize_exceptions(self):
+        identity_map = IdentityMap()
+
+        def failing():
+            msg = "boom"
+            raise ValueError(msg)
+
+        with self.assertRaises(ValueError):
+            identity_map.fetch("kind", "key", failing)
+
+        self.assertNotIn(("kind", "key"), identity_map)
+        self.assertEqual(identity_map.fetch("kind", "key", lambda: 1), 1)
+
+    def test_forget_and_clear(self):
+        identity_map = IdentityMap()
+        identity_map.remember("kind", "a", 1)
+        identity_map.remember("kind", "b", 2)
+
+        identity_map.forget("kind", "a")
+        self.assertNotIn(("kind", "a"), identity_map)
+        self.assertIn(("kind", "b"), identity_map)
+
+        identity_map.clear()
+        self.assertNotIn(("kind", "b"), identity_map)
+
+
+class IdentityMapMiddlewareTests(TestCase):
+    def test_attaches_map_for_the_request_only(self):
+        seen = {}
+
+        def view(request):
+            seen["map"] = get_identity_map(request)
+            return "response"
+
+        request = RequestFactory().get("/")
+        response = IdentityMapMiddleware(view)(request)
+
+        self.assertEqual(response, "response")
+        self.assertIsInstance(seen["map"], IdentityMap)
+        self.assertFalse(hasattr(request, "identity_map"))
+
+
+class SharedLookupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "shareduser", password="x", is_staff=True
+        )
+        self.profile = ProfileFactory(username="shareduser")
+        self.request = RequestFactory().get("/")
+        self.request.identity_map = IdentityMap()
+
+    def test_get_api_returns_same_instance_within_request(self):
+        first = get_api(self.request, "shareduser")
+        second = get_api(self.request, "shareduser")
+
+        self.assertIs(first, second)
+        self.assertIsNot(
+            first, get_api(self.request, "shareduser", use_wordpress=False)
+        )
+
+    def test_get_api_without_map_builds_new_instances(self):
+        request = RequestFactory().get("/")
+
+        self.assertIsNot(
+            get_api(request, "shareduser"), get_api(request, "shareduser")
+        )
+
+    def test_profile_loaded_once_per_request(self):
+        first = API(self.request, "shareduser", use_wordpress=False)
+        second = API(self.request, "shareduser", use_wordpress=True)
+
+        # one query for the profile plus one per prefetched relation
+        with self.assertNumQueries(3):
+            self.assertEqual(first.profile, self.profile)
+
+        with self.assertNumQueries(0):
+            self.assertIs(second.profile, first.profile)
+
+    def test_profile_passed_in_is_shared(self):
+        API(self.request, self.profile)
+
+        with self.assertNumQueries(0):
+            self.assertIs(API(self.request, "shareduser").profile, self.profile)
+
+    def test_user_loaded_once_per_request(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(get_is_superadmin(self.profile, self.request))
+            self.assertEqual(
+                API(self.request, "shareduser").django_user, self.user
+            )
+
+    def test_missing_user_is_memoized(self):
+        missing = ProfileFactory(username="nodjangouser")
+
+        with self.assertNumQueries(1):
+            self.assertFalse(get_is_superadmin(missing, self.request))
+            self.assertFalse(get_is_superadmin(missing, self.request))
+
+    def test_lookups_without_map_are_not_shared(self):
+        with self.assertNumQueries(2):
+            self.assertTrue(get_is_superadmin(self.profile))
+            self.assertTrue(get_is_superadmin(self.profile))
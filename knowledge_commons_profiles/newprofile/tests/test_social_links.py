@@ -149,11 +149,11 @@ class EditProfileViewSocialLinksTests(TestCase):
 
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "index_profile_in_cc_search"
+        "queue_cc_search_index"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "send_webhook_user_update"
+        "queue_user_update"
     )
     def test_post_persists_social_links(self, mock_webhook, mock_index):
         del mock_webhook, mock_index
@@ -4,7 +4,6 @@ from unittest.mock import PropertyMock
 from unittest.mock import patch
 
 import django.db
-import requests
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
@@ -14,6 +13,9 @@ from django.test import SimpleTestCase
 from django.test import TestCase
 from django.test import override_settings
 
+from knowledge_commons_profiles.newprofile.models import OutboxKind
+from knowledge_commons_profiles.newprofile.models import OutboxMessage
+from knowledge_commons_profiles.newprofile.models import Profile
 from knowledge_commons_profiles.newprofile.views.profile.htmx import blog_posts
 from knowledge_commons_profiles.newprofile.views.profile.htmx import (
     mastodon_feed,
@@ -484,7 +486,7 @@ class EditProfileTests(TestCase):
 
 
 class EditProfileWebhookFailureTests(TestCase):
-    """Tests that webhook failures don't block profile saving."""
+    """Tests that outbound calls don't block profile saving."""
 
     def setUp(self):
         self.factory = RequestFactory()
@@ -492,16 +494,9 @@ class EditProfileWebhookFailureTests(TestCase):
             username="testuser", password="testpass"
         )
 
-    @patch(
-        "knowledge_commons_profiles.newprofile.views.profile.profile.logger"
-    )
-    @patch(
-        "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "index_profile_in_cc_search"
-    )
-    @patch(
-        "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "send_webhook_user_update"
+    @override_settings(
+        WORKS_UPDATE_ENDPOINTS=["https://works.example/"],
+        CC_SEARCH_URL="https://search.example/v1/",
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
@@ -511,15 +506,13 @@ class EditProfileWebhookFailureTests(TestCase):
         "knowledge_commons_profiles.newprofile.models.Profile.objects."
         "prefetch_related"
     )
-    def test_webhook_failure_does_not_block_redirect(
+    def test_outbound_calls_are_queued_not_sent(
         self,
         mock_prefetch,
         mock_form_class,
-        mock_send_webhook,
-        mock_index,
-        mock_logger,
     ):
-        """Profile edit should redirect even if webhook fails."""
+        """Profile edit should write the webhook and search update to the
+        outbox rather than calling the services inline."""
         mock_queryset = MagicMock()
         mock_prefetch.return_value = mock_queryset
         mock_user = MagicMock()
@@ -532,29 +525,72 @@ class EditProfileWebhookFailureTests(TestCase):
         mock_form_class.return_value = mock_form
         mock_form.is_valid.return_value = True
 
-        mock_send_webhook.side_effect = requests.exceptions.ConnectionError(
-            "Webhook failed"
-        )
-
         request = self.factory.post("/edit-profile/", {"field": "value"})
         request.user = self.user
 
-        response = edit_profile(request)
+        with patch(
+            "knowledge_commons_profiles.rest_api.idms_api.APIClient"
+        ) as mock_client:
+            response = edit_profile(request)
 
         self.assertEqual(response.status_code, 302)
         mock_form.save.assert_called_once()
-        mock_logger.warning.assert_called()
+        mock_client.assert_not_called()
+        self.assertEqual(
+            set(
+                OutboxMessage.objects.filter(username="testuser").values_list(
+                    "kind", flat=True
+                )
+            ),
+            {OutboxKind.IDMS_USER_UPDATE, OutboxKind.CC_SEARCH},
+        )
+
+    @override_settings(WORKS_UPDATE_ENDPOINTS=["https://works.example/"])
+    @patch(
+        "knowledge_commons_profiles.newprofile.views.profile.profile."
+        "queue_cc_search_index",
+        side_effect=RuntimeError("outbox unavailable"),
+    )
+    @patch(
+        "knowledge_commons_profiles.newprofile.views.profile.profile."
+        "ProfileForm"
+    )
+    def test_edit_is_rolled_back_with_its_outbox_messages(
+        self,
+        mock_form_class,
+        mock_queue,
+    ):
+        """A profile edit and the messages reporting it commit together"""
+        Profile.objects.create(username="testuser", about_user="before")
+
+        mock_form = MagicMock()
+        mock_form_class.return_value = mock_form
+        mock_form.is_valid.return_value = True
+        mock_form.save.side_effect = lambda: Profile.objects.filter(
+            username="testuser"
+        ).update(about_user="after")
+
+        request = self.factory.post("/edit-profile/", {"field": "value"})
+        request.user = self.user
+
+        with self.assertRaises(RuntimeError):
+            edit_profile(request)
+
+        self.assertEqual(
+            Profile.objects.get(username="testuser").about_user, "before"
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
 
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile.logger"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "index_profile_in_cc_search"
+        "queue_cc_search_index"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
-        "send_webhook_user_update"
+        "queue_user_update"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.profile."
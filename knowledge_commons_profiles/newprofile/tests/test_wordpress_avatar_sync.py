@@ -166,11 +166,11 @@ class AvatarUploadTriggersWordPressSyncTests(TestCase):
 
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
-        ".sync_avatar_to_wordpress"
+        ".queue_avatar_sync"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
-        ".index_profile_in_cc_search"
+        ".queue_cc_search_index"
     )
     @patch(
         "knowledge_commons_profiles.newprofile.views.profile.avatars"
@@ -179,7 +179,7 @@ class AvatarUploadTriggersWordPressSyncTests(TestCase):
     def test_upload_avatar_calls_wordpress_sync(
         self, mock_storage, mock_index, mock_sync
     ):
-        """Uploading an avatar should call sync_avatar_to_wordpress."""
+        """Uploading an avatar should queue the WordPress avatar sync."""
         mock_storage.url.return_value = "/media/profile_images/new.jpg"
         self.client.login(username="alice", password="pass1234")
 
@@ -9,6 +9,11 @@ from django.db import connections
 from django.http import JsonResponse
 
 from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.common.db_backends.circuit_breaker.base import (
+    circuit_breaker_for,
+)
+from knowledge_commons_profiles.common.rate_limit import rate_limit_stats
+from knowledge_commons_profiles.newprofile.outbox import queue_depth
 from knowledge_commons_profiles.rest_api.utils import check_api_endpoints_health
 
 logger = logging.getLogger(__name__)
@@ -16,6 +21,18 @@ logger = logging.getLogger(__name__)
 REDIS_TEST_TIMEOUT_VALUE = 25
 
 
+def wordpress_circuit_status():
+    """
+    Report the state of the WordPress database circuit breaker
+    """
+    settings_dict = settings.DATABASES["wordpress_dev"]
+
+    if "WRAPPED_ENGINE" not in settings_dict:
+        return "disabled"
+
+    return circuit_breaker_for(settings_dict, "wordpress_dev").status()
+
+
 def health(request):
     """
     Healthcheck URL
@@ -43,6 +60,8 @@ def health(request):
     else:
         health_result["WordPress DB"] = "healthy"
 
+    health_result["WordPress DB circuit"] = wordpress_circuit_status()
+
     try:
         db_conn = connections["default"]
         _ = db_conn.cursor()
@@ -61,6 +80,14 @@ def health(request):
         logger.exception("Health check: API endpoint check failed")
         health_result["API Endpoints"] = "check failed"
 
+    try:
+        health_result["Outbox"] = queue_depth()
+    except django.db.utils.DatabaseError:
+        logger.exception("Health check: outbox depth unavailable")
+        health_result["Outbox"] = "unavailable"
+
+    health_result["Partner API rate limits"] = rate_limit_stats()
+
     health_result["Debug Mode"] = settings.DEBUG
 
     health_result["VERSION"] = VERSION
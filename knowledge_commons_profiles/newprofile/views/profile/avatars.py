@@ -7,19 +7,16 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.db import transaction
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from PIL import Image
 
-from knowledge_commons_profiles.newprofile.cc_search import (
-    index_profile_in_cc_search,
-)
 from knowledge_commons_profiles.newprofile.forms import AvatarUploadForm
 from knowledge_commons_profiles.newprofile.models import CoverImage
 from knowledge_commons_profiles.newprofile.models import Profile
-from knowledge_commons_profiles.newprofile.wordpress_sync import (
-    sync_avatar_to_wordpress,
-)
+from knowledge_commons_profiles.newprofile.outbox import queue_avatar_sync
+from knowledge_commons_profiles.newprofile.outbox import queue_cc_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -79,19 +76,21 @@ def upload_avatar(request, username=None):
     # Save with a safe randomized name
     url = save_image(out, request, "profile_images")
 
-    # Save to user's profile (authorization: user owns this profile)
-    profile = Profile.objects.get(username=username)
-    profile.profile_image = url
-    profile.save(update_fields=["profile_image"])
+    # Save to user's profile (authorization: user owns this profile), and
+    # queue the updates in the same transaction
+    with transaction.atomic():
+        profile = Profile.objects.get(username=username)
+        profile.profile_image = url
+        profile.save(update_fields=["profile_image"])
 
-    msg = f"Saved avatar for {username} to {url}"
-    logger.info(msg)
+        # queue an update to the CC search client because avatar has changed
+        queue_cc_search_index(profile)
 
-    # now send an update to the CC search client because avatar has changed
-    index_profile_in_cc_search(profile)
+        # and queue the avatar sync to WordPress
+        queue_avatar_sync(username, url)
 
-    # sync the avatar to WordPress
-    sync_avatar_to_wordpress(username, url)
+    msg = f"Saved avatar for {username} to {url}"
+    logger.info(msg)
 
     return JsonResponse({"ok": True, "url": url})
 
@@ -2,20 +2,21 @@
 import logging
 
 import django.db
-from django.core.cache import cache
 from django.http import HttpResponse
 from django.shortcuts import render
 from django.template.loader import render_to_string
 from django.urls import reverse
 
+from knowledge_commons_profiles.common import tagged_cache
+from knowledge_commons_profiles.common.tagged_cache import user_tag
 from knowledge_commons_profiles.newprofile.api import API
 from knowledge_commons_profiles.newprofile.works import WorksApiError
 
-# Short TTL for HTMX fragment caches. Long enough that the second hit of a
-# profile page (same user clicks through and comes back) is a Redis GET;
-# short enough that user-visible profile edits show up within a minute
-# without explicit invalidation.
-HTMX_FRAGMENT_CACHE_TTL = 60
+# TTL for HTMX fragment caches. Fragments are tagged with their user and
+# dropped by the edit views, so profile edits show up immediately; the TTL
+# only bounds how stale data from outside the profile (such as Works
+# deposits) can get.
+HTMX_FRAGMENT_CACHE_TTL = 600
 
 logger = logging.getLogger(__name__)
 
@@ -92,7 +93,7 @@ def works_deposits(request, username, style=None):
     logger.debug("Getting works deposits for %s", username)
 
     cache_key = f"htmx_works_deposits:{username}:{style or 'default'}"
-    cached_html = cache.get(cache_key)
+    cached_html = tagged_cache.fetch("works_fragment", cache_key)
     if cached_html is not None:
         return HttpResponse(cached_html)
 
@@ -130,7 +131,13 @@ def works_deposits(request, username, style=None):
             },
             request=request,
         )
-        cache.set(cache_key, html, timeout=HTMX_FRAGMENT_CACHE_TTL)
+        tagged_cache.store(
+            "works_fragment",
+            cache_key,
+            html,
+            timeout=HTMX_FRAGMENT_CACHE_TTL,
+            tags=[user_tag(username)],
+        )
         return HttpResponse(html)
 
     except (django.db.utils.OperationalError, WorksApiError) as ex:
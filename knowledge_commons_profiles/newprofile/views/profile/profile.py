@@ -4,11 +4,10 @@ import json
 import logging
 
 import django.db
-import requests
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.http import Http404
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
@@ -18,20 +17,18 @@ from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.http import require_POST
 
-from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.common import tagged_cache
+from knowledge_commons_profiles.common.tagged_cache import user_tag
 from knowledge_commons_profiles.newprofile.api import API
-from knowledge_commons_profiles.newprofile.cc_search import (
-    index_profile_in_cc_search,
-)
+from knowledge_commons_profiles.newprofile.api import get_api
 from knowledge_commons_profiles.newprofile.forms import ProfileForm
 from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.newprofile.outbox import queue_cc_search_index
+from knowledge_commons_profiles.newprofile.outbox import queue_user_update
 from knowledge_commons_profiles.newprofile.utils import process_orders
 from knowledge_commons_profiles.newprofile.utils import (
     profile_exists_or_has_been_created,
 )
-from knowledge_commons_profiles.rest_api.idms_api import (
-    send_webhook_user_update,
-)
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +70,9 @@ def profile(request, user=""):
         del left_order
         del right_order
 
-        user = User.objects.filter(username=profile_obj.username).first()
+        user = get_api(
+            request, profile_obj.username, use_wordpress=False
+        ).django_user
 
         return render(
             request=request,
@@ -208,29 +207,15 @@ def edit_profile(request, username=None, auto_open_modal=None):
     if request.method == "POST":
         form = ProfileForm(request.POST, request.FILES, instance=user)
         if form.is_valid():
-            form.save()
-
-            # now trigger the webhook that sends updates to the system
-
-            # Prepare updates using Pydantic models and send an update command
-            # to third-party systems via webhook
-            try:
-                send_webhook_user_update(user.username)
-            except (requests.exceptions.RequestException, ValueError):
-                logger.warning(
-                    "Webhook update failed for %s, profile was saved",
-                    user.username,
-                )
-
-            # now send an update to the CC search client
-            try:
-                index_profile_in_cc_search(user)
-            except django.db.OperationalError:
-                logger.warning(
-                    "Could not index profile for %s in CC search: "
-                    "WordPress database unavailable",
-                    user.username,
-                )
+            # queue the webhook that sends updates to third-party systems and
+            # the update to the CC search index in the same transaction as
+            # the change, so they are committed together or not at all
+            with transaction.atomic():
+                form.save()
+                queue_user_update(user.username)
+                queue_cc_search_index(user)
+
+            tagged_cache.invalidate(user_tag(user.username))
 
             return redirect("profile", user=user.username)
     else:
@@ -331,12 +316,7 @@ def save_profile_order(request, side):
 
         api.profile.save()
 
-        cache_key = (
-            f"hc-member-profiles-xprofile-works-deposits-"
-            f"{request.user.username}"
-        )
-
-        cache.delete(cache_key, version=VERSION)
+        tagged_cache.invalidate(user_tag(request.user.username))
 
         return JsonResponse({"success": True})
 
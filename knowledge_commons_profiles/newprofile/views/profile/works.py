@@ -4,12 +4,12 @@ import logging
 
 import django.db
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_POST
 
-from knowledge_commons_profiles.__version__ import VERSION
+from knowledge_commons_profiles.common import tagged_cache
+from knowledge_commons_profiles.common.tagged_cache import user_tag
 from knowledge_commons_profiles.newprofile.api import API
 from knowledge_commons_profiles.newprofile.models import Profile
 from knowledge_commons_profiles.newprofile.works import HiddenWorks
@@ -56,6 +56,8 @@ def works_deposits_edit(request):
     user.reference_style = id_reference_style
     user.save()
 
+    tagged_cache.invalidate(user_tag(user.username))
+
     return render(
         request,
         "newprofile/fragments/works_edit_fragment.html",
@@ -90,22 +92,10 @@ def save_works_visibility(request):
             request, request.user.username, use_wordpress=True, create=False
         )
 
-        cache_key = (
-            f"hc-member-profiles-xprofile-works-deposits-"
-            f"{request.user.username}"
-        )
-
-        cache.delete(cache_key, version=VERSION)
-
         api.profile.works_work_show = works_visibility
         api.profile.save()
 
-        cache_key = (
-            f"hc-member-profiles-xprofile-works-deposits-"
-            f"{request.user.username}"
-        )
-
-        cache.delete(cache_key, version=VERSION)
+        tagged_cache.invalidate(user_tag(request.user.username))
 
         return JsonResponse({"success": True})
 
@@ -145,12 +135,7 @@ def save_works_order(request):
         api.profile.works_show = items_checked
         api.profile.save()
 
-        cache_key = (
-            f"hc-member-profiles-xprofile-works-deposits-"
-            f"{request.user.username}"
-        )
-
-        cache.delete(cache_key, version=VERSION)
+        tagged_cache.invalidate(user_tag(request.user.username))
 
         return JsonResponse({"success": True})
 
@@ -14,7 +14,6 @@ import altair as alt
 import httpx
 import pandas as pd
 from django.conf import settings
-from django.core.cache import cache
 from django.template.loader import render_to_string
 from pydantic import BaseModel
 from pydantic import ConfigDict
@@ -26,13 +25,14 @@ from tenacity import retry_if_exception_type
 from tenacity import stop_after_attempt
 from tenacity import wait_fixed
 
-from knowledge_commons_profiles.__version__ import VERSION
 from knowledge_commons_profiles.citeproc import Citation
 from knowledge_commons_profiles.citeproc import CitationItem
 from knowledge_commons_profiles.citeproc import CitationStylesBibliography
 from knowledge_commons_profiles.citeproc import CitationStylesStyle
 from knowledge_commons_profiles.citeproc import formatter
 from knowledge_commons_profiles.citeproc.source.json import CiteProcJSON
+from knowledge_commons_profiles.common import tagged_cache
+from knowledge_commons_profiles.common.tagged_cache import user_tag
 from knowledge_commons_profiles.newprofile import models
 from knowledge_commons_profiles.newprofile.utils import get_visibilities
 from knowledge_commons_profiles.newprofile.utils import hide_work
@@ -377,7 +377,7 @@ class WorksDeposits:
 
         cache_key = f"hc-member-profiles-xprofile-works-json-{self.user}"
 
-        result = cache.get(cache_key, version=VERSION)
+        result = tagged_cache.fetch("works_json", cache_key)
 
         if result:
             return result
@@ -419,11 +419,12 @@ class WorksDeposits:
             return []
 
         try:
-            cache.set(
-                key=cache_key,
-                value=validated.hits.hits,
+            tagged_cache.store(
+                "works_json",
+                cache_key,
+                validated.hits.hits,
                 timeout=CACHE_TIMEOUT,
-                version=VERSION,
+                tags=[user_tag(self.user)],
             )
         except Exception as e:
             msg = (
@@ -0,0 +1,222 @@
+"""
+Version stamps for conditional REST API requests
+
+Serializing a profile or a group touches WordPress, the partner membership
+data and the avatar store. The detail views instead compute a strong ETag
+from a few cheap version stamps (the profile's revision counter, its last
+sync, its resolved avatar and the version of its group memberships) and
+answer a matching
+If-None-Match (or a current If-Modified-Since) with 304 Not Modified
+before doing any of that work.
+
+A payload can also depend on whether the request is authenticated (emails
+and private groups), so the ETag includes that and responses vary on the
+Authorization header.
+"""
+
+import datetime
+import hashlib
+import logging
+from calendar import timegm
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import Sum
+from django.db.utils import OperationalError
+from django.utils.cache import get_conditional_response
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.utils.http import quote_etag
+
+from knowledge_commons_profiles.newprofile.models import GroupMembershipMirror
+from knowledge_commons_profiles.newprofile.models import WpBpGroupMember
+from knowledge_commons_profiles.newprofile.utils import get_profile_photo
+
+logger = logging.getLogger(__name__)
+
+
+def _etag(*parts):
+    """
+    A strong ETag for the given version stamps
+    """
+    return quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:32])
+
+
+def _latest(*timestamps):
+    return max((stamp for stamp in timestamps if stamp), default=None)
+
+
+def group_membership_version(username):
+    """
+    A cheap stamp that changes whenever the user's group memberships do
+
+    With the membership mirror enabled, a renamed group or a change of its
+    status moves the mirror's sync time. WordPress keeps no modification
+    time for groups, so otherwise the stamp carries the groups' names, slugs
+    and statuses themselves, and its latest change is None.
+
+    :return: a (count, latest change, id sum, groups) tuple, or None if the
+        membership data is unavailable
+    """
+    try:
+        if settings.GROUP_MEMBERSHIP_MIRROR_ENABLED:
+            stamp = GroupMembershipMirror.objects.filter(
+                username=username
+            ).aggregate(count=Count("id"), latest=Max("synced"), ids=Sum("id"))
+            return stamp["count"], stamp["latest"], stamp["ids"], None
+
+        rows = sorted(
+            WpBpGroupMember.objects.filter(
+                user__user_login=username
+            ).values_list(
+                "id",
+                "date_modified",
+                "group__name",
+                "group__slug",
+                "group__status",
+            )
+        )
+    except OperationalError:
+        logger.warning("Unable to version group memberships for %s", username)
+        return None
+
+    return len(rows), None, sum(row[0] for row in rows), rows
+
+
+def avatar_version(profile):
+    """
+    A stamp for the avatar a profile's representation shows
+
+    An avatar uploaded through BuddyPress is found on disk, not on the
+    profile, so replacing it moves no other stamp. This resolves the avatar
+    as the serializer does and notes when the avatar directory last changed.
+
+    :return: a (avatar URL, datetime or None) tuple, or None if the avatar
+        cannot be resolved
+    """
+    try:
+        avatar = get_profile_photo(profile)
+        directory = (
+            Path(settings.WP_MEDIA_ROOT)
+            / "avatars"
+            / str(profile.central_user_id)
+        )
+        changed = (
+            datetime.datetime.fromtimestamp(
+                directory.stat().st_mtime, tz=datetime.UTC
+            )
+            if directory.exists()
+            else None
+        )
+    except (OSError, OperationalError):
+        logger.warning("Unable to version the avatar of %s", profile.username)
+        return None
+
+    return avatar, changed
+
+
+def profile_version(profile, has_full_access):
+    """
+    The ETag and last modification time of a profile's API representation
+
+    :return: an (etag, datetime or None) tuple; the time is None when a
+        group change could not move it (see group_membership_version)
+    """
+    memberships = group_membership_version(profile.username)
+    avatar = avatar_version(profile)
+
+    etag = _etag(
+        "profile",
+        profile.pk,
+        profile.revision,
+        profile.modified,
+        profile.last_sync,
+        has_full_access,
+        memberships,
+        avatar,
+    )
+
+    if (
+        memberships is None
+        or avatar is None
+        or not settings.GROUP_MEMBERSHIP_MIRROR_ENABLED
+    ):
+        return etag, None
+
+    last_modified = _latest(
+        profile.modified, profile.last_sync, memberships[1], avatar[1]
+    )
+
+    return etag, last_modified
+
+
+def group_version(group):
+    """
+    The ETag and last modification time of a group's API representation
+
+    WordPress keeps no modification time for groups. With the membership
+    mirror enabled, its sync time for the group's rows moves whenever the
+    group is renamed or its status changes.
+
+    :param group: the group's metadata, from get_group_metadata()
+    :return: an (etag, datetime or None) tuple
+    """
+    mirrored = None
+
+    if settings.GROUP_MEMBERSHIP_MIRROR_ENABLED:
+        try:
+            mirrored = GroupMembershipMirror.objects.filter(
+                group_id=group["id"]
+            ).aggregate(latest=Max("synced"))["latest"]
+        except OperationalError:
+            logger.warning("Unable to version group %s", group["id"])
+
+    etag = _etag(
+        "group",
+        group["id"],
+        group["name"],
+        group["slug"],
+        group["status"],
+        group["description"],
+        group["avatar"],
+        group["groupblog"],
+        mirrored,
+    )
+
+    return etag, _latest(group["date_created"], mirrored)
+
+
+def not_modified_response(request, etag, last_modified):
+    """
+    A 304 response if the client's copy is current, otherwise None
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=(
+            timegm(last_modified.utctimetuple()) if last_modified else None
+        ),
+    )
+
+    if response is None:
+        return None
+
+    return add_version_headers(response, etag, last_modified)
+
+
+def add_version_headers(response, etag, last_modified):
+    """
+    Set the ETag, Last-Modified and Vary headers on a response
+    """
+    response["ETag"] = etag
+
+    if last_modified:
+        response["Last-Modified"] = http_date(
+            timegm(last_modified.utctimetuple())
+        )
+
+    patch_vary_headers(response, ("Authorization",))
+
+    return response
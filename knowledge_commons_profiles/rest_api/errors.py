@@ -45,3 +45,13 @@ class RESTError:
         "status": "fatal",
         "code": 1009,
     }
+    FATAL_INVALID_CURSOR = {
+        "message": "Invalid cursor or limit",
+        "status": "fatal",
+        "code": 1010,
+    }
+    FATAL_CURSOR_EXPIRED = {
+        "message": "Cursor has expired; resync in full",
+        "status": "fatal",
+        "code": 1011,
+    }
@@ -1,5 +1,6 @@
 import json
 import logging
+import threading
 from enum import Enum
 from typing import Any
 
@@ -14,6 +15,8 @@ from pydantic import field_validator
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from knowledge_commons_profiles.common import fast_json
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -367,7 +370,7 @@ class APIClient:
             # Send request
             response = self.session.post(
                 url,
-                json=payload.dict(),
+                data=fast_json.dumpb(payload.dict()),
                 headers=default_headers,
                 timeout=self.timeout,
                 verify=False,  # we don't want to validate certs when testing
@@ -378,13 +381,13 @@ class APIClient:
 
             # Parse response
             try:
-                response_data = response.json()
+                response_data = fast_json.loads(response.content)
                 message = f"Request successful. Status: {response.status_code}"
                 logger.info(message)
                 return APIResponse(
                     status_code=response.status_code, data=response_data
                 )
-            except json.JSONDecodeError:
+            except fast_json.JSONDecodeError:
                 message = "Failed to parse response JSON"
                 logger.exception(message)
                 return APIResponse(
@@ -474,7 +477,7 @@ class APIClient:
             # Send request
             response = self.session.post(
                 url,
-                json=payload.dict(),
+                data=fast_json.dumpb(payload.dict()),
                 headers=default_headers,
                 timeout=self.timeout,
                 verify=False,  # we don't want to validate certs when testing
@@ -485,13 +488,13 @@ class APIClient:
 
             # Parse response
             try:
-                response_data = response.json()
+                response_data = fast_json.loads(response.content)
                 message = f"Request successful. Status: {response.status_code}"
                 logger.info(message)
                 return APIResponse(
                     status_code=response.status_code, data=response_data
                 )
-            except json.JSONDecodeError:
+            except fast_json.JSONDecodeError:
                 message = "Failed to parse response JSON"
                 logger.exception(message)
                 return APIResponse(
@@ -535,6 +538,45 @@ class APIClient:
         return updates_dict
 
 
+# shared clients by base URL; see get_client()
+_clients: dict[str, APIClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_endpoint: str) -> APIClient:
+    """
+    The shared client for a works endpoint.
+
+    Each client keeps one requests session, so every call to an endpoint
+    reuses its pooled keep-alive connections instead of opening new ones.
+    :param base_endpoint: the endpoint's base URL
+    :return: the APIClient
+    """
+    with _clients_lock:
+        client = _clients.get(base_endpoint)
+        if client is None:
+            config = APIClientConfig(
+                base_url=base_endpoint,
+                timeout=30,
+                max_retries=3,
+                backoff_factor=0.5,
+            )
+            client = APIClient(config)
+            _clients[base_endpoint] = client
+
+    return client
+
+
+def close_clients():
+    """
+    Close the shared clients' sessions.
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
+
+
 def send_webhook_updates(
     user_updates: list[UserUpdate] | None = None,
     group_updates: list[GroupUpdate] | None = None,
@@ -546,15 +588,22 @@ def send_webhook_updates(
     :return: the API response
     """
     for base_endpoint in settings.WORKS_UPDATE_ENDPOINTS:
-        config = APIClientConfig(
-            base_url=base_endpoint,
-            timeout=30,
-            max_retries=3,
-            backoff_factor=0.5,
-        )
-        client = APIClient(config)
+        send_webhook_updates_to(base_endpoint, user_updates, group_updates)
 
-        client.post_webhook(group_updates, user_updates)
+
+def send_webhook_updates_to(
+    base_endpoint: str,
+    user_updates: list[UserUpdate] | None = None,
+    group_updates: list[GroupUpdate] | None = None,
+):
+    """
+    Send updates to one works endpoint.
+    :param base_endpoint: the endpoint's base URL
+    :param user_updates: the users and their operations
+    :param group_updates: the groups and their operations
+    :return: the API response, or None if sending failed
+    """
+    return get_client(base_endpoint).post_webhook(group_updates, user_updates)
 
 
 def send_webhook_user_update(user_name: str):
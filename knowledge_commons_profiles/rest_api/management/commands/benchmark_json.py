@@ -0,0 +1,114 @@
+"""
+Compare DRF's JSON renderer and parser with the orjson-backed ones.
+
+Serializes a page of profiles as ProfileListView does, then times rendering
+and parsing it with each pair. If there are fewer profiles than the page
+size, the page is padded by repeating them.
+
+Usage:
+    # A 100-profile page, rendered and parsed 200 times each
+    ./manage.py benchmark_json
+
+    ./manage.py benchmark_json --page-size 50 --iterations 1000
+"""
+
+import io
+import itertools
+import time
+
+import django.db
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from knowledge_commons_profiles.common import fast_json
+from knowledge_commons_profiles.rest_api.export import export_queryset
+from knowledge_commons_profiles.rest_api.parsers import FastJSONParser
+from knowledge_commons_profiles.rest_api.renderers import FastJSONRenderer
+from knowledge_commons_profiles.rest_api.serializers.serializers import (
+    ProfileSerializer,
+)
+
+
+def _time(function, iterations):
+    """
+    The mean seconds per call
+    """
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSON renderer and parser with the orjson ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=100,
+            help="Profiles in the page.",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=200,
+            help="Times to render and parse the page with each pair.",
+        )
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        iterations = options["iterations"]
+
+        try:
+            profiles = list(export_queryset()[:page_size])
+        except django.db.utils.OperationalError as exc:
+            msg = f"Unable to read profiles: {exc}"
+            raise CommandError(msg) from exc
+
+        if not profiles:
+            msg = "There are no profiles to benchmark with."
+            raise CommandError(msg)
+
+        data = ProfileSerializer(profiles, many=True).data
+        page = {
+            "results": list(itertools.islice(itertools.cycle(data), page_size)),
+            "next": None,
+            "previous": None,
+        }
+
+        if not fast_json.available():
+            self.stdout.write(
+                self.style.WARNING(
+                    "orjson is not installed; the fast pair falls back to "
+                    "the standard library."
+                )
+            )
+
+        body = JSONRenderer().render(page)
+        self.stdout.write(
+            f"Page of {page_size} profiles, {len(body):,} bytes, "
+            f"{iterations} iterations"
+        )
+
+        for action, before, after in (
+            (
+                "render",
+                lambda: JSONRenderer().render(page),
+                lambda: FastJSONRenderer().render(page),
+            ),
+            (
+                "parse",
+                lambda: JSONParser().parse(io.BytesIO(body)),
+                lambda: FastJSONParser().parse(io.BytesIO(body)),
+            ),
+        ):
+            slow = _time(before, iterations)
+            fast = _time(after, iterations)
+            self.stdout.write(
+                f"{action}: {slow * 1000:.2f} ms before, "
+                f"{fast * 1000:.2f} ms after "
+                f"({slow / fast if fast else 0:.1f}x)"
+            )
@@ -0,0 +1,74 @@
+"""
+Export every profile as NDJSON, one profile per line.
+
+Usage:
+    # Write to standard output
+    ./manage.py export_profiles
+
+    # Write a gzip-compressed file
+    ./manage.py export_profiles --output profiles.ndjson.gz --gzip
+"""
+
+import sys
+
+import django.db
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from knowledge_commons_profiles.rest_api.export import EXPORT_CHUNK_SIZE
+from knowledge_commons_profiles.rest_api.export import ExportStats
+from knowledge_commons_profiles.rest_api.export import gzip_lines
+from knowledge_commons_profiles.rest_api.export import iter_profile_lines
+
+
+class Command(BaseCommand):
+    help = "Export every profile as NDJSON, one profile per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="File to write, or - for standard output.",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Gzip-compress the output.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="Profiles to fetch and serialize at a time.",
+        )
+
+    def handle(self, *args, **options):
+        stats = ExportStats()
+        lines = iter_profile_lines(
+            chunk_size=options["chunk_size"], stats=stats
+        )
+
+        if options["gzip"]:
+            lines = gzip_lines(lines)
+
+        to_stdout = options["output"] == "-"
+
+        try:
+            if to_stdout:
+                self._write(sys.stdout.buffer, lines)
+            else:
+                with open(options["output"], "wb") as output:  # noqa: PTH123
+                    self._write(output, lines)
+        except django.db.utils.OperationalError as exc:
+            msg = f"Unable to export profiles: {exc}"
+            raise CommandError(msg) from exc
+
+        # keep the summary out of an export written to standard output
+        report = self.stderr if to_stdout else self.stdout
+        report.write(self.style.SUCCESS(f"Exported {stats}."))
+
+    @staticmethod
+    def _write(output, lines):
+        for line in lines:
+            output.write(line)
+        output.flush()
@@ -0,0 +1,124 @@
+"""
+Deliver queued calls to other services.
+
+Profile edits, avatar uploads, email changes and logins write their calls to
+the IDMS works endpoints, the subscriber webhooks, WordPress and CC search
+to an outbox table; this dispatcher delivers them. Run it as a separate
+long-lived process.
+
+Usage:
+    ./manage.py run_outbox_dispatcher
+
+    # Deliver whatever is due now, then exit
+    ./manage.py run_outbox_dispatcher --once
+
+    # Print the queue depth and exit
+    ./manage.py run_outbox_dispatcher --stats
+"""
+
+import json
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+import django.db
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from knowledge_commons_profiles.newprofile.outbox import queue_depth
+from knowledge_commons_profiles.rest_api.outbox_dispatcher import (
+    CLAIM_BATCH_SIZE,
+)
+from knowledge_commons_profiles.rest_api.outbox_dispatcher import (
+    DISPATCH_WORKERS,
+)
+from knowledge_commons_profiles.rest_api.outbox_dispatcher import run_pending
+from knowledge_commons_profiles.rest_api.outbox_dispatcher import run_worker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued calls to other services."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Deliver the messages that are due now and exit.",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Print the queue depth as JSON and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CLAIM_BATCH_SIZE,
+            help="Messages to claim at a time.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DISPATCH_WORKERS,
+            help="Destinations to deliver to at once.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds to wait when nothing is due.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            try:
+                depth = queue_depth()
+            except django.db.utils.OperationalError as exc:
+                msg = f"Unable to read the outbox: {exc}"
+                raise CommandError(msg) from exc
+
+            self.stdout.write(json.dumps(depth, indent=2, sort_keys=True))
+            return
+
+        if options["once"]:
+            totals = {
+                "claimed": 0,
+                "delivered": 0,
+                "coalesced": 0,
+                "failed": 0,
+                "deferred": 0,
+            }
+            with ThreadPoolExecutor(
+                max_workers=options["workers"], thread_name_prefix="outbox"
+            ) as executor:
+                while True:
+                    counts = run_pending(options["batch_size"], executor)
+                    # failed destinations are deferred, so they do not
+                    # come round again in this run
+                    if not counts["claimed"]:
+                        break
+                    for key, value in counts.items():
+                        totals[key] += value
+        else:
+            stopping = []
+
+            def stop(signum, frame):
+                stopping.append(signum)
+
+            signal.signal(signal.SIGTERM, stop)
+            signal.signal(signal.SIGINT, stop)
+
+            self.stdout.write("Outbox dispatcher waiting for messages.")
+            totals = run_worker(
+                poll_interval=options["poll_interval"],
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                should_stop=lambda: bool(stopping),
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Delivered {totals['delivered']} messages "
+                f"({totals['coalesced']} more coalesced), "
+                f"{totals['failed']} failed, {totals['deferred']} deferred."
+            )
+        )
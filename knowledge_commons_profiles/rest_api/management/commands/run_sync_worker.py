@@ -0,0 +1,77 @@
+"""
+Run queued external membership refreshes.
+
+REST API reads queue a refresh when a profile's memberships are older than
+SYNC_HOURS; this worker runs them. Run it as a separate long-lived process.
+
+Usage:
+    ./manage.py run_sync_worker
+
+    # Run whatever is queued now, then exit
+    ./manage.py run_sync_worker --once
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from knowledge_commons_profiles.rest_api.sync_queue import CLAIM_BATCH_SIZE
+from knowledge_commons_profiles.rest_api.sync_queue import prune_failed_jobs
+from knowledge_commons_profiles.rest_api.sync_queue import run_pending
+from knowledge_commons_profiles.rest_api.sync_queue import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued external membership refreshes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs that are due now and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=CLAIM_BATCH_SIZE,
+            help="Jobs to claim at a time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds to wait when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            prune_failed_jobs()
+            totals = {"claimed": 0, "synced": 0, "failed": 0}
+            while True:
+                counts = run_pending(options["batch_size"])
+                if not counts["claimed"]:
+                    break
+                for key, value in counts.items():
+                    totals[key] += value
+        else:
+            stopping = []
+
+            def stop(signum, frame):
+                stopping.append(signum)
+
+            signal.signal(signal.SIGTERM, stop)
+            signal.signal(signal.SIGINT, stop)
+
+            self.stdout.write("Sync worker waiting for jobs.")
+            totals = run_worker(
+                poll_interval=options["poll_interval"],
+                batch_size=options["batch_size"],
+                should_stop=lambda: bool(stopping),
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Synced {totals['synced']} profiles, "
+                f"{totals['failed']} failed."
+            )
+        )
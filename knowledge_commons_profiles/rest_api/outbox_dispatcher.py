@@ -0,0 +1,485 @@
+"""
+Delivery of the outbox written by newprofile/outbox.py
+
+The run_outbox_dispatcher command calls run_worker(). Each round claims a
+batch of due messages with SELECT ... FOR UPDATE SKIP LOCKED, so that
+several dispatchers can run side by side, and delivers them on a thread
+pool, one task per destination.
+
+Ordering: a message is only claimed when no earlier message to the same
+destination about the same user is pending or running, so a user's updates
+reach each service in the order they were written, even across
+dispatchers.
+
+Retries: a failed message is retried with an exponential backoff. A
+failure that is the message's own (a 4xx, or a handler reporting that the
+call did not succeed) backs off only that message, and the destination's
+other messages are still delivered. A failure that says the service is
+down (a connection error, a timeout or a 5xx), or
+CONSECUTIVE_FAILURES_DOWN failed calls in a row, backs off the whole
+destination: the rest of its claimed messages go back to the queue
+unattempted, and every message queued for it waits until the same time, so
+a service that is down is not hammered by one request per user. After
+MAX_ATTEMPTS a message is marked failed and stays in the table for
+inspection.
+
+Batching: IDMS user updates to a works endpoint are sent together, up to
+settings.IDMS_UPDATE_BATCH_SIZE users in one UpdatePayload, over the
+endpoint's pooled session. A delivered user update also clears the
+updates for the same user that were queued behind it, since the endpoint
+re-reads the user either way.
+"""
+
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django.db
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists
+from django.db.models import F
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.utils import timezone
+
+from knowledge_commons_profiles.cilogon.oauth import send_association_message_to
+from knowledge_commons_profiles.cilogon.oauth import sync_email_to_wordpress
+from knowledge_commons_profiles.newprofile.cc_search import (
+    index_profile_in_cc_search,
+)
+from knowledge_commons_profiles.newprofile.models import OutboxKind
+from knowledge_commons_profiles.newprofile.models import OutboxMessage
+from knowledge_commons_profiles.newprofile.models import OutboxStatus
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.newprofile.wordpress_sync import (
+    sync_avatar_to_wordpress,
+)
+from knowledge_commons_profiles.rest_api.idms_api import EventType
+from knowledge_commons_profiles.rest_api.idms_api import UserUpdate
+from knowledge_commons_profiles.rest_api.idms_api import send_webhook_updates_to
+from knowledge_commons_profiles.rest_api.sync import ExternalSync
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH_SIZE = 50
+
+DISPATCH_WORKERS = 8
+
+MAX_ATTEMPTS = 8
+
+# retry a failed message after this long, doubled for each earlier attempt
+RETRY_BACKOFF = datetime.timedelta(seconds=30)
+
+MAX_BACKOFF = datetime.timedelta(hours=1)
+
+# a message that has been running this long belongs to a dispatcher that died
+STALE_RUNNING = datetime.timedelta(minutes=15)
+
+# failed calls in a row after which a destination is treated as down, for
+# handlers that report a failure without saying why
+CONSECUTIVE_FAILURES_DOWN = 3
+
+
+def _deliver_user_updates(messages):
+    user_updates = [
+        UserUpdate(id=message.username, event=EventType.UPDATED)
+        for message in messages
+    ]
+    response = send_webhook_updates_to(
+        messages[0].destination, user_updates, []
+    )
+    return response is not None
+
+
+def _deliver_subscriber_webhook(message):
+    return ExternalSync.ping_subscriber(message.destination, message.username)
+
+
+def _deliver_association(message):
+    return send_association_message_to(
+        message.destination, message.payload["sub"], message.username
+    )
+
+
+def _deliver_avatar(message):
+    return sync_avatar_to_wordpress(
+        message.username, message.payload["image_url"]
+    )
+
+
+def _deliver_email(message):
+    return sync_email_to_wordpress(message.username, message.payload["email"])
+
+
+def _deliver_cc_search(message):
+    try:
+        profile = Profile.objects.get(username=message.username)
+    except Profile.DoesNotExist:
+        # the profile has gone, so there is nothing to index
+        return True
+
+    return index_profile_in_cc_search(profile) is not None
+
+
+# kinds whose consecutive messages to a destination are sent in one call
+BATCH_HANDLERS = {
+    OutboxKind.IDMS_USER_UPDATE: _deliver_user_updates,
+}
+
+HANDLERS = {
+    OutboxKind.SUBSCRIBER_WEBHOOK: _deliver_subscriber_webhook,
+    OutboxKind.ASSOCIATION: _deliver_association,
+    OutboxKind.WORDPRESS_AVATAR: _deliver_avatar,
+    OutboxKind.WORDPRESS_EMAIL: _deliver_email,
+    OutboxKind.CC_SEARCH: _deliver_cc_search,
+}
+
+
+def backoff(attempts):
+    """
+    How long to wait after a message's nth failed attempt
+    """
+    return min(RETRY_BACKOFF * 2 ** max(attempts - 1, 0), MAX_BACKOFF)
+
+
+def claim_messages(limit=CLAIM_BATCH_SIZE):
+    """
+    Mark up to limit deliverable messages as running and return them
+
+    A message is deliverable when it is due and no earlier message to the
+    same destination about the same user is still pending or running.
+    """
+    now = timezone.now()
+
+    earlier = OutboxMessage.objects.filter(
+        destination=OuterRef("destination"),
+        username=OuterRef("username"),
+        id__lt=OuterRef("id"),
+        status__in=[OutboxStatus.PENDING, OutboxStatus.RUNNING],
+    )
+
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=OutboxStatus.PENDING, run_after__lte=now)
+                | Q(
+                    status=OutboxStatus.RUNNING,
+                    started__lt=now - STALE_RUNNING,
+                )
+            )
+            .filter(~Exists(earlier))
+            .order_by("run_after", "id")[:limit]
+        )
+
+        OutboxMessage.objects.filter(
+            id__in=[message.id for message in messages]
+        ).update(
+            status=OutboxStatus.RUNNING,
+            started=now,
+            attempts=F("attempts") + 1,
+        )
+
+    for message in messages:
+        message.attempts += 1
+
+    return messages
+
+
+def _superseded(messages):
+    """
+    Find the queued IDMS user updates that the claimed ones will make
+    redundant
+
+    A user update only tells the works endpoint to re-read the user, so
+    once one is delivered, any other for the same user and endpoint that
+    was already committed when it was sent adds nothing. These are found
+    before delivery starts, so that an update committed during the call is
+    kept.
+
+    :return: the ids of the superseded messages by (destination, username)
+    """
+    claimed = [
+        message
+        for message in messages
+        if message.kind == OutboxKind.IDMS_USER_UPDATE
+    ]
+
+    if not claimed:
+        return {}
+
+    superseded = {}
+    for message_id, destination, username in OutboxMessage.objects.filter(
+        kind=OutboxKind.IDMS_USER_UPDATE,
+        status=OutboxStatus.PENDING,
+        destination__in={message.destination for message in claimed},
+        username__in={message.username for message in claimed},
+    ).values_list("id", "destination", "username"):
+        superseded.setdefault((destination, username.lower()), []).append(
+            message_id
+        )
+
+    return superseded
+
+
+def _batches(messages):
+    """
+    Split one destination's messages into calls, keeping their order
+
+    Consecutive messages of a kind in BATCH_HANDLERS share a call, up to
+    settings.IDMS_UPDATE_BATCH_SIZE of them; every other message is a call
+    of its own.
+    """
+    batch = []
+    for message in messages:
+        if batch and (
+            message.kind != batch[0].kind
+            or message.kind not in BATCH_HANDLERS
+            or len(batch) >= settings.IDMS_UPDATE_BATCH_SIZE
+        ):
+            yield batch
+            batch = []
+        batch.append(message)
+
+    if batch:
+        yield batch
+
+
+def destination_is_down(exc):
+    """
+    Whether an exception from a handler says the service itself is
+    unavailable, rather than that it refused this message
+    """
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status is not None and status >= 500  # noqa: PLR2004
+
+
+def deliver(batch):
+    """
+    Make the call for a batch of messages of one kind
+
+    :return: an (error, down) tuple: error is None on success, or a
+        description of the failure; down is True if the failure says the
+        destination is unavailable
+    """
+    kind = batch[0].kind
+
+    try:
+        if kind in BATCH_HANDLERS:
+            delivered = BATCH_HANDLERS[kind](batch)
+        else:
+            delivered = HANDLERS[kind](batch[0])
+    except Exception as exc:  # noqa: BLE001
+        return str(exc) or exc.__class__.__name__, destination_is_down(exc)
+
+    return (None, False) if delivered else ("delivery failed", False)
+
+
+def _deliver_destination(messages):
+    """
+    Deliver one destination's messages in order, stopping once the
+    destination looks down
+
+    :return: a (results, down) tuple: (message, error) pairs for the
+        messages attempted, and whether the destination looks down
+    """
+    results = []
+    failures_in_a_row = 0
+
+    for batch in _batches(messages):
+        error, down = deliver(batch)
+        results.extend((message, error) for message in batch)
+
+        if not error:
+            failures_in_a_row = 0
+            continue
+
+        failures_in_a_row += 1
+        if down or failures_in_a_row >= CONSECUTIVE_FAILURES_DOWN:
+            return results, True
+
+    return results, False
+
+
+def _deliver_destination_in_thread(messages):
+    """
+    _deliver_destination() on a pool thread, closing the thread's database
+    connections afterwards
+    """
+    try:
+        return _deliver_destination(messages)
+    finally:
+        django.db.connections.close_all()
+
+
+def _record_failures(destination, failed, deferred, down):
+    """
+    Back off failed messages, and their whole destination if it is down
+
+    :param failed: (message, error) pairs for the messages that failed
+    :param deferred: the destination's claimed messages that were not tried
+    :param down: whether the destination looks unavailable
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        for message, error in failed:
+            if message.attempts >= MAX_ATTEMPTS:
+                OutboxMessage.objects.filter(id=message.id).update(
+                    status=OutboxStatus.FAILED, last_error=error
+                )
+                logger.error(
+                    "Giving up on %s for %s after %s attempts: %s",
+                    message.kind,
+                    message.username,
+                    message.attempts,
+                    error,
+                )
+            else:
+                OutboxMessage.objects.filter(id=message.id).update(
+                    status=OutboxStatus.PENDING,
+                    last_error=error,
+                    run_after=now + backoff(message.attempts),
+                )
+                logger.warning(
+                    "Delivery of %s for %s failed (attempt %s): %s",
+                    message.kind,
+                    message.username,
+                    message.attempts,
+                    error,
+                )
+
+        # the untried messages did not use up an attempt
+        OutboxMessage.objects.filter(
+            id__in=[other.id for other in deferred]
+        ).update(status=OutboxStatus.PENDING, attempts=F("attempts") - 1)
+
+        if not down:
+            return
+
+        retry_at = now + backoff(
+            max(message.attempts for message, _ in failed)
+        )
+        OutboxMessage.objects.filter(
+            destination=destination,
+            status=OutboxStatus.PENDING,
+            run_after__lt=retry_at,
+        ).update(run_after=retry_at)
+
+
+def run_pending(limit=CLAIM_BATCH_SIZE, executor=None):
+    """
+    Claim and deliver one batch of messages
+
+    :param executor: a thread pool to deliver destinations concurrently on;
+        without one, they are delivered one after another
+    :return: a dict of counts
+    """
+    counts = {
+        "claimed": 0,
+        "delivered": 0,
+        "coalesced": 0,
+        "failed": 0,
+        "deferred": 0,
+    }
+
+    messages = claim_messages(limit)
+    superseded = _superseded(messages)
+
+    by_destination = {}
+    for message in messages:
+        counts["claimed"] += 1
+        by_destination.setdefault(message.destination, []).append(message)
+
+    if executor is None:
+        outcomes = map(_deliver_destination, by_destination.values())
+    else:
+        outcomes = executor.map(
+            _deliver_destination_in_thread, by_destination.values()
+        )
+
+    for (destination, messages), (results, down) in zip(
+        by_destination.items(), outcomes, strict=True
+    ):
+        delivered = [message for message, error in results if not error]
+        OutboxMessage.objects.filter(
+            id__in=[message.id for message in delivered]
+        ).delete()
+        counts["delivered"] += len(delivered)
+
+        redundant = [
+            message_id
+            for message in delivered
+            for message_id in superseded.get(
+                (destination, message.username.lower()), []
+            )
+        ]
+        if redundant:
+            coalesced, _ = OutboxMessage.objects.filter(
+                id__in=redundant, status=OutboxStatus.PENDING
+            ).delete()
+            counts["coalesced"] += coalesced
+
+        failed = [(message, error) for message, error in results if error]
+        if failed:
+            deferred = messages[len(results) :]
+            _record_failures(destination, failed, deferred, down)
+            counts["failed"] += len(failed)
+            counts["deferred"] += len(deferred)
+
+    if counts["claimed"]:
+        logger.info(
+            "Outbox: %(delivered)s delivered, %(coalesced)s coalesced, "
+            "%(failed)s failed, %(deferred)s deferred",
+            counts,
+        )
+
+    return counts
+
+
+def run_worker(
+    poll_interval=5,
+    batch_size=CLAIM_BATCH_SIZE,
+    workers=DISPATCH_WORKERS,
+    should_stop=None,
+):
+    """
+    Deliver messages until should_stop() returns True, sleeping for
+    poll_interval seconds whenever nothing is due
+
+    :return: a dict of counts
+    """
+    totals = {
+        "claimed": 0,
+        "delivered": 0,
+        "coalesced": 0,
+        "failed": 0,
+        "deferred": 0,
+    }
+    should_stop = should_stop or (lambda: False)
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="outbox"
+    ) as executor:
+        while not should_stop():
+            django.db.close_old_connections()
+
+            try:
+                counts = run_pending(batch_size, executor)
+            except django.db.utils.OperationalError:
+                logger.warning("Database unavailable, dispatcher waiting")
+                counts = {"claimed": 0}
+
+            for key, value in counts.items():
+                totals[key] += value
+
+            if not counts["claimed"]:
+                time.sleep(poll_interval)
+
+    return totals
@@ -0,0 +1,35 @@
+"""
+A DRF JSON parser backed by common.fast_json
+
+Enabled with FAST_JSON_API (see config/settings/base.py). Request bodies
+in an encoding other than UTF-8 fall back to the standard parser.
+"""
+
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from knowledge_commons_profiles.common import fast_json
+
+UTF8 = codecs.lookup("utf-8").name
+
+
+class FastJSONParser(JSONParser):
+    """
+    Parses JSON-serialized data with orjson
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        if not fast_json.available() or codecs.lookup(encoding).name != UTF8:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return fast_json.loads(stream.read())
+        except ValueError as exc:
+            msg = f"JSON parse error - {exc}"
+            raise ParseError(msg) from exc
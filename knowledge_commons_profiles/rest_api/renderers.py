@@ -0,0 +1,54 @@
+"""
+A DRF JSON renderer backed by common.fast_json
+
+Enabled with FAST_JSON_API (see config/settings/base.py). The output
+decodes to the same values as DRF's compact JSONRenderer, but the bytes are
+not always the same:
+
+- floats use orjson's shortest form, so 1e16 is written as 1e16 rather
+  than 1e+16 and 1e-7 as 1e-7 rather than 1e-07
+- NaN and the infinities are written as null, where DRF raises ValueError
+  (or, with STRICT_JSON off, writes NaN and Infinity)
+
+The API's serializers produce no non-finite floats. Indented output (an
+"indent" media type parameter, or the browsable API) and checkouts without
+orjson fall back to the standard renderer.
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from knowledge_commons_profiles.common import fast_json
+
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """
+    Encode the types DRF's encoder knows, such as Decimal and lazy strings,
+    and datetimes in DRF's format
+    """
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renderer which serializes to JSON with orjson
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+
+        if indent is not None or not fast_json.available():
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # escape U+2028 and U+2029 as DRF does, so that the output stays a
+        # strict javascript subset
+        return (
+            fast_json.dumpb(data, default=_default, native_datetimes=False)
+            .replace(b"\xe2\x80\xa8", b"\\u2028")
+            .replace(b"\xe2\x80\xa9", b"\\u2029")
+        )
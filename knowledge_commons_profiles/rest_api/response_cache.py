@@ -0,0 +1,146 @@
+"""
+A shared cache of rendered anonymous REST detail responses
+
+Without a bearer token, ProfileDetailView and GroupDetailView return the
+same public subset to every caller. Once such a response has been rendered,
+its bytes are stored under the resource and its version stamp (the ETag
+from conditional.py), so that the next anonymous request for an unchanged
+resource is answered from the cache without running the serializer.
+
+Responses to authenticated requests, which can include emails and private
+groups, are never stored here. Only JSON responses are cached; the
+browsable API is always rendered afresh.
+
+Entries are tagged with the resource's tag and the owning user's or
+group's tag, so invalidate_profile() (on every profile save, including the
+one made when a user's superadmin flags change) and
+group_cache.invalidate_group() drop them when the profile or group changes,
+as do the existing per-user invalidations. What keeps a stale entry from
+being served is the key: the ETag covers the profile's revision, its last
+sync, its resolved avatar (including one on disk from BuddyPress) and its
+group memberships, including the groups' names and statuses, and a group's
+ETag covers its own fields and avatar, so any of those changing moves the
+key. Dropping entries only frees the memory sooner.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from knowledge_commons_profiles.common import tagged_cache
+from knowledge_commons_profiles.common.tagged_cache import group_tag
+from knowledge_commons_profiles.common.tagged_cache import user_tag
+
+
+def profile_resource(username):
+    return f"profile:{str(username).lower()}"
+
+
+def group_resource(group_id):
+    return f"group:{group_id}"
+
+
+def _resource_tag(resource):
+    return f"response:{resource}"
+
+
+def _cache_key(resource, etag, renderer_format):
+    stamp = hashlib.sha256(etag.encode()).hexdigest()[:32]
+    return f"response-{resource}-{renderer_format}-{stamp}"
+
+
+def is_cacheable(request):
+    """
+    Whether a response to this request may go in the shared cache
+    """
+    renderer = getattr(request, "accepted_renderer", None)
+
+    return (
+        bool(settings.ANONYMOUS_RESPONSE_CACHE_TIMEOUT)
+        and not request.auth
+        and renderer is not None
+        and renderer.format == "json"
+    )
+
+
+def fetch(request, resource, etag):
+    """
+    The cached response for a resource at a version, if any
+
+    :return: an HttpResponse, or None on a miss or if the request may not
+        use the shared cache
+    """
+    if not is_cacheable(request):
+        return None
+
+    cached = tagged_cache.fetch(
+        "rest_response",
+        _cache_key(resource, etag, request.accepted_renderer.format),
+    )
+
+    if cached is None:
+        return None
+
+    content_type, content = cached
+
+    return HttpResponse(content, content_type=content_type)
+
+
+def store(request, resource, etag, data, tags=()):
+    """
+    Render data for an anonymous request and cache the bytes
+
+    :param request: the request being answered
+    :param resource: profile_resource() or group_resource()
+    :param etag: the resource's current ETag
+    :param data: the serialized response body
+    :param tags: further tags to record the entry against
+    :return: an HttpResponse with the rendered bytes, or None if the
+        request may not use the shared cache
+    """
+    if not is_cacheable(request):
+        return None
+
+    renderer = request.accepted_renderer
+    content = renderer.render(data, request.accepted_media_type)
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f"{content_type}; charset={renderer.charset}"
+
+    tagged_cache.store(
+        "rest_response",
+        _cache_key(resource, etag, renderer.format),
+        (content_type, content),
+        settings.ANONYMOUS_RESPONSE_CACHE_TIMEOUT,
+        tags=[_resource_tag(resource), *tags],
+    )
+
+    return HttpResponse(content, content_type=content_type)
+
+
+def store_profile(request, profile, etag, data):
+    return store(
+        request,
+        profile_resource(profile.username),
+        etag,
+        data,
+        tags=[user_tag(profile.username)],
+    )
+
+
+def store_group(request, group_id, etag, data):
+    return store(
+        request,
+        group_resource(group_id),
+        etag,
+        data,
+        tags=[group_tag(group_id)],
+    )
+
+
+def invalidate_profile(username):
+    """
+    Drop the cached responses for a profile
+    """
+    return tagged_cache.invalidate(_resource_tag(profile_resource(username)))
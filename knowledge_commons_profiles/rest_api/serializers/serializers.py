@@ -12,21 +12,19 @@ from rest_framework.reverse import reverse
 
 from knowledge_commons_profiles.cilogon.models import SubAssociation
 from knowledge_commons_profiles.cilogon.models import TokenUserAgentAssociations
-from knowledge_commons_profiles.newprofile.api import API
+from knowledge_commons_profiles.newprofile.api import get_api
 from knowledge_commons_profiles.newprofile.models import AcademicInterest
+from knowledge_commons_profiles.newprofile.models import ChangeLogEntry
 from knowledge_commons_profiles.newprofile.models import Profile
-from knowledge_commons_profiles.newprofile.models import WpBlog
 from knowledge_commons_profiles.newprofile.models import WpBpGroup
-from knowledge_commons_profiles.newprofile.models import WpBpGroupsGroupmeta
 from knowledge_commons_profiles.newprofile.network_urls import group_url
-from knowledge_commons_profiles.newprofile.network_urls import (
-    society_ids_for_groups,
-)
 from knowledge_commons_profiles.rest_api.utils import get_external_memberships
 from knowledge_commons_profiles.rest_api.utils import wp_unslash
 
 logger = logging.getLogger(__name__)
 
+MAX_BATCH_USERNAMES = 300
+
 
 class GroupMembershipSerializer(serializers.Serializer):
     """
@@ -83,7 +81,7 @@ class GroupMembershipSerializer(serializers.Serializer):
 
 class GroupDetailSerializer(serializers.Serializer):
     """
-    Serializer for the Group model
+    Serializer for a group's cached metadata (see get_group_metadata)
     """
 
     id = serializers.IntegerField()
@@ -92,42 +90,21 @@ class GroupDetailSerializer(serializers.Serializer):
     visibility = serializers.CharField(source="status")
     description = serializers.CharField()
     slug = serializers.CharField()
-    avatar = serializers.SerializerMethodField()
-    groupblog = serializers.SerializerMethodField()
+    avatar = serializers.CharField()
+    groupblog = serializers.CharField()
     upload_roles = serializers.SerializerMethodField()
     moderate_roles = serializers.SerializerMethodField()
 
-    def get_avatar(self, obj: WpBpGroup) -> str:
-        return obj.get_avatar()
-
-    def get_url(self, obj: WpBpGroup) -> str:
+    def get_url(self, obj: dict) -> str:
         # network-aware: resolve the group's home network (bp_group_type)
         # and build the URL on that network's domain, falling back to the
         # base Commons domain when the group has no network. See #622.
-        society_id = society_ids_for_groups([obj.id]).get(obj.id)
-        return group_url(society_id, obj.slug)
+        return group_url(obj["society_id"], obj["slug"])
 
-    def get_groupblog(self, obj: WpBpGroup) -> str:
-        blog_id = (
-            WpBpGroupsGroupmeta.objects.filter(
-                group=obj, meta_key="groupblog_blog_id"
-            )
-            .values_list("meta_value", flat=True)
-            .first()
-        )
-        if blog_id:
-            try:
-                blog = WpBlog.objects.get(blog_id=blog_id)
-            except WpBlog.DoesNotExist:
-                return ""
-            else:
-                return f"https://{blog.domain}{blog.path}"
-        return ""
-
-    def get_upload_roles(self, obj: WpBpGroup) -> list[str]:
+    def get_upload_roles(self, obj: dict) -> list[str]:
         return ["member", "moderator", "administrator"]
 
-    def get_moderate_roles(self, obj: WpBpGroup) -> list[str]:
+    def get_moderate_roles(self, obj: dict) -> list[str]:
         return ["moderator", "administrator"]
 
     def to_representation(self, instance):
@@ -229,11 +206,16 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     def get_is_superadmin(self, obj: Profile) -> bool:
         """Work out whether the user is a superadmin"""
+        # ProfileListView annotates this onto its queryset
+        annotated = getattr(obj, "user_is_superadmin", None)
+        if annotated is not None:
+            return annotated
+
         from knowledge_commons_profiles.rest_api.serializers.serializers_shared import (
             get_is_superadmin as giss,
         )
 
-        return giss(obj)
+        return giss(obj, self.context.get("request"))
 
 
 class ProfileDetailSerializer(serializers.ModelSerializer):
@@ -291,9 +273,9 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
         """
         Get the avatar URL for the profile
         """
-        api = API(
-            request=None,
-            user=obj,
+        api = get_api(
+            self.context.get("request"),
+            obj,
             use_wordpress=True,
             create=False,
         )
@@ -314,6 +296,15 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
         Query the WP DB for this user's confirmed group memberships,
         then serialize them with your existing GroupMembershipSerializer.
         """
+        # ProfileBatchView looks up every profile's groups in one go
+        batch_groups = self.context.get("groups_by_username")
+        if batch_groups is not None:
+            return GroupMembershipSerializer(
+                batch_groups.get(obj.username.lower(), []),
+                many=True,
+                context=self.context,
+            ).data
+
         # assume you store the central user ID on Profile.central_user_id
         user_id = obj.username
         request = self.context.get("request")
@@ -329,7 +320,7 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
 
         # create a skeleton API object
         try:
-            api = API(request, user_id, use_wordpress=True)
+            api = get_api(request, user_id, use_wordpress=True)
 
             # serialize into the same shape you already have
             return GroupMembershipSerializer(
@@ -366,11 +357,57 @@ class ProfileDetailSerializer(serializers.ModelSerializer):
 
     def get_is_superadmin(self, obj: Profile) -> bool:
         """Work out whether the user is a superadmin"""
+        # ProfileBatchView annotates this onto its queryset
+        annotated = getattr(obj, "user_is_superadmin", None)
+        if annotated is not None:
+            return annotated
+
         from knowledge_commons_profiles.rest_api.serializers.serializers_shared import (
             get_is_superadmin as giss,
         )
 
-        return giss(obj)
+        return giss(obj, self.context.get("request"))
+
+
+class ProfileBatchSerializer(serializers.Serializer):
+    """
+    Serializer for the usernames posted to the batch member view
+    """
+
+    usernames = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=MAX_BATCH_USERNAMES,
+    )
+
+    def validate_usernames(self, value: list[str]) -> list[str]:
+        """
+        Strip the usernames and drop blanks and duplicates, which differ
+        only in case since usernames match case-insensitively
+        """
+        usernames = {}
+        for name in value:
+            name = name.strip()  # noqa: PLW2901
+            if name:
+                usernames.setdefault(name.lower(), name)
+        return list(usernames.values())
+
+
+class ChangeLogEntrySerializer(serializers.ModelSerializer):
+    """
+    Serializer for a change feed entry
+    """
+
+    type = serializers.CharField(source="kind")
+    time = serializers.DateTimeField(source="created")
+
+    class Meta:
+        """
+        Meta class
+        """
+
+        model = ChangeLogEntry
+        fields = ["id", "type", "action", "username", "object_id", "time"]
 
 
 class SubProfileSerializer(serializers.ModelSerializer):
@@ -2,17 +2,25 @@ import logging
 
 from django.contrib.auth.models import User
 
+from knowledge_commons_profiles.newprofile.api import get_api
+from knowledge_commons_profiles.newprofile.identity_map import get_identity_map
 from knowledge_commons_profiles.newprofile.models import Profile
 from knowledge_commons_profiles.rest_api import utils
 
 logger = logging.getLogger(__name__)
 
 
-def get_is_superadmin(obj: Profile) -> bool:
+def get_is_superadmin(obj: Profile, request=None) -> bool:
     """Work out whether the user is a superadmin"""
-    try:
-        user_object: User = User.objects.get(username=obj.username)
-    except User.DoesNotExist:
+    identity_map = get_identity_map(request)
+
+    if identity_map is not None:
+        # share the User row with any API object built for this username
+        user_object = get_api(request, obj.username).django_user
+    else:
+        user_object = User.objects.filter(username=obj.username).first()
+
+    if user_object is None:
         return False
 
     return any([user_object.is_superuser, user_object.is_staff])
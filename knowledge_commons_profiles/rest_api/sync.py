@@ -2,13 +2,14 @@
 Classes for syncing external data
 """
 
+import asyncio
 import datetime
-import json
 import logging
 from typing import Any
 
-import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import transaction
 from requests import RequestException
 
 from knowledge_commons_profiles.cilogon.sync_apis import arlisna
@@ -16,10 +17,18 @@ from knowledge_commons_profiles.cilogon.sync_apis import mla
 from knowledge_commons_profiles.cilogon.sync_apis import msu
 from knowledge_commons_profiles.cilogon.sync_apis import up
 from knowledge_commons_profiles.cilogon.sync_apis.sync_class import SyncClass
+from knowledge_commons_profiles.cilogon.sync_apis.sync_class import (
+    count_api_error,
+)
+from knowledge_commons_profiles.common import fast_json
+from knowledge_commons_profiles.common import http_pool
 from knowledge_commons_profiles.newprofile import models
 from knowledge_commons_profiles.newprofile.models import Profile
 from knowledge_commons_profiles.newprofile.models import Role
 from knowledge_commons_profiles.newprofile.models import RoleStatus
+from knowledge_commons_profiles.newprofile.outbox import (
+    queue_subscriber_webhooks,
+)
 
 CLASS_LOOKUPS: dict[str, SyncClass] = {
     "MLA": mla.MLA(),
@@ -46,34 +55,99 @@ class ExternalSync:
     ) -> dict[str, bool]:
         """
         Sync external data
+
+        The partner APIs are called concurrently, each with
+        settings.EXTERNAL_SYNC_DEADLINE seconds to answer. A partner that
+        fails or misses the deadline keeps its previous values, and the
+        profile goes stale again after settings.EXTERNAL_SYNC_RETRY_MINUTES
+        so that a later sync tries it again.
+        """
+        return ExternalSync.sync_with_status(
+            profile, class_list, send_webhook, cache, webhooks
+        )[0]
+
+    @staticmethod
+    def sync_with_status(
+        profile: models.Profile,
+        class_list: list[str] | None = None,
+        send_webhook=True,
+        cache=True,
+        webhooks=True,
+        deadline=None,
+    ) -> tuple[dict[str, bool], bool]:
+        """
+        sync(), also saying whether every partner answered
+
+        :param deadline: the seconds the partners have to answer, by
+            default settings.EXTERNAL_SYNC_DEADLINE
+        :return: (memberships, complete); complete is False if a partner
+            failed or missed the deadline and kept its previous values
         """
 
         # don't sync if we've already done this in the period specified
         # in settings.SYNC_HOURS
-        try:
-            if (
-                cache
-                and profile.last_sync
-                and (
-                    datetime.datetime.now(tz=datetime.UTC) - profile.last_sync
-                ).total_seconds()
-                < settings.SYNC_HOURS * 60 * 60
-            ):
-                msg = (
-                    f"External data sync is already synced for "
-                    f"{profile.username}. Using cached version."
-                )
-                logger.info(msg)
-                return profile.is_member_of
-        except TypeError:
+        if cache and not ExternalSync.is_stale(profile):
             msg = (
-                f"Not caching external data sync for {profile.username} "
-                f"due to an error."
+                f"External data sync is already synced for "
+                f"{profile.username}. Using cached version."
+            )
+            logger.info(msg)
+            return profile.is_member_of, True
+
+        logger.info("Syncing external data for %s", profile.username)
+
+        class_list = ExternalSync._class_list(class_list)
+
+        results = ExternalSync._fetch_classes(
+            [class_name for class_name, _ in class_list],
+            [profile.email, *profile.emails],
+            deadline,
+        )
+
+        return ExternalSync._apply_results(
+            profile, class_list, results, webhooks and send_webhook
+        )
+
+    @staticmethod
+    async def async_sync(
+        profile: models.Profile,
+        class_list: list[str] | None = None,
+        send_webhook=True,
+        cache=True,
+        webhooks=True,
+    ) -> dict[str, bool]:
+        """
+        sync() for async code
+
+        The partner APIs are called with their async clients, so that many
+        syncs can share one event loop; only saving the results runs on a
+        thread, as Django's database calls must.
+        """
+        if cache and not ExternalSync.is_stale(profile):
+            msg = (
+                f"External data sync is already synced for "
+                f"{profile.username}. Using cached version."
             )
             logger.info(msg)
+            return profile.is_member_of
 
         logger.info("Syncing external data for %s", profile.username)
 
+        class_list = ExternalSync._class_list(class_list)
+
+        results = await ExternalSync._afetch_classes(
+            [class_name for class_name, _ in class_list],
+            [profile.email, *profile.emails],
+        )
+
+        is_member_of, _ = await sync_to_async(ExternalSync._apply_results)(
+            profile, class_list, results, webhooks and send_webhook
+        )
+
+        return is_member_of
+
+    @staticmethod
+    def _class_list(class_list):
         class_list = (
             class_list if class_list else settings.EXTERNAL_SYNC_CLASSES
         )
@@ -81,109 +155,215 @@ class ExternalSync:
         if not isinstance(class_list, list):
             class_list = [class_list]
 
+        return class_list
+
+    @staticmethod
+    def _apply_results(profile, class_list, results, send_webhook):
+        """
+        Store the partners' answers on the profile and its roles
+
+        :param results: the (sync_id, is_member, groups) or None by class
+            name
+        :return: (memberships, complete)
+        """
         try:
-            is_member_of = json.loads(
+            is_member_of = fast_json.loads(
                 profile.is_member_of if profile.is_member_of else "{}"
             )
-        except TypeError:
+        except (TypeError, fast_json.JSONDecodeError):
             is_member_of = {}
 
-        # ruff: noqa: B007
-        for class_name, role_organization in class_list:
-            class_to_use: SyncClass = CLASS_LOOKUPS[class_name]
-
-            # see whether the Profile has an ID for this class
-            sync_ids = json.loads(
+        # see whether the Profile has an ID for each class
+        try:
+            sync_ids = fast_json.loads(
                 profile.external_sync_ids
                 if profile.external_sync_ids
                 else "{}"
             )
+        except (TypeError, fast_json.JSONDecodeError):
+            sync_ids = {}
 
-            in_membership_groups = json.loads(
+        try:
+            in_membership_groups = fast_json.loads(
                 profile.in_membership_groups
                 if profile.in_membership_groups
                 else "{}"
             )
+        except (TypeError, fast_json.JSONDecodeError):
+            in_membership_groups = {}
 
-            try:
-                ExternalSync._sync_class(
-                    class_name,
-                    class_to_use,
-                    in_membership_groups,
-                    is_member_of,
-                    profile,
-                    role_organization,
-                    sync_ids,
-                )
+        # apply the results in the order of class_list, whatever order the
+        # partners answered in, so the stored JSON is the same either way
+        complete = True
+        for class_name, role_organization in class_list:
+            result = results[class_name]
+
+            if result is None:
+                # keep what we last knew until the next sync
+                complete = False
+                continue
+
+            ExternalSync._apply_class_result(
+                class_name,
+                result,
+                in_membership_groups,
+                is_member_of,
+                profile,
+                role_organization,
+                sync_ids,
+            )
 
-            finally:
-                profile.external_sync_ids = json.dumps(sync_ids)
-                profile.in_membership_groups = json.dumps(in_membership_groups)
+        profile.external_sync_ids = fast_json.dumps(sync_ids)
+        profile.in_membership_groups = fast_json.dumps(in_membership_groups)
 
         # now iterate over roles for known organizations
         ExternalSync._handle_comanage_roles(is_member_of, profile)
 
-        profile.is_member_of = json.dumps(is_member_of)
-        profile.last_sync = datetime.datetime.now(tz=datetime.UTC)
-        profile.save()
+        profile.is_member_of = fast_json.dumps(is_member_of)
+        profile.last_sync = ExternalSync._synced_at(complete)
+
+        with transaction.atomic():
+            profile.save()
 
-        if webhooks:
-            ExternalSync._send_webhooks(profile, send_webhook)
+            if send_webhook:
+                queue_subscriber_webhooks(profile.username)
 
         logger.info("Roles are now %s", profile.is_member_of)
 
-        return is_member_of
+        return is_member_of, complete
+
+    @staticmethod
+    def _synced_at(complete):
+        """
+        The last_sync to record for a sync
+
+        A sync that skipped a partner is dated back so that the profile
+        goes stale again EXTERNAL_SYNC_RETRY_MINUTES from now, rather than
+        after SYNC_HOURS or (if it stayed stale) on the very next request.
+        """
+        now = datetime.datetime.now(tz=datetime.UTC)
+
+        if complete:
+            return now
+
+        fresh_for = datetime.timedelta(hours=settings.SYNC_HOURS)
+        retry = min(
+            datetime.timedelta(minutes=settings.EXTERNAL_SYNC_RETRY_MINUTES),
+            fresh_for,
+        )
+
+        return now - fresh_for + retry
+
+    @staticmethod
+    def prefetch(profiles, class_list=None) -> None:
+        """
+        Look many profiles up at once in the partners that support bulk
+        searches, before syncing them one by one
+
+        The partners cache each email's result, so the searches that
+        sync() then makes are answered from the cache, and a batch of
+        profiles costs one call per batch of emails rather than one per
+        email. A failure here is only logged: sync() searches again.
+        """
+        class_list = (
+            class_list if class_list else settings.EXTERNAL_SYNC_CLASSES
+        )
+        emails_by_username = {
+            profile.username: [profile.email, *profile.emails]
+            for profile in profiles
+        }
+
+        if not emails_by_username:
+            return
+
+        for class_name, _ in class_list:
+            class_to_use: SyncClass = CLASS_LOOKUPS[class_name]
+
+            if not class_to_use.supports_bulk_search:
+                continue
+
+            try:
+                class_to_use.search_bulk(emails_by_username)
+            except Exception:
+                logger.exception(
+                    "Bulk search of %s failed for %s profiles",
+                    class_name,
+                    len(emails_by_username),
+                )
+
+    @staticmethod
+    def is_stale(profile: models.Profile) -> bool:
+        """
+        Whether the profile's external data is older than
+        settings.SYNC_HOURS (or has never been synced)
+        """
+        try:
+            return (
+                not profile.last_sync
+                or (
+                    datetime.datetime.now(tz=datetime.UTC) - profile.last_sync
+                ).total_seconds()
+                >= settings.SYNC_HOURS * 60 * 60
+            )
+        except TypeError:
+            msg = (
+                f"Not caching external data sync for {profile.username} "
+                f"due to an error."
+            )
+            logger.info(msg)
+            return True
 
     @staticmethod
     def notify_subscribers(profile: Profile) -> None:
         """Ping ``settings.WEBHOOK_URLS`` so downstream services
         (BuddyPress) re-fetch this profile's memberships. Per-user signal
         — the webhook URL takes ``?username=…``, so the caller must fire
-        it once per affected profile."""
-        ExternalSync._send_webhooks(profile, send_webhook=True)
+        it once per affected profile. The pings go through the outbox."""
+        queue_subscriber_webhooks(profile.username)
 
     @staticmethod
-    def _send_webhooks(profile: Profile, send_webhook):
-        if send_webhook:
-            # send a ping to other services
-            for url in settings.WEBHOOK_URLS:
-                try:
-                    r = requests.get(
-                        url,
-                        params={
-                            "username": profile.username,
-                        },
-                        headers={
-                            "Content-Type": "application/json",
-                            "Authorization": "Bearer "
-                            + settings.WEBHOOK_TOKEN,
-                        },
-                        timeout=8,  # 8 seconds to ping
-                    )
-                    msg = (
-                        f"Webhook request update sent to {url} for "
-                        f"user {profile.username}"
-                    )
-                    logger.info(msg)
-
-                    if not r.ok:
-                        # Log the status only, never the response/URL:
-                        # the request URL can carry query params and we
-                        # must not emit secrets to the logs.
-                        logger.error(
-                            "Webhook to %s for user %s returned %s %s",
-                            url,
-                            profile.username,
-                            r.status_code,
-                            r.reason,
-                        )
-
-                except (RequestException, TypeError):
-                    logger.exception(
-                        "Failed to send webhook to %s for user %s",
-                        url,
-                        profile.username,
-                    )
+    def ping_subscriber(url: str, username: str) -> bool:
+        """Ping one subscriber about one user, over the shared keep-alive
+        session for its host
+
+        :return: True if the subscriber answered with a success status
+        """
+        try:
+            r = http_pool.session_for(url).get(
+                url,
+                params={
+                    "username": username,
+                },
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": "Bearer " + settings.WEBHOOK_TOKEN,
+                },
+                timeout=8,  # 8 seconds to ping
+            )
+            msg = f"Webhook request update sent to {url} for user {username}"
+            logger.info(msg)
+
+            if not r.ok:
+                # Log the status only, never the response/URL: the request
+                # URL can carry query params and we must not emit secrets to
+                # the logs.
+                logger.error(
+                    "Webhook to %s for user %s returned %s %s",
+                    url,
+                    username,
+                    r.status_code,
+                    r.reason,
+                )
+
+        except (RequestException, TypeError):
+            logger.exception(
+                "Failed to send webhook to %s for user %s",
+                url,
+                username,
+            )
+            return False
+
+        return r.ok
 
     @staticmethod
     def refresh_local_memberships(profile: Profile) -> dict:
@@ -200,13 +380,13 @@ class ExternalSync:
         ``settings.KNOWN_SOCIETY_MAPPINGS`` are recomputed from roles.
         """
         try:
-            is_member_of = json.loads(profile.is_member_of or "{}")
-        except (TypeError, json.JSONDecodeError):
+            is_member_of = fast_json.loads(profile.is_member_of or "{}")
+        except (TypeError, fast_json.JSONDecodeError):
             is_member_of = {}
 
         ExternalSync._handle_comanage_roles(is_member_of, profile)
 
-        profile.is_member_of = json.dumps(is_member_of)
+        profile.is_member_of = fast_json.dumps(is_member_of)
         profile.save(update_fields=["is_member_of"])
 
         return is_member_of
@@ -235,38 +415,149 @@ class ExternalSync:
                 for role in roles
             )
 
+    @staticmethod
+    def _fetch_class(class_name: str, emails: list[str]):
+        """
+        Look a user up in one partner API
+
+        This makes only HTTP (and cache) calls, never database queries, so
+        that it can run on the partner sync pool.
+
+        :return: (sync_id, is_member, groups)
+        """
+        class_to_use: SyncClass = CLASS_LOOKUPS[class_name]
+
+        # see whether we can find a sync ID for this user
+        search_by_email = class_to_use.search_multiple(emails=emails)
+
+        sync_id = class_to_use.get_sync_id(search_by_email[class_name])
+
+        if not sync_id:
+            return sync_id, False, []
+
+        logger.info("Syncing %s for %s", class_name, sync_id)
+
+        return (
+            sync_id,
+            class_to_use.is_member(sync_id),
+            class_to_use.groups(sync_id),
+        )
+
+    @staticmethod
+    def _fetch_classes(
+        class_names: list[str], emails: list[str], deadline=None
+    ):
+        """
+        Look a user up in several partner APIs concurrently
+
+        Each lookup that fails, or has not finished within deadline
+        seconds (by default settings.EXTERNAL_SYNC_DEADLINE), gives None,
+        so one slow or broken partner does not hold up or break the others.
+
+        :return: the (sync_id, is_member, groups) or None by class name
+        """
+        if deadline is None:
+            deadline = settings.EXTERNAL_SYNC_DEADLINE
+
+        def fetch(class_name):
+            try:
+                return ExternalSync._fetch_class(class_name, emails)
+            except Exception:
+                count_api_error(class_name)
+                logger.exception("External sync of %s failed", class_name)
+                return None
+
+        def missed_deadline(class_name):
+            count_api_error(class_name)
+            logger.warning(
+                "External sync of %s missed the %ss deadline",
+                class_name,
+                deadline,
+            )
+
+        results = http_pool.fan_out(
+            fetch,
+            class_names,
+            missed_deadline,
+            deadline=deadline,
+            pool=http_pool.PARTNER_SYNC_POOL,
+        )
+
+        return dict(zip(class_names, results, strict=True))
+
+    @staticmethod
+    async def _afetch_class(class_name: str, emails: list[str]):
+        """
+        _fetch_class() for async code
+
+        :return: (sync_id, is_member, groups)
+        """
+        class_to_use: SyncClass = CLASS_LOOKUPS[class_name]
+
+        search_by_email = await class_to_use.asearch_multiple(emails=emails)
+
+        sync_id = class_to_use.get_sync_id(search_by_email[class_name])
+
+        if not sync_id:
+            return sync_id, False, []
+
+        logger.info("Syncing %s for %s", class_name, sync_id)
+
+        # awaited in turn, straight after the search, since UP reads the
+        # Contacts that its search found
+        is_member = await class_to_use.ais_member(sync_id)
+        groups = await class_to_use.agroups(sync_id)
+
+        return sync_id, is_member, groups
+
+    @staticmethod
+    async def _afetch_classes(class_names: list[str], emails: list[str]):
+        """
+        _fetch_classes() for async code
+
+        :return: the (sync_id, is_member, groups) or None by class name
+        """
+
+        async def fetch(class_name):
+            try:
+                return await asyncio.wait_for(
+                    ExternalSync._afetch_class(class_name, emails),
+                    timeout=settings.EXTERNAL_SYNC_DEADLINE,
+                )
+            except TimeoutError:
+                count_api_error(class_name)
+                logger.warning(
+                    "External sync of %s missed the %ss deadline",
+                    class_name,
+                    settings.EXTERNAL_SYNC_DEADLINE,
+                )
+            except Exception:
+                count_api_error(class_name)
+                logger.exception("External sync of %s failed", class_name)
+
+            return None
+
+        results = await asyncio.gather(*map(fetch, class_names))
+
+        return dict(zip(class_names, results, strict=True))
+
     # ruff: noqa: PLR0913
     @staticmethod
-    def _sync_class(
+    def _apply_class_result(
         class_name,
-        class_to_use: SyncClass,
+        result,
         in_membership_groups,
         is_member_of: dict[Any, Any] | Any,
         profile: Profile,
         role_organization,
         sync_ids,
     ):
-        sync_id = sync_ids.get(class_name, None)
-
-        email_list = [profile.email, *profile.emails]
-
-        # see whether we can find a sync ID for this user
-        search_by_email = class_to_use.search_multiple(emails=email_list)
-
-        sync_id = class_to_use.get_sync_id(search_by_email[class_name])
+        sync_id, is_member, groups = result
 
         # save the sync ID for future use
         sync_ids[class_name] = sync_id
-
-        if sync_id:
-            msg = f"Syncing {class_name} for {sync_id} on {profile.username}"
-            logger.info(msg)
-
-            is_member_of[class_name] = class_to_use.is_member(sync_id)
-            in_membership_groups[class_name] = class_to_use.groups(sync_id)
-        else:
-            is_member_of[class_name] = False
-            in_membership_groups[class_name] = []
+        is_member_of[class_name] = is_member
+        in_membership_groups[class_name] = groups
 
         # now update roles
         roles = Role.objects.filter(person__user__username=profile.username)
@@ -0,0 +1,248 @@
+"""
+A Postgres-backed queue of external membership refreshes
+
+ExternalSync.sync calls the partner APIs, with long timeouts, and
+then pings the webhook subscribers. Rather than doing that inside a REST
+GET, ProfileDetailView serves the stored memberships and calls
+enqueue_external_sync(); the run_sync_worker command, running in its own
+process, claims queued jobs and runs them.
+
+Jobs are de-duplicated by a partial unique index: a profile has at most one
+pending job however many requests find it stale, and queuing another is an
+INSERT ... ON CONFLICT DO NOTHING. Workers claim jobs with SELECT ... FOR
+UPDATE SKIP LOCKED so that several can run side by side. Jobs that used up
+their attempts are kept for FAILED_RETENTION for inspection, then deleted.
+
+Before a batch of jobs runs, the stale profiles in it are looked up
+together with ExternalSync.prefetch(), so a partner that supports bulk
+searches is called once for the batch rather than once per email.
+"""
+
+import datetime
+import logging
+import time
+
+import django.db
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Q
+from django.utils import timezone
+
+from knowledge_commons_profiles.cilogon.sync_apis import salesforce_token
+from knowledge_commons_profiles.newprofile.models import ExternalSyncJob
+from knowledge_commons_profiles.newprofile.models import ExternalSyncJobStatus
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api.sync import ExternalSync
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH_SIZE = 10
+
+MAX_ATTEMPTS = 3
+
+# retry a failed job after this long, multiplied by the attempts so far
+RETRY_BACKOFF = datetime.timedelta(minutes=5)
+
+# a job that has been running this long belongs to a worker that died
+STALE_RUNNING = datetime.timedelta(minutes=15)
+
+# keep failed jobs this long, then delete them
+FAILED_RETENTION = datetime.timedelta(days=7)
+
+# seconds between the worker's deletions of old failed jobs
+PRUNE_INTERVAL = 3600
+
+
+def enqueue_external_sync(profile):
+    """
+    Queue a refresh of the profile's external memberships, unless one is
+    already pending
+    """
+    ExternalSyncJob.objects.bulk_create(
+        [ExternalSyncJob(username=profile.username)], ignore_conflicts=True
+    )
+
+
+def prune_failed_jobs():
+    """
+    Delete failed jobs older than FAILED_RETENTION
+
+    :return: the number of jobs deleted
+    """
+    deleted, _ = ExternalSyncJob.objects.filter(
+        status=ExternalSyncJobStatus.FAILED,
+        run_after__lt=timezone.now() - FAILED_RETENTION,
+    ).delete()
+
+    if deleted:
+        logger.info("Deleted %s old failed external syncs", deleted)
+
+    return deleted
+
+
+def claim_jobs(limit=CLAIM_BATCH_SIZE):
+    """
+    Mark up to limit runnable jobs as running and return them
+
+    A job left running by a dead worker is claimed again, unless it has
+    used up its attempts, in which case it is marked failed: a profile
+    whose sync kills the worker must not do so forever.
+    """
+    now = timezone.now()
+    abandoned = Q(
+        status=ExternalSyncJobStatus.RUNNING, started__lt=now - STALE_RUNNING
+    )
+
+    with transaction.atomic():
+        given_up = ExternalSyncJob.objects.filter(
+            abandoned, attempts__gte=MAX_ATTEMPTS
+        ).update(
+            status=ExternalSyncJobStatus.FAILED,
+            last_error="abandoned by a worker that stopped",
+        )
+        if given_up:
+            logger.error(
+                "Giving up on %s external syncs abandoned after %s attempts",
+                given_up,
+                MAX_ATTEMPTS,
+            )
+
+        jobs = list(
+            ExternalSyncJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ExternalSyncJobStatus.PENDING, run_after__lte=now)
+                | abandoned
+            )
+            .order_by("run_after", "id")[:limit]
+        )
+
+        ExternalSyncJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=ExternalSyncJobStatus.RUNNING,
+            started=now,
+            attempts=F("attempts") + 1,
+        )
+
+    for job in jobs:
+        job.attempts += 1
+
+    return jobs
+
+
+def _job_failed(job, error):
+    """
+    Requeue a failed job with a backoff, or give up on it
+    """
+    if job.attempts >= MAX_ATTEMPTS:
+        ExternalSyncJob.objects.filter(id=job.id).update(
+            status=ExternalSyncJobStatus.FAILED, last_error=error
+        )
+        logger.error(
+            "Giving up on external sync for %s after %s attempts: %s",
+            job.username,
+            job.attempts,
+            error,
+        )
+        return
+
+    try:
+        with transaction.atomic():
+            ExternalSyncJob.objects.filter(id=job.id).update(
+                status=ExternalSyncJobStatus.PENDING,
+                run_after=timezone.now() + RETRY_BACKOFF * job.attempts,
+                last_error=error,
+            )
+    except IntegrityError:
+        # a new job was queued for this profile while this one ran
+        ExternalSyncJob.objects.filter(id=job.id).delete()
+
+
+def run_job(job):
+    """
+    Run one claimed job
+
+    :return: True if the sync succeeded
+    """
+    try:
+        profile = Profile.objects.get(username=job.username)
+    except Profile.DoesNotExist:
+        ExternalSyncJob.objects.filter(id=job.id).delete()
+        return False
+
+    try:
+        # another job may already have refreshed the profile, in which case
+        # the SYNC_HOURS check makes this a no-op
+        ExternalSync.sync(profile=profile)
+    except django.db.utils.OperationalError:
+        raise
+    except Exception as exc:  # noqa: BLE001
+        _job_failed(job, str(exc))
+        return False
+
+    ExternalSyncJob.objects.filter(id=job.id).delete()
+    return True
+
+
+def run_pending(limit=CLAIM_BATCH_SIZE):
+    """
+    Claim and run one batch of jobs
+
+    :return: a dict of counts
+    """
+    counts = {"claimed": 0, "synced": 0, "failed": 0}
+
+    jobs = claim_jobs(limit)
+
+    if jobs:
+        ExternalSync.prefetch(
+            profile
+            for profile in Profile.objects.filter(
+                username__in=[job.username for job in jobs]
+            )
+            if ExternalSync.is_stale(profile)
+        )
+
+    for job in jobs:
+        counts["claimed"] += 1
+        if run_job(job):
+            counts["synced"] += 1
+        else:
+            counts["failed"] += 1
+
+    return counts
+
+
+def run_worker(poll_interval=5, batch_size=CLAIM_BATCH_SIZE, should_stop=None):
+    """
+    Run jobs until should_stop() returns True, sleeping for poll_interval
+    seconds whenever the queue is empty
+
+    :return: a dict of counts
+    """
+    totals = {"claimed": 0, "synced": 0, "failed": 0}
+    should_stop = should_stop or (lambda: False)
+    next_prune = 0
+
+    while not should_stop():
+        django.db.close_old_connections()
+
+        # keep the shared partner token fresh even when nothing is queued
+        salesforce_token.refresh_if_due()
+
+        try:
+            if time.monotonic() >= next_prune:
+                prune_failed_jobs()
+                next_prune = time.monotonic() + PRUNE_INTERVAL
+
+            counts = run_pending(batch_size)
+        except django.db.utils.OperationalError:
+            logger.warning("Database unavailable, sync worker waiting")
+            counts = {"claimed": 0}
+
+        for key, value in counts.items():
+            totals[key] += value
+
+        if not counts["claimed"]:
+            time.sleep(poll_interval)
+
+    return totals
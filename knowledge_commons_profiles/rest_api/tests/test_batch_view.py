@@ -0,0 +1,109 @@
+"""
+Tests for the batch member-detail endpoint.
+"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from knowledge_commons_profiles.newprofile.models import GroupMembershipMirror
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api.serializers.serializers import (
+    MAX_BATCH_USERNAMES,
+)
+from knowledge_commons_profiles.rest_api.serializers.serializers import (
+    ProfileBatchSerializer,
+)
+from knowledge_commons_profiles.rest_api.views import ProfileBatchView
+
+
+@override_settings(
+    EXTERNAL_SYNC_IN_BACKGROUND=False,
+    GROUP_MEMBERSHIP_MIRROR_ENABLED=True,
+)
+class ProfileBatchViewTests(TestCase):
+    def setUp(self):
+        for number in range(4):
+            username = f"member{number}"
+            Profile.objects.create(
+                username=username,
+                name=f"Member {number}",
+                email=f"{username}@example.com",
+                profile_image="/media/avatar.png",
+            )
+            for group_id, group_status in ((10, "public"), (20, "private")):
+                GroupMembershipMirror.objects.create(
+                    id=number * 100 + group_id,
+                    wp_user_id=number,
+                    username=username,
+                    group_id=group_id,
+                    group_name=f"Group {group_id}",
+                    group_slug=f"group-{group_id}",
+                    group_status=group_status,
+                    role="member",
+                    is_confirmed=True,
+                    date_modified=timezone.now(),
+                )
+
+    def _post(self, usernames):
+        request = APIRequestFactory().post(
+            "/api/v1/members/batch/",
+            {"usernames": usernames},
+            format="json",
+        )
+        return ProfileBatchView.as_view()(request)
+
+    def test_returns_map_keyed_by_username(self):
+        response = self._post(["member0", "member1", "nobody", "member0"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data["results"]), {"member0", "member1"})
+        self.assertEqual(response.data["not_found"], ["nobody"])
+
+        member = response.data["results"]["member1"]
+        self.assertEqual(member["name"], "Member 1")
+        self.assertNotIn("email", member)
+        # anonymous requests only see public groups
+        self.assertEqual(
+            [group["id"] for group in member["groups"]],
+            [10],
+        )
+
+    def test_usernames_match_in_any_case(self):
+        response = self._post(["Member0", "member0", "MEMBER1", "Nobody"])
+
+        self.assertEqual(set(response.data["results"]), {"Member0", "MEMBER1"})
+        self.assertEqual(
+            response.data["results"]["MEMBER1"]["name"], "Member 1"
+        )
+        self.assertEqual(response.data["not_found"], ["Nobody"])
+
+    def test_usernames_differing_only_in_case_are_asked_once(self):
+        batch = ProfileBatchSerializer(
+            data={"usernames": [" Alice", "alice", "ALICE ", "bob"]}
+        )
+
+        self.assertTrue(batch.is_valid())
+        self.assertEqual(batch.validated_data["usernames"], ["Alice", "bob"])
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        with CaptureQueriesContext(connection) as two:
+            self._post(["member0", "member1"])
+
+        with CaptureQueriesContext(connection) as four:
+            self._post(["member0", "member1", "member2", "member3"])
+
+        self.assertEqual(len(two), len(four))
+
+    def test_rejects_oversized_batches(self):
+        response = self._post(
+            [f"user{number}" for number in range(MAX_BATCH_USERNAMES + 1)]
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_empty_batches(self):
+        self.assertEqual(self._post([]).status_code, 400)
@@ -0,0 +1,231 @@
+"""
+Tests for ETag and Last-Modified handling on the REST detail views.
+"""
+
+import datetime
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from knowledge_commons_profiles.newprofile.models import ExternalSyncJob
+from knowledge_commons_profiles.newprofile.models import GroupMembershipMirror
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api import conditional
+from knowledge_commons_profiles.rest_api import views
+from knowledge_commons_profiles.rest_api.views import GroupDetailView
+from knowledge_commons_profiles.rest_api.views import ProfileDetailView
+
+
+@override_settings(
+    EXTERNAL_SYNC_IN_BACKGROUND=True,
+    GROUP_MEMBERSHIP_MIRROR_ENABLED=True,
+    SYNC_HOURS=24,
+)
+class ProfileConditionalTests(TestCase):
+    def setUp(self):
+        self.profile = Profile.objects.create(
+            username="etag", name="E", last_sync=timezone.now()
+        )
+
+    def _get(self, **headers):
+        request = APIRequestFactory().get("/api/v1/members/etag/", **headers)
+        with patch.object(
+            ProfileDetailView,
+            "get_serializer",
+            return_value=MagicMock(data={"username": "etag"}),
+        ) as mock_serializer:
+            response = ProfileDetailView.as_view()(request, user_name="etag")
+        return response, mock_serializer
+
+    def test_full_response_carries_version_headers(self):
+        response, _ = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+        self.assertIn("Authorization", response["Vary"])
+
+    def test_matching_etag_skips_serializer_and_sync_check(self):
+        Profile.objects.filter(pk=self.profile.pk).update(last_sync=None)
+        etag = self._get()[0]["ETag"]
+        ExternalSyncJob.objects.all().delete()
+
+        response, mock_serializer = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        mock_serializer.assert_not_called()
+        self.assertFalse(ExternalSyncJob.objects.exists())
+
+    def test_profile_save_changes_etag(self):
+        etag = self._get()[0]["ETag"]
+
+        self.profile.about_user = "updated"
+        self.profile.save(update_fields=["about_user"])
+
+        response, _ = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_group_membership_change_changes_etag(self):
+        etag = self._get()[0]["ETag"]
+
+        GroupMembershipMirror.objects.create(
+            id=1,
+            wp_user_id=1,
+            username="etag",
+            group_id=5,
+            group_name="Group",
+            group_slug="group",
+            group_status="public",
+            role="member",
+            is_confirmed=True,
+            date_modified=timezone.now(),
+        )
+
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag)[0].status_code, 200)
+
+    def test_current_if_modified_since_is_not_modified(self):
+        response, _ = self._get()
+
+        response, _ = self._get(
+            HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_avatar_on_disk_changes_etag(self):
+        media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        avatars = media_root / "avatars" / "42"
+        avatars.mkdir(parents=True)
+        (avatars / "old-bpfull.jpg").touch()
+        Profile.objects.filter(pk=self.profile.pk).update(central_user_id=42)
+
+        with override_settings(WP_MEDIA_ROOT=str(media_root)):
+            etag = self._get()[0]["ETag"]
+            (avatars / "old-bpfull.jpg").unlink()
+            (avatars / "new-bpfull.jpg").touch()
+
+            response, _ = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_access_level(self):
+        self.assertNotEqual(
+            conditional.profile_version(self.profile, has_full_access=True)[0],
+            conditional.profile_version(self.profile, has_full_access=False)[0],
+        )
+
+    def test_superadmin_toggle_changes_etag(self):
+        user = User.objects.create(username="etag")
+        etag = self._get()[0]["ETag"]
+
+        user.is_superuser = user.is_staff = True
+        user.save()
+
+        self.assertEqual(
+            self._get(HTTP_IF_NONE_MATCH=etag)[0].status_code, 200
+        )
+
+
+@override_settings(GROUP_MEMBERSHIP_MIRROR_ENABLED=False)
+class ProfileWordPressGroupsVersionTests(TestCase):
+    def setUp(self):
+        self.profile = Profile.objects.create(
+            username="wpgroups", name="W", last_sync=timezone.now()
+        )
+
+    def _version(self, status):
+        rows = [(3, timezone.now(), "Group", "group", status)]
+        with patch.object(conditional, "WpBpGroupMember") as mock_member:
+            mock_member.objects.filter.return_value.values_list.return_value = (
+                rows
+            )
+            return conditional.profile_version(
+                self.profile, has_full_access=False
+            )
+
+    def test_group_status_change_changes_etag(self):
+        self.assertNotEqual(
+            self._version("public")[0], self._version("private")[0]
+        )
+
+    def test_no_last_modified_without_a_group_change_time(self):
+        self.assertIsNone(self._version("public")[1])
+
+
+class ProfileRevisionTests(TestCase):
+    def test_every_save_bumps_revision(self):
+        profile = Profile.objects.create(username="rev", name="R")
+        first = profile.revision
+
+        profile.save(update_fields=["name"])
+        profile.refresh_from_db()
+
+        self.assertEqual(profile.revision, first + 1)
+        self.assertIsNotNone(profile.modified)
+
+
+@override_settings(GROUP_MEMBERSHIP_MIRROR_ENABLED=False)
+class GroupConditionalTests(TestCase):
+    def setUp(self):
+        self.group = {
+            "id": 7,
+            "name": "Group",
+            "slug": "group",
+            "status": "public",
+            "description": "A group",
+            "date_created": timezone.now() - datetime.timedelta(days=1),
+            "avatar": "",
+            "groupblog": "https://blog.example.org/",
+            "society_id": "",
+        }
+
+    def _get(self, **headers):
+        request = APIRequestFactory().get("/api/v1/groups/7/", **headers)
+        with (
+            patch.object(views, "get_group_metadata", return_value=self.group),
+            patch.object(
+                GroupDetailView,
+                "get_serializer",
+                return_value=MagicMock(data={"id": 7}),
+            ) as mock_serializer,
+        ):
+            response = GroupDetailView.as_view()(request, pk=7)
+        return response, mock_serializer
+
+    def test_matching_etag_skips_serializer(self):
+        etag = self._get()[0]["ETag"]
+
+        response, mock_serializer = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        mock_serializer.assert_not_called()
+
+    def test_renamed_group_changes_etag(self):
+        etag = self._get()[0]["ETag"]
+        self.group["name"] = "Renamed"
+
+        response, _ = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"results": {"id": 7}})
+
+    def test_new_avatar_changes_etag(self):
+        etag = self._get()[0]["ETag"]
+        self.group["avatar"] = "https://example.org/avatars/7/new.jpg"
+
+        response, _ = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
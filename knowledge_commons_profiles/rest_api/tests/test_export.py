@@ -0,0 +1,110 @@
+"""
+Tests for the streaming NDJSON profile export.
+"""
+
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from knowledge_commons_profiles.newprofile.models import AcademicInterest
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api.authentication import (
+    StaticBearerAuthentication,
+)
+from knowledge_commons_profiles.rest_api.export import ExportStats
+from knowledge_commons_profiles.rest_api.export import iter_profile_lines
+from knowledge_commons_profiles.rest_api.views import ProfileExportView
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        interest = AcademicInterest.objects.create(text="Poetry")
+        for number in range(5):
+            profile = Profile.objects.create(
+                username=f"export{number}", name=f"Export {number}"
+            )
+            profile.academic_interests.add(interest)
+
+    def test_one_line_per_profile_in_username_order(self):
+        stats = ExportStats()
+
+        lines = b"".join(iter_profile_lines(chunk_size=2, stats=stats))
+        rows = [json.loads(line) for line in lines.splitlines()]
+
+        self.assertEqual(
+            [row["username"] for row in rows],
+            [f"export{number}" for number in range(5)],
+        )
+        self.assertEqual(rows[0]["academic_interests"][0]["text"], "Poetry")
+        self.assertEqual(stats.profiles, 5)
+        self.assertIsNotNone(stats.finished)
+
+    def test_prefetches_once_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in iter_profile_lines(chunk_size=2):
+                pass
+
+        # the profiles, then academic interests for each of three chunks
+        self.assertEqual(len(queries), 4)
+
+    def test_command_writes_gzip_file(self):
+        out = StringIO()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "profiles.ndjson.gz"
+            call_command(
+                "export_profiles", "--output", str(path), "--gzip", stdout=out
+            )
+            with gzip.open(path) as export:
+                rows = [json.loads(line) for line in export]
+
+        self.assertEqual(len(rows), 5)
+        self.assertIn("Exported 5 profiles", out.getvalue())
+        self.assertIn("profiles/s", out.getvalue())
+
+
+@override_settings(STATIC_API_BEARER="export-token")
+@patch.object(StaticBearerAuthentication, "static_token", "export-token")
+class ExportViewTests(TestCase):
+    def setUp(self):
+        Profile.objects.create(username="streamed", name="S")
+
+    def _get(self, **headers):
+        request = APIRequestFactory().get(
+            "/api/v1/members/export/",
+            HTTP_AUTHORIZATION="Bearer export-token",
+            **headers,
+        )
+        return ProfileExportView.as_view()(request)
+
+    def test_streams_ndjson(self):
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        body = b"".join(response.streaming_content)
+        self.assertEqual(json.loads(body)["username"], "streamed")
+
+    def test_gzip_when_accepted(self):
+        response = self._get(HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = gzip.decompress(b"".join(response.streaming_content))
+        self.assertEqual(json.loads(body)["username"], "streamed")
+
+    def test_requires_token(self):
+        request = APIRequestFactory().get("/api/v1/members/export/")
+
+        response = ProfileExportView.as_view()(request)
+
+        self.assertIn(response.status_code, (401, 403))
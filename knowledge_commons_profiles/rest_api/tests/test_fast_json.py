@@ -0,0 +1,136 @@
+"""
+Tests for the orjson-backed JSON helpers, renderer and parser
+"""
+
+import datetime
+import io
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from knowledge_commons_profiles.common import fast_json
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api.parsers import FastJSONParser
+from knowledge_commons_profiles.rest_api.renderers import FastJSONRenderer
+
+DATA = {
+    "name": "Zo\u00eb \u2028 test",
+    "amount": Decimal("1.50"),
+    "when": datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.UTC),
+    "label": gettext_lazy("Public"),
+    "nested": [{"a": 1, "b": None}, True],
+    3: "int key",
+}
+
+
+class FastJSONTests(SimpleTestCase):
+    def test_round_trip(self):
+        encoded = fast_json.dumps({"MLA": True, "UP": False})
+
+        self.assertIsInstance(encoded, str)
+        self.assertEqual(fast_json.loads(encoded), {"MLA": True, "UP": False})
+        self.assertEqual(
+            fast_json.loads(fast_json.dumpb({"a": [1]})), {"a": [1]}
+        )
+
+    def test_decode_errors_are_json_decode_errors(self):
+        with self.assertRaises(fast_json.JSONDecodeError):
+            fast_json.loads("{not json")
+
+    def test_standard_library_fallback(self):
+        with patch.object(fast_json, "orjson", None):
+            self.assertFalse(fast_json.available())
+            self.assertEqual(
+                fast_json.loads(fast_json.dumps(DATA))["3"], "int key"
+            )
+
+
+class RendererTests(SimpleTestCase):
+    def test_output_matches_drf(self):
+        self.assertEqual(
+            FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+
+    @skipUnless(fast_json.available(), "needs orjson")
+    def test_float_formatting_differs_from_drf(self):
+        data = {"large": 1e16, "small": 1e-7}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), b'{"large":1e16,"small":1e-7}'
+        )
+        self.assertEqual(
+            fast_json.loads(FastJSONRenderer().render(data)),
+            fast_json.loads(JSONRenderer().render(data)),
+        )
+
+    @skipUnless(fast_json.available(), "needs orjson")
+    def test_non_finite_floats_are_written_as_null(self):
+        data = {"nan": float("nan"), "inf": float("inf")}
+
+        self.assertEqual(
+            FastJSONRenderer().render(data), b'{"nan":null,"inf":null}'
+        )
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+
+    def test_indent_falls_back_to_drf(self):
+        media_type = "application/json; indent=4"
+
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type),
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+class ParserTests(SimpleTestCase):
+    def test_parses_like_drf(self):
+        body = JSONRenderer().render({"usernames": ["a", "zoë"]})
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+
+    def test_invalid_json_is_a_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b"{oops"))
+
+    def test_other_encodings_fall_back_to_drf(self):
+        body = '{"name": "zoë"}'.encode("latin-1")
+
+        data = FastJSONParser().parse(
+            io.BytesIO(body), parser_context={"encoding": "latin-1"}
+        )
+
+        self.assertEqual(data, {"name": "zoë"})
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_reports_render_and_parse_timings(self):
+        Profile.objects.create(username="bench", name="B")
+        out = StringIO()
+
+        call_command(
+            "benchmark_json",
+            "--page-size",
+            "5",
+            "--iterations",
+            "2",
+            stdout=out,
+        )
+
+        self.assertIn("Page of 5 profiles", out.getvalue())
+        self.assertIn("render:", out.getvalue())
+        self.assertIn("parse:", out.getvalue())
@@ -1,7 +1,9 @@
 import unittest
 
+from django.test import SimpleTestCase
 from pydantic import ValidationError
 
+from knowledge_commons_profiles.rest_api import idms_api
 from knowledge_commons_profiles.rest_api.idms_api import APIClientConfig
 
 
@@ -39,3 +41,20 @@ class TestAPIClientConfigBaseURLScheme(unittest.TestCase):
     def test_base_url_still_rejects_garbage(self):
         with self.assertRaises(ValidationError):
             APIClientConfig(base_url="not a url at all")
+
+
+class TestSharedClients(SimpleTestCase):
+    def tearDown(self):
+        idms_api.close_clients()
+
+    def test_one_client_per_endpoint(self):
+        first = idms_api.get_client("https://works.example/")
+
+        self.assertIs(idms_api.get_client("https://works.example/"), first)
+        self.assertIsNot(idms_api.get_client("https://other.example/"), first)
+
+    def test_close_clients_starts_afresh(self):
+        first = idms_api.get_client("https://works.example/")
+        idms_api.close_clients()
+
+        self.assertIsNot(idms_api.get_client("https://works.example/"), first)
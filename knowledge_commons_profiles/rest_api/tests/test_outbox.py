@@ -0,0 +1,330 @@
+"""
+Tests for the outbox of outbound calls and its dispatcher
+"""
+
+import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import requests
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.utils import timezone
+
+from knowledge_commons_profiles.newprofile import outbox
+from knowledge_commons_profiles.newprofile.models import OutboxKind
+from knowledge_commons_profiles.newprofile.models import OutboxMessage
+from knowledge_commons_profiles.newprofile.models import OutboxStatus
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api import outbox_dispatcher
+from knowledge_commons_profiles.rest_api.sync import ExternalSync
+
+SUBSCRIBERS = ["https://one.example/hook", "https://two.example/hook?k=s"]
+
+PING = "knowledge_commons_profiles.rest_api.sync.ExternalSync.ping_subscriber"
+
+
+@override_settings(
+    WEBHOOK_URLS=SUBSCRIBERS,
+    WORKS_UPDATE_ENDPOINTS=["https://works.example/"],
+    WORDPRESS_AVATAR_UPDATE_URL="https://wp.example/avatar",
+    WORDPRESS_EMAIL_UPDATE_URL="",
+)
+class EnqueueTests(TestCase):
+    def test_fans_out_one_message_per_destination(self):
+        outbox.queue_subscriber_webhooks("alice")
+        outbox.queue_association("sub-1", "alice")
+
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list("kind", "destination")),
+            [
+                (OutboxKind.ASSOCIATION, "https://works.example/"),
+                (OutboxKind.SUBSCRIBER_WEBHOOK, SUBSCRIBERS[0]),
+                (OutboxKind.SUBSCRIBER_WEBHOOK, SUBSCRIBERS[1]),
+            ],
+        )
+        self.assertEqual(
+            OutboxMessage.objects.get(kind=OutboxKind.ASSOCIATION).payload,
+            {"sub": "sub-1"},
+        )
+
+    def test_unconfigured_destination_is_skipped(self):
+        self.assertIsNone(outbox.queue_email_sync("alice", "a@example.com"))
+        self.assertIsNotNone(outbox.queue_avatar_sync("alice", "/a.jpg"))
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_rolled_back_request_leaves_no_message(self):
+        msg = "the view failed"
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            outbox.queue_user_update("alice")
+            raise RuntimeError(msg)
+
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_sync_queues_subscriber_pings(self):
+        profile = Profile.objects.create(username="alice", name="A")
+
+        with patch("requests.Session.get") as mock_get:
+            ExternalSync.notify_subscribers(profile)
+
+        mock_get.assert_not_called()
+        self.assertEqual(
+            OutboxMessage.objects.filter(
+                kind=OutboxKind.SUBSCRIBER_WEBHOOK
+            ).count(),
+            2,
+        )
+
+    def test_queue_depth(self):
+        outbox.queue_subscriber_webhooks("alice")
+        outbox.queue_subscriber_webhooks("bob")
+        OutboxMessage.objects.filter(username="bob").update(
+            status=OutboxStatus.FAILED
+        )
+
+        depth = outbox.queue_depth()
+
+        self.assertEqual(depth["pending"], 2)
+        self.assertEqual(depth["failed"], 2)
+        self.assertEqual(depth["running"], 0)
+        self.assertEqual(
+            depth["pending_by_kind"], {OutboxKind.SUBSCRIBER_WEBHOOK: 2}
+        )
+        # hosts only, so credentials in the URLs are not reported
+        self.assertEqual(
+            depth["pending_by_destination"],
+            {"one.example": 1, "two.example": 1},
+        )
+
+
+@override_settings(WEBHOOK_URLS=SUBSCRIBERS[:1])
+class DispatcherTests(TestCase):
+    def test_delivered_messages_are_removed(self):
+        outbox.queue_subscriber_webhooks("alice")
+
+        with patch(PING, return_value=True) as mock_ping:
+            counts = outbox_dispatcher.run_pending()
+
+        mock_ping.assert_called_once_with(SUBSCRIBERS[0], "alice")
+        self.assertEqual(counts["delivered"], 1)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_one_users_messages_are_delivered_in_order(self):
+        first = outbox.queue_subscriber_webhooks("alice")[0]
+        second = outbox.queue_subscriber_webhooks("alice")[0]
+        outbox.queue_subscriber_webhooks("bob")
+
+        claimed = outbox_dispatcher.claim_messages()
+
+        self.assertEqual(
+            sorted(message.username for message in claimed), ["alice", "bob"]
+        )
+        self.assertIn(first.id, [message.id for message in claimed])
+
+        # the second is held back while the first is running
+        self.assertEqual(outbox_dispatcher.claim_messages(), [])
+
+        OutboxMessage.objects.filter(id=first.id).delete()
+        self.assertEqual(
+            [message.id for message in outbox_dispatcher.claim_messages()],
+            [second.id],
+        )
+
+    def test_failed_message_is_backed_off_alone(self):
+        outbox.queue_subscriber_webhooks("alice")
+        outbox.queue_subscriber_webhooks("bob")
+
+        with patch(PING, side_effect=[False, True]) as mock_ping:
+            counts = outbox_dispatcher.run_pending()
+
+        # alice's refused ping does not hold up bob's
+        self.assertEqual(mock_ping.call_count, 2)
+        self.assertEqual(counts["delivered"], 1)
+        self.assertEqual(counts["failed"], 1)
+        self.assertEqual(counts["deferred"], 0)
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.username, "alice")
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.status, OutboxStatus.PENDING)
+        self.assertGreater(message.run_after, timezone.now())
+        self.assertEqual(message.last_error, "delivery failed")
+
+    def test_repeated_failures_back_off_the_whole_destination(self):
+        for username in ("alice", "bob", "carol", "dave"):
+            outbox.queue_subscriber_webhooks(username)
+
+        with patch(PING, return_value=False) as mock_ping:
+            counts = outbox_dispatcher.run_pending()
+
+        self.assertEqual(
+            mock_ping.call_count, outbox_dispatcher.CONSECUTIVE_FAILURES_DOWN
+        )
+        self.assertEqual(counts["failed"], 3)
+        self.assertEqual(counts["deferred"], 1)
+        self.assertEqual(outbox_dispatcher.claim_messages(), [])
+
+    def test_unavailable_destination_is_backed_off_whole(self):
+        outbox.queue_subscriber_webhooks("alice")
+        outbox.queue_subscriber_webhooks("bob")
+
+        with patch(
+            PING, side_effect=requests.ConnectionError("refused")
+        ) as mock_ping:
+            counts = outbox_dispatcher.run_pending()
+
+        # bob's message was not tried once alice's failed
+        mock_ping.assert_called_once()
+        self.assertEqual(counts["failed"], 1)
+        self.assertEqual(counts["deferred"], 1)
+
+        messages = OutboxMessage.objects.order_by("id")
+        self.assertEqual([message.attempts for message in messages], [1, 0])
+        self.assertTrue(
+            all(
+                message.status == OutboxStatus.PENDING
+                and message.run_after > timezone.now()
+                for message in messages
+            )
+        )
+        self.assertEqual(messages[0].last_error, "refused")
+
+        self.assertEqual(outbox_dispatcher.claim_messages(), [])
+
+    def test_backoff_is_exponential_and_capped(self):
+        self.assertEqual(
+            outbox_dispatcher.backoff(1), outbox_dispatcher.RETRY_BACKOFF
+        )
+        self.assertEqual(
+            outbox_dispatcher.backoff(3), outbox_dispatcher.RETRY_BACKOFF * 4
+        )
+        self.assertEqual(
+            outbox_dispatcher.backoff(30), outbox_dispatcher.MAX_BACKOFF
+        )
+
+    def test_gives_up_after_max_attempts(self):
+        message = outbox.queue_subscriber_webhooks("alice")[0]
+        OutboxMessage.objects.filter(id=message.id).update(
+            attempts=outbox_dispatcher.MAX_ATTEMPTS - 1
+        )
+
+        with patch(PING, side_effect=ValueError("bad payload")):
+            outbox_dispatcher.run_pending()
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxStatus.FAILED)
+        self.assertEqual(message.last_error, "bad payload")
+
+    def test_stale_running_messages_are_reclaimed(self):
+        message = outbox.queue_subscriber_webhooks("alice")[0]
+        OutboxMessage.objects.filter(id=message.id).update(
+            status=OutboxStatus.RUNNING,
+            started=timezone.now()
+            - outbox_dispatcher.STALE_RUNNING
+            - datetime.timedelta(minutes=1),
+        )
+
+        self.assertEqual(
+            [claimed.id for claimed in outbox_dispatcher.claim_messages()],
+            [message.id],
+        )
+
+    def test_cc_search_message_for_a_deleted_profile_is_dropped(self):
+        with override_settings(CC_SEARCH_URL="https://search.example/"):
+            outbox.queue_cc_search_index(Mock(username="gone"))
+
+        counts = outbox_dispatcher.run_pending()
+
+        self.assertEqual(counts["delivered"], 1)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+@override_settings(
+    WORKS_UPDATE_ENDPOINTS=["https://works.example/"],
+    IDMS_UPDATE_BATCH_SIZE=2,
+)
+@patch.object(outbox_dispatcher, "send_webhook_updates_to")
+class UserUpdateBatchingTests(TestCase):
+    def test_user_updates_share_a_call(self, mock_send):
+        for username in ("alice", "bob", "carol"):
+            outbox.queue_user_update(username)
+
+        counts = outbox_dispatcher.run_pending()
+
+        self.assertEqual(counts["delivered"], 3)
+        self.assertEqual(
+            [
+                [update.id for update in call.args[1]]
+                for call in mock_send.call_args_list
+            ],
+            [["alice", "bob"], ["carol"]],
+        )
+
+    def test_queued_repeats_are_coalesced(self, mock_send):
+        outbox.queue_user_update("alice")
+        outbox.queue_user_update("alice")
+        outbox.queue_user_update("alice")
+
+        counts = outbox_dispatcher.run_pending()
+
+        mock_send.assert_called_once()
+        self.assertEqual(counts["coalesced"], 2)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_failed_batch_is_retried_together(self, mock_send):
+        mock_send.return_value = None
+        outbox.queue_user_update("alice")
+        outbox.queue_user_update("bob")
+
+        counts = outbox_dispatcher.run_pending()
+
+        self.assertEqual(counts["failed"], 2)
+        self.assertEqual(
+            list(OutboxMessage.objects.values_list("attempts", flat=True)),
+            [1, 1],
+        )
+
+
+@override_settings(WEBHOOK_URLS=SUBSCRIBERS)
+class ConcurrentDispatchTests(TransactionTestCase):
+    def test_destinations_are_delivered_on_the_pool(self):
+        for username in ("alice", "bob", "carol"):
+            outbox.queue_subscriber_webhooks(username)
+
+        with (
+            patch(PING, return_value=True) as mock_ping,
+            ThreadPoolExecutor(max_workers=2) as executor,
+        ):
+            counts = outbox_dispatcher.run_pending(executor=executor)
+
+        self.assertEqual(counts["delivered"], 6)
+        self.assertEqual(mock_ping.call_count, 6)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+@override_settings(WEBHOOK_URLS=SUBSCRIBERS[:1])
+class CommandTests(TransactionTestCase):
+    def test_once_delivers_and_reports(self):
+        outbox.queue_subscriber_webhooks("alice")
+        out = StringIO()
+
+        with patch(PING, return_value=True):
+            call_command("run_outbox_dispatcher", "--once", stdout=out)
+
+        self.assertIn(
+            "Delivered 1 messages (0 more coalesced), 0 failed", out.getvalue()
+        )
+
+    def test_stats(self):
+        outbox.queue_subscriber_webhooks("alice")
+        out = StringIO()
+
+        call_command("run_outbox_dispatcher", "--stats", stdout=out)
+
+        self.assertEqual(json.loads(out.getvalue())["pending"], 1)
@@ -0,0 +1,81 @@
+"""
+Tests for the shared cache of anonymous REST detail responses
+"""
+
+import json
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api.authentication import (
+    StaticBearerAuthentication,
+)
+from knowledge_commons_profiles.rest_api.views import ProfileDetailView
+
+
+@override_settings(
+    ANONYMOUS_RESPONSE_CACHE_TIMEOUT=600,
+    EXTERNAL_SYNC_IN_BACKGROUND=True,
+    GROUP_MEMBERSHIP_MIRROR_ENABLED=True,
+    STATIC_API_BEARER="cache-token",
+    SYNC_HOURS=24,
+)
+@patch.object(StaticBearerAuthentication, "static_token", "cache-token")
+class AnonymousResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profile = Profile.objects.create(
+            username="cached", name="C", last_sync=timezone.now()
+        )
+
+    def _get(self, **headers):
+        request = APIRequestFactory().get("/api/v1/members/cached/", **headers)
+        with patch.object(
+            ProfileDetailView,
+            "get_serializer",
+            return_value=MagicMock(data={"name": self.profile.name}),
+        ) as mock_serializer:
+            response = ProfileDetailView.as_view()(request, user_name="cached")
+        return response, mock_serializer
+
+    def test_hit_skips_the_serializer(self):
+        first, _ = self._get()
+        second, mock_serializer = self._get()
+
+        mock_serializer.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(json.loads(second.content), {"name": "C"})
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second["Content-Type"], "application/json")
+
+    def test_authenticated_responses_are_not_shared(self):
+        self._get(HTTP_AUTHORIZATION="Bearer cache-token")
+        _, mock_serializer = self._get(HTTP_AUTHORIZATION="Bearer cache-token")
+
+        mock_serializer.assert_called_once()
+
+        _, mock_serializer = self._get()
+        mock_serializer.assert_called_once()
+
+    def test_profile_save_invalidates(self):
+        self._get()
+
+        self.profile.name = "Renamed"
+        self.profile.save()
+        response, mock_serializer = self._get()
+
+        mock_serializer.assert_called_once()
+        self.assertEqual(json.loads(response.content), {"name": "Renamed"})
+
+    @override_settings(ANONYMOUS_RESPONSE_CACHE_TIMEOUT=0)
+    def test_can_be_turned_off(self):
+        self._get()
+        _, mock_serializer = self._get()
+
+        mock_serializer.assert_called_once()
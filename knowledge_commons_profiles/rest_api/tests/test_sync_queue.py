@@ -0,0 +1,188 @@
+"""
+Tests for the background queue of external membership refreshes.
+"""
+
+import datetime
+from io import StringIO
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from knowledge_commons_profiles.newprofile.models import ExternalSyncJob
+from knowledge_commons_profiles.newprofile.models import ExternalSyncJobStatus
+from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api import sync_queue
+from knowledge_commons_profiles.rest_api.views import ProfileDetailView
+
+SYNC = "knowledge_commons_profiles.rest_api.sync_queue.ExternalSync.sync"
+PREFETCH = (
+    "knowledge_commons_profiles.rest_api.sync_queue.ExternalSync.prefetch"
+)
+
+
+class EnqueueTests(TestCase):
+    def setUp(self):
+        self.profile = Profile.objects.create(username="queued", name="Q")
+
+    def test_pending_jobs_are_deduplicated(self):
+        sync_queue.enqueue_external_sync(self.profile)
+        sync_queue.enqueue_external_sync(self.profile)
+
+        self.assertEqual(ExternalSyncJob.objects.count(), 1)
+
+    def test_running_job_does_not_block_a_new_one(self):
+        sync_queue.enqueue_external_sync(self.profile)
+        sync_queue.claim_jobs()
+
+        sync_queue.enqueue_external_sync(self.profile)
+
+        self.assertEqual(
+            ExternalSyncJob.objects.filter(
+                status=ExternalSyncJobStatus.PENDING
+            ).count(),
+            1,
+        )
+
+
+class WorkerTests(TestCase):
+    def setUp(self):
+        self.profile = Profile.objects.create(username="queued", name="Q")
+        sync_queue.enqueue_external_sync(self.profile)
+
+        prefetch = patch(PREFETCH)
+        self.mock_prefetch = prefetch.start()
+        self.addCleanup(prefetch.stop)
+
+    @patch(SYNC)
+    def test_successful_jobs_are_removed(self, mock_sync):
+        counts = sync_queue.run_pending()
+
+        self.assertEqual(counts, {"claimed": 1, "synced": 1, "failed": 0})
+        mock_sync.assert_called_once_with(profile=self.profile)
+        self.assertFalse(ExternalSyncJob.objects.exists())
+
+    @patch(SYNC)
+    def test_stale_profiles_in_a_batch_are_prefetched(self, mock_sync):
+        fresh = Profile.objects.create(
+            username="fresh", name="F", last_sync=timezone.now()
+        )
+        sync_queue.enqueue_external_sync(fresh)
+
+        sync_queue.run_pending()
+
+        prefetched = self.mock_prefetch.call_args.args[0]
+        self.assertEqual(
+            [profile.username for profile in prefetched], ["queued"]
+        )
+
+    @patch(SYNC, side_effect=ValueError("partner down"))
+    def test_failed_jobs_back_off_then_give_up(self, mock_sync):
+        sync_queue.run_pending()
+
+        job = ExternalSyncJob.objects.get()
+        self.assertEqual(job.status, ExternalSyncJobStatus.PENDING)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(job.last_error, "partner down")
+
+        # not due yet
+        self.assertEqual(sync_queue.run_pending()["claimed"], 0)
+
+        for _ in range(sync_queue.MAX_ATTEMPTS - 1):
+            ExternalSyncJob.objects.update(run_after=timezone.now())
+            sync_queue.run_pending()
+
+        self.assertEqual(
+            ExternalSyncJob.objects.get().status, ExternalSyncJobStatus.FAILED
+        )
+
+    @patch(SYNC)
+    def test_jobs_abandoned_by_a_dead_worker_are_reclaimed(self, mock_sync):
+        ExternalSyncJob.objects.update(
+            status=ExternalSyncJobStatus.RUNNING,
+            started=timezone.now() - datetime.timedelta(hours=1),
+        )
+
+        self.assertEqual(sync_queue.run_pending()["synced"], 1)
+
+    @patch(SYNC)
+    def test_abandoned_job_out_of_attempts_is_given_up(self, mock_sync):
+        ExternalSyncJob.objects.update(
+            status=ExternalSyncJobStatus.RUNNING,
+            started=timezone.now() - datetime.timedelta(hours=1),
+            attempts=sync_queue.MAX_ATTEMPTS,
+        )
+
+        self.assertEqual(sync_queue.run_pending()["claimed"], 0)
+
+        mock_sync.assert_not_called()
+        self.assertEqual(
+            ExternalSyncJob.objects.get().status, ExternalSyncJobStatus.FAILED
+        )
+
+    def test_old_failed_jobs_are_pruned(self):
+        ExternalSyncJob.objects.update(status=ExternalSyncJobStatus.FAILED)
+        old = ExternalSyncJob.objects.create(
+            username="old",
+            status=ExternalSyncJobStatus.FAILED,
+            run_after=timezone.now() - sync_queue.FAILED_RETENTION * 2,
+        )
+
+        self.assertEqual(sync_queue.prune_failed_jobs(), 1)
+
+        self.assertFalse(ExternalSyncJob.objects.filter(id=old.id).exists())
+        self.assertEqual(ExternalSyncJob.objects.count(), 1)
+
+    @patch(SYNC)
+    def test_command_runs_queue_once(self, mock_sync):
+        out = StringIO()
+
+        call_command("run_sync_worker", "--once", stdout=out)
+
+        self.assertIn("Synced 1 profiles, 0 failed.", out.getvalue())
+
+
+@override_settings(
+    EXTERNAL_SYNC_IN_BACKGROUND=True,
+    GROUP_MEMBERSHIP_MIRROR_ENABLED=True,
+    SYNC_HOURS=24,
+)
+class DetailViewTests(TestCase):
+    def _get(self, username):
+        request = APIRequestFactory().get(f"/api/v1/members/{username}/")
+        with (
+            patch.object(
+                ProfileDetailView,
+                "get_serializer",
+                return_value=MagicMock(data={"username": username}),
+            ),
+            patch(
+                "knowledge_commons_profiles.rest_api.views.ExternalSync.sync"
+            ) as mock_sync,
+        ):
+            response = ProfileDetailView.as_view()(request, user_name=username)
+
+        mock_sync.assert_not_called()
+        return response
+
+    def test_stale_profile_is_served_and_queued(self):
+        Profile.objects.create(username="stale", name="S", last_sync=None)
+
+        response = self._get("stale")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            ExternalSyncJob.objects.filter(username="stale").exists()
+        )
+
+    def test_fresh_profile_is_not_queued(self):
+        Profile.objects.create(
+            username="fresh", name="F", last_sync=timezone.now()
+        )
+
+        self.assertEqual(self._get("fresh").status_code, 200)
+        self.assertFalse(ExternalSyncJob.objects.exists())
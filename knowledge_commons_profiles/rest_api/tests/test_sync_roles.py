@@ -6,14 +6,20 @@ STEMED+) overwrite each other's is_member_of values because the mapping
 dict was iterated inside the role loop.
 """
 
+import asyncio
+import datetime
 import json
+import threading
+from unittest.mock import AsyncMock
 from unittest.mock import Mock
 from unittest.mock import patch
 
 import requests
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.test import override_settings
+from django.utils import timezone
 
 from knowledge_commons_profiles.newprofile.models import CO
 from knowledge_commons_profiles.newprofile.models import Person
@@ -195,9 +201,7 @@ class RefreshLocalMembershipsTests(TestCase):
     @override_settings(KNOWN_SOCIETY_MAPPINGS=SOCIETY_MAPPINGS)
     def test_does_not_make_external_http_calls(self):
         self._make_role(self.co_hastac, "Hastac")
-        with patch(
-            "knowledge_commons_profiles.rest_api.sync.requests.get"
-        ) as mock_get:
+        with patch("requests.Session.get") as mock_get:
             ExternalSync.refresh_local_memberships(self.profile)
         mock_get.assert_not_called()
 
@@ -211,13 +215,13 @@ class RefreshLocalMembershipsTests(TestCase):
 
 
 class TestSendWebhooks(TestCase):
-    """Tests for ExternalSync._send_webhooks() outbound request."""
+    """Tests for ExternalSync.ping_subscriber() outbound request."""
 
     @override_settings(
         WEBHOOK_URLS=["https://webhook1.example/"],
         WEBHOOK_TOKEN="secret-token",
     )
-    @patch("knowledge_commons_profiles.rest_api.sync.requests.get")
+    @patch("requests.Session.get")
     def test_auth_sent_in_header_not_query_string(self, mock_get):
         """The webhook token must travel in the Authorization header
         only, never in the query string, where it would leak into the
@@ -228,10 +232,9 @@ class TestSendWebhooks(TestCase):
         mock_response.ok = True
         mock_get.return_value = mock_response
 
-        profile = Mock()
-        profile.username = "testuser"
-
-        ExternalSync._send_webhooks(profile, send_webhook=True)
+        ExternalSync.ping_subscriber(
+            "https://webhook1.example/", "testuser"
+        )
 
         mock_get.assert_called_once_with(
             "https://webhook1.example/",
@@ -247,14 +250,250 @@ class TestSendWebhooks(TestCase):
         WEBHOOK_URLS=["https://webhook1.example/"],
         WEBHOOK_TOKEN="secret-token",
     )
-    @patch("knowledge_commons_profiles.rest_api.sync.requests.get")
+    @patch("requests.Session.get")
     def test_connection_error_is_swallowed(self, mock_get):
         """A failing webhook must not propagate an exception to the
         caller; sync should continue regardless."""
         mock_get.side_effect = requests.exceptions.ConnectionError("boom")
 
-        profile = Mock()
-        profile.username = "testuser"
-
         # Should not raise.
-        ExternalSync._send_webhooks(profile, send_webhook=True)
+        delivered = ExternalSync.ping_subscriber(
+            "https://webhook1.example/", "testuser"
+        )
+
+        self.assertFalse(delivered)
+
+
+def _partner(class_name, sync_id, is_member=True, delay=None):
+    """A stand-in SyncClass whose search takes delay() to return."""
+
+    def search_multiple(emails):
+        if delay:
+            delay()
+        return {class_name: sync_id}
+
+    return Mock(
+        search_multiple=Mock(side_effect=search_multiple),
+        get_sync_id=lambda response: response,
+        is_member=Mock(return_value=is_member),
+        groups=Mock(return_value=[f"{class_name} group"]),
+    )
+
+
+def _minutes_until_stale(profile):
+    fresh_until = profile.last_sync + datetime.timedelta(
+        hours=settings.SYNC_HOURS
+    )
+    return (fresh_until - timezone.now()).total_seconds() / 60
+
+
+@override_settings(
+    KNOWN_SOCIETY_MAPPINGS={},
+    EXTERNAL_SYNC_CLASSES=[("MLA", ["MLA"]), ("UP", ["UP"])],
+    EXTERNAL_SYNC_DEADLINE=5,
+    EXTERNAL_SYNC_RETRY_MINUTES=15,
+)
+class ParallelSyncTests(TestCase):
+    """Tests for the concurrent partner lookups in ExternalSync.sync()."""
+
+    def setUp(self):
+        self.profile = Profile.objects.create(
+            username="dana",
+            email="dana@example.test",
+            is_member_of=json.dumps({"UP": True}),
+            in_membership_groups=json.dumps({"UP": ["old group"]}),
+            external_sync_ids=json.dumps({"UP": "up-1"}),
+        )
+
+    def _sync(self, partners):
+        with patch.dict(
+            "knowledge_commons_profiles.rest_api.sync.CLASS_LOOKUPS",
+            partners,
+        ):
+            return ExternalSync.sync(self.profile, cache=False, webhooks=False)
+
+    def test_partners_are_called_concurrently(self):
+        barrier = threading.Barrier(2, timeout=2)
+
+        # each search waits for the other, so this only succeeds if both
+        # are in flight at once
+        result = self._sync(
+            {
+                "MLA": _partner("MLA", "mla-1", delay=barrier.wait),
+                "UP": _partner("UP", "up-1", delay=barrier.wait),
+            }
+        )
+
+        self.assertEqual(result, {"UP": True, "MLA": True})
+
+    def test_results_are_merged_in_class_order(self):
+        up_answered = threading.Event()
+
+        # MLA answers last, but is still stored first
+        self._sync(
+            {
+                "MLA": _partner(
+                    "MLA", "mla-1", delay=lambda: up_answered.wait(2)
+                ),
+                "UP": _partner(
+                    "UP", None, delay=up_answered.set, is_member=False
+                ),
+            }
+        )
+
+        self.profile.refresh_from_db()
+        self.assertEqual(
+            list(json.loads(self.profile.external_sync_ids)), ["UP", "MLA"]
+        )
+        self.assertEqual(
+            json.loads(self.profile.in_membership_groups),
+            {"UP": [], "MLA": ["MLA group"]},
+        )
+        self.assertIsNotNone(self.profile.last_sync)
+
+    @override_settings(EXTERNAL_SYNC_DEADLINE=0.1)
+    def test_slow_partner_keeps_its_previous_result(self):
+        release = threading.Event()
+
+        try:
+            result = self._sync(
+                {
+                    "MLA": _partner("MLA", "mla-1", is_member=False),
+                    "UP": _partner(
+                        "UP", "up-2", delay=lambda: release.wait(2)
+                    ),
+                }
+            )
+        finally:
+            release.set()
+
+        self.assertEqual(result, {"UP": True, "MLA": False})
+
+        self.profile.refresh_from_db()
+        self.assertEqual(
+            json.loads(self.profile.external_sync_ids),
+            {"UP": "up-1", "MLA": "mla-1"},
+        )
+        self.assertEqual(
+            json.loads(self.profile.in_membership_groups)["UP"],
+            ["old group"],
+        )
+        # stale again soon, so a later sync asks UP again
+        self.assertAlmostEqual(_minutes_until_stale(self.profile), 15, delta=1)
+
+    def test_sync_with_status_reports_a_skipped_partner(self):
+        broken = _partner("UP", "up-1")
+        broken.search_multiple.side_effect = requests.ConnectionError("down")
+
+        with patch.dict(
+            "knowledge_commons_profiles.rest_api.sync.CLASS_LOOKUPS",
+            {"MLA": _partner("MLA", "mla-1"), "UP": broken},
+        ):
+            _, complete = ExternalSync.sync_with_status(
+                self.profile, cache=False, webhooks=False
+            )
+            _, complete_again = ExternalSync.sync_with_status(
+                self.profile,
+                [("MLA", ["MLA"])],
+                cache=False,
+                webhooks=False,
+            )
+
+        self.assertFalse(complete)
+        self.assertTrue(complete_again)
+
+    def test_failing_partner_does_not_break_the_others(self):
+        broken = _partner("UP", "up-1")
+        broken.search_multiple.side_effect = requests.ConnectionError("down")
+
+        result = self._sync({"MLA": _partner("MLA", "mla-1"), "UP": broken})
+
+        self.assertEqual(result, {"UP": True, "MLA": True})
+        self.profile.refresh_from_db()
+        self.assertAlmostEqual(_minutes_until_stale(self.profile), 15, delta=1)
+
+
+def _async_partner(class_name, sync_id, is_member=True, delay=None):
+    """A stand-in SyncClass whose async search awaits delay() to return."""
+
+    async def asearch_multiple(emails):
+        if delay:
+            await delay()
+        return {class_name: sync_id}
+
+    return Mock(
+        asearch_multiple=AsyncMock(side_effect=asearch_multiple),
+        get_sync_id=lambda response: response,
+        ais_member=AsyncMock(return_value=is_member),
+        agroups=AsyncMock(return_value=[f"{class_name} group"]),
+    )
+
+
+@override_settings(
+    KNOWN_SOCIETY_MAPPINGS={},
+    EXTERNAL_SYNC_CLASSES=[("MLA", ["MLA"]), ("UP", ["UP"])],
+    EXTERNAL_SYNC_DEADLINE=5,
+    EXTERNAL_SYNC_RETRY_MINUTES=15,
+)
+class AsyncSyncTests(TestCase):
+    """Tests for ExternalSync.async_sync()."""
+
+    def setUp(self):
+        self.profile = Profile.objects.create(
+            username="dana",
+            email="dana@example.test",
+            is_member_of=json.dumps({"UP": True}),
+            in_membership_groups=json.dumps({"UP": ["old group"]}),
+            external_sync_ids=json.dumps({"UP": "up-1"}),
+        )
+
+    async def _sync(self, partners):
+        with patch.dict(
+            "knowledge_commons_profiles.rest_api.sync.CLASS_LOOKUPS",
+            partners,
+        ):
+            return await ExternalSync.async_sync(
+                self.profile, cache=False, webhooks=False
+            )
+
+    async def test_partners_are_awaited_together(self):
+        barrier = asyncio.Barrier(2)
+
+        async def both_in_flight():
+            await asyncio.wait_for(barrier.wait(), timeout=2)
+
+        result = await self._sync(
+            {
+                "MLA": _async_partner("MLA", "mla-1", delay=both_in_flight),
+                "UP": _async_partner("UP", None, delay=both_in_flight),
+            }
+        )
+
+        self.assertEqual(result, {"UP": False, "MLA": True})
+
+        await self.profile.arefresh_from_db()
+        self.assertEqual(
+            json.loads(self.profile.external_sync_ids),
+            {"UP": None, "MLA": "mla-1"},
+        )
+        self.assertIsNotNone(self.profile.last_sync)
+
+    @override_settings(EXTERNAL_SYNC_DEADLINE=0.1)
+    async def test_slow_partner_keeps_its_previous_result(self):
+        result = await self._sync(
+            {
+                "MLA": _async_partner("MLA", "mla-1", is_member=False),
+                "UP": _async_partner(
+                    "UP", "up-2", delay=lambda: asyncio.sleep(2)
+                ),
+            }
+        )
+
+        self.assertEqual(result, {"UP": True, "MLA": False})
+
+        await self.profile.arefresh_from_db()
+        self.assertEqual(
+            json.loads(self.profile.external_sync_ids),
+            {"UP": "up-1", "MLA": "mla-1"},
+        )
+        self.assertAlmostEqual(_minutes_until_stale(self.profile), 15, delta=1)
@@ -1,3 +1,4 @@
+import threading
 import unittest
 from unittest.mock import Mock
 from unittest.mock import patch
@@ -367,7 +368,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_single_successful_request(self, mock_post):
         """Test successful logout to single endpoint."""
         mock_response = Mock()
@@ -386,7 +387,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_single_failed_request_4xx(self, mock_post):
         """Test failed logout with 4xx status code."""
         mock_response = Mock()
@@ -405,7 +406,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_single_failed_request_5xx(self, mock_post):
         """Test failed logout with 5xx status code."""
         mock_response = Mock()
@@ -423,7 +424,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_request_exception(self, mock_post):
         """Test handling of network/connection exceptions."""
         mock_post.side_effect = requests.ConnectionError("Connection failed")
@@ -445,7 +446,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         ],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_multiple_successful_requests(self, mock_post):
         """Test successful logout to multiple endpoints."""
         mock_response = Mock()
@@ -475,7 +476,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         ],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_mixed_success_failure_results(self, mock_post):
         """Test mixed results with some successes and failures."""
 
@@ -511,7 +512,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_correct_headers_sent(self, mock_post):
         """Test that correct headers are sent with requests."""
         mock_response = Mock()
@@ -535,7 +536,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         * 15,  # 15 identical endpoints
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_many_endpoints_processed(self, mock_post):
         """Test that function can handle many endpoints."""
         mock_response = Mock()
@@ -554,7 +555,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_return_value_structure(self, mock_post):
         """Test that return values have correct structure."""
         mock_response = Mock()
@@ -577,7 +578,7 @@ class TestLogoutAllEndpointsSync(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="different-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_uses_configured_bearer_token(self, mock_post):
         """Test that function uses the configured bearer token."""
         mock_response = Mock()
@@ -591,6 +592,45 @@ class TestLogoutAllEndpointsSync(TestCase):
             called_headers["Authorization"], "Bearer different-token"
         )
 
+    @override_settings(
+        LOGOUT_ENDPOINTS=["https://fast.com/logout", "https://slow.com/logout"],
+        STATIC_API_BEARER="test-token",
+        OUTBOUND_FANOUT_DEADLINE=0.1,
+    )
+    @patch("requests.Session.post")
+    def test_endpoint_missing_the_deadline(self, mock_post):
+        """Test that a slow endpoint does not hold up the logout."""
+        release = threading.Event()
+
+        def side_effect(url, **kwargs):
+            if "slow" in url:
+                release.wait(2)
+            return Mock(status_code=200)
+
+        mock_post.side_effect = side_effect
+
+        try:
+            result = logout_all_endpoints_sync(username="testuser")
+        finally:
+            release.set()
+
+        self.assertEqual(
+            result,
+            [
+                {
+                    "endpoint": "https://fast.com/logout",
+                    "status": 200,
+                    "success": True,
+                },
+                {
+                    "endpoint": "https://slow.com/logout",
+                    "status": None,
+                    "success": False,
+                    "error": "deadline",
+                },
+            ],
+        )
+
 
 class TestCheckApiEndpointsHealth(TestCase):
     @override_settings(LOGOUT_ENDPOINTS=[], STATIC_API_BEARER="test-token")
@@ -609,7 +649,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_401_is_reachable(self, mock_post):
         """Test that 401 response means endpoint is reachable."""
         mock_response = Mock()
@@ -624,7 +664,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_403_is_reachable(self, mock_post):
         """Test that 403 response means endpoint is reachable."""
         mock_response = Mock()
@@ -639,7 +679,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_503_is_unreachable(self, mock_post):
         """Test that 503 response means endpoint is unreachable."""
         mock_response = Mock()
@@ -656,7 +696,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_404_is_reachable(self, mock_post):
         """Test that 404 response means endpoint is reachable."""
         mock_response = Mock()
@@ -671,7 +711,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_200_is_reachable(self, mock_post):
         """Test that 200 response means endpoint is reachable."""
         mock_response = Mock()
@@ -686,7 +726,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_connection_error(self, mock_post):
         """Test handling of connection errors."""
         mock_post.side_effect = requests.ConnectionError("Connection refused")
@@ -701,7 +741,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_timeout_error(self, mock_post):
         """Test handling of timeout errors."""
         mock_post.side_effect = requests.Timeout("Request timed out")
@@ -719,7 +759,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         ],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_multiple_endpoints_mixed(self, mock_post):
         """Test mixed results with multiple endpoints."""
 
@@ -743,7 +783,7 @@ class TestCheckApiEndpointsHealth(TestCase):
         LOGOUT_ENDPOINTS=["https://api1.com/logout"],
         STATIC_API_BEARER="test-token",
     )
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_correct_headers_and_params(self, mock_post):
         """Test that correct headers, params, and timeout are sent."""
         mock_response = Mock()
@@ -2,11 +2,21 @@
 Tests for REST API views.
 """
 
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import RequestFactory
 from django.test import TestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
 from knowledge_commons_profiles.cilogon.models import SubAssociation
 from knowledge_commons_profiles.newprofile.models import Profile
+from knowledge_commons_profiles.rest_api.authentication import (
+    StaticBearerAuthentication,
+)
 from knowledge_commons_profiles.rest_api.views import SubSingleView
 
 
@@ -115,3 +125,62 @@ class TestSubSingleViewQueryset(TestCase):
             "profile",
             queryset.query.select_related,
         )
+
+
+@override_settings(STATIC_API_BEARER="list-token")
+class TestProfileListViewQueries(TestCase):
+    """The members list must not query per profile."""
+
+    def setUp(self):
+        self.client_headers = {"Authorization": "Bearer list-token"}
+        self.token_patcher = patch.object(
+            StaticBearerAuthentication, "static_token", "list-token"
+        )
+        self.token_patcher.start()
+
+        User.objects.create_user(username="admin0", is_staff=True)
+        User.objects.create_user(username="member1")
+
+    def tearDown(self):
+        self.token_patcher.stop()
+
+    def _create_profiles(self, count):
+        for index in range(count):
+            Profile.objects.create(
+                username=f"member{index}", name=f"Member Number{index}"
+            )
+        Profile.objects.create(username="admin0", name="Ada Admin")
+
+    def _get_page(self):
+        return self.client.get(
+            reverse("profiles_list_view"), headers=self.client_headers
+        )
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._create_profiles(3)
+        with CaptureQueriesContext(connection) as small_page:
+            self.assertEqual(self._get_page().status_code, 200)
+
+        Profile.objects.bulk_create(
+            [
+                Profile(username=f"extra{index}", name=f"Extra {index}")
+                for index in range(10)
+            ]
+        )
+        with CaptureQueriesContext(connection) as large_page:
+            response = self._get_page()
+
+        self.assertEqual(len(response.json()["results"]), 14)
+        self.assertEqual(len(large_page), len(small_page))
+
+    def test_superadmin_and_names_come_from_the_page_query(self):
+        self._create_profiles(2)
+
+        response = self._get_page()
+
+        results = {row["username"]: row for row in response.json()["results"]}
+        self.assertTrue(results["admin0"]["is_superadmin"])
+        self.assertFalse(results["member1"]["is_superadmin"])
+        self.assertFalse(results["member0"]["is_superadmin"])
+        self.assertEqual(results["admin0"]["first_name"], "Ada")
+        self.assertEqual(results["admin0"]["last_name"], "Admin")
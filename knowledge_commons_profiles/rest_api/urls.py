@@ -20,9 +20,12 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from knowledge_commons_profiles.rest_api.views import ChangeFeedView
 from knowledge_commons_profiles.rest_api.views import GroupDetailView
 from knowledge_commons_profiles.rest_api.views import LogoutView
+from knowledge_commons_profiles.rest_api.views import ProfileBatchView
 from knowledge_commons_profiles.rest_api.views import ProfileDetailView
+from knowledge_commons_profiles.rest_api.views import ProfileExportView
 from knowledge_commons_profiles.rest_api.views import ProfileListView
 from knowledge_commons_profiles.rest_api.views import SubListView
 from knowledge_commons_profiles.rest_api.views import SubSingleView
@@ -80,11 +83,26 @@ urlpatterns = [
         ProfileListView.as_view(),
         name="profiles_list_view",
     ),
+    path(
+        r"api/v1/members/export/",
+        ProfileExportView.as_view(),
+        name="profiles_export_view",
+    ),
+    path(
+        r"api/v1/members/batch/",
+        ProfileBatchView.as_view(),
+        name="profiles_batch_view",
+    ),
     path(
         r"api/v1/members/<str:user_name>/",
         ProfileDetailView.as_view(),
         name="profiles_detail_view",
     ),
+    path(
+        r"api/v1/changes/",
+        ChangeFeedView.as_view(),
+        name="changes_view",
+    ),
     path(
         r"api/v1/groups/<int:pk>/",
         GroupDetailView.as_view(),
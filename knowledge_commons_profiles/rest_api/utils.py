@@ -2,16 +2,21 @@
 Utility functions
 """
 
-import json
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from concurrent.futures import as_completed
 
 import requests
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import CharField
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.db.models import Q
+from django.db.models.functions import Cast
 from nameparser import HumanName
 from rest_framework.status import HTTP_400_BAD_REQUEST
 
+from knowledge_commons_profiles.common import fast_json
+from knowledge_commons_profiles.common import http_pool
 from knowledge_commons_profiles.newprofile.models import Profile
 
 logger = logging.getLogger(__name__)
@@ -29,6 +34,20 @@ def wp_unslash(value: str) -> str:
     return value.replace("\\'", "'").replace('\\"', '"').replace("\\\\", "\\")
 
 
+def superadmin_exists():
+    """
+    An expression for whether a profile's user is a superadmin, so that
+    profile querysets can annotate it rather than the serializer looking up
+    each User in turn
+    """
+    return Exists(
+        User.objects.filter(
+            Q(is_superuser=True) | Q(is_staff=True),
+            username=Cast(OuterRef("username"), CharField()),
+        )
+    )
+
+
 def build_metadata(authed, error=None):
     """
     Build the metadata for the response
@@ -76,7 +95,9 @@ def get_last_name(obj: Profile, logger) -> str:
 
 
 def logout_all_endpoints_sync(username="", request=None):
-    """Synchronous logout using threading for parallel requests."""
+    """Synchronous logout, sent to the endpoints in parallel on the shared
+    outbound pool. An endpoint that has not answered by the fan-out
+    deadline is reported with the error "deadline"."""
 
     endpoints = getattr(settings, "LOGOUT_ENDPOINTS", [])
     if not endpoints:
@@ -100,7 +121,7 @@ def logout_all_endpoints_sync(username="", request=None):
         msg = f"Sending logout request to {endpoint} for {username}"
         logger.info(msg)
         try:
-            response = requests.post(
+            response = http_pool.session_for(endpoint).post(
                 endpoint,
                 headers=headers,
                 params={"username": username},
@@ -133,13 +154,25 @@ def logout_all_endpoints_sync(username="", request=None):
                 "success": response.status_code < HTTP_400_BAD_REQUEST,
             }
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_endpoint = {
-            executor.submit(send_request, endpoint): endpoint
-            for endpoint in endpoints
+    def missed_deadline(endpoint):
+        return {
+            "endpoint": endpoint,
+            "status": None,
+            "success": False,
+            "error": "deadline",
         }
 
-        return [future.result() for future in as_completed(future_to_endpoint)]
+    results = http_pool.fan_out(send_request, endpoints, missed_deadline)
+
+    logger.info(
+        "Logout for %s sent to %s endpoints: %s succeeded, %s failed",
+        username,
+        len(results),
+        sum(result["success"] for result in results),
+        sum(not result["success"] for result in results),
+    )
+
+    return results
 
 
 def check_api_endpoints_health():
@@ -160,7 +193,7 @@ def check_api_endpoints_health():
 
     def probe(endpoint):
         try:
-            response = requests.post(
+            response = http_pool.session_for(endpoint).post(
                 endpoint,
                 headers=headers,
                 params={"username": "zed-stack-a-deh"},
@@ -177,9 +210,10 @@ def check_api_endpoints_health():
                 return (endpoint, "reachable")
             return (endpoint, f"unreachable: {response.status_code}")
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(probe, ep): ep for ep in endpoints}
-        return dict(future.result() for future in as_completed(futures))
+    def missed_deadline(endpoint):
+        return (endpoint, "unreachable: deadline")
+
+    return dict(http_pool.fan_out(probe, endpoints, missed_deadline))
 
 
 def get_external_memberships(obj: Profile, api_only=False):
@@ -194,13 +228,13 @@ def get_external_memberships(obj: Profile, api_only=False):
         # been synced; treat that as an empty base so the manual
         # role_overrides layer still applies below
         member_data = obj.is_member_of
-        member_json = json.loads(member_data) if member_data else {}
+        member_json = fast_json.loads(member_data) if member_data else {}
 
         if not api_only:
             for role in obj.role_overrides:
                 member_json[role] = True
 
-    except (json.JSONDecodeError, AttributeError, Exception) as e:
+    except (fast_json.JSONDecodeError, AttributeError, Exception) as e:
         message = (
             f"Failed to get external sync memberships "
             f"for {obj.username}: {e}"
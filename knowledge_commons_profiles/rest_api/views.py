@@ -6,9 +6,11 @@ import logging
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import OperationalError
 from django.http import Http404
-from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
 from django.urls import reverse
+from django.utils.cache import patch_vary_headers
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics
@@ -19,27 +21,45 @@ from rest_framework.response import Response
 from knowledge_commons_profiles.cilogon.models import SubAssociation
 from knowledge_commons_profiles.cilogon.views import RedirectBehaviour
 from knowledge_commons_profiles.cilogon.views import app_logout
+from knowledge_commons_profiles.newprofile import change_feed
+from knowledge_commons_profiles.newprofile.api import get_groups_for_usernames
+from knowledge_commons_profiles.newprofile.group_cache import get_group_metadata
 from knowledge_commons_profiles.newprofile.models import Profile
 from knowledge_commons_profiles.newprofile.models import WpBpGroup
+from knowledge_commons_profiles.rest_api import response_cache
 from knowledge_commons_profiles.rest_api.authentication import (
     HasStaticBearerToken,
 )
 from knowledge_commons_profiles.rest_api.authentication import (
     StaticBearerAuthentication,
 )
+from knowledge_commons_profiles.rest_api.conditional import add_version_headers
+from knowledge_commons_profiles.rest_api.conditional import group_version
+from knowledge_commons_profiles.rest_api.conditional import (
+    not_modified_response,
+)
+from knowledge_commons_profiles.rest_api.conditional import profile_version
 from knowledge_commons_profiles.rest_api.errors import RESTError
+from knowledge_commons_profiles.rest_api.export import gzip_lines
+from knowledge_commons_profiles.rest_api.export import iter_profile_lines
 from knowledge_commons_profiles.rest_api.pagination import (
     ProfileCursorPagination,
 )
 from knowledge_commons_profiles.rest_api.pagination import (
     SubProfileCursorPagination,
 )
+from knowledge_commons_profiles.rest_api.serializers.serializers import (
+    ChangeLogEntrySerializer,
+)
 from knowledge_commons_profiles.rest_api.serializers.serializers import (
     GroupDetailSerializer,
 )
 from knowledge_commons_profiles.rest_api.serializers.serializers import (
     LogoutSerializer,
 )
+from knowledge_commons_profiles.rest_api.serializers.serializers import (
+    ProfileBatchSerializer,
+)
 from knowledge_commons_profiles.rest_api.serializers.serializers import (
     ProfileDetailSerializer,
 )
@@ -56,7 +76,9 @@ from knowledge_commons_profiles.rest_api.serializers.serializers import (
     TokenSerializer,
 )
 from knowledge_commons_profiles.rest_api.sync import ExternalSync
+from knowledge_commons_profiles.rest_api.sync_queue import enqueue_external_sync
 from knowledge_commons_profiles.rest_api.utils import build_metadata
+from knowledge_commons_profiles.rest_api.utils import superadmin_exists
 
 logger = logging.getLogger(__name__)
 
@@ -120,6 +142,43 @@ class ProfileListView(generics.ListAPIView):
     serializer_class = ProfileSerializer
     pagination_class = ProfileCursorPagination
 
+    def get_queryset(self):
+        # work out superadmin status in the page query, rather than with a
+        # User lookup per profile in the serializer
+        return (
+            super()
+            .get_queryset()
+            .annotate(user_is_superadmin=superadmin_exists())
+        )
+
+
+class ProfileExportView(generics.GenericAPIView):
+    """
+    Stream every profile as NDJSON, gzip-compressed if the client accepts it
+    """
+
+    authentication_classes = [StaticBearerAuthentication]
+    permission_classes = [HasStaticBearerToken]
+
+    def get(self, request, *args, **kwargs):
+        lines = iter_profile_lines(request)
+
+        compress = "gzip" in request.headers.get("Accept-Encoding", "")
+        if compress:
+            lines = gzip_lines(lines)
+
+        response = StreamingHttpResponse(
+            lines, content_type="application/x-ndjson"
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="profiles.ndjson"'
+        )
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        return response
+
 
 class ProfileDetailView(generics.RetrieveAPIView):
     """
@@ -138,8 +197,20 @@ class ProfileDetailView(generics.RetrieveAPIView):
 
         try:
             instance = self.get_object()
-            # update the instance's sync IDs
-            ExternalSync.sync(profile=instance)
+
+            # answer a conditional request from the version stamps alone,
+            # before the sync check and the serializer
+            etag, last_modified = profile_version(instance, has_full_access)
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+            if not settings.EXTERNAL_SYNC_IN_BACKGROUND:
+                # update the instance's sync IDs
+                ExternalSync.sync(profile=instance)
+            elif ExternalSync.is_stale(instance):
+                # serve the stored memberships; a worker refreshes them
+                enqueue_external_sync(instance)
 
         except Http404:
             meta = build_metadata(
@@ -147,73 +218,217 @@ class ProfileDetailView(generics.RetrieveAPIView):
             )
             return Response(meta, status=status.HTTP_404_NOT_FOUND)
 
+        if not settings.EXTERNAL_SYNC_IN_BACKGROUND:
+            # an inline sync may have changed the profile
+            etag, last_modified = profile_version(instance, has_full_access)
+
+        # the public variant is the same for everyone, so share it
+        resource = response_cache.profile_resource(instance.username)
+        cached = response_cache.fetch(request, resource, etag)
+        if cached is not None:
+            return add_version_headers(cached, etag, last_modified)
+
         serializer = self.get_serializer(instance)
         data = serializer.data
 
+        response = response_cache.store_profile(
+            request, instance, etag, data
+        ) or Response(data, status=status.HTTP_200_OK)
+
+        return add_version_headers(response, etag, last_modified)
+
+
+class ProfileBatchView(generics.GenericAPIView):
+    """
+    Retrieve many profiles at once
+    """
+
+    authentication_classes = [StaticBearerAuthentication]
+    permission_classes = [AllowAny]
+    queryset = Profile.objects.prefetch_related(
+        "academic_interests", "profileimage_set"
+    )
+    serializer_class = ProfileDetailSerializer
+
+    @swagger_auto_schema(
+        request_body=ProfileBatchSerializer,
+        responses={
+            200: openapi.Response(
+                "A map of username to profile, and the usernames not found"
+            )
+        },
+    )
+    def post(self, request, *args, **kwargs):
+        has_full_access = bool(request.auth)
+
+        batch = ProfileBatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        usernames = batch.validated_data["usernames"]
+
+        profiles = list(
+            self.get_queryset()
+            .filter(username__in=usernames)
+            .annotate(user_is_superadmin=superadmin_exists())
+        )
+
+        status_choices = (
+            WpBpGroup.STATUS_CHOICES
+            if has_full_access
+            else WpBpGroup.STATUS_CHOICES[:1]
+        )
+
+        try:
+            groups = get_groups_for_usernames(
+                [profile.username for profile in profiles],
+                [key for key, label in status_choices],
+            )
+        except OperationalError:
+            logger.warning("Unable to connect to MySQL, fast-failing groups.")
+            groups = {}
+
+        if settings.EXTERNAL_SYNC_IN_BACKGROUND:
+            # never sync inline here: a batch can be hundreds of profiles
+            for profile in profiles:
+                if ExternalSync.is_stale(profile):
+                    enqueue_external_sync(profile)
+
+        serializer = self.get_serializer(
+            profiles,
+            many=True,
+            context={
+                **self.get_serializer_context(),
+                "groups_by_username": groups,
+            },
+        )
+
+        # usernames match case-insensitively, so answer each under the
+        # spelling it was asked for
+        found = {
+            profile.username.lower(): data
+            for profile, data in zip(profiles, serializer.data, strict=True)
+        }
+        results = {
+            username: found[username.lower()]
+            for username in usernames
+            if username.lower() in found
+        }
+
         return Response(
-            data,
+            {
+                "results": results,
+                "not_found": [
+                    username
+                    for username in usernames
+                    if username not in results
+                ],
+                **build_metadata(has_full_access),
+            },
             status=status.HTTP_200_OK,
         )
 
 
-class MultipleFieldLookupMixin:
+class ChangeFeedView(generics.GenericAPIView):
     """
-    Allows us to lookup by different field names
+    List changes to profiles and memberships since a cursor
     """
 
-    def get_object(self):
-        queryset = self.get_queryset()
-        queryset = self.filter_queryset(queryset)
-        queryset_filter = {}
+    authentication_classes = [StaticBearerAuthentication]
+    permission_classes = [HasStaticBearerToken]
+    serializer_class = ChangeLogEntrySerializer
 
-        for field in self.lookup_fields:
-            if self.kwargs.get(field, None):
-                queryset_filter[field] = self.kwargs[field]
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                description="The cursor returned by the previous page",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="The maximum number of changes to return",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        has_full_access = bool(request.auth)
 
-        obj = get_object_or_404(queryset, **queryset_filter)
-        self.check_object_permissions(self.request, obj)
-        return obj
+        try:
+            limit = int(
+                request.query_params.get(
+                    "limit", change_feed.DEFAULT_PAGE_SIZE
+                )
+            )
+            entries, next_cursor, has_more = change_feed.changes_since(
+                request.query_params.get("since"), limit=limit
+            )
+        except ValueError:
+            meta = build_metadata(
+                has_full_access, error=RESTError.FATAL_INVALID_CURSOR
+            )
+            return Response(meta, status=status.HTTP_400_BAD_REQUEST)
+        except change_feed.ExpiredCursorError:
+            meta = build_metadata(
+                has_full_access, error=RESTError.FATAL_CURSOR_EXPIRED
+            )
+            return Response(meta, status=status.HTTP_410_GONE)
+
+        return Response(
+            {
+                "results": self.get_serializer(entries, many=True).data,
+                "next": next_cursor,
+                "has_more": has_more,
+                **build_metadata(has_full_access),
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
-class GroupDetailView(MultipleFieldLookupMixin, generics.RetrieveAPIView):
+class GroupDetailView(generics.RetrieveAPIView):
     """
-    Retrieve a profile
+    Retrieve a group
     """
 
     authentication_classes = [StaticBearerAuthentication]
     permission_classes = [AllowAny]
     queryset = WpBpGroup.objects.all()
     serializer_class = GroupDetailSerializer
-    lookup_fields = ["pk", "slug"]
-    lookup_url_kwarg = ["pk"]
 
     def retrieve(self, request, *args, **kwargs):
         has_full_access = bool(request.auth)
 
-        try:
-            instance: WpBpGroup = self.get_object()
-
-            if instance.status != "public" and not has_full_access:
-                meta = build_metadata(
-                    has_full_access, error=RESTError.FATAL_GROUP_NOT_FOUND
-                )
-                return Response(meta, status=status.HTTP_404_NOT_FOUND)
+        instance = get_group_metadata(
+            group_id=self.kwargs.get("pk"), slug=self.kwargs.get("slug")
+        )
 
-        except Http404:
+        if instance is None or (
+            instance["status"] != "public" and not has_full_access
+        ):
             meta = build_metadata(
                 has_full_access, error=RESTError.FATAL_GROUP_NOT_FOUND
             )
             return Response(meta, status=status.HTTP_404_NOT_FOUND)
 
+        etag, last_modified = group_version(instance)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        resource = response_cache.group_resource(instance["id"])
+        cached = response_cache.fetch(request, resource, etag)
+        if cached is not None:
+            return add_version_headers(cached, etag, last_modified)
+
         serializer = self.get_serializer(instance)
-        data = serializer.data
+        data = {"results": serializer.data}
 
-        return Response(
-            {
-                "results": data,
-            },
-            status=status.HTTP_200_OK,
-        )
+        response = response_cache.store_group(
+            request, instance["id"], etag, data
+        ) or Response(data, status=status.HTTP_200_OK)
+
+        return add_version_headers(response, etag, last_modified)
 
 
 class TokenPutView(generics.CreateAPIView):